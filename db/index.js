@@ -1,12 +1,15 @@
 var pg = require('pg');
 
-var pool = new pg.Pool({
+var connection = {
   connectionString: process.env.DATABASE_URL,
-  ssl: process.env.NODE_ENV === 'production' ? { rejectUnauthorized: false } : false,
+  ssl: process.env.NODE_ENV === 'production' ? { rejectUnauthorized: false } : false
+};
+
+var pool = new pg.Pool(Object.assign({
   max: 20,
   idleTimeoutMillis: 30000,
   connectionTimeoutMillis: 5000
-});
+}, connection));
 
 pool.on('error', function(err) {
   console.error('Unexpected pool error:', err);
@@ -30,4 +33,35 @@ async function dbRun(text, params) {
   return result;
 }
 
-module.exports = { pool, dbAll, dbGet, dbRun };
+// Bulk INSERT ... SELECT unnest(...): one round trip per chunk of rows instead
+// of one per row. columns is [{ name, type }] where type is the Postgres
+// element type of the parameter array (e.g. 'int', 'text', 'float8', 'jsonb');
+// rows are arrays of values in column order. Returns the RETURNING rows.
+async function dbBulkInsert(table, columns, rows, options) {
+  options = options || {};
+  var chunkSize = options.chunkSize || 500;
+  var conflict = options.onConflict === undefined ? 'ON CONFLICT DO NOTHING' : options.onConflict;
+  var returning = options.returning ? ' RETURNING ' + options.returning : '';
+  var names = columns.map(function(c) { return c.name; }).join(', ');
+  var unnestArgs = columns.map(function(c, i) { return '$' + (i + 1) + '::' + c.type + '[]'; }).join(', ');
+  var text = 'INSERT INTO ' + table + ' (' + names + ') SELECT * FROM unnest(' + unnestArgs + ') ' + conflict + returning;
+
+  var out = [];
+  for (var start = 0; start < rows.length; start += chunkSize) {
+    var chunk = rows.slice(start, start + chunkSize);
+    var params = columns.map(function(c, i) {
+      return chunk.map(function(row) { return row[i] === undefined ? null : row[i]; });
+    });
+    var result = await pool.query(text, params);
+    if (result.rows) out = out.concat(result.rows);
+  }
+  return out;
+}
+
+// A dedicated connection outside the pool, for long-lived sessions such as
+// LISTEN that must not hold one of the pool's slots. Caller connects/ends it.
+function createClient() {
+  return new pg.Client(Object.assign({ connectionTimeoutMillis: 5000 }, connection));
+}
+
+module.exports = { pool, dbAll, dbGet, dbRun, dbBulkInsert, createClient };
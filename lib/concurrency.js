@@ -0,0 +1,83 @@
+// ── Bounded concurrency helpers ──
+// Background jobs (matching, ingestion, precompute) share the web process and
+// its pg.Pool (max 20). These helpers cap how many async tasks a job has in
+// flight, and how fast it spends an upstream rate limit, so it can never take
+// over the pool or flood an upstream API.
+
+// Semaphore: limit(fn) runs fn when a slot is free and resolves with its result.
+function createLimiter(max) {
+  max = Math.max(1, max || 1);
+  var active = 0;
+  var waiting = [];
+
+  function next() {
+    while (active < max && waiting.length) {
+      active++;
+      var task = waiting.shift();
+      Promise.resolve().then(task.fn).then(task.resolve, task.reject).finally(function() {
+        active--;
+        next();
+      });
+    }
+  }
+
+  function limit(fn) {
+    return new Promise(function(resolve, reject) {
+      waiting.push({ fn: fn, resolve: resolve, reject: reject });
+      next();
+    });
+  }
+
+  limit.active = function() { return active; };
+  limit.pending = function() { return waiting.length; };
+  limit.setMax = function(n) { max = Math.max(1, n || 1); next(); };
+  return limit;
+}
+
+// Map items through an async fn with at most `max` in flight. Results keep
+// input order; a rejected item yields { error } instead of failing the batch.
+async function mapWithConcurrency(items, max, fn) {
+  var limit = createLimiter(max);
+  return Promise.all(items.map(function(item, i) {
+    return limit(function() { return fn(item, i); }).catch(function(err) {
+      return { error: err };
+    });
+  }));
+}
+
+// Token bucket: take(n) resolves once n tokens are available. Refills
+// continuously at ratePerSec up to capacity; callers are served in order.
+function createTokenBucket(ratePerSec, capacity) {
+  capacity = Math.max(1, capacity || ratePerSec);
+  var tokens = capacity;
+  var last = Date.now();
+  var chain = Promise.resolve();
+
+  function refill() {
+    var now = Date.now();
+    tokens = Math.min(capacity, tokens + (now - last) / 1000 * ratePerSec);
+    last = now;
+  }
+
+  function take(n) {
+    n = Math.min(Math.max(0, n || 1), capacity);
+    var p = chain.then(async function() {
+      refill();
+      while (tokens < n) {
+        var waitMs = Math.ceil((n - tokens) / ratePerSec * 1000);
+        await new Promise(function(r) { setTimeout(r, waitMs); });
+        refill();
+      }
+      tokens -= n;
+    });
+    chain = p.catch(function() {});
+    return p;
+  }
+
+  return {
+    take: take,
+    available: function() { refill(); return tokens; }
+  };
+}
+
+module.exports = { createLimiter, mapWithConcurrency, createTokenBucket };
@@ -4,6 +4,7 @@
 var xlsx = require('xlsx');
 var crypto = require('crypto');
 var { dbRun, dbGet, dbAll } = require('../db');
+var { registerJobHandler, enqueueJob } = require('./job_queue');
 var { inferStakeholderType, inferThemes, inferJurisdiction } = require('./stakeholder_inference');
 
 function parseCSV(csvString) {
@@ -117,8 +118,8 @@ async function importContacts(communityId, rows, source, createdBy, fieldMapping
     [imported, skipped, failed, batchId]
   );
 
-  // Shadow canister build — fire and forget
-  buildShadowCanistersForBatch(communityId, batchId).catch(function(err) {
+  // Shadow canister build — queued, survives a restart mid-build
+  enqueueJob('shadow_canisters', { community_id: communityId, batch_id: batchId }).catch(function(err) {
     console.error('[contact_importer] shadow canister build failed:', err.message);
   });
 
@@ -166,4 +167,14 @@ async function buildShadowCanistersForBatch(communityId, batchId) {
   }
 }
 
+// Only contacts not yet built are selected, so a retried job resumes where
+// the previous attempt stopped.
+registerJobHandler('shadow_canisters', {
+  batchSize: 1,
+  concurrency: 1,
+  handler: function(jobs) {
+    return buildShadowCanistersForBatch(jobs[0].payload.community_id, jobs[0].payload.batch_id);
+  }
+});
+
 module.exports = { parseCSV, parseExcel, applyMapping, normaliseContact, importContacts };
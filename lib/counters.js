@@ -0,0 +1,167 @@
+// ── Maintained counters ──
+// Denormalised counts that list endpoints read instead of aggregating per
+// row: events.registration_count (active RSVPs), communities.member_count,
+// users.match_count and users.reveal_count. Triggers keep them current in
+// the same transaction as the write (server.js runMigrations); this module
+// finds and repairs drift — rows written before a trigger existed, bulk
+// loads with triggers disabled, manual fixes.
+//
+// Design:
+//   - Each counter has a detect query (one grouped pass, no locks) that
+//     returns the ids whose stored value differs from a recount.
+//   - Repairs run COUNTER_REPAIR_CHUNK ids per transaction: lock the rows
+//     FOR UPDATE, then recount in a fresh statement. A writer whose trigger
+//     already ran has committed by the time the lock is granted and is
+//     counted; one that has not yet run waits and applies its +/-1 on top.
+//     So a repair never loses a concurrent increment.
+//   - Runs every COUNTER_RECONCILE_HOURS (first pass shortly after boot),
+//     under an advisory lock so one instance does the work. The lock sits
+//     on a dedicated connection; detect queries and repair transactions
+//     borrow pooled ones only for as long as each takes. runMigrations
+//     also runs one pass inline when it creates a counter column, so new
+//     columns are filled before they are read. Drift is logged per
+//     counter; steady non-zero drift means a write path bypasses the
+//     triggers.
+
+var { pool, createClient } = require('../db');
+
+var RECONCILE_EVERY_MS = parseFloat(process.env.COUNTER_RECONCILE_HOURS || '6') * 60 * 60 * 1000;
+var REPAIR_CHUNK = parseInt(process.env.COUNTER_REPAIR_CHUNK || '500', 10);
+var ADVISORY_LOCK_KEY = 824646; // arbitrary constant, unique to counter reconciliation
+
+// User-side view of event_matches: one row per (match, participant)
+var USER_MATCHES = `(SELECT id, user_a_id AS user_id, status FROM event_matches
+                     UNION SELECT id, user_b_id, status FROM event_matches)`;
+
+var COUNTERS = [
+  {
+    name: 'events.registration_count',
+    table: 'events',
+    detect: `SELECT e.id FROM events e
+             LEFT JOIN (SELECT event_id, COUNT(*)::int AS n FROM event_registrations
+                        WHERE status = 'active' GROUP BY event_id) c ON c.event_id = e.id
+             WHERE e.registration_count <> COALESCE(c.n, 0)`,
+    repair: `UPDATE events e SET registration_count =
+               (SELECT COUNT(*) FROM event_registrations r WHERE r.event_id = e.id AND r.status = 'active')
+             WHERE e.id = ANY($1::int[])`
+  },
+  {
+    name: 'communities.member_count',
+    table: 'communities',
+    detect: `SELECT c.id FROM communities c
+             LEFT JOIN (SELECT community_id, COUNT(*)::int AS n FROM community_members
+                        GROUP BY community_id) m ON m.community_id = c.id
+             WHERE c.member_count <> COALESCE(m.n, 0)`,
+    repair: `UPDATE communities c SET member_count =
+               (SELECT COUNT(*) FROM community_members m WHERE m.community_id = c.id)
+             WHERE c.id = ANY($1::int[])`
+  },
+  {
+    name: 'users.match_count/reveal_count',
+    table: 'users',
+    detect: `SELECT u.id FROM users u
+             LEFT JOIN (SELECT user_id, COUNT(*)::int AS n,
+                               COUNT(*) FILTER (WHERE status = 'revealed')::int AS r
+                        FROM ${USER_MATCHES} um GROUP BY user_id) c ON c.user_id = u.id
+             WHERE u.match_count <> COALESCE(c.n, 0) OR u.reveal_count <> COALESCE(c.r, 0)`,
+    repair: `UPDATE users u SET match_count = c.n, reveal_count = c.r
+             FROM (SELECT x.id, COUNT(m.id)::int AS n,
+                          COUNT(m.id) FILTER (WHERE m.status = 'revealed')::int AS r
+                   FROM unnest($1::int[]) AS x(id)
+                   LEFT JOIN event_matches m ON m.user_a_id = x.id OR m.user_b_id = x.id
+                   GROUP BY x.id) c
+             WHERE u.id = c.id`
+  }
+];
+
+var running = false;
+var lastRun = null;
+
+// One transaction on a pooled client, returned as soon as the chunk commits
+async function repairChunk(counter, ids) {
+  var client = await pool.connect();
+  try {
+    await client.query('BEGIN');
+    await client.query('SELECT id FROM ' + counter.table + ' WHERE id = ANY($1::int[]) ORDER BY id FOR UPDATE', [ids]);
+    var result = await client.query(counter.repair, [ids]);
+    await client.query('COMMIT');
+    return result.rowCount || 0;
+  } catch (err) {
+    await client.query('ROLLBACK').catch(function() {});
+    throw err;
+  } finally {
+    client.release();
+  }
+}
+
+// Recount every counter and repair rows that drifted. Returns the run
+// summary (or { skipped } when another run holds the lock).
+async function reconcileCounters() {
+  if (running) return { skipped: 'running' };
+  running = true;
+  var client = null;
+  var lockHeld = false;
+  var summary = { started_at: new Date().toISOString(), finished_at: null, duration_ms: 0, counters: {} };
+
+  try {
+    // Held for the whole run, so kept off the pool the repairs use
+    client = createClient();
+    client.on('error', function(err) { console.error('[counters] Lock connection error:', err.message); });
+    await client.connect();
+    var lock = await client.query('SELECT pg_try_advisory_lock($1) AS ok', [ADVISORY_LOCK_KEY]);
+    if (!lock.rows[0].ok) return { skipped: 'locked' };
+    lockHeld = true;
+
+    for (var i = 0; i < COUNTERS.length; i++) {
+      var counter = COUNTERS[i];
+      var entry = summary.counters[counter.name] = { drifted: 0, repaired: 0 };
+      try {
+        var ids = (await pool.query(counter.detect)).rows.map(function(r) { return r.id; });
+        entry.drifted = ids.length;
+        for (var start = 0; start < ids.length; start += REPAIR_CHUNK) {
+          entry.repaired += await repairChunk(counter, ids.slice(start, start + REPAIR_CHUNK));
+        }
+        if (ids.length) console.log('[counters] ' + counter.name + ': repaired ' + entry.repaired + ' drifted row(s)');
+      } catch (err) {
+        entry.error = err.message;
+        console.error('[counters] ' + counter.name + ' reconcile failed:', err.message);
+      }
+    }
+
+    summary.finished_at = new Date().toISOString();
+    summary.duration_ms = Date.now() - new Date(summary.started_at).getTime();
+    lastRun = summary;
+    return summary;
+  } catch (err) {
+    console.error('[counters] Reconcile error:', err.message);
+    summary.finished_at = new Date().toISOString();
+    lastRun = Object.assign(summary, { error: err.message });
+    return summary;
+  } finally {
+    running = false;
+    if (client) {
+      if (lockHeld) {
+        try { await client.query('SELECT pg_advisory_unlock($1)', [ADVISORY_LOCK_KEY]); } catch (e) {}
+      }
+      await client.end().catch(function() {});
+    }
+  }
+}
+
+function startCounterReconciler() {
+  setInterval(function() { reconcileCounters(); }, RECONCILE_EVERY_MS);
+  // First pass after boot catches drift from writes made while we were down
+  setTimeout(function() { reconcileCounters(); }, 30000);
+  console.log('[counters] Reconciler armed: every ' + Math.round(RECONCILE_EVERY_MS / 3600000 * 10) / 10 + 'h');
+}
+
+function getCounterStatus() {
+  return {
+    running: running,
+    last_run: lastRun,
+    counters: COUNTERS.map(function(c) { return c.name; }),
+    config: { every_hours: RECONCILE_EVERY_MS / 3600000, repair_chunk: REPAIR_CHUNK }
+  };
+}
+
+module.exports = { reconcileCounters, startCounterReconciler, getCounterStatus };
@@ -0,0 +1,182 @@
+// ── Crawl pipeline primitives ──
+// Building blocks for the ingestion crawler: bounded stages that hand work to
+// each other, per-host politeness, and latency histograms cheap enough to
+// keep for every item and small enough to store in ingestion_runs.stats.
+//
+// Design:
+//   - A stage is a bounded queue plus N workers. push() resolves once the
+//     item is queued; when the queue is full it waits, so a slow downstream
+//     stage throttles its producers instead of buffering a whole slice.
+//   - Stages are drained in pipeline order: a worker blocked pushing into
+//     the next stage still counts as active, so upstream.drain() only
+//     resolves once everything it produced has been queued downstream.
+//   - Politeness is per host, not global: at most HOST_CONCURRENCY requests
+//     in flight per host and a minimum gap between request starts. Slots are
+//     reserved synchronously so concurrent callers never share one.
+//   - Histograms use fixed millisecond buckets; percentiles are reported as
+//     the upper bound of the bucket they fall in (capped at the max seen).
+
+var { createLimiter } = require('./concurrency');
+
+var BUCKETS_MS = [50, 100, 250, 500, 1000, 2500, 5000, 10000, 25000, 60000];
+
+function sleep(ms) { return new Promise(function(r) { setTimeout(r, ms); }); }
+
+// ── Latency histogram ──
+function createHistogram() {
+  var counts = new Array(BUCKETS_MS.length + 1).fill(0);
+  var count = 0;
+  var total = 0;
+  var max = 0;
+
+  function record(ms) {
+    var i = 0;
+    while (i < BUCKETS_MS.length && ms > BUCKETS_MS[i]) i++;
+    counts[i]++;
+    count++;
+    total += ms;
+    if (ms > max) max = ms;
+  }
+
+  function percentile(p) {
+    if (!count) return null;
+    var rank = Math.ceil(count * p);
+    var seen = 0;
+    for (var i = 0; i < counts.length; i++) {
+      seen += counts[i];
+      if (seen >= rank) return Math.round(i < BUCKETS_MS.length ? Math.min(BUCKETS_MS[i], max) : max);
+    }
+    return max;
+  }
+
+  function toJSON() {
+    var buckets = {};
+    counts.forEach(function(c, i) {
+      if (c) buckets[i < BUCKETS_MS.length ? 'le_' + BUCKETS_MS[i] : 'gt_' + BUCKETS_MS[BUCKETS_MS.length - 1]] = c;
+    });
+    return {
+      count: count,
+      mean_ms: count ? Math.round(total / count) : null,
+      p50_ms: percentile(0.5),
+      p95_ms: percentile(0.95),
+      max_ms: Math.round(max),
+      buckets: buckets
+    };
+  }
+
+  return { record: record, toJSON: toJSON };
+}
+
+// ── Bounded stage ──
+// fn(item) does the work; its errors are counted and passed to opts.onError
+// rather than stopping the stage.
+function createStage(name, opts, fn) {
+  var concurrency = Math.max(1, opts.concurrency || 1);
+  var capacity = Math.max(1, opts.capacity || concurrency * 4);
+  var queue = [];
+  var spaceWaiters = [];
+  var idleWaiters = [];
+  var active = 0;
+  var histogram = createHistogram();
+  var counters = { processed: 0, errors: 0 };
+
+  function isIdle() {
+    return !queue.length && !active && !spaceWaiters.length;
+  }
+
+  function settleIdle() {
+    if (!isIdle()) return;
+    var waiters = idleWaiters;
+    idleWaiters = [];
+    waiters.forEach(function(r) { r(); });
+  }
+
+  function pump() {
+    while (active < concurrency && queue.length) {
+      var item = queue.shift();
+      if (spaceWaiters.length) spaceWaiters.shift()();
+      active++;
+      run(item);
+    }
+    settleIdle();
+  }
+
+  async function run(item) {
+    var started = Date.now();
+    try {
+      await fn(item);
+      counters.processed++;
+    } catch (err) {
+      counters.errors++;
+      if (opts.onError) opts.onError(err, item);
+    } finally {
+      histogram.record(Date.now() - started);
+      active--;
+      pump();
+    }
+  }
+
+  function push(item) {
+    if (queue.length < capacity) {
+      queue.push(item);
+      pump();
+      return Promise.resolve();
+    }
+    return new Promise(function(resolve) {
+      spaceWaiters.push(function() {
+        queue.push(item);
+        resolve();
+      });
+    });
+  }
+
+  function drain() {
+    if (isIdle()) return Promise.resolve();
+    return new Promise(function(resolve) { idleWaiters.push(resolve); });
+  }
+
+  function stats() {
+    return Object.assign({ concurrency: concurrency, latency: histogram.toJSON() }, counters);
+  }
+
+  return { name: name, push: push, drain: drain, stats: stats };
+}
+
+// ── Per-host politeness ──
+function hostOf(url) {
+  try { return new URL(url).hostname.replace(/^www\./, ''); } catch (e) { return ''; }
+}
+
+function createHostGate(opts) {
+  opts = opts || {};
+  var perHost = Math.max(1, opts.concurrency || 1);
+  var intervalMs = Math.max(0, opts.intervalMs || 0);
+  var hosts = new Map();
+  var counters = { hosts: 0, waits: 0, wait_ms: 0 };
+
+  function gate(url, fn) {
+    var host = hostOf(url);
+    var h = hosts.get(host);
+    if (!h) {
+      h = { limit: createLimiter(perHost), nextAt: 0 };
+      hosts.set(host, h);
+      counters.hosts++;
+    }
+    return h.limit(async function() {
+      var now = Date.now();
+      var at = Math.max(now, h.nextAt);
+      h.nextAt = at + intervalMs;
+      if (at > now) {
+        counters.waits++;
+        counters.wait_ms += at - now;
+        await sleep(at - now);
+      }
+      return fn();
+    });
+  }
+
+  gate.stats = function() { return Object.assign({}, counters); };
+  return gate;
+}
+
+module.exports = { createStage, createHostGate, createHistogram, hostOf };
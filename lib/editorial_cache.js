@@ -0,0 +1,130 @@
+// ── Editorial cache ──
+// Persistent memo of the short Claude-written editorial lines in the
+// community dashboard (pulse cluster summaries, "why now" rationales,
+// network narratives). Those prompts are built only from aggregates —
+// theme, signal count, action breakdown — so a cluster whose numbers have
+// not moved since the last pulse gets the same prompt and reuses its text
+// instead of calling the model again.
+//
+// Design:
+//   - Keyed by sha256(model, max_tokens, prompt): the prompt is a pure
+//     function of the aggregates, so this is a hash of the inputs that also
+//     changes whenever a prompt template is edited.
+//   - Rows older than EDITORIAL_CACHE_DAYS are ignored and overwritten, so
+//     wording is refreshed now and then even for steady clusters.
+//   - Model calls go through one process-wide limiter
+//     (EDITORIAL_CONCURRENCY): callers can fan out every prompt at once.
+//   - Concurrent requests for one key share a call. Failures are not cached.
+//   - Fail open, like extraction_cache: Postgres trouble means a miss.
+
+var crypto = require('crypto');
+var { createLimiter } = require('./concurrency');
+
+var EDITORIAL_CACHE_DAYS = parseFloat(process.env.EDITORIAL_CACHE_DAYS || '7');
+var EDITORIAL_CONCURRENCY = parseInt(process.env.EDITORIAL_CONCURRENCY || '4', 10);
+var WRITES_PER_PRUNE = 500;
+
+var limit = createLimiter(EDITORIAL_CONCURRENCY);
+var tableReady = null;
+var inflight = new Map();
+var writesSincePrune = 0;
+var stats = { hits: 0, misses: 0, shared: 0, writes: 0, errors: 0 };
+
+function db() {
+  return require('../db');
+}
+
+function ensureTable() {
+  if (!tableReady) {
+    tableReady = db().dbRun(`CREATE TABLE IF NOT EXISTS editorial_cache (
+      input_hash BYTEA PRIMARY KEY,
+      model TEXT NOT NULL,
+      text TEXT NOT NULL,
+      created_at TIMESTAMPTZ DEFAULT NOW()
+    )`).catch(function(err) {
+      tableReady = null;
+      throw err;
+    });
+  }
+  return tableReady;
+}
+
+async function lookup(hash) {
+  try {
+    await ensureTable();
+    var row = await db().dbGet(
+      "SELECT text FROM editorial_cache WHERE input_hash = $1 AND created_at > NOW() - $2 * INTERVAL '1 day'",
+      [hash, EDITORIAL_CACHE_DAYS]
+    );
+    return row ? row.text : null;
+  } catch (err) {
+    stats.errors++;
+    console.error('[editorial_cache] lookup failed, treating as miss:', err.message);
+    return null;
+  }
+}
+
+async function store(hash, model, text) {
+  try {
+    await ensureTable();
+    await db().dbRun(
+      `INSERT INTO editorial_cache (input_hash, model, text) VALUES ($1, $2, $3)
+       ON CONFLICT (input_hash) DO UPDATE SET text = EXCLUDED.text, created_at = NOW()`,
+      [hash, model, text]
+    );
+    stats.writes++;
+    if (++writesSincePrune >= WRITES_PER_PRUNE) {
+      writesSincePrune = 0;
+      await db().dbRun(
+        "DELETE FROM editorial_cache WHERE created_at < NOW() - $1 * INTERVAL '1 day'",
+        [EDITORIAL_CACHE_DAYS]
+      );
+    }
+  } catch (err) {
+    stats.errors++;
+    console.error('[editorial_cache] store failed:', err.message);
+  }
+}
+
+// Returns cached text for this prompt, or runs generate() under the shared
+// limiter and stores what it resolves to. generate() should throw on
+// failure so that failures are not cached.
+async function cachedEditorial(model, maxTokens, prompt, generate) {
+  var hash = crypto.createHash('sha256')
+    .update(model).update('\0').update(String(maxTokens)).update('\0').update(prompt, 'utf8')
+    .digest();
+  var key = hash.toString('hex');
+  if (inflight.has(key)) {
+    stats.shared++;
+    return inflight.get(key);
+  }
+
+  var p = (async function() {
+    var hit = await lookup(hash);
+    if (hit !== null) {
+      stats.hits++;
+      return hit;
+    }
+    stats.misses++;
+    var text = await limit(generate);
+    await store(hash, model, text);
+    return text;
+  })();
+  inflight.set(key, p);
+  try {
+    return await p;
+  } finally {
+    inflight.delete(key);
+  }
+}
+
+function getEditorialCacheStats() {
+  var lookups = stats.hits + stats.misses;
+  return Object.assign({
+    hit_rate: lookups ? Math.round(stats.hits / lookups * 1000) / 1000 : null,
+    active: limit.active(),
+    pending: limit.pending()
+  }, stats);
+}
+
+module.exports = { cachedEditorial, getEditorialCacheStats };
@@ -0,0 +1,289 @@
+// ── Profile Embedding Backfill ──
+// Embeds every stakeholder profile that has no stored vector yet (profile,
+// intent and offering collections) in batches instead of one profile at a
+// time with three single-text calls, two single-point upserts and a sleep.
+//
+// Design:
+//   - Keyset scan over stakeholder_profiles by user_id, BATCH profiles per
+//     batch. Each batch is one getEmbeddings call for all of its texts
+//     (through the embedding cache, so re-runs only pay for new text), one
+//     chunked upsertPoints per collection, and one bulk UPDATE.
+//   - Up to CONCURRENCY batches in flight; a token bucket sized from
+//     EMBED_BACKFILL_TPM (estimated tokens/min) paces OpenAI instead of a
+//     fixed sleep.
+//   - Checkpoint: embedding_backfill_runs.cursor_user_id only advances past
+//     batches that have fully completed, in order. A crashed or failed run
+//     is resumed from its cursor by the next call (unless restart: true).
+//   - Throughput (profiles/sec) and ETA are logged per batch and exposed via
+//     getBackfillStatus().
+//   - Postgres advisory lock prevents two backfills across replicas. It is
+//     held on a dedicated connection, not a pooled one.
+
+var { dbAll, dbGet, dbRun, createClient } = require('../db');
+var { createTokenBucket } = require('./concurrency');
+var vs = require('./vector_search');
+
+var BATCH = parseInt(process.env.EMBED_BACKFILL_BATCH || '200', 10);
+var CONCURRENCY = parseInt(process.env.EMBED_BACKFILL_CONCURRENCY || '2', 10);
+var TOKENS_PER_MINUTE = parseInt(process.env.EMBED_BACKFILL_TPM || '500000', 10);
+var UPSERT_CHUNK = 100; // Qdrant batch limit is ~100 points per call
+var ADVISORY_LOCK_KEY = 824644; // arbitrary constant, unique to embedding backfill
+
+var PENDING_WHERE = `sp.embedding_updated_at IS NULL
+  AND (sp.stakeholder_type IS NOT NULL OR sp.focus_text IS NOT NULL OR sp.themes IS NOT NULL)`;
+
+var current = null;
+
+// ── Run ledger / checkpoint ──
+async function ensureTables() {
+  await dbRun(`CREATE TABLE IF NOT EXISTS embedding_backfill_runs (
+    id SERIAL PRIMARY KEY,
+    status TEXT DEFAULT 'running',
+    cursor_user_id INTEGER DEFAULT 0,
+    started_at TIMESTAMPTZ DEFAULT NOW(),
+    updated_at TIMESTAMPTZ DEFAULT NOW(),
+    finished_at TIMESTAMPTZ,
+    stats JSONB DEFAULT '{}',
+    error TEXT
+  )`);
+}
+
+// Rough OpenAI token estimate (~4 chars/token), for pacing only
+function estimateTokens(text) {
+  return Math.ceil(Math.min(text.length, 30000) / 4);
+}
+
+function formatEta(seconds) {
+  if (seconds === null || !isFinite(seconds)) return '?';
+  var m = Math.floor(seconds / 60);
+  return (m ? m + 'm' : '') + Math.round(seconds % 60) + 's';
+}
+
+function progress(state) {
+  var elapsed = Math.max(1, Date.now() - state.t0) / 1000;
+  var rate = state.processed / elapsed;
+  var remaining = Math.max(0, state.total - state.processed);
+  return {
+    run_id: state.runId,
+    cursor_user_id: state.cursor,
+    total: state.total,
+    processed: state.processed,
+    embedded: state.embedded,
+    skipped: state.skipped,
+    failed: state.failed,
+    profiles_per_sec: Math.round(rate * 100) / 100,
+    eta_sec: rate > 0 ? Math.round(remaining / rate) : null
+  };
+}
+
+// Upsert points into a collection in UPSERT_CHUNK chunks. Returns the set of
+// ids whose chunk was accepted.
+async function upsertChunked(collection, points) {
+  var ok = new Set();
+  for (var i = 0; i < points.length; i += UPSERT_CHUNK) {
+    var chunk = points.slice(i, i + UPSERT_CHUNK);
+    var result = await vs.upsertPoints(collection, chunk);
+    if (result) chunk.forEach(function(p) { ok.add(p.id); });
+  }
+  return ok;
+}
+
+async function processBatch(rows, bucket, state) {
+  var inputs = [];
+  var jobs = rows.map(function(row) {
+    var job = { row: row, profile: -1, intent: -1, offering: -1 };
+    var profileText = '';
+    try { profileText = vs.buildProfileText(row, { name: row.name, company: row.company }); } catch (e) {}
+    var intentText = vs.buildIntentText(row);
+    var offeringText = vs.buildOfferingText(row);
+    if (profileText) { job.profile = inputs.length; inputs.push(profileText); }
+    if (intentText) { job.intent = inputs.length; inputs.push(intentText); }
+    if (offeringText) { job.offering = inputs.length; inputs.push(offeringText); }
+    return job;
+  });
+  if (!inputs.length) {
+    state.skipped += rows.length;
+    return;
+  }
+
+  await bucket.take(inputs.reduce(function(sum, t) { return sum + estimateTokens(t); }, 0));
+  var vectors = await vs.getEmbeddings(inputs);
+  if (vectors.length !== inputs.length) throw new Error('embedding request failed for batch ending at user ' + rows[rows.length - 1].user_id);
+
+  var profilePoints = [];
+  var intentPoints = [];
+  var offeringPoints = [];
+  jobs.forEach(function(j) {
+    var r = j.row;
+    if (j.profile !== -1) {
+      profilePoints.push({ id: r.user_id, vector: vectors[j.profile], payload: vs.profilePayload(r, inputs[j.profile]) });
+    }
+    if (j.intent !== -1) {
+      intentPoints.push({ id: r.user_id, vector: vectors[j.intent], payload: vs.intentOfferingPayload(r, inputs[j.intent]) });
+    }
+    if (j.offering !== -1) {
+      offeringPoints.push({ id: r.user_id, vector: vectors[j.offering], payload: vs.intentOfferingPayload(r, inputs[j.offering]) });
+    }
+  });
+
+  var stored = await upsertChunked(vs.COLLECTIONS.profiles, profilePoints);
+  await upsertChunked(vs.INTENT_OFFERING_COLLECTIONS.intents, intentPoints);
+  await upsertChunked(vs.INTENT_OFFERING_COLLECTIONS.offerings, offeringPoints);
+
+  var ids = Array.from(stored);
+  if (ids.length) {
+    await dbRun(
+      `UPDATE stakeholder_profiles sp SET qdrant_vector_id = v.vid, embedding_updated_at = NOW()
+       FROM unnest($1::int[], $2::text[]) AS v(uid, vid) WHERE sp.user_id = v.uid`,
+      [ids, ids.map(function(id) { return 'user_' + id; })]
+    );
+  }
+  state.embedded += ids.length;
+  state.skipped += jobs.filter(function(j) { return j.profile === -1; }).length;
+  state.failed += profilePoints.length - ids.length;
+}
+
+// options.restart: ignore any interrupted run's checkpoint and start from 0
+async function runProfileBackfill(options) {
+  options = options || {};
+  if (current) {
+    console.warn('[backfill] Already running in this process — skipping');
+    return { skipped: 'already_running' };
+  }
+
+  var client = null;
+  var lockHeld = false;
+  var state = null;
+
+  try {
+    // Held for the whole run, so kept off the pool the batches share
+    client = createClient();
+    client.on('error', function(err) { console.error('[backfill] Lock connection error:', err.message); });
+    await client.connect();
+    var lock = await client.query('SELECT pg_try_advisory_lock($1) AS ok', [ADVISORY_LOCK_KEY]);
+    if (!lock.rows[0].ok) {
+      console.warn('[backfill] Another instance holds the backfill lock — skipping');
+      return { skipped: 'locked' };
+    }
+    lockHeld = true;
+    await ensureTables();
+
+    // With the lock held, a 'running' row can only be a crashed run
+    var resume = options.restart ? null : await dbGet(
+      "SELECT id, cursor_user_id FROM embedding_backfill_runs WHERE status IN ('running','failed') ORDER BY id DESC LIMIT 1"
+    );
+    if (options.restart) {
+      await dbRun("UPDATE embedding_backfill_runs SET status = 'abandoned' WHERE status IN ('running','failed')");
+    }
+    var runId;
+    var cursor = 0;
+    if (resume) {
+      runId = resume.id;
+      cursor = resume.cursor_user_id || 0;
+      await dbRun("UPDATE embedding_backfill_runs SET status = 'running', error = NULL, updated_at = NOW() WHERE id = $1", [runId]);
+    } else {
+      runId = (await dbGet("INSERT INTO embedding_backfill_runs (status) VALUES ('running') RETURNING id")).id;
+    }
+
+    var remaining = await dbGet(
+      'SELECT COUNT(*)::int AS c FROM stakeholder_profiles sp WHERE ' + PENDING_WHERE + ' AND sp.user_id > $1', [cursor]
+    );
+    state = current = {
+      runId: runId, t0: Date.now(), started_at: new Date().toISOString(), cursor: cursor,
+      total: remaining ? remaining.c : 0, processed: 0, embedded: 0, skipped: 0, failed: 0
+    };
+    console.log('[backfill] Run #' + runId + (resume ? ' resuming after user ' + cursor : ' started') +
+      ': ' + state.total + ' profiles to embed (batch=' + BATCH + ', concurrency=' + CONCURRENCY +
+      ', ' + TOKENS_PER_MINUTE + ' tokens/min)');
+
+    var bucket = createTokenBucket(TOKENS_PER_MINUTE / 60, TOKENS_PER_MINUTE);
+    var active = new Set();
+    var finishedAt = {};
+    var nextSeq = 0;
+    var commitSeq = 0;
+    var readCursor = cursor;
+    var firstError = null;
+
+    // Advance the checkpoint over every leading batch that has completed
+    async function commit(seq, lastId, size) {
+      finishedAt[seq] = { lastId: lastId, size: size };
+      var advanced = false;
+      while (finishedAt[commitSeq]) {
+        state.cursor = finishedAt[commitSeq].lastId;
+        state.processed += finishedAt[commitSeq].size;
+        delete finishedAt[commitSeq];
+        commitSeq++;
+        advanced = true;
+      }
+      if (!advanced) return;
+      var p = progress(state);
+      await dbRun(
+        'UPDATE embedding_backfill_runs SET cursor_user_id = $2, stats = $3, updated_at = NOW() WHERE id = $1',
+        [runId, state.cursor, JSON.stringify(p)]
+      );
+      console.log('[backfill] ' + p.processed + '/' + p.total + ' (' + p.profiles_per_sec + ' profiles/s, ETA ' +
+        formatEta(p.eta_sec) + ') embedded=' + p.embedded + ' skipped=' + p.skipped + ' failed=' + p.failed);
+    }
+
+    while (!firstError) {
+      var rows = await dbAll(
+        `SELECT sp.*, u.name, u.company FROM stakeholder_profiles sp JOIN users u ON u.id = sp.user_id
+         WHERE ` + PENDING_WHERE + ` AND sp.user_id > $1 ORDER BY sp.user_id LIMIT $2`,
+        [readCursor, BATCH]
+      );
+      if (!rows.length) break;
+      readCursor = rows[rows.length - 1].user_id;
+
+      (function(seq, batch) {
+        var p = processBatch(batch, bucket, state)
+          .then(function() { return commit(seq, batch[batch.length - 1].user_id, batch.length); })
+          .catch(function(err) { firstError = firstError || err; })
+          .finally(function() { active.delete(p); });
+        active.add(p);
+      })(nextSeq++, rows);
+
+      if (active.size >= CONCURRENCY) await Promise.race(active);
+    }
+    await Promise.all(active);
+    if (firstError) throw firstError;
+
+    var final = progress(state);
+    await dbRun(
+      "UPDATE embedding_backfill_runs SET status = 'success', cursor_user_id = $2, stats = $3, finished_at = NOW(), updated_at = NOW() WHERE id = $1",
+      [runId, state.cursor, JSON.stringify(final)]
+    );
+    console.log('[backfill] Run #' + runId + ' complete. success=' + final.embedded + ' failed=' + final.failed + ' skipped=' + final.skipped);
+    return Object.assign({ success: final.embedded }, final);
+
+  } catch (err) {
+    console.error('[backfill] Run failed:', err.message);
+    var partial = state ? progress(state) : {};
+    if (state) {
+      await dbRun(
+        "UPDATE embedding_backfill_runs SET status = 'failed', cursor_user_id = $2, stats = $3, error = $4, updated_at = NOW() WHERE id = $1",
+        [state.runId, state.cursor, JSON.stringify(partial), String(err.message || err).slice(0, 500)]
+      ).catch(function() {});
+    }
+    return Object.assign({ success: partial.embedded || 0, error: err.message }, partial);
+
+  } finally {
+    current = null;
+    if (client) {
+      if (lockHeld) {
+        try { await client.query('SELECT pg_advisory_unlock($1)', [ADVISORY_LOCK_KEY]); } catch (e) {}
+      }
+      await client.end().catch(function() {});
+    }
+  }
+}
+
+// ── Status for the admin dashboard ──
+async function getBackfillStatus() {
+  await ensureTables();
+  var runs = await dbAll(
+    'SELECT id, status, cursor_user_id, started_at, updated_at, finished_at, stats, error FROM embedding_backfill_runs ORDER BY id DESC LIMIT 10'
+  );
+  return { running: !!current, current: current ? progress(current) : null, runs: runs };
+}
+
+module.exports = { runProfileBackfill, getBackfillStatus };
@@ -0,0 +1,110 @@
+// ── Embedding Cache ──
+// Persistent cache of OpenAI embeddings keyed by (model, sha256(text)), so a
+// profile save, backfill re-run or on-the-fly scoring fallback that produces
+// the same text as last time never pays for the same embedding twice.
+//
+// Design:
+//   - embedding_cache rows hold the vector as packed little-endian float4
+//     bytea (6 KB for 1536 dims vs ~30 KB as JSON text).
+//   - The key is the hash of the exact (already truncated) input sent
+//     upstream, plus the model name, so a model change never serves stale
+//     vectors.
+//   - Fail open: if Postgres is unavailable every lookup is a miss and
+//     writes are dropped — embedding never fails because the cache did.
+//   - Writes are one unnest INSERT per batch with ON CONFLICT DO NOTHING, so
+//     concurrent writers of the same text are harmless.
+
+var crypto = require('crypto');
+
+var tableReady = null;
+var stats = { hits: 0, misses: 0, writes: 0, errors: 0 };
+
+function db() {
+  return require('../db');
+}
+
+function ensureTable() {
+  if (!tableReady) {
+    tableReady = db().dbRun(`CREATE TABLE IF NOT EXISTS embedding_cache (
+      model TEXT NOT NULL,
+      text_hash BYTEA NOT NULL,
+      dims INTEGER NOT NULL,
+      embedding BYTEA NOT NULL,
+      created_at TIMESTAMPTZ DEFAULT NOW(),
+      PRIMARY KEY (model, text_hash)
+    )`).catch(function(err) {
+      tableReady = null;
+      throw err;
+    });
+  }
+  return tableReady;
+}
+
+function hashText(text) {
+  return crypto.createHash('sha256').update(text, 'utf8').digest();
+}
+
+function encodeVector(vector) {
+  var f32 = vector instanceof Float32Array ? vector : Float32Array.from(vector);
+  return Buffer.from(f32.buffer, f32.byteOffset, f32.byteLength);
+}
+
+function decodeVector(buf) {
+  // Copy into a fresh, aligned buffer — pg hands back slices of a shared one
+  var out = new Float32Array(buf.length / 4);
+  new Uint8Array(out.buffer).set(buf);
+  return out;
+}
+
+// Returns an array aligned with texts: Float32Array for hits, null for misses.
+async function lookupEmbeddings(model, texts) {
+  var out = texts.map(function() { return null; });
+  if (!texts.length) return out;
+  var hashes = texts.map(hashText);
+  try {
+    await ensureTable();
+    var rows = await db().dbAll(
+      'SELECT text_hash, embedding FROM embedding_cache WHERE model = $1 AND text_hash = ANY($2::bytea[])',
+      [model, hashes]
+    );
+    var byHash = {};
+    rows.forEach(function(r) { byHash[r.text_hash.toString('hex')] = r.embedding; });
+    hashes.forEach(function(h, i) {
+      var hit = byHash[h.toString('hex')];
+      if (hit) out[i] = decodeVector(hit);
+    });
+  } catch (err) {
+    stats.errors++;
+    console.error('[embedding_cache] lookup failed, treating as miss:', err.message);
+  }
+  out.forEach(function(v) { if (v) stats.hits++; else stats.misses++; });
+  return out;
+}
+
+// entries: [{ text, vector }]
+async function storeEmbeddings(model, entries) {
+  entries = entries.filter(function(e) { return e.vector && e.vector.length; });
+  if (!entries.length) return;
+  try {
+    await ensureTable();
+    await db().dbBulkInsert('embedding_cache', [
+      { name: 'model', type: 'text' },
+      { name: 'text_hash', type: 'bytea' },
+      { name: 'dims', type: 'int' },
+      { name: 'embedding', type: 'bytea' }
+    ], entries.map(function(e) {
+      return [model, hashText(e.text), e.vector.length, encodeVector(e.vector)];
+    }), { chunkSize: 200 });
+    stats.writes += entries.length;
+  } catch (err) {
+    stats.errors++;
+    console.error('[embedding_cache] store failed:', err.message);
+  }
+}
+
+function getEmbeddingCacheStats() {
+  var lookups = stats.hits + stats.misses;
+  return Object.assign({ hit_rate: lookups ? Math.round(stats.hits / lookups * 1000) / 1000 : null }, stats);
+}
+
+module.exports = { lookupEmbeddings, storeEmbeddings, getEmbeddingCacheStats, hashText };
@@ -7,6 +7,8 @@
 var fetch = require('node-fetch');
 var cheerio = require('cheerio');
 var { normalizeThemes } = require('./theme_taxonomy');
+var { fetchCached } = require('./page_cache');
+var { cachedExtraction, promptVersion } = require('./extraction_cache');
 
 var CANONICAL_THEMES = [
   'AI', 'Connectivity', 'IoT', 'Enterprise SaaS', 'Cybersecurity', 'FinTech',
@@ -23,26 +25,36 @@ var FETCH_TIMEOUT_MS = 25000;
 var MAX_TEXT_CHARS = 10000;
 
 // ── Step 1: Fetch HTML ────────────────────────────────────────────────────────
-async function fetchPage(url) {
-  var controller = new AbortController();
-  var timer = setTimeout(function() { controller.abort(); }, FETCH_TIMEOUT_MS);
+// Goes through the on-disk page cache (lib/page_cache.js): options.maxAgeMs
+// controls how old a cached copy may be before it is revalidated, and
+// options.consumer enables the `unchanged` flag. fetchPage resolves to the
+// HTML; fetchPageCached to the full cache result.
+async function fetchPageCached(url, options) {
   try {
-    var resp = await fetch(url, {
-      headers: { 'User-Agent': USER_AGENT, 'Accept': 'text/html,application/xhtml+xml,*/*;q=0.8', 'Accept-Language': 'en-US,en;q=0.9' },
-      signal: controller.signal,
-      redirect: 'follow'
-    });
-    clearTimeout(timer);
-    if (!resp.ok) throw new Error('HTTP ' + resp.status);
-    var html = await resp.text();
-    return html;
+    return await fetchCached(url, async function(conditional) {
+      var controller = new AbortController();
+      var timer = setTimeout(function() { controller.abort(); }, FETCH_TIMEOUT_MS);
+      try {
+        return await fetch(url, {
+          headers: Object.assign({ 'User-Agent': USER_AGENT, 'Accept': 'text/html,application/xhtml+xml,*/*;q=0.8', 'Accept-Language': 'en-US,en;q=0.9' }, conditional),
+          signal: controller.signal,
+          redirect: 'follow'
+        });
+      } finally {
+        clearTimeout(timer);
+      }
+    }, options);
   } catch(e) {
-    clearTimeout(timer);
     if (e.name === 'AbortError') throw new Error('Could not reach that URL — request timed out');
     throw new Error('Could not reach that URL: ' + e.message);
   }
 }
 
+async function fetchPage(url, options) {
+  var page = await fetchPageCached(url, options);
+  return page.body;
+}
+
 // ── Step 2: Clean HTML ────────────────────────────────────────────────────────
 function extractText(html, url) {
   var $ = cheerio.load(html);
@@ -76,55 +88,63 @@ function extractText(html, url) {
 }
 
 // ── Step 3: Claude Extraction ─────────────────────────────────────────────────
+// Results are memoised in extraction_cache keyed by the prompt version, model
+// and page text, so repeat pages never go back to Claude. EXTRACTION_PROMPT_VERSION
+// hashes the prompt text below — edit the prompt and old results stop matching.
+var EXTRACTION_MODEL = 'claude-haiku-4-5-20251001';
+
+var EXTRACTION_SYSTEM_PROMPT = 'You are an event data extractor. Extract structured information from event website text.\nOnly extract events taking place in 2026 or 2027. If the event date is before 2026 or the page only shows past editions, return {"name": null}.\nRespond ONLY with valid JSON. No markdown, no explanation, no code fences.';
+
+var EXTRACTION_USER_PROMPT = 'Extract event details from this website content and return JSON with exactly these fields:\n\n' +
+  '{\n' +
+  '  "name": "full event name (include year if shown, e.g. Web Summit 2026)",\n' +
+  '  "event_date": "YYYY-MM-DD or null if unknown",\n' +
+  '  "end_date": "YYYY-MM-DD or null",\n' +
+  '  "city": "city name or null",\n' +
+  '  "country": "country name or null",\n' +
+  '  "venue": "venue name or null",\n' +
+  '  "description": "2-3 sentence description of the event",\n' +
+  '  "themes": ["array", "of", "relevant", "topics"],\n' +
+  '  "expected_attendees": "number as integer or null",\n' +
+  '  "website": "the original URL",\n' +
+  '  "organiser": "organiser name or null",\n' +
+  '  "ticket_url": "URL if found or null",\n' +
+  '  "event_format": "conference | summit | expo | meetup | hackathon | workshop | forum | festival | congress | virtual | hybrid | null",\n' +
+  '  "speakers": ["up to 10 named speakers if listed, otherwise empty array"],\n' +
+  '  "sponsors": ["up to 10 sponsor/partner company names if listed, otherwise empty array"],\n' +
+  '  "ticket_tiers": [{"name": "tier name", "price": "price as string or null"}],\n' +
+  '  "industries_served": ["target industries/verticals if mentioned"]\n' +
+  '}\n\n' +
+  'For themes, use only these canonical values where applicable:\n' +
+  CANONICAL_THEMES.join(', ') + '\n\n' +
+  'Website content:\n';
+
+var EXTRACTION_PROMPT_VERSION = promptVersion(EXTRACTION_SYSTEM_PROMPT, EXTRACTION_USER_PROMPT, 2048);
+
 async function extractWithClaude(pageText) {
-  var { callClaude } = require('./anthropic_client');
-
-  var systemPrompt = 'You are an event data extractor. Extract structured information from event website text.\nOnly extract events taking place in 2026 or 2027. If the event date is before 2026 or the page only shows past editions, return {"name": null}.\nRespond ONLY with valid JSON. No markdown, no explanation, no code fences.';
-
-  var userPrompt = 'Extract event details from this website content and return JSON with exactly these fields:\n\n' +
-    '{\n' +
-    '  "name": "full event name (include year if shown, e.g. Web Summit 2026)",\n' +
-    '  "event_date": "YYYY-MM-DD or null if unknown",\n' +
-    '  "end_date": "YYYY-MM-DD or null",\n' +
-    '  "city": "city name or null",\n' +
-    '  "country": "country name or null",\n' +
-    '  "venue": "venue name or null",\n' +
-    '  "description": "2-3 sentence description of the event",\n' +
-    '  "themes": ["array", "of", "relevant", "topics"],\n' +
-    '  "expected_attendees": "number as integer or null",\n' +
-    '  "website": "the original URL",\n' +
-    '  "organiser": "organiser name or null",\n' +
-    '  "ticket_url": "URL if found or null",\n' +
-    '  "event_format": "conference | summit | expo | meetup | hackathon | workshop | forum | festival | congress | virtual | hybrid | null",\n' +
-    '  "speakers": ["up to 10 named speakers if listed, otherwise empty array"],\n' +
-    '  "sponsors": ["up to 10 sponsor/partner company names if listed, otherwise empty array"],\n' +
-    '  "ticket_tiers": [{"name": "tier name", "price": "price as string or null"}],\n' +
-    '  "industries_served": ["target industries/verticals if mentioned"]\n' +
-    '}\n\n' +
-    'For themes, use only these canonical values where applicable:\n' +
-    CANONICAL_THEMES.join(', ') + '\n\n' +
-    'Website content:\n' + pageText;
-
-  var data = await callClaude({
-    model: 'claude-haiku-4-5-20251001',
-    max_tokens: 2048,
-    system: systemPrompt,
-    messages: [{ role: 'user', content: userPrompt }]
-  });
+  var parsed = await cachedExtraction(EXTRACTION_PROMPT_VERSION, EXTRACTION_MODEL, pageText, async function() {
+    var { callClaude } = require('./anthropic_client');
+    var data = await callClaude({
+      model: EXTRACTION_MODEL,
+      max_tokens: 2048,
+      system: EXTRACTION_SYSTEM_PROMPT,
+      messages: [{ role: 'user', content: EXTRACTION_USER_PROMPT + pageText }]
+    });
 
-  var raw = data.content && data.content[0] && data.content[0].text || '';
+    var raw = data.content && data.content[0] && data.content[0].text || '';
 
-  // Strip accidental markdown fences
-  raw = raw.replace(/^```(?:json)?\s*/i, '').replace(/\s*```\s*$/i, '').trim();
+    // Strip accidental markdown fences
+    raw = raw.replace(/^```(?:json)?\s*/i, '').replace(/\s*```\s*$/i, '').trim();
 
-  var parsed;
-  try {
-    parsed = JSON.parse(raw);
-  } catch(e) {
-    throw new Error('Claude returned invalid JSON. This may not be an event page.');
-  }
+    try {
+      return JSON.parse(raw);
+    } catch(e) {
+      throw new Error('Claude returned invalid JSON. This may not be an event page.');
+    }
+  });
 
-  return parsed;
+  // validate() mutates its input — hand out a copy, never the shared result
+  return JSON.parse(JSON.stringify(parsed));
 }
 
 // ── Step 4: Validate + normalise ─────────────────────────────────────────────
@@ -217,12 +237,27 @@ async function harvestEvent(url) {
   // Basic URL validation
   try { new URL(url); } catch(e) { throw new Error('Invalid URL format'); }
 
-  var html = await fetchPage(url);
+  // Interactive/admin harvests always revalidate — a 304 is still cheap
+  var html = await fetchPage(url, { maxAgeMs: 0 });
+  return extractEventFromHtml(html, url);
+}
+
+// Steps 2-4 on an already-fetched page, so a crawler can fetch and extract
+// in separate stages (the ingestion pipeline does).
+// Validation failures are tagged err.rejected so callers can tell "not an
+// event page" apart from a transient upstream error.
+async function extractEventFromHtml(html, url) {
   var pageText = extractText(html, url);
   var extracted = await extractWithClaude(pageText);
-  var validated = validate(extracted, url);
+  var validated;
+  try {
+    validated = validate(extracted, url);
+  } catch (e) {
+    e.rejected = true;
+    throw e;
+  }
   validated.image_url = extractImageFromHtml(html, url);
   return validated;
 }
 
-module.exports = { harvestEvent, fetchPage, extractImageFromHtml };
+module.exports = { harvestEvent, fetchPage, fetchPageCached, extractEventFromHtml, extractImageFromHtml };
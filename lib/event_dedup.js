@@ -57,20 +57,167 @@ function bigrams(str) {
   return map;
 }
 
+// ── Candidate retrieval ──
+// events.normalised_name is a generated column computed by the SQL mirror of
+// normaliseName (em_normalise_event_name, see server.js migrations) with a
+// pg_trgm GIN index and a btree index. Fuzzy candidates come from:
+//   - trigram similarity (normalised_name % $1) — covers Dice > 0.8 pairs
+//   - normalised_name LIKE %query% — candidate contains the query
+//   - normalised_name = ANY(substrings of query) — query contains candidate
+// isSimilar then makes the final call, exactly as before.
+// If pg_trgm or the normalised_name column is missing (the migration that adds
+// them failed), fall back to the full scan once and stay there for the life of
+// the process. Other errors (timeouts, dropped connections)
+// propagate and the next lookup tries the index again.
+
+var trigramAvailable = true;
+// undefined_function (similarity, %) / undefined_object (gin_trgm_ops) /
+// undefined_column (normalised_name)
+var TRIGRAM_MISSING_CODES = ['42883', '42704', '42703'];
+var MIN_SUBSTRING = 3;
+var MAX_FUZZY_CANDIDATES = 200;
+
+function substrings(str) {
+  var out = new Set();
+  for (var i = 0; i < str.length; i++) {
+    for (var j = i + MIN_SUBSTRING; j <= str.length; j++) out.add(str.substring(i, j));
+  }
+  return Array.from(out);
+}
+
+function likeEscape(str) {
+  return str.replace(/[\\%_]/g, '\\$&');
+}
+
+async function fuzzyCandidates(normName) {
+  if (trigramAvailable) {
+    try {
+      return await dbAll(
+        `SELECT id, name, slug, normalised_name FROM events
+         WHERE normalised_name % $1 OR normalised_name LIKE '%' || $2 || '%' OR normalised_name = ANY($3::text[])
+         ORDER BY similarity(normalised_name, $1) DESC
+         LIMIT ` + MAX_FUZZY_CANDIDATES,
+        [normName, likeEscape(normName), substrings(normName)]
+      );
+    } catch (err) {
+      if (TRIGRAM_MISSING_CODES.indexOf(err.code) === -1) throw err;
+      trigramAvailable = false;
+      console.warn('[dedup] trigram lookup unavailable, falling back to full scan:', err.message);
+    }
+  }
+  return dbAll('SELECT id, name, slug FROM events');
+}
+
+// Calendar day number for a DATE (pg hands back local-midnight Dates, callers
+// pass 'YYYY-MM-DD' strings), so ±7-day windows compare whole days.
+function dayNumber(v) {
+  if (!v) return null;
+  if (v instanceof Date) return Date.UTC(v.getFullYear(), v.getMonth(), v.getDate()) / 86400000;
+  var t = Date.parse(String(v).slice(0, 10));
+  return isNaN(t) ? null : t / 86400000;
+}
+
+// ── In-memory index over this year's and later events ──
+// Built once per ingestion run (createDedupIndex) and kept current with
+// add() as events are inserted, so most lookups never touch Postgres.
+// It covers from 7 days before 1 January of the current year, which is
+// everything the exact name+year and ±7-day fuzzy checks can reach for an
+// event dated this year or later. Bigram postings give the candidate set
+// (any real match shares at least one bigram with the query); isSimilar
+// makes the final call.
+function createDedupIndex() {
+  var events = [];          // { id, name, slug, event_date, city, norm, day, lowerCity }
+  var postings = new Map(); // bigram -> [event index]
+  var byLowerYear = new Map();
+  var fromYear = null;      // first calendar year fully covered
+
+  function add(ev) {
+    var norm = normaliseName(ev.name);
+    var entry = {
+      id: ev.id, name: ev.name, slug: ev.slug, event_date: ev.event_date, city: ev.city,
+      norm: norm, day: dayNumber(ev.event_date), lowerCity: (ev.city || '').toLowerCase()
+    };
+    var idx = events.push(entry) - 1;
+    if (ev.event_date) {
+      var key = (ev.name || '').toLowerCase() + '|' + new Date(ev.event_date).getFullYear();
+      if (!byLowerYear.has(key)) byLowerYear.set(key, entry);
+    }
+    bigrams(norm).forEach(function(count, bg) {
+      if (!postings.has(bg)) postings.set(bg, []);
+      postings.get(bg).push(idx);
+    });
+  }
+
+  function covers(eventDate) {
+    return fromYear !== null && !!eventDate && new Date(eventDate).getFullYear() >= fromYear;
+  }
+
+  // Same contract as findDuplicate, restricted to indexed events
+  function lookup(name, eventDate, city) {
+    var day = dayNumber(eventDate);
+    if (eventDate) {
+      var exact = byLowerYear.get((name || '').toLowerCase() + '|' + new Date(eventDate).getFullYear());
+      if (exact) return exact;
+    }
+    var normName = normaliseName(name);
+    if (!normName || normName.length < 3) return null;
+
+    var seen = new Set();
+    var lowerCity = (city || '').toLowerCase();
+    var keys = Array.from(bigrams(normName).keys());
+    for (var k = 0; k < keys.length; k++) {
+      var list = postings.get(keys[k]) || [];
+      for (var i = 0; i < list.length; i++) {
+        var idx = list[i];
+        if (seen.has(idx)) continue;
+        seen.add(idx);
+        var c = events[idx];
+        if (day !== null) {
+          if (c.day === null || Math.abs(c.day - day) > 7) continue;
+          if (city && c.lowerCity !== lowerCity) continue;
+        }
+        if (isSimilar(normName, c.norm)) return c;
+      }
+    }
+    return null;
+  }
+
+  async function load() {
+    var rows = await dbAll(
+      "SELECT id, name, slug, event_date, city FROM events WHERE event_date >= date_trunc('year', CURRENT_DATE) - INTERVAL '7 days'"
+    );
+    fromYear = new Date().getFullYear();
+    rows.forEach(add);
+    return rows.length;
+  }
+
+  return { load: load, add: add, lookup: lookup, covers: covers, size: function() { return events.length; } };
+}
+
 /**
  * Check if an event is a duplicate of something already in the DB.
  * Uses exact match on name+year first, then fuzzy name matching
  * within the same date window (±7 days) and city.
  *
+ * options.index: a loaded createDedupIndex(); events it covers are
+ * answered from memory, and undated names are checked there first.
+ *
  * Returns the existing event if duplicate, null if not.
  */
-async function findDuplicate(name, eventDate, city) {
+async function findDuplicate(name, eventDate, city, options) {
+  var index = options && options.index;
+  if (index && index.covers(eventDate)) return index.lookup(name, eventDate, city);
+  if (index && !eventDate) {
+    var hit = index.lookup(name, null, city);
+    if (hit) return hit;
+  }
+
   var year = eventDate ? new Date(eventDate).getFullYear() : null;
 
-  // 1. Exact name + year match (case-insensitive)
+  // 1. Exact name + year match (case-insensitive, index on LOWER(name))
   if (year) {
     var exact = await dbGet(
-      "SELECT id, name, slug FROM events WHERE name ILIKE $1 AND EXTRACT(YEAR FROM event_date) = $2",
+      "SELECT id, name, slug FROM events WHERE LOWER(name) = LOWER($1) AND event_date >= make_date($2, 1, 1) AND event_date < make_date($2 + 1, 1, 1)",
       [name, year]
     );
     if (exact) return exact;
@@ -92,12 +239,13 @@ async function findDuplicate(name, eventDate, city) {
       [eventDate]
     );
   } else {
-    // No date — check by normalised name only
-    candidates = await dbAll("SELECT id, name, slug FROM events");
+    // No date — check by normalised name only, via the trigram index
+    candidates = await fuzzyCandidates(normName);
   }
 
   for (var i = 0; i < candidates.length; i++) {
-    var cNorm = normaliseName(candidates[i].name);
+    var cNorm = candidates[i].normalised_name !== undefined && candidates[i].normalised_name !== null
+      ? candidates[i].normalised_name : normaliseName(candidates[i].name);
     if (isSimilar(normName, cNorm)) {
       return candidates[i];
     }
@@ -106,4 +254,4 @@ async function findDuplicate(name, eventDate, city) {
   return null;
 }
 
-module.exports = { findDuplicate, normaliseName, isSimilar };
+module.exports = { findDuplicate, createDedupIndex, normaliseName, isSimilar };
@@ -13,10 +13,13 @@ require('dotenv').config();
  *   node lib/event_harvester.js --theme AI         # single theme
  *   node lib/event_harvester.js --city London      # single city
  *   node lib/event_harvester.js --dry-run          # search only, don't store
+ *   node lib/event_harvester.js --recheck          # ignore the URL-seen index
  */
 
 var { dbGet, dbRun, dbAll } = require('../db');
 var { normalizeThemes } = require('./theme_taxonomy');
+var { fetchCached } = require('./page_cache');
+var { filterUnseen, recordUrlOutcomes } = require('./harvest_index');
 
 // ── Configuration ──
 
@@ -198,20 +201,19 @@ async function searchEvents(query) {
 
 async function extractEventFromPage(url) {
   try {
-    var resp = await fetch(url, {
-      headers: {
-        'User-Agent': 'Mozilla/5.0 (compatible; EventMediumBot/1.0)',
-        'Accept': 'text/html'
-      },
-      signal: AbortSignal.timeout(10000)
+    var page = await fetchCached(url, function(conditional) {
+      return fetch(url, {
+        headers: Object.assign({
+          'User-Agent': 'Mozilla/5.0 (compatible; EventMediumBot/1.0)',
+          'Accept': 'text/html'
+        }, conditional),
+        signal: AbortSignal.timeout(10000)
+      });
     });
 
-    if (!resp.ok) return null;
-
-    var contentType = resp.headers.get('content-type') || '';
-    if (!contentType.includes('text/html')) return null;
+    if (!page.content_type.includes('text/html')) return null;
 
-    var html = await resp.text();
+    var html = page.body;
 
     // 1. Try JSON-LD schema.org
     var jsonld = extractJsonLd(html);
@@ -564,6 +566,21 @@ async function harvest(options) {
 
   console.log('\n--- Search complete ---');
   console.log('Unique candidates:', candidates.length);
+
+  // Skip URLs an earlier run (of either harvester) already dealt with,
+  // unless --recheck asks for everything again
+  if (!dryRun && !options.recheck) {
+    try {
+      var due = new Set(await filterUnseen(candidates.map(function(c) { return c.url; })));
+      var before = candidates.length;
+      candidates = candidates.filter(function(c) { return due.has(c.url); });
+      stats.already_seen = before - candidates.length;
+      console.log('Already harvested (skipped):', stats.already_seen);
+    } catch (err) {
+      console.error('URL index unavailable, fetching all candidates:', err.message);
+    }
+  }
+  var outcomes = [];
   console.log('Fetching event pages...\n');
 
   // Fetch and extract
@@ -625,6 +642,7 @@ async function harvest(options) {
       // Skip if name is too short or generic
       if (!pageData.name || pageData.name.length < 5) {
         stats.skipped++;
+        outcomes.push({ url: candidate.url, outcome: 'rejected' });
         continue;
       }
 
@@ -632,6 +650,11 @@ async function harvest(options) {
 
       // Store
       var storeResult = await storeEvent(pageData);
+      outcomes.push({
+        url: candidate.url,
+        outcome: storeResult.stored ? 'added' : storeResult.reason === 'duplicate' ? 'duplicate' : 'stale',
+        event_id: storeResult.id
+      });
       if (storeResult.stored) {
         stats.stored++;
         console.log('  ✓ Stored:', pageData.name, '| ID:', storeResult.id);
@@ -653,10 +676,15 @@ async function harvest(options) {
 
     } catch (err) {
       stats.errors++;
+      outcomes.push({ url: candidate.url, outcome: 'failed' });
       console.error('  ✗ Error:', err.message);
     }
   }
 
+  await recordUrlOutcomes(outcomes).catch(function(err) {
+    console.error('URL index write failed:', err.message);
+  });
+
   console.log('\n=== Harvest Complete ===');
   console.log('Queries:', stats.queries);
   console.log('Search results:', stats.results);
@@ -710,6 +738,7 @@ if (require.main === module) {
     if (args[i] === '--theme' && args[i + 1]) { options.theme = args[++i]; }
     else if (args[i] === '--city' && args[i + 1]) { options.city = args[++i]; }
     else if (args[i] === '--dry-run') { options.dryRun = true; }
+    else if (args[i] === '--recheck') { options.recheck = true; }
     else if (args[i] === '--max-queries' && args[i + 1]) { options.maxQueries = parseInt(args[++i]); }
   }
 
@@ -0,0 +1,415 @@
+// ── Event recommender ──
+// Scores a user's canister against every upcoming event for
+// GET /api/events/recommended. Event-side work — parsing themes, lowercasing
+// and tokenising text, placing countries in regions, spotting stakeholder-type
+// keywords — is done once per events version into a feature table. A request
+// then only does index lookups and array arithmetic, so all upcoming events
+// are scored (the route used to stop at the first 100).
+//
+// Design:
+//   - Themes: a vocabulary of canonical taxonomy themes (then any other theme
+//     seen on an event), one bitset per event. Theme Jaccard is a popcount of
+//     (user & event) over the words the user has bits in; the union comes
+//     from precomputed per-event counts.
+//   - Keywords: postings lists from token to event, for name and description
+//     (a keyword phrase hits a field when all its tokens occur there), and
+//     from vocabulary theme to event (a keyword hits every event theme that
+//     contains it as a substring, as before).
+//   - Geography: events grouped by city, country and region code, so each
+//     distinct place is compared against the user's geography once.
+//   - Stakeholder-type boosts: a precomputed column per type.
+//   - The table is rebuilt when lib/events_version moves or the date rolls
+//     over. Requests during a rebuild score against the previous table.
+//   - Optional: RECOMMEND_VECTOR_WEIGHT > 0 blends in cosine similarity
+//     between the user's em_user_profiles vector and em_events (top
+//     RECOMMEND_VECTOR_CANDIDATES hits). Vector errors are ignored.
+//   Weights and thresholds are unchanged: themes 30%, keywords 25%, geo 25%,
+//   type 20%; scores above 3 are meaningful, else the top 6 are a fallback.
+
+var { dbAll, dbGet } = require('../db');
+var { normalizeTheme, getCanonicalThemes } = require('./theme_taxonomy');
+var { getEventsVersion } = require('./events_version');
+
+var VECTOR_WEIGHT = parseFloat(process.env.RECOMMEND_VECTOR_WEIGHT || '0');
+var VECTOR_CANDIDATES = parseInt(process.env.RECOMMEND_VECTOR_CANDIDATES || '200', 10);
+var RESULT_LIMIT = 10;
+
+var REGIONS = [
+  ['europe', ['uk','united kingdom','england','germany','france','spain','netherlands','sweden','switzerland','italy','portugal','austria','belgium','denmark','finland','norway','ireland','poland','czech','romania','greece']],
+  ['apac', ['singapore','australia','japan','south korea','china','india','hong kong','taiwan','new zealand','indonesia','thailand','malaysia','vietnam','philippines']],
+  ['americas', ['usa','us','canada','united states','austin','new york','san francisco','texas','california']],
+  ['mea', ['uae','saudi arabia','israel','qatar','south africa','kenya','nigeria','egypt']]
+];
+
+var TYPE_KEYWORDS = {
+  'investor': ['investor','vc','venture','fund','capital','pitch','deal','portfolio'],
+  'founder': ['founder','startup','pitch','launch','build','scale','fundrais'],
+  'corporate': ['enterprise','corporate','innovation','partnership','strategy'],
+  'researcher': ['research','academic','science','university','lab','deep tech']
+};
+
+var table = null;       // current feature table
+var building = null;    // Promise of the table being built
+var stats = { builds: 0, last_build_ms: 0, requests: 0, last_score_ms: 0, vector_errors: 0 };
+
+function parseList(raw) {
+  var v = raw;
+  if (typeof v === 'string') { try { v = JSON.parse(v); } catch (e) { v = []; } }
+  return Array.isArray(v) ? v.filter(function(t) { return typeof t === 'string'; }) : [];
+}
+
+function tokenize(text) {
+  return (text || '').toLowerCase().split(/[^\p{L}\p{N}]+/u).filter(Boolean);
+}
+
+function themeKey(t) {
+  return (normalizeTheme(t) || t.trim()).toLowerCase();
+}
+
+// Region index (1-based, 0 = none) of a place string. Later regions win,
+// as in the original nested loop.
+function regionOf(place) {
+  var region = 0;
+  REGIONS.forEach(function(r, i) {
+    r[1].forEach(function(c) { if (place.indexOf(c) !== -1) region = i + 1; });
+  });
+  return region;
+}
+
+function popcount(x) {
+  x = x - ((x >>> 1) & 0x55555555);
+  x = (x & 0x33333333) + ((x >>> 2) & 0x33333333);
+  return (((x + (x >>> 4)) & 0x0F0F0F0F) * 0x01010101) >>> 24;
+}
+
+function addPosting(map, key, idx) {
+  var list = map.get(key);
+  if (!list) map.set(key, list = []);
+  if (list[list.length - 1] !== idx) list.push(idx);
+}
+
+function dayKey() {
+  return new Date().toISOString().slice(0, 10);
+}
+
+// ── Feature table ──
+function buildTable(rows, version) {
+  var n = rows.length;
+  var vocab = new Map();
+  getCanonicalThemes().forEach(function(t) { vocab.set(t.toLowerCase(), vocab.size); });
+
+  var eventThemes = rows.map(function(ev) {
+    var keys = {};
+    parseList(ev.themes).forEach(function(t) {
+      var k = themeKey(t);
+      if (!k) return;
+      if (!vocab.has(k)) vocab.set(k, vocab.size);
+      keys[vocab.get(k)] = true;
+    });
+    return Object.keys(keys).map(Number);
+  });
+
+  var words = Math.ceil(vocab.size / 32) || 1;
+  var t = {
+    version: version,
+    day: dayKey(),
+    n: n,
+    events: rows.map(function(ev) {
+      return {
+        id: ev.id, name: ev.name, event_date: ev.event_date, city: ev.city, country: ev.country,
+        slug: ev.slug, community_id: ev.community_id, is_public: ev.is_public
+      };
+    }),
+    vocab: vocab,
+    vocabKeys: Array.from(vocab.keys()),
+    words: words,
+    themeBits: new Uint32Array(n * words),
+    themeCount: new Uint16Array(n),
+    themePostings: [],            // vocab index -> event indices
+    kwThemes: new Map(),          // keyword -> vocab indices containing it
+    namePostings: new Map(),      // token -> event indices
+    descPostings: new Map(),
+    cityGroups: new Map(),        // lowercased city -> event indices
+    countryGroups: new Map(),
+    region: new Uint8Array(n),
+    typeBoost: {}
+  };
+  Object.keys(TYPE_KEYWORDS).forEach(function(type) { t.typeBoost[type] = new Float32Array(n); });
+
+  rows.forEach(function(ev, i) {
+    eventThemes[i].forEach(function(v) {
+      t.themeBits[i * words + (v >>> 5)] |= (1 << (v & 31));
+      (t.themePostings[v] || (t.themePostings[v] = [])).push(i);
+    });
+    t.themeCount[i] = eventThemes[i].length;
+
+    var name = (ev.name || '').toLowerCase();
+    var desc = (ev.description || '').toLowerCase();
+    tokenize(name).forEach(function(tok) { addPosting(t.namePostings, tok, i); });
+    tokenize(desc).forEach(function(tok) { addPosting(t.descPostings, tok, i); });
+
+    var city = (ev.city || '').toLowerCase();
+    var country = (ev.country || '').toLowerCase();
+    if (city) addPosting(t.cityGroups, city, i);
+    if (country) addPosting(t.countryGroups, country, i);
+    if (city || country) t.region[i] = regionOf(country + '\u0000' + city);
+
+    Object.keys(TYPE_KEYWORDS).forEach(function(type) {
+      var boost = 0;
+      TYPE_KEYWORDS[type].forEach(function(w) {
+        if (name.indexOf(w) !== -1 || desc.indexOf(w) !== -1) boost += 0.1;
+      });
+      t.typeBoost[type][i] = Math.min(boost, 0.3);
+    });
+  });
+  return t;
+}
+
+async function loadTable(version) {
+  var started = Date.now();
+  var rows = await dbAll(
+    `SELECT id, name, description, event_date, city, country, themes, slug,
+            community_id, COALESCE(is_public, false) AS is_public
+     FROM events
+     WHERE event_date >= CURRENT_DATE
+     ORDER BY event_date ASC, id ASC`
+  );
+  var t = buildTable(rows, version);
+  stats.builds++;
+  stats.last_build_ms = Date.now() - started;
+  console.log('[recommender] Feature table built: ' + t.n + ' events, ' + t.vocab.size + ' themes in ' + stats.last_build_ms + 'ms');
+  return t;
+}
+
+// Current table; rebuilds in the background when stale and waits only when
+// there is no table yet.
+async function getTable() {
+  var version = await getEventsVersion();
+  if (table && table.version === version && table.day === dayKey()) return table;
+  if (!building) {
+    building = loadTable(version).then(function(t) {
+      table = t;
+      return t;
+    }).finally(function() {
+      building = null;
+    });
+  }
+  if (table) {
+    building.catch(function(err) { console.error('[recommender] Rebuild failed:', err.message); });
+    return table;
+  }
+  return building;
+}
+
+// ── Scoring ──
+// Events (by index) where every token of the phrase occurs in the field.
+function phraseHits(postings, tokens, n, out) {
+  if (!tokens.length) return;
+  if (tokens.length === 1) {
+    (postings.get(tokens[0]) || []).forEach(function(i) { out[i]++; });
+    return;
+  }
+  var seen = new Uint8Array(n);
+  var list;
+  for (var k = 0; k < tokens.length; k++) {
+    list = postings.get(tokens[k]);
+    if (!list) return;
+    for (var j = 0; j < list.length; j++) if (seen[list[j]] === k) seen[list[j]] = k + 1;
+  }
+  // Every full match is in the last token's list
+  for (j = 0; j < list.length; j++) if (seen[list[j]] === tokens.length) out[list[j]]++;
+}
+
+// Vocabulary themes containing the keyword, memoised per table
+function themesContaining(t, kw) {
+  var hit = t.kwThemes.get(kw);
+  if (!hit) {
+    hit = [];
+    t.vocabKeys.forEach(function(key, v) { if (key.indexOf(kw) !== -1 && t.themePostings[v]) hit.push(v); });
+    t.kwThemes.set(kw, hit);
+  }
+  return hit;
+}
+
+function userContext(profile) {
+  var themes = parseList(profile.themes);
+  var intent = parseList(profile.intent);
+  var offering = parseList(profile.offering);
+  var type = (profile.stakeholder_type || '').toLowerCase();
+  var focus = (profile.focus_text || '').toLowerCase();
+
+  var keywords = new Set();
+  themes.concat(intent, offering).forEach(function(t) { keywords.add(t.toLowerCase()); });
+  if (focus) focus.split(/[\s,;]+/).forEach(function(w) { if (w.length > 3) keywords.add(w); });
+  if (type) keywords.add(type);
+  keywords.delete('');
+
+  return {
+    themeKeys: Array.from(new Set(themes.map(themeKey).filter(Boolean))),
+    keywords: Array.from(keywords),
+    geo: (profile.geography || '').toLowerCase(),
+    type: type
+  };
+}
+
+function scoreAll(t, user) {
+  var n = t.n;
+
+  // 1. Theme Jaccard via bitsets
+  var userBits = new Uint32Array(t.words);
+  var userExtra = 0;   // user themes no event has: only widen the union
+  user.themeKeys.forEach(function(k) {
+    var v = t.vocab.get(k);
+    if (v === undefined) userExtra++;
+    else userBits[v >>> 5] |= (1 << (v & 31));
+  });
+  var userWords = [];
+  var userCount = userExtra;
+  for (var w = 0; w < t.words; w++) {
+    if (userBits[w]) { userWords.push(w); userCount += popcount(userBits[w]); }
+  }
+  var themeScore = new Float32Array(n);
+  for (var i = 0; i < n; i++) {
+    var inter = 0;
+    for (var u = 0; u < userWords.length; u++) inter += popcount(userBits[userWords[u]] & t.themeBits[i * t.words + userWords[u]]);
+    var union = userCount + t.themeCount[i] - inter;
+    themeScore[i] = union > 0 ? inter / union : 0;
+  }
+
+  // 2. Keyword hits: name, description, and event themes containing the keyword
+  var hits = new Uint16Array(n);
+  user.keywords.forEach(function(kw) {
+    var tokens = tokenize(kw);
+    phraseHits(t.namePostings, tokens, n, hits);
+    phraseHits(t.descPostings, tokens, n, hits);
+    themesContaining(t, kw).forEach(function(v) {
+      t.themePostings[v].forEach(function(e) { hits[e]++; });
+    });
+  });
+  var kwDenom = Math.max(2, user.keywords.length * 0.25);
+
+  // 3. Geography per distinct place
+  var geoScore = new Float32Array(n);
+  if (user.geo) {
+    t.cityGroups.forEach(function(list, city) {
+      if (user.geo.indexOf(city) !== -1 || city.indexOf(user.geo) !== -1) list.forEach(function(e) { geoScore[e] = 1; });
+    });
+    t.countryGroups.forEach(function(list, country) {
+      if (user.geo.indexOf(country) !== -1 || country.indexOf(user.geo) !== -1) {
+        list.forEach(function(e) { if (geoScore[e] < 0.6) geoScore[e] = 0.6; });
+      }
+    });
+    var userRegion = regionOf(user.geo);
+    if (userRegion) {
+      for (i = 0; i < n; i++) if (!geoScore[i] && t.region[i] === userRegion) geoScore[i] = 0.3;
+    }
+  }
+
+  // 4. Stakeholder type
+  var typeBoost = t.typeBoost[user.type] || null;
+
+  return { themeScore: themeScore, hits: hits, kwDenom: kwDenom, hasKeywords: user.keywords.length > 0, geoScore: geoScore, typeBoost: typeBoost };
+}
+
+async function vectorSimilarities(userId) {
+  if (!(VECTOR_WEIGHT > 0)) return null;
+  try {
+    var vs = require('./vector_search');
+    var vector = await vs.getPointVector(vs.COLLECTIONS.profiles, userId);
+    if (!vector) return null;
+    var result = await vs.searchByVector(vs.COLLECTIONS.events, vector, VECTOR_CANDIDATES);
+    var sims = new Map();
+    ((result && result.result) || []).forEach(function(r) {
+      var id = r.payload && r.payload.event_id != null ? r.payload.event_id : r.id;
+      sims.set(Number(id), Math.max(0, r.score || 0));
+    });
+    return sims;
+  } catch (err) {
+    stats.vector_errors++;
+    return null;
+  }
+}
+
+// Returns up to 10 recommendations ({ id, name, event_date, city, country,
+// slug, score, reasons, _debug }), or null when the user has no profile.
+async function recommendEvents(userId) {
+  var results = await Promise.all([
+    dbGet(
+      `SELECT sp.stakeholder_type, sp.themes, sp.intent, sp.offering, sp.geography, sp.focus_text,
+              ARRAY(SELECT event_id FROM event_registrations WHERE user_id = $1 AND status = 'active') AS registered,
+              ARRAY(SELECT community_id FROM community_members WHERE user_id = $1) AS communities
+       FROM stakeholder_profiles sp WHERE sp.user_id = $1`,
+      [userId]
+    ),
+    getTable(),
+    vectorSimilarities(userId)
+  ]);
+  var profile = results[0];
+  var t = results[1];
+  var sims = results[2];
+  if (!profile) return null;
+
+  var started = Date.now();
+  var user = userContext(profile);
+  var s = scoreAll(t, user);
+  var registered = new Set(profile.registered || []);
+  var communities = new Set(profile.communities || []);
+
+  var scored = [];
+  for (var i = 0; i < t.n; i++) {
+    var ev = t.events[i];
+    if (registered.has(ev.id)) continue;
+    if (ev.community_id != null && !ev.is_public && !communities.has(ev.community_id)) continue;
+
+    var keywordScore = s.hasKeywords ? Math.min(1, s.hits[i] / s.kwDenom) : 0;
+    var typeBoost = s.typeBoost ? s.typeBoost[i] : 0;
+    var total = (s.themeScore[i] * 0.3) + (keywordScore * 0.25) + (s.geoScore[i] * 0.25) + (typeBoost * 0.2);
+    var sim = sims ? (sims.get(ev.id) || 0) : null;
+    if (sims) total = total * (1 - VECTOR_WEIGHT) + sim * VECTOR_WEIGHT;
+
+    var reasons = [];
+    if (s.themeScore[i] > 0) reasons.push('Theme match');
+    if (keywordScore > 0) reasons.push('Canister signal');
+    if (s.geoScore[i] >= 0.6) reasons.push('Your region');
+    if (typeBoost > 0) reasons.push('For ' + (profile.stakeholder_type || 'you') + 's');
+    if (sim !== null && sim >= 0.5) reasons.push('Similar to your canister');
+
+    scored.push({
+      id: ev.id, name: ev.name, event_date: ev.event_date,
+      city: ev.city, country: ev.country, slug: ev.slug,
+      score: Math.round(total * 100), reasons: reasons,
+      _debug: {
+        themeScore: s.themeScore[i], keywordScore: keywordScore, keywordHits: s.hits[i],
+        geoScore: s.geoScore[i], typeBoost: typeBoost, similarity: sim, total: total
+      }
+    });
+  }
+  // Stable: equal scores keep date order
+  scored.sort(function(a, b) { return b.score - a.score; });
+
+  var meaningful = scored.filter(function(r) { return r.score > 3; });
+  if (!meaningful.length && scored.length) {
+    // Fallback: top upcoming events
+    meaningful = scored.slice(0, 6).map(function(r) {
+      r.reasons = r.reasons.length ? r.reasons : ['Upcoming event'];
+      r.score = Math.max(r.score, 1);
+      return r;
+    });
+  }
+
+  stats.requests++;
+  stats.last_score_ms = Date.now() - started;
+  return meaningful.slice(0, RESULT_LIMIT);
+}
+
+function getRecommenderStats() {
+  return Object.assign({
+    events: table ? table.n : 0,
+    themes: table ? table.vocab.size : 0,
+    version: table ? table.version : null,
+    building: !!building,
+    vector_weight: VECTOR_WEIGHT
+  }, stats);
+}
+
+module.exports = { recommendEvents, getRecommenderStats };
@@ -0,0 +1,171 @@
+// ── Event search ──
+// Shared query builder behind GET /api/events, /api/events/feed.json and
+// /api/events/rss. Every filter those endpoints offer is answered from an
+// index, and the list is paged by keyset instead of OFFSET.
+//
+// Design:
+//   - Text search: events.search_tsv (generated from name + description,
+//     GIN) via websearch_to_tsquery, OR'd with a trigram ILIKE on name so
+//     partial words ("ethc") still find "EthCC". Both legs are index scans.
+//   - Themes: containment (themes @> '["AI"]') on a jsonb_path_ops GIN
+//     index. Event themes are stored canonical (normalizeThemes), so the
+//     filter value is normalised the same way.
+//   - City/country: substring match, as the old ILIKE '%city%' filter did
+//     ("york" still finds "New York"), on generated city_norm / country_norm
+//     (em_normalise_place) through pg_trgm GIN indexes. normalisePlace()
+//     below is the JS mirror — keep the two in step.
+//   - Registration counts come from events.registration_count, kept by a
+//     trigger on event_registrations; no GROUP BY per request.
+//   - Keyset pagination: each sort has a total order ending in id, and the
+//     cursor is the last row's key, base64url-encoded. Undated events sort
+//     as 'infinity', the same NULLS LAST order as before, so they count as
+//     upcoming; the public feeds pass `dated` to keep them out as before.
+//   Columns, indexes and the trigger are created in server.js runMigrations.
+
+var { dbAll } = require('../db');
+var { normalizeTheme } = require('./theme_taxonomy');
+
+var DATE_KEY = "COALESCE(e.event_date, 'infinity'::date)";
+
+// Per sort: key columns as selected into the cursor, their types, and
+// whether each is descending.
+var SORTS = {
+  date_asc: {
+    keys: [DATE_KEY + '::text', 'e.id'],
+    types: ['date', 'int'],
+    desc: [false, false]
+  },
+  date_desc: {
+    keys: [DATE_KEY + '::text', 'e.id'],
+    types: ['date', 'int'],
+    desc: [true, true]
+  },
+  popular: {
+    keys: ['e.registration_count', DATE_KEY + '::text', 'e.id'],
+    types: ['int', 'date', 'int'],
+    desc: [true, false, false]
+  }
+};
+
+function normalisePlace(s) {
+  return String(s == null ? '' : s).replace(/\s+/g, ' ').trim().toLowerCase();
+}
+
+function likeContains(s) {
+  return '%' + s.replace(/[\\%_]/g, '\\$&') + '%';
+}
+
+function keyExpr(sort, i) {
+  // Compare on the typed expression so the index on it is usable
+  return sort.types[i] === 'date' ? DATE_KEY : sort.keys[i];
+}
+
+// ── Cursors ──
+function encodeCursor(values) {
+  return Buffer.from(JSON.stringify(values)).toString('base64url');
+}
+
+function decodeCursor(cursor, sort) {
+  try {
+    var values = JSON.parse(Buffer.from(String(cursor), 'base64url').toString('utf8'));
+    if (!Array.isArray(values) || values.length !== sort.keys.length) return null;
+    return values;
+  } catch (e) {
+    return null;
+  }
+}
+
+// Rows strictly after `values` in the sort order: a row comparison when all
+// keys run one way (an index seek), expanded column by column otherwise.
+function afterCursor(sort, values, params) {
+  var refs = values.map(function(v, i) {
+    params.push(v);
+    return '$' + params.length + '::' + sort.types[i];
+  });
+  var exprs = sort.keys.map(function(k, i) { return keyExpr(sort, i); });
+  if (sort.desc.every(function(d) { return d === sort.desc[0]; })) {
+    return '(' + exprs.join(', ') + ') ' + (sort.desc[0] ? '<' : '>') + ' (' + refs.join(', ') + ')';
+  }
+  var ors = [];
+  for (var i = 0; i < refs.length; i++) {
+    var ands = [];
+    for (var j = 0; j < i; j++) ands.push(exprs[j] + ' = ' + refs[j]);
+    ands.push(exprs[i] + (sort.desc[i] ? ' < ' : ' > ') + refs[i]);
+    ors.push('(' + ands.join(' AND ') + ')');
+  }
+  return '(' + ors.join(' OR ') + ')';
+}
+
+// ── Filters ──
+// filters: { search, theme, city, country, status: 'upcoming'|'past'|'all',
+//            dated: true to leave out events with no date }
+function filterConditions(filters, params) {
+  var conds = ['(e.community_id IS NULL OR e.is_public = true)'];
+
+  if (filters.search && String(filters.search).trim()) {
+    var q = String(filters.search).trim();
+    params.push(q);
+    var tsq = '$' + params.length;
+    params.push('%' + q.replace(/[\\%_]/g, '\\$&') + '%');
+    conds.push("(e.search_tsv @@ websearch_to_tsquery('english', " + tsq + ') OR e.name ILIKE $' + params.length + ')');
+  }
+  if (filters.theme) {
+    var theme = normalizeTheme(String(filters.theme)) || String(filters.theme).trim();
+    params.push(JSON.stringify([theme]));
+    conds.push('e.themes @> $' + params.length + '::jsonb');
+  }
+  if (filters.city && normalisePlace(filters.city)) {
+    params.push(likeContains(normalisePlace(filters.city)));
+    conds.push('e.city_norm LIKE $' + params.length);
+  }
+  if (filters.country && normalisePlace(filters.country)) {
+    params.push(likeContains(normalisePlace(filters.country)));
+    conds.push('e.country_norm LIKE $' + params.length);
+  }
+  if (filters.dated) conds.push('e.event_date IS NOT NULL');
+  if (filters.status === 'upcoming') conds.push(DATE_KEY + ' >= CURRENT_DATE');
+  else if (filters.status === 'past') conds.push(DATE_KEY + ' < CURRENT_DATE');
+  return conds;
+}
+
+// ── Search ──
+// opts: { columns (SQL select list over alias e), sort, limit, cursor }.
+// Returns { events, next_cursor } — next_cursor is null on the last page.
+async function searchEvents(filters, opts) {
+  var sort = SORTS[opts.sort] || SORTS.date_asc;
+  var params = [];
+  var conds = filterConditions(filters, params);
+  if (opts.cursor) {
+    var values = decodeCursor(opts.cursor, sort);
+    if (!values) {
+      var err = new Error('Invalid cursor');
+      err.status = 400;
+      throw err;
+    }
+    conds.push(afterCursor(sort, values, params));
+  }
+
+  var order = sort.keys.map(function(k, i) {
+    return keyExpr(sort, i) + (sort.desc[i] ? ' DESC' : ' ASC');
+  });
+  var keySelect = sort.keys.map(function(k, i) { return k + ' AS _k' + i; });
+  params.push(opts.limit + 1);
+
+  var rows = await dbAll(
+    'SELECT ' + (opts.columns || 'e.*') + ', ' + keySelect.join(', ') +
+    ' FROM events e WHERE ' + conds.join(' AND ') +
+    ' ORDER BY ' + order.join(', ') + ' LIMIT $' + params.length,
+    params
+  );
+
+  var more = rows.length > opts.limit;
+  if (more) rows = rows.slice(0, opts.limit);
+  var last = rows[rows.length - 1];
+  var next = more ? encodeCursor(sort.keys.map(function(k, i) { return last['_k' + i]; })) : null;
+  rows.forEach(function(r) {
+    sort.keys.forEach(function(k, i) { delete r['_k' + i]; });
+  });
+  return { events: rows, next_cursor: next };
+}
+
+module.exports = { searchEvents };
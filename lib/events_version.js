@@ -0,0 +1,47 @@
+// ── Events version ──
+// A cheap "have events changed?" check for in-process caches built from the
+// events table (lib/event_recommender.js). A statement-level trigger on
+// events bumps em_events_change_seq on every insert, delete, truncate and
+// content update (server.js runMigrations), so writes from any path — routes,
+// harvesters, one-off scripts, other instances — move the version.
+//
+// Design:
+//   - Reading the sequence is O(1). The value is memoised for
+//     EVENTS_VERSION_CHECK_S, so a burst of requests costs one query.
+//   - Sequences are not transactional: a rolled-back write still bumps the
+//     version. That only means an occasional unneeded rebuild.
+//   - registration_count is not a content column, so RSVPs do not move it.
+
+var { dbGet } = require('../db');
+
+var CHECK_MS = parseFloat(process.env.EVENTS_VERSION_CHECK_S || '5') * 1000;
+
+var cached = null;      // { version, checked }
+var inflight = null;
+
+// Resolves to the current version string. On error the last known version
+// is returned (or '0'), so callers keep serving what they have.
+function getEventsVersion() {
+  if (cached && Date.now() - cached.checked < CHECK_MS) return Promise.resolve(cached.version);
+  if (inflight) return inflight;
+  inflight = dbGet('SELECT last_value::text AS v FROM em_events_change_seq').then(function(row) {
+    cached = { version: row ? row.v : '0', checked: Date.now() };
+    return cached.version;
+  }, function(err) {
+    console.error('[events_version] check failed:', err.message);
+    var v = cached ? cached.version : '0';
+    cached = { version: v, checked: Date.now() };
+    return v;
+  }).finally(function() {
+    inflight = null;
+  });
+  return inflight;
+}
+
+// For writers in this process: forces the next getEventsVersion() to
+// re-read, so a change is picked up by the very next request.
+function noteEventsChanged() {
+  cached = null;
+}
+
+module.exports = { getEventsVersion, noteEventsChanged };
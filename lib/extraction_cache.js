@@ -0,0 +1,114 @@
+// ── Extraction Cache ──
+// Persistent memo of LLM page extractions keyed by (prompt version, model,
+// sha256(cleaned page text)), so a curated URL re-checked every Sunday or
+// the same event page found by several discovery queries is only sent to
+// Claude once.
+//
+// Design:
+//   - The prompt version is a hash of the prompt template itself (computed
+//     by the caller), so editing the prompt invalidates old rows without
+//     anyone remembering to bump a constant.
+//   - Rows store the model's parsed JSON before validation, so changes to
+//     validate() apply to cached results too. A {"name": null} answer is
+//     cached like any other — non-event pages are the commonest repeat.
+//   - Concurrent lookups of the same key share one in-flight extraction.
+//   - Fail open, like embedding_cache: Postgres trouble means a miss.
+
+var crypto = require('crypto');
+
+var tableReady = null;
+var inflight = new Map();
+var stats = { hits: 0, misses: 0, shared: 0, writes: 0, errors: 0 };
+
+function db() {
+  return require('../db');
+}
+
+function ensureTable() {
+  if (!tableReady) {
+    tableReady = db().dbRun(`CREATE TABLE IF NOT EXISTS extraction_cache (
+      prompt_version TEXT NOT NULL,
+      model TEXT NOT NULL,
+      text_hash BYTEA NOT NULL,
+      result JSONB NOT NULL,
+      created_at TIMESTAMPTZ DEFAULT NOW(),
+      PRIMARY KEY (prompt_version, model, text_hash)
+    )`).catch(function(err) {
+      tableReady = null;
+      throw err;
+    });
+  }
+  return tableReady;
+}
+
+function promptVersion() {
+  var h = crypto.createHash('sha256');
+  for (var i = 0; i < arguments.length; i++) h.update(String(arguments[i])).update('\0');
+  return h.digest('hex').slice(0, 16);
+}
+
+async function lookup(version, model, hash) {
+  try {
+    await ensureTable();
+    var row = await db().dbGet(
+      'SELECT result FROM extraction_cache WHERE prompt_version = $1 AND model = $2 AND text_hash = $3',
+      [version, model, hash]
+    );
+    return row ? row.result : null;
+  } catch (err) {
+    stats.errors++;
+    console.error('[extraction_cache] lookup failed, treating as miss:', err.message);
+    return null;
+  }
+}
+
+async function store(version, model, hash, result) {
+  try {
+    await ensureTable();
+    await db().dbRun(
+      `INSERT INTO extraction_cache (prompt_version, model, text_hash, result)
+       VALUES ($1, $2, $3, $4) ON CONFLICT DO NOTHING`,
+      [version, model, hash, JSON.stringify(result)]
+    );
+    stats.writes++;
+  } catch (err) {
+    stats.errors++;
+    console.error('[extraction_cache] store failed:', err.message);
+  }
+}
+
+// Returns the cached result for this text, or runs extract() and stores
+// what it resolves to. extract() errors are not cached.
+async function cachedExtraction(version, model, text, extract) {
+  var hash = crypto.createHash('sha256').update(text, 'utf8').digest();
+  var key = version + '|' + model + '|' + hash.toString('hex');
+  if (inflight.has(key)) {
+    stats.shared++;
+    return inflight.get(key);
+  }
+
+  var p = (async function() {
+    var hit = await lookup(version, model, hash);
+    if (hit) {
+      stats.hits++;
+      return hit;
+    }
+    stats.misses++;
+    var result = await extract();
+    await store(version, model, hash, result);
+    return result;
+  })();
+  inflight.set(key, p);
+  try {
+    return await p;
+  } finally {
+    inflight.delete(key);
+  }
+}
+
+function getExtractionCacheStats() {
+  var lookups = stats.hits + stats.misses;
+  return Object.assign({ hit_rate: lookups ? Math.round(stats.hits / lookups * 1000) / 1000 : null }, stats);
+}
+
+module.exports = { cachedExtraction, promptVersion, getExtractionCacheStats };
@@ -0,0 +1,195 @@
+// ── Feed snapshots ──
+// Pre-rendered, pre-compressed bodies for the public feeds
+// (/api/events/feed.json, /api/events/rss). Embed partners poll these with
+// the same handful of filter combinations, so a poll is served from memory
+// and, when the client sends If-None-Match, answered with a 304.
+//
+// Design:
+//   - One snapshot per feed + normalised filter set (the key parts the route
+//     passes). A snapshot holds the identity body plus gzip and brotli
+//     copies, compressed once when it is built.
+//   - A snapshot is current while the events version (lib/events_version.js)
+//     and the calendar day are unchanged and it is younger than
+//     FEED_SNAPSHOT_TTL_S. The TTL covers what the version does not track:
+//     RSVP counts (events.registration_count) and render-time fields.
+//   - ETags are strong and derived from a hash of the body rendered with the
+//     build time pinned to the start of the day, so generated_at-style
+//     fields don't change it but row and renderer changes do. A rebuild whose
+//     pinned render is unchanged keeps the previous snapshot (bytes, ETag and
+//     generated_at), so pollers keep getting 304s until the feed content
+//     really changes. Each content-coding gets its
+//     own ETag ("<hash>", "<hash>-gz", "<hash>-br"); If-None-Match matches
+//     any of them.
+//   - A failed rebuild serves the previous snapshot for that key.
+//   - Concurrent requests for a key share one build. The feeds are public,
+//     so routes bound the key space (fixed status values and limit sizes)
+//     and the cache is capped at FEED_SNAPSHOT_MAX_MB of bodies, all three
+//     codings counted (oldest built evicted first).
+
+var zlib = require('zlib');
+var crypto = require('crypto');
+var { promisify } = require('util');
+var { getEventsVersion } = require('./events_version');
+
+var gzip = promisify(zlib.gzip);
+var brotli = promisify(zlib.brotliCompress);
+
+var TTL_MS = parseFloat(process.env.FEED_SNAPSHOT_TTL_S || '300') * 1000;
+var MAX_BYTES = parseFloat(process.env.FEED_SNAPSHOT_MAX_MB || '64') * 1024 * 1024;
+var BROTLI_QUALITY = parseInt(process.env.FEED_SNAPSHOT_BROTLI_QUALITY || '9', 10);
+
+var snapshots = new Map();   // key -> snapshot, oldest built first
+var inflight = new Map();
+var totalBytes = 0;
+var stats = { hits: 0, not_modified: 0, builds: 0, unchanged_rebuilds: 0, shared: 0, evictions: 0, errors: 0 };
+
+function dayKey() {
+  return new Date().toISOString().slice(0, 10);
+}
+
+function hashBody(body) {
+  return crypto.createHash('sha1').update(body).digest('hex');
+}
+
+function isCurrent(snap, version) {
+  return snap.version === version && snap.day === dayKey() && Date.now() - snap.built < TTL_MS;
+}
+
+function snapshotBytes(snap) {
+  return snap.bodies.identity.length + snap.bodies.gzip.length + snap.bodies.br.length;
+}
+
+function drop(key) {
+  var snap = snapshots.get(key);
+  if (!snap) return;
+  snapshots.delete(key);
+  totalBytes -= snapshotBytes(snap);
+}
+
+// The newest snapshot is always kept, even if it alone exceeds MAX_BYTES
+function store(key, snap) {
+  drop(key);
+  snapshots.set(key, snap);
+  totalBytes += snapshotBytes(snap);
+  while (totalBytes > MAX_BYTES && snapshots.size > 1) {
+    drop(snapshots.keys().next().value);
+    stats.evictions++;
+  }
+}
+
+async function build(version, spec, prev) {
+  var rows = await spec.load();
+  var day = dayKey();
+  var hash = hashBody(spec.render(rows, new Date(day + 'T00:00:00Z')));
+  if (prev && prev.hash === hash) {
+    stats.unchanged_rebuilds++;
+    return Object.assign({}, prev, { version: version, day: day, built: Date.now() });
+  }
+
+  var body = Buffer.from(spec.render(rows, new Date()), 'utf8');
+  var compressed = await Promise.all([
+    gzip(body),
+    brotli(body, { params: { [zlib.constants.BROTLI_PARAM_QUALITY]: BROTLI_QUALITY } })
+  ]);
+  stats.builds++;
+  return {
+    hash: hash,
+    version: version,
+    day: day,
+    built: Date.now(),
+    content_type: spec.contentType,
+    bodies: { identity: body, gzip: compressed[0], br: compressed[1] }
+  };
+}
+
+// keyParts: feed name plus its normalised filters, e.g. ['rss', theme, city].
+// spec: { contentType, load() -> rows, render(rows, builtAt) -> string }.
+// Resolves to the current snapshot for that key.
+async function getFeedSnapshot(keyParts, spec) {
+  var key = JSON.stringify(keyParts);
+  var version = await getEventsVersion();
+  var snap = snapshots.get(key);
+  if (snap && isCurrent(snap, version)) {
+    stats.hits++;
+    return snap;
+  }
+  if (inflight.has(key)) {
+    stats.shared++;
+    return inflight.get(key);
+  }
+
+  var p = build(version, spec, snap).then(function(fresh) {
+    store(key, fresh);
+    return fresh;
+  }, function(err) {
+    stats.errors++;
+    if (!snap) throw err;
+    console.error('[feed_snapshots] Rebuild failed, serving previous snapshot:', err.message);
+    return snap;
+  });
+  inflight.set(key, p);
+  try {
+    return await p;
+  } finally {
+    inflight.delete(key);
+  }
+}
+
+// ── Serving ──
+// Preferred coding from Accept-Encoding: br, then gzip, else identity.
+function pickEncoding(header) {
+  var accepted = {};
+  String(header || '').split(',').forEach(function(part) {
+    var bits = part.trim().toLowerCase().split(';');
+    var q = 1;
+    bits.slice(1).forEach(function(b) {
+      var m = b.trim().match(/^q=([\d.]+)$/);
+      if (m) q = parseFloat(m[1]);
+    });
+    if (bits[0]) accepted[bits[0]] = q;
+  });
+  function ok(coding) {
+    var q = accepted[coding] != null ? accepted[coding] : accepted['*'];
+    return q != null && q > 0;
+  }
+  if (ok('br')) return 'br';
+  if (ok('gzip')) return 'gzip';
+  return 'identity';
+}
+
+var ETAG_SUFFIX = { identity: '', gzip: '-gz', br: '-br' };
+
+function notModified(ifNoneMatch, hash) {
+  if (!ifNoneMatch) return false;
+  return ifNoneMatch.split(',').some(function(tag) {
+    tag = tag.trim().replace(/^W\//, '');
+    if (tag === '*') return true;
+    return /^".*"$/.test(tag) && tag.slice(1, -1).replace(/-(gz|br)$/, '') === hash;
+  });
+}
+
+// Writes the snapshot (or a 304) with validators and the negotiated coding.
+// Cache-Control is left to the caller.
+function sendFeedSnapshot(req, res, snap) {
+  var encoding = pickEncoding(req.headers['accept-encoding']);
+  res.set('Vary', 'Accept-Encoding');
+  res.set('ETag', '"' + snap.hash + ETAG_SUFFIX[encoding] + '"');
+  if (notModified(req.headers['if-none-match'], snap.hash)) {
+    stats.not_modified++;
+    return res.status(304).end();
+  }
+  res.set('Content-Type', snap.content_type);
+  if (encoding !== 'identity') res.set('Content-Encoding', encoding);
+  res.send(snap.bodies[encoding]);
+}
+
+function getFeedSnapshotStats() {
+  return Object.assign({
+    snapshots: snapshots.size,
+    bytes: totalBytes,
+    ttl_s: TTL_MS / 1000,
+    max_bytes: MAX_BYTES
+  }, stats);
+}
+
+module.exports = { getFeedSnapshot, sendFeedSnapshot, getFeedSnapshotStats };
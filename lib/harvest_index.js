@@ -0,0 +1,186 @@
+// ── Harvest index: URL-seen ledger + discovery query planner ──
+// Shared memory for both harvesters, so a URL that was already harvested (or
+// already turned out not to be an event) is not fetched again by the next
+// run, and so the rotating theme×city query pool spends the search quota on
+// the queries that actually find events.
+//
+// Design:
+//   - harvest_urls: normalised URL (same normalisation as the page cache) →
+//     last outcome and time. 'failed' is retried after HARVEST_URL_RETRY_DAYS;
+//     every other outcome holds for HARVEST_URL_RECHECK_DAYS.
+//   - discovery_queries: per-query running totals (runs, raw results, URLs
+//     not already in harvest_urls, events added). Written once per run.
+//   - planQueries keeps an exploration share of never-run queries in
+//     rotation order and fills the rest by smoothed yield (events added per
+//     run, then fresh URLs per run). Queries run within the cooldown are
+//     skipped; dead ones (several runs, nothing fresh) are only retried after
+//     QUERY_DEAD_RETRY_DAYS and only when nothing better is left.
+//   - Outcome writes are bulk unnest upserts; callers buffer and flush.
+
+var { dbAll, dbRun, dbBulkInsert } = require('../db');
+var { normaliseUrl } = require('./page_cache');
+
+var URL_RECHECK_DAYS = parseFloat(process.env.HARVEST_URL_RECHECK_DAYS || '30');
+var URL_RETRY_DAYS = parseFloat(process.env.HARVEST_URL_RETRY_DAYS || '3');
+var QUERY_COOLDOWN_DAYS = parseFloat(process.env.QUERY_COOLDOWN_DAYS || '7');
+var QUERY_DEAD_AFTER_RUNS = parseInt(process.env.QUERY_DEAD_AFTER_RUNS || '3', 10);
+var QUERY_DEAD_RETRY_DAYS = parseFloat(process.env.QUERY_DEAD_RETRY_DAYS || '45');
+var QUERY_EXPLORE_FRACTION = parseFloat(process.env.QUERY_EXPLORE_FRACTION || '0.3');
+
+var DAY_MS = 86400 * 1000;
+var tablesReady = null;
+
+function ensureTables() {
+  if (!tablesReady) {
+    tablesReady = (async function() {
+      await dbRun(`CREATE TABLE IF NOT EXISTS harvest_urls (
+        url TEXT PRIMARY KEY,
+        outcome TEXT NOT NULL,
+        event_id INTEGER,
+        attempts INTEGER DEFAULT 1,
+        first_seen_at TIMESTAMPTZ DEFAULT NOW(),
+        last_harvested_at TIMESTAMPTZ DEFAULT NOW()
+      )`);
+      await dbRun(`CREATE TABLE IF NOT EXISTS discovery_queries (
+        query TEXT PRIMARY KEY,
+        runs INTEGER DEFAULT 0,
+        results INTEGER DEFAULT 0,
+        new_urls INTEGER DEFAULT 0,
+        added INTEGER DEFAULT 0,
+        last_run_at TIMESTAMPTZ,
+        last_added_at TIMESTAMPTZ
+      )`);
+    })().catch(function(err) {
+      tablesReady = null;
+      throw err;
+    });
+  }
+  return tablesReady;
+}
+
+// ── URL-seen index ──
+
+// Returns the subset of urls due for harvesting, in input order.
+async function filterUnseen(urls) {
+  if (!urls.length) return [];
+  await ensureTables();
+  var keys = urls.map(normaliseUrl);
+  var rows = await dbAll(
+    'SELECT url, outcome, last_harvested_at FROM harvest_urls WHERE url = ANY($1::text[])',
+    [keys]
+  );
+  var known = {};
+  rows.forEach(function(r) { known[r.url] = r; });
+  var now = Date.now();
+  return urls.filter(function(url, i) {
+    var r = known[keys[i]];
+    if (!r) return true;
+    var holdDays = r.outcome === 'failed' ? URL_RETRY_DAYS : URL_RECHECK_DAYS;
+    return now - new Date(r.last_harvested_at).getTime() > holdDays * DAY_MS;
+  });
+}
+
+// entries: [{ url, outcome, event_id }] — outcome is one of
+// added | duplicate | rejected | unchanged | stale | skipped | failed
+async function recordUrlOutcomes(entries) {
+  if (!entries.length) return;
+  await ensureTables();
+  // ON CONFLICT DO UPDATE cannot touch one row twice per statement: last wins
+  var byUrl = new Map();
+  entries.forEach(function(e) { byUrl.set(normaliseUrl(e.url), e); });
+  await dbBulkInsert('harvest_urls', [
+    { name: 'url', type: 'text' },
+    { name: 'outcome', type: 'text' },
+    { name: 'event_id', type: 'int' }
+  ], Array.from(byUrl.entries()).map(function(kv) {
+    return [kv[0], kv[1].outcome, kv[1].event_id || null];
+  }), {
+    onConflict: `ON CONFLICT (url) DO UPDATE SET
+      outcome = EXCLUDED.outcome,
+      event_id = COALESCE(EXCLUDED.event_id, harvest_urls.event_id),
+      attempts = harvest_urls.attempts + 1,
+      last_harvested_at = NOW()`
+  });
+}
+
+// ── Query planner ──
+
+// tallies: { query: { results, new_urls, added } } for one run
+async function recordQueryStats(tallies) {
+  var queries = Object.keys(tallies);
+  if (!queries.length) return;
+  await ensureTables();
+  await dbBulkInsert('discovery_queries', [
+    { name: 'query', type: 'text' },
+    { name: 'runs', type: 'int' },
+    { name: 'results', type: 'int' },
+    { name: 'new_urls', type: 'int' },
+    { name: 'added', type: 'int' },
+    { name: 'last_run_at', type: 'timestamptz' },
+    { name: 'last_added_at', type: 'timestamptz' }
+  ], queries.map(function(q) {
+    var t = tallies[q];
+    var now = new Date();
+    return [q, 1, t.results || 0, t.new_urls || 0, t.added || 0, now, t.added ? now : null];
+  }), {
+    onConflict: `ON CONFLICT (query) DO UPDATE SET
+      runs = discovery_queries.runs + 1,
+      results = discovery_queries.results + EXCLUDED.results,
+      new_urls = discovery_queries.new_urls + EXCLUDED.new_urls,
+      added = discovery_queries.added + EXCLUDED.added,
+      last_run_at = EXCLUDED.last_run_at,
+      last_added_at = COALESCE(EXCLUDED.last_added_at, discovery_queries.last_added_at)`
+  });
+}
+
+// Choose n queries from pool. offset rotates exploration order so
+// consecutive runs walk different parts of the never-run set.
+async function planQueries(pool, n, offset) {
+  await ensureTables();
+  var rows = await dbAll(
+    'SELECT query, runs, results, new_urls, added, last_run_at FROM discovery_queries WHERE query = ANY($1::text[])',
+    [pool]
+  );
+  var known = {};
+  rows.forEach(function(r) { known[r.query] = r; });
+
+  var now = Date.now();
+  var unexplored = [];
+  var ranked = [];
+  var dead = [];
+  var plan = { cooling: 0, dead_skipped: 0 };
+
+  for (var i = 0; i < pool.length; i++) {
+    var q = pool[(offset + i) % pool.length];
+    var r = known[q];
+    if (!r || !r.runs) { unexplored.push(q); continue; }
+    var idleMs = now - new Date(r.last_run_at).getTime();
+    if (idleMs < QUERY_COOLDOWN_DAYS * DAY_MS) { plan.cooling++; continue; }
+    if (r.runs >= QUERY_DEAD_AFTER_RUNS && !r.added && !r.new_urls) {
+      if (idleMs >= QUERY_DEAD_RETRY_DAYS * DAY_MS) dead.push(q);
+      else plan.dead_skipped++;
+      continue;
+    }
+    ranked.push({
+      query: q,
+      // Laplace-smoothed so one lucky run doesn't dominate
+      score: (r.added + 1) / (r.runs + 2) + 0.1 * (r.new_urls + 1) / (r.runs + 2)
+    });
+  }
+  ranked.sort(function(a, b) { return b.score - a.score; });
+
+  var exploreSlots = Math.min(unexplored.length, Math.ceil(n * QUERY_EXPLORE_FRACTION));
+  var chosen = [];
+  var ri = 0, ui = 0, di = 0;
+  plan.exploit = 0;
+  plan.explore = 0;
+  plan.dead_retried = 0;
+  while (chosen.length < n - exploreSlots && ri < ranked.length) { chosen.push(ranked[ri++].query); plan.exploit++; }
+  while (chosen.length < n && ui < unexplored.length) { chosen.push(unexplored[ui++]); plan.explore++; }
+  // Short on history or on unexplored queries: top up, dead ones last
+  while (chosen.length < n && ri < ranked.length) { chosen.push(ranked[ri++].query); plan.exploit++; }
+  while (chosen.length < n && di < dead.length) { chosen.push(dead[di++]); plan.dead_retried++; }
+  return { queries: chosen, plan: plan };
+}
+
+module.exports = { filterUnseen, recordUrlOutcomes, recordQueryStats, planQueries };
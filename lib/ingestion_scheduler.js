@@ -11,18 +11,29 @@
 //     "when did ingestion last work?" is a SQL query, not an archaeology dig.
 //   - Postgres advisory lock prevents concurrent runs across replicas;
 //     an in-memory flag prevents them within the process.
-//   - Rotating slice of the theme×city query pool per run — deterministic
-//     offset from the run counter, so the full pool is covered over time
-//     without burning the Serper quota in one go.
+//   - Slice of the theme×city query pool per run, chosen by the query
+//     planner (lib/harvest_index.js): productive queries first, a share of
+//     never-run ones in rotation order, dead ones held back. URLs already
+//     in the shared harvest_urls index are not fetched again.
 //   - Watchdog deadline: a run hard-stops inserting new work after
 //     MAX_RUN_MINUTES so a hung network can't wedge the scheduler.
 //   - Past-dated events are never inserted; years beyond +2 are rejected.
+//   - Search, fetch, extraction and insert run as a staged pipeline with
+//     bounded queues and per-host politeness; per-stage latency histograms
+//     land in ingestion_runs.stats.stages.
+//   - Pages come through the on-disk page cache (lib/page_cache.js); a page
+//     whose content hash matches the last successful extraction is skipped.
 
 var { pool, dbGet, dbRun } = require('../db');
 var { searchEvents } = require('./event_harvester');
-var { harvestEvent } = require('./event-harvester');
-var { findDuplicate } = require('./event_dedup');
+var { fetchPageCached, extractEventFromHtml } = require('./event-harvester');
+var { markProcessed, getPageCacheStats } = require('./page_cache');
+var { getExtractionCacheStats } = require('./extraction_cache');
+var { filterUnseen, recordUrlOutcomes, recordQueryStats, planQueries } = require('./harvest_index');
+var { findDuplicate, createDedupIndex } = require('./event_dedup');
 var { normalizeThemes } = require('./theme_taxonomy');
+var { createTokenBucket } = require('./concurrency');
+var { createStage, createHostGate } = require('./crawl_pipeline');
 
 var INGEST_HOUR_UTC = parseInt(process.env.INGEST_HOUR_UTC || '5', 10);
 var QUERIES_PER_RUN = parseInt(process.env.INGEST_QUERIES_PER_RUN || '40', 10);
@@ -31,6 +42,14 @@ var MAX_RUN_MINUTES = parseInt(process.env.INGEST_MAX_RUN_MINUTES || '45', 10);
 var CATCHUP_STALE_HOURS = 26;
 var ADVISORY_LOCK_KEY = 824642; // arbitrary constant, unique to ingestion
 
+// Pipeline stage widths and politeness — see createCrawlPipeline
+var SEARCH_CONCURRENCY = parseInt(process.env.INGEST_SEARCH_CONCURRENCY || '2', 10);
+var SEARCH_QPS = parseFloat(process.env.INGEST_SEARCH_QPS || '3');
+var FETCH_CONCURRENCY = parseInt(process.env.INGEST_FETCH_CONCURRENCY || '6', 10);
+var EXTRACT_CONCURRENCY = parseInt(process.env.INGEST_EXTRACT_CONCURRENCY || '3', 10);
+var HOST_CONCURRENCY = parseInt(process.env.INGEST_HOST_CONCURRENCY || '1', 10);
+var HOST_INTERVAL_MS = parseInt(process.env.INGEST_HOST_INTERVAL_MS || '1000', 10);
+
 var CITIES = [
   'London', 'Singapore', 'Sydney', 'Melbourne', 'New York', 'Las Vegas',
   'Barcelona', 'Madrid', 'Berlin', 'Stockholm', 'Copenhagen', 'Paris',
@@ -101,12 +120,13 @@ function makeSlug(name, eventDate, runId) {
   return slug + '-' + Date.now().toString(36) + (runId ? '-r' + runId : '');
 }
 
-async function insertEvent(ex, fallbackUrl, runId, stats) {
-  if (!ex.name || ex.name.length < 5) { stats.skipped++; return; }
-  if (!isAcceptableDate(ex.event_date)) { stats.stale++; return; }
+// Resolves to { outcome: 'added'|'duplicate'|'stale'|'skipped', id }
+async function insertEvent(ex, fallbackUrl, runId, stats, dedup) {
+  if (!ex.name || ex.name.length < 5) { stats.skipped++; return { outcome: 'skipped' }; }
+  if (!isAcceptableDate(ex.event_date)) { stats.stale++; return { outcome: 'stale' }; }
 
-  var dupe = await findDuplicate(ex.name, ex.event_date, ex.city);
-  if (dupe) { stats.duplicates++; return; }
+  var dupe = await findDuplicate(ex.name, ex.event_date, ex.city, { index: dedup });
+  if (dupe) { stats.duplicates++; return { outcome: 'duplicate', id: dupe.id }; }
 
   var themes = normalizeThemes(ex.themes || []);
   var res = await dbRun(
@@ -121,38 +141,108 @@ async function insertEvent(ex, fallbackUrl, runId, stats) {
 
   if (res && res.rows && res.rows[0]) {
     stats.added++;
+    // Keep the run's dedup index current so a second page announcing the same
+    // event later in this run is caught without another round-trip
+    if (dedup) dedup.add({ id: res.rows[0].id, name: ex.name, event_date: ex.event_date || null, city: ex.city || null });
     console.log('[Ingest]   + ' + ex.name + ' | ' + (ex.city || '?') + ' | ' + (ex.event_date || 'tbd'));
-  } else {
-    stats.duplicates++;
+    return { outcome: 'added', id: res.rows[0].id };
   }
+  stats.duplicates++;
+  return { outcome: 'duplicate' };
 }
 
 function sleep(ms) { return new Promise(function(r) { setTimeout(r, ms); }); }
 
-// ── Phase 1: rotating search discovery ──
-async function runDiscoverySlice(runId, deadline, stats) {
-  var queryPool = buildQueryPool();
+// ── Crawl pipeline: search → fetch → extract → insert ──
+// Each stage has its own worker count and a bounded queue in front of it, so
+// a slow Claude extraction backs up fetches instead of stalling searches.
+// Politeness is per host (HOST_INTERVAL_MS between requests to one host)
+// rather than a global sleep, and search spends a token bucket.
+// Insert runs single-worker so the run's dedup index sees every insert
+// before the next candidate is checked.
+// Every URL's outcome goes to the harvest_urls index, and each query's
+// results / fresh URLs / events added to discovery_queries for the planner.
+function createCrawlPipeline(runId, deadline, stats, dedup) {
+  var hostGate = createHostGate({ concurrency: HOST_CONCURRENCY, intervalMs: HOST_INTERVAL_MS });
+  var searchBucket = createTokenBucket(SEARCH_QPS, 1);
+  var seenUrls = new Set();
+  var abortError = null;
+  var outcomes = [];
+  var tallies = {};
+
+  function record(job, outcome, id) {
+    outcomes.push({ url: job.url, outcome: outcome, event_id: id || null });
+    if (outcome === 'added' && job.query) tallies[job.query].added++;
+    if (outcomes.length >= 200) flushOutcomes();
+  }
 
-  // Deterministic rotation: each run picks up where the run counter points,
-  // so consecutive runs sweep the whole pool instead of re-shuffling it.
-  var counted = await dbGet('SELECT COUNT(*)::int AS c FROM ingestion_runs');
-  var offset = ((counted.c || 0) * QUERIES_PER_RUN) % queryPool.length;
-  var batch = [];
-  for (var i = 0; i < Math.min(QUERIES_PER_RUN, queryPool.length); i++) {
-    batch.push(queryPool[(offset + i) % queryPool.length]);
+  function flushOutcomes() {
+    var batch = outcomes;
+    outcomes = [];
+    return recordUrlOutcomes(batch).catch(function(e) {
+      console.error('[Ingest] URL index write failed:', e.message);
+    });
   }
-  console.log('[Ingest] Discovery slice: ' + batch.length + ' queries at offset ' + offset + '/' + queryPool.length);
 
-  for (var q = 0; q < batch.length; q++) {
-    if (Date.now() > deadline) {
-      console.warn('[Ingest] Watchdog deadline hit — stopping discovery at query ' + q + '/' + batch.length);
-      stats.deadline_hit = true;
-      break;
+  function pastDeadline(where) {
+    if (Date.now() <= deadline) return false;
+    if (!stats.deadline_hit) {
+      console.warn('[Ingest] Watchdog deadline hit — dropping remaining work from ' + where);
+    }
+    stats.deadline_hit = true;
+    stats.dropped = (stats.dropped || 0) + 1;
+    return true;
+  }
+
+  function countFailure(err, job) {
+    stats.failed++;
+    record(job, err && err.rejected ? 'rejected' : 'failed');
+  }
+
+  var insert = createStage('insert', { concurrency: 1, capacity: 16, onError: countFailure }, async function(job) {
+    if (abortError || pastDeadline('insert')) return;
+    var res = await insertEvent(job.ex, job.url, runId, stats, dedup);
+    // Only a page whose event reached an outcome counts as processed; a job
+    // dropped at the deadline or failed insert is retried on the next run
+    await markProcessed(job.url, 'ingest', job.contentHash).catch(function() {});
+    record(job, res.outcome, res.id);
+  });
+
+  var extract = createStage('extract', { concurrency: EXTRACT_CONCURRENCY, onError: countFailure }, async function(job) {
+    if (abortError || pastDeadline('extract')) return;
+    var ex = await extractEventFromHtml(job.html, job.url);
+    await insert.push({ ex: ex, url: job.url, query: job.query, contentHash: job.contentHash });
+  });
+
+  var fetchStage = createStage('fetch', { concurrency: FETCH_CONCURRENCY, onError: countFailure }, async function(job) {
+    if (abortError || pastDeadline('fetch')) return;
+    new URL(job.url); // harvestEvent's URL check — throws on garbage
+    var page = await hostGate(job.url, function() { return fetchPageCached(job.url, { consumer: 'ingest' }); });
+    // Same bytes as the last successful extraction: nothing new to learn
+    if (page.unchanged) {
+      stats.unchanged = (stats.unchanged || 0) + 1;
+      record(job, 'unchanged');
+      return;
     }
+    await extract.push({ html: page.body, url: job.url, query: job.query, contentHash: page.content_hash });
+  });
+
+  async function enqueueUrl(url, query) {
+    if (seenUrls.has(url)) { stats.skipped++; return; }
+    seenUrls.add(url);
+    await fetchStage.push({ url: url, query: query || null });
+  }
 
+  var search = createStage('search', { concurrency: SEARCH_CONCURRENCY }, async function(query) {
+    if (abortError || pastDeadline('search')) return;
+    await searchBucket.take(1);
     var results = [];
+    var tally;
     try {
-      results = await searchEvents(batch[q]);
+      results = await searchEvents(query);
+      // Tallied only once the search succeeded: a provider outage must not
+      // count as a fruitless run toward marking the query dead
+      tally = tallies[query] = { results: results.length, new_urls: 0, added: 0 };
       stats.queries++;
       if (results.length) stats.queries_with_results = (stats.queries_with_results || 0) + 1;
     } catch (e) {
@@ -161,36 +251,82 @@ async function runDiscoverySlice(runId, deadline, stats) {
       console.error('[Ingest] SEARCH PROVIDER FAILURE (' + stats.search_errors + '): ' + e.message);
       // A dead provider fails every query — bail out early rather than burning
       // the whole slice, and let the run be marked failed below.
-      if (stats.search_errors >= 5 && stats.queries === 0) {
-        throw new Error('search provider is down — aborted after ' + stats.search_errors +
+      if (stats.search_errors >= 5 && stats.queries === 0 && !abortError) {
+        abortError = new Error('search provider is down — aborted after ' + stats.search_errors +
           ' consecutive failures: ' + stats.first_search_error);
       }
-      continue;
+      return;
     }
 
-    var taken = 0;
-    for (var j = 0; j < results.length && taken < URLS_PER_QUERY; j++) {
-      if (Date.now() > deadline) break;
+    var candidates = [];
+    for (var j = 0; j < results.length && candidates.length < URLS_PER_QUERY; j++) {
       var r = results[j];
       var lo = (r.url + ' ' + r.title).toLowerCase();
       if (BLOCKLIST.some(function(b) { return lo.includes(b); })) { stats.skipped++; continue; }
       if (!/conference|summit|congress|forum|expo/i.test(r.title + ' ' + r.snippet)) { stats.skipped++; continue; }
-      taken++;
+      candidates.push(r.url);
+    }
 
-      try {
-        var ex = await harvestEvent(r.url);
-        await insertEvent(ex, r.url, runId, stats);
-      } catch (e) {
-        stats.failed++;
-      }
-      await sleep(1000);
+    // Already harvested by an earlier run (either harvester): don't refetch
+    var due = await filterUnseen(candidates).catch(function(e) {
+      console.error('[Ingest] URL index read failed, fetching all candidates:', e.message);
+      return candidates;
+    });
+    stats.already_seen = (stats.already_seen || 0) + candidates.length - due.length;
+    tally.new_urls = due.length;
+    for (var k = 0; k < due.length; k++) await enqueueUrl(due[k], query);
+  });
+
+  var stages = [search, fetchStage, extract, insert];
+
+  return {
+    pushQuery: function(q) { return search.push(q); },
+    pushUrl: enqueueUrl,
+    // Drain in pipeline order, then publish per-stage latency into stats
+    finish: async function() {
+      for (var i = 0; i < stages.length; i++) await stages[i].drain();
+      await flushOutcomes();
+      await recordQueryStats(tallies).catch(function(e) {
+        console.error('[Ingest] Query stats write failed:', e.message);
+      });
+      stats.stages = {};
+      stages.forEach(function(st) { stats.stages[st.name] = st.stats(); });
+      stats.politeness = hostGate.stats();
+      if (abortError) throw abortError;
     }
-    await sleep(300);
+  };
+}
+
+// ── Phase 1: planned search discovery ──
+async function runDiscoverySlice(pipeline, stats) {
+  var queryPool = buildQueryPool();
+
+  // Deterministic rotation: each run picks up where the run counter points,
+  // so never-run queries are explored in a sweep instead of re-shuffled.
+  var counted = await dbGet('SELECT COUNT(*)::int AS c FROM ingestion_runs');
+  var offset = ((counted.c || 0) * QUERIES_PER_RUN) % queryPool.length;
+  var n = Math.min(QUERIES_PER_RUN, queryPool.length);
+  var batch;
+  try {
+    // Rank by historical yield; cooling and dead queries are held back
+    var planned = await planQueries(queryPool, n, offset);
+    batch = planned.queries;
+    stats.query_plan = planned.plan;
+  } catch (e) {
+    console.error('[Ingest] Query planner failed, using plain rotation:', e.message);
+    batch = [];
+    for (var i = 0; i < n; i++) batch.push(queryPool[(offset + i) % queryPool.length]);
+  }
+  console.log('[Ingest] Discovery slice: ' + batch.length + ' queries at offset ' + offset + '/' + queryPool.length +
+    (stats.query_plan ? ' ' + JSON.stringify(stats.query_plan) : ''));
+
+  for (var q = 0; q < batch.length; q++) {
+    await pipeline.pushQuery(batch[q]);
   }
 }
 
 // ── Phase 2: weekly curated re-check ──
-async function runCuratedCheck(runId, deadline, stats) {
+async function runCuratedCheck(pipeline) {
   var urls = [];
   try {
     urls = require('../scripts/batch_harvest_2026').URLS || [];
@@ -203,18 +339,7 @@ async function runCuratedCheck(runId, deadline, stats) {
 
   console.log('[Ingest] Curated re-check: ' + urls.length + ' URLs');
   for (var i = 0; i < urls.length; i++) {
-    if (Date.now() > deadline) {
-      console.warn('[Ingest] Watchdog deadline hit — stopping curated check at ' + i + '/' + urls.length);
-      stats.deadline_hit = true;
-      break;
-    }
-    try {
-      var ex = await harvestEvent(urls[i]);
-      await insertEvent(ex, urls[i], runId, stats);
-    } catch (e) {
-      stats.failed++;
-    }
-    await sleep(1000);
+    await pipeline.pushUrl(urls[i]);
   }
 }
 
@@ -301,14 +426,27 @@ async function runIngestionCycle(opts) {
     var deadline = Date.now() + MAX_RUN_MINUTES * 60 * 1000;
     console.log('[Ingest] Run #' + runId + ' (' + kind + ') started at ' + new Date().toISOString());
 
+    // One in-memory dedup index per run: current-year events loaded once, so
+    // each harvested page is checked without a per-insert table scan
+    var dedup = createDedupIndex();
+    await dedup.load().catch(function(e) {
+      console.error('[Ingest] Dedup index load failed, falling back to SQL lookups:', e.message);
+      dedup = null;
+    });
+    if (dedup) stats.dedup_index_size = dedup.size();
+
+    // Discovery and the curated pass feed one pipeline, so curated fetches
+    // overlap with search instead of waiting for the slice to finish
+    var pipeline = createCrawlPipeline(runId, deadline, stats, dedup);
     if (kind !== 'curated') {
-      await runDiscoverySlice(runId, deadline, stats);
+      await runDiscoverySlice(pipeline, stats);
     }
 
     // Curated pass: weekly on Sundays, or when explicitly requested
     if (kind === 'curated' || new Date().getUTCDay() === 0) {
-      await runCuratedCheck(runId, deadline, stats);
+      await runCuratedCheck(pipeline);
     }
+    await pipeline.finish();
 
     // Representative images for events that don't have one yet
     await runImageBackfill(deadline, stats).catch(function(e) {
@@ -379,12 +517,13 @@ async function getIngestionStatus() {
   var provider = process.env.SERPER_API_KEY ? 'serper'
     : (process.env.GOOGLE_SEARCH_API_KEY && process.env.GOOGLE_SEARCH_CX) ? 'google_cse'
     : null;
-  return { runs: runs.rows, events: freshness, search_provider: provider };
+  return { runs: runs.rows, events: freshness, search_provider: provider,
+    page_cache: getPageCacheStats(), extraction_cache: getExtractionCacheStats() };
 }
 
 // ── Scheduler: daily tick + boot catch-up ──
 function startIngestionScheduler() {
-  // Daily tick, same minute-check pattern as scheduleMatching
+  // Daily tick, same minute-check pattern as the matching scheduler
   setInterval(function() {
     var now = new Date();
     if (now.getUTCHours() !== INGEST_HOUR_UTC || now.getUTCMinutes() !== 0) return;
@@ -0,0 +1,306 @@
+// ── Durable background job queue ──
+// Postgres-backed replacement for fire-and-forget side effects (embedding,
+// entity resolution, match notifications, shadow canisters). Jobs survive a
+// restart, failures are retried with backoff, and each job type has its own
+// batch size and concurrency so a large ingest can't flood OpenAI or the pool.
+//
+// Design:
+//   - background_jobs rows are claimed with UPDATE ... WHERE id IN (SELECT
+//     ... FOR UPDATE SKIP LOCKED), so any number of workers across replicas
+//     can poll the same table without double-processing.
+//   - Handlers are typed: registerJobHandler(type, { handler, batchSize,
+//     concurrency, maxAttempts }). A worker claims up to batchSize pending
+//     jobs of its type and hands them to the handler together — that is how
+//     100 embed jobs become one embeddings call.
+//   - A handler either resolves (all jobs done), throws (all retried), or
+//     returns { failed: { <jobId>: error } } to retry only some of them.
+//   - Retries back off exponentially (JOB_BACKOFF_BASE_MS · 2^(attempt-1),
+//     capped, with jitter); after maxAttempts a job stays 'failed' for
+//     inspection. Running jobs whose lock is older than JOB_LOCK_TIMEOUT are
+//     returned to pending (the worker died mid-batch).
+//   - Idle workers poll every JOB_POLL_MS; enqueueing in-process wakes the
+//     type's workers immediately. Finished jobs are pruned after
+//     JOB_RETENTION_HOURS, which is also the window for latency stats.
+
+var os = require('os');
+var { dbAll, dbRun, dbBulkInsert } = require('../db');
+
+var JOB_POLL_MS = parseInt(process.env.JOB_POLL_MS || '2000', 10);
+var JOB_BACKOFF_BASE_MS = parseInt(process.env.JOB_BACKOFF_BASE_MS || '5000', 10);
+var JOB_BACKOFF_MAX_MS = 30 * 60 * 1000;
+var JOB_LOCK_TIMEOUT_MIN = parseInt(process.env.JOB_LOCK_TIMEOUT_MIN || '10', 10);
+var JOB_RETENTION_HOURS = parseInt(process.env.JOB_RETENTION_HOURS || '24', 10);
+var MAINTENANCE_MS = 60 * 1000;
+
+var WORKER_ID = os.hostname() + ':' + process.pid;
+
+var handlers = {};   // type -> { handler, batchSize, concurrency, maxAttempts, wake[] }
+var counters = {};   // type -> { claimed, done, retried, failed, batches }
+var started = false;
+var tablesReady = null;
+
+function ensureTables() {
+  if (!tablesReady) {
+    tablesReady = (async function() {
+      await dbRun(`CREATE TABLE IF NOT EXISTS background_jobs (
+        id BIGSERIAL PRIMARY KEY,
+        type TEXT NOT NULL,
+        payload JSONB NOT NULL DEFAULT '{}',
+        status TEXT NOT NULL DEFAULT 'pending',
+        attempts INTEGER NOT NULL DEFAULT 0,
+        max_attempts INTEGER NOT NULL DEFAULT 5,
+        run_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+        locked_at TIMESTAMPTZ,
+        locked_by TEXT,
+        last_error TEXT,
+        created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+        finished_at TIMESTAMPTZ
+      )`);
+      await dbRun("CREATE INDEX IF NOT EXISTS idx_background_jobs_claim ON background_jobs (type, run_at, id) WHERE status = 'pending'");
+      await dbRun('CREATE INDEX IF NOT EXISTS idx_background_jobs_status ON background_jobs (status, finished_at)');
+    })().catch(function(err) {
+      tablesReady = null;
+      throw err;
+    });
+  }
+  return tablesReady;
+}
+
+function counterFor(type) {
+  return counters[type] || (counters[type] = { claimed: 0, done: 0, retried: 0, failed: 0, batches: 0 });
+}
+
+// ── Registration ──
+function registerJobHandler(type, opts) {
+  handlers[type] = {
+    handler: opts.handler,
+    batchSize: Math.max(1, opts.batchSize || 1),
+    concurrency: Math.max(1, opts.concurrency || 1),
+    maxAttempts: Math.max(1, opts.maxAttempts || 5),
+    wake: []
+  };
+  counterFor(type);
+  if (started) startWorkers(type);
+}
+
+// ── Enqueue ──
+async function enqueueJobs(type, payloads, opts) {
+  opts = opts || {};
+  if (!payloads.length) return 0;
+  await ensureTables();
+  var h = handlers[type];
+  var maxAttempts = opts.maxAttempts || (h && h.maxAttempts) || 5;
+  var runAt = opts.runAt || new Date();
+  await dbBulkInsert('background_jobs', [
+    { name: 'type', type: 'text' },
+    { name: 'payload', type: 'jsonb' },
+    { name: 'max_attempts', type: 'int' },
+    { name: 'run_at', type: 'timestamptz' }
+  ], payloads.map(function(p) { return [type, JSON.stringify(p), maxAttempts, runAt]; }), { chunkSize: 1000, onConflict: '' });
+  wake(type);
+  return payloads.length;
+}
+
+function enqueueJob(type, payload, opts) {
+  return enqueueJobs(type, [payload], opts);
+}
+
+function wake(type) {
+  var h = handlers[type];
+  if (!h) return;
+  var waiters = h.wake;
+  h.wake = [];
+  waiters.forEach(function(fn) { fn(); });
+}
+
+// ── Workers ──
+async function claim(type, limit) {
+  return dbAll(
+    `UPDATE background_jobs SET status = 'running', locked_at = NOW(), locked_by = $3, attempts = attempts + 1
+     WHERE id IN (
+       SELECT id FROM background_jobs
+       WHERE type = $1 AND status = 'pending' AND run_at <= NOW()
+       ORDER BY run_at, id
+       LIMIT $2
+       FOR UPDATE SKIP LOCKED
+     )
+     RETURNING id, payload, attempts, max_attempts, created_at`,
+    [type, limit, WORKER_ID]
+  );
+}
+
+function backoffMs(attempts) {
+  var ms = Math.min(JOB_BACKOFF_MAX_MS, JOB_BACKOFF_BASE_MS * Math.pow(2, Math.max(0, attempts - 1)));
+  return Math.round(ms * (0.75 + Math.random() * 0.5));
+}
+
+async function settle(type, jobs, failed) {
+  var c = counterFor(type);
+  var doneIds = [];
+  var retry = [];
+  var dead = [];
+  jobs.forEach(function(job) {
+    var err = failed[job.id];
+    if (!err) { doneIds.push(job.id); return; }
+    var msg = String(err && err.message || err).slice(0, 500);
+    if (job.attempts >= job.max_attempts) dead.push({ id: job.id, error: msg });
+    else retry.push({ id: job.id, error: msg, delay: backoffMs(job.attempts) });
+  });
+
+  if (doneIds.length) {
+    await dbRun("UPDATE background_jobs SET status = 'done', finished_at = NOW(), locked_at = NULL, last_error = NULL WHERE id = ANY($1::bigint[])", [doneIds]);
+    c.done += doneIds.length;
+  }
+  if (retry.length) {
+    await dbRun(
+      `UPDATE background_jobs j SET status = 'pending', locked_at = NULL, locked_by = NULL,
+              last_error = r.error, run_at = NOW() + r.delay * INTERVAL '1 millisecond'
+       FROM unnest($1::bigint[], $2::text[], $3::int[]) AS r(id, error, delay)
+       WHERE j.id = r.id`,
+      [retry.map(function(r) { return r.id; }), retry.map(function(r) { return r.error; }), retry.map(function(r) { return r.delay; })]
+    );
+    c.retried += retry.length;
+  }
+  if (dead.length) {
+    await dbRun(
+      `UPDATE background_jobs j SET status = 'failed', finished_at = NOW(), locked_at = NULL, last_error = r.error
+       FROM unnest($1::bigint[], $2::text[]) AS r(id, error)
+       WHERE j.id = r.id`,
+      [dead.map(function(r) { return r.id; }), dead.map(function(r) { return r.error; })]
+    );
+    c.failed += dead.length;
+    console.error('[jobs] ' + dead.length + ' ' + type + ' job(s) failed permanently: ' + dead[0].error);
+  }
+}
+
+async function runBatch(type, h) {
+  var jobs = await claim(type, h.batchSize);
+  if (!jobs.length) return 0;
+  var c = counterFor(type);
+  c.claimed += jobs.length;
+  c.batches++;
+
+  var failed = {};
+  try {
+    var result = await h.handler(jobs.map(function(j) { return { id: j.id, payload: j.payload, attempts: j.attempts }; }));
+    if (result && result.failed) failed = result.failed;
+  } catch (err) {
+    jobs.forEach(function(j) { failed[j.id] = err; });
+  }
+  await settle(type, jobs, failed);
+  return jobs.length;
+}
+
+function sleepOrWake(type, ms) {
+  return new Promise(function(resolve) {
+    var timer = setTimeout(done, ms);
+    function done() {
+      clearTimeout(timer);
+      resolve();
+    }
+    handlers[type].wake.push(done);
+  });
+}
+
+async function workerLoop(type) {
+  var h = handlers[type];
+  for (;;) {
+    var n = 0;
+    try {
+      await ensureTables();
+      n = await runBatch(type, h);
+    } catch (err) {
+      console.error('[jobs] ' + type + ' worker error:', err.message);
+    }
+    // A full batch means there is probably more waiting — go again at once
+    if (n < h.batchSize) await sleepOrWake(type, JOB_POLL_MS);
+  }
+}
+
+function startWorkers(type) {
+  var h = handlers[type];
+  for (var i = 0; i < h.concurrency; i++) workerLoop(type);
+}
+
+// ── Maintenance: stale locks + retention ──
+async function maintain() {
+  await ensureTables();
+  var stale = await dbRun(
+    `UPDATE background_jobs SET status = 'pending', locked_at = NULL, locked_by = NULL,
+            last_error = COALESCE(last_error, 'lock expired')
+     WHERE status = 'running' AND locked_at < NOW() - $1 * INTERVAL '1 minute'`,
+    [JOB_LOCK_TIMEOUT_MIN]
+  );
+  if (stale.rowCount) console.warn('[jobs] Re-queued ' + stale.rowCount + ' job(s) with expired locks');
+  await dbRun(
+    "DELETE FROM background_jobs WHERE status IN ('done', 'failed') AND finished_at < NOW() - $1 * INTERVAL '1 hour'",
+    [JOB_RETENTION_HOURS]
+  );
+}
+
+function startJobWorkers() {
+  if (started) return;
+  started = true;
+  Object.keys(handlers).forEach(startWorkers);
+  setInterval(function() {
+    maintain().catch(function(e) { console.error('[jobs] maintenance failed:', e.message); });
+  }, MAINTENANCE_MS);
+  console.log('[jobs] Workers started for: ' + Object.keys(handlers).map(function(t) {
+    return t + '×' + handlers[t].concurrency;
+  }).join(', '));
+}
+
+// ── Status for the admin dashboard ──
+async function getJobQueueStatus() {
+  await ensureTables();
+  var rows = await dbAll(
+    `SELECT type,
+            COUNT(*) FILTER (WHERE status = 'pending')::int AS pending,
+            COUNT(*) FILTER (WHERE status = 'pending' AND run_at > NOW())::int AS delayed,
+            COUNT(*) FILTER (WHERE status = 'running')::int AS running,
+            COUNT(*) FILTER (WHERE status = 'done')::int AS done,
+            COUNT(*) FILTER (WHERE status = 'failed')::int AS failed,
+            EXTRACT(EPOCH FROM NOW() - MIN(created_at) FILTER (WHERE status = 'pending'))::int AS oldest_pending_s,
+            ROUND(AVG(EXTRACT(EPOCH FROM finished_at - created_at) * 1000) FILTER (WHERE status = 'done'))::int AS avg_latency_ms,
+            ROUND((percentile_cont(0.95) WITHIN GROUP (ORDER BY EXTRACT(EPOCH FROM finished_at - created_at) * 1000))
+              FILTER (WHERE status = 'done'))::int AS p95_latency_ms
+     FROM background_jobs GROUP BY type ORDER BY type`
+  );
+  var recentFailures = await dbAll(
+    "SELECT id, type, attempts, last_error, finished_at FROM background_jobs WHERE status = 'failed' ORDER BY finished_at DESC LIMIT 20"
+  );
+  var types = {};
+  Object.keys(handlers).forEach(function(t) {
+    types[t] = {
+      batch_size: handlers[t].batchSize,
+      concurrency: handlers[t].concurrency,
+      max_attempts: handlers[t].maxAttempts,
+      process: counterFor(t)
+    };
+  });
+  return {
+    worker: WORKER_ID,
+    started: started,
+    window_hours: JOB_RETENTION_HOURS,
+    queues: rows,
+    handlers: types,
+    recent_failures: recentFailures
+  };
+}
+
+// Put permanently failed jobs back in the queue (optionally one type)
+async function retryFailedJobs(type) {
+  await ensureTables();
+  var res = await dbRun(
+    `UPDATE background_jobs SET status = 'pending', attempts = 0, run_at = NOW(), finished_at = NULL
+     WHERE status = 'failed' AND ($1::text IS NULL OR type = $1)`,
+    [type || null]
+  );
+  Object.keys(handlers).forEach(wake);
+  return res.rowCount || 0;
+}
+
+module.exports = {
+  registerJobHandler, enqueueJob, enqueueJobs, startJobWorkers,
+  getJobQueueStatus, retryFailedJobs
+};
@@ -0,0 +1,450 @@
+// ── Local Vector Index ──
+// In-process stand-in for the Qdrant collections (VECTOR_BACKEND=local or
+// hybrid in lib/vector_search.js), so candidate selection for an event pool
+// is a memory scan instead of a network round trip, and the matcher can run
+// without a live Qdrant.
+//
+// Design:
+//   - One collection = packed, L2-normalised Float32Array slab + parallel id
+//     and payload arrays. Cosine similarity is a 4-way unrolled dot product,
+//     which is what Qdrant's Cosine distance returns as `score`.
+//   - Exact brute force below HNSW_MIN_POINTS live points, or whenever a
+//     filter's `must` narrows the pool through a payload field index (e.g.
+//     findCandidates' user_id ∈ registrants) — that is always exact.
+//   - HNSW graph (M, efConstruction, efSearch) for large collections. Built
+//     in the background in yielding slices; searches stay exact until done.
+//     Filtered HNSW searches oversample and fall back to exact if the filter
+//     leaves fewer than `limit` hits.
+//   - Qdrant filter subset: must / must_not / should of
+//     { key, match: { value | any | except } }, with array payload fields
+//     matching if any element matches (Qdrant semantics).
+//   - Upserts append and tombstone the old row; the slab is compacted once
+//     tombstones pass 25%.
+//   - dump()/load() move a collection to and from a snapshot file pair
+//     (meta JSON + raw float32) — see saveSnapshot/loadSnapshot.
+
+var fs = require('fs');
+var path = require('path');
+
+var HNSW_MIN_POINTS = parseInt(process.env.LOCAL_INDEX_HNSW_MIN || '50000', 10);
+var HNSW_M = 16;
+var HNSW_EF_CONSTRUCTION = 100;
+var HNSW_EF_SEARCH = parseInt(process.env.LOCAL_INDEX_EF_SEARCH || '200', 10); // raise for recall, lower for latency
+var BUILD_SLICE = 200; // graph inserts between event-loop yields
+
+// ── Binary heap ordered by `before(a, b)` ──
+function createHeap(before) {
+  var items = [];
+  function up(i) {
+    while (i > 0) {
+      var p = (i - 1) >> 1;
+      if (!before(items[i], items[p])) break;
+      var t = items[i]; items[i] = items[p]; items[p] = t;
+      i = p;
+    }
+  }
+  function down(i) {
+    var n = items.length;
+    for (;;) {
+      var l = 2 * i + 1, r = l + 1, m = i;
+      if (l < n && before(items[l], items[m])) m = l;
+      if (r < n && before(items[r], items[m])) m = r;
+      if (m === i) break;
+      var t = items[i]; items[i] = items[m]; items[m] = t;
+      i = m;
+    }
+  }
+  return {
+    size: function() { return items.length; },
+    peek: function() { return items[0]; },
+    push: function(x) { items.push(x); up(items.length - 1); },
+    pop: function() {
+      var top = items[0];
+      var last = items.pop();
+      if (items.length) { items[0] = last; down(0); }
+      return top;
+    },
+    toArray: function() { return items.slice(); }
+  };
+}
+
+function closerFirst(a, b) { return a.d < b.d; }
+function furtherFirst(a, b) { return a.d > b.d; }
+
+// ── Filters ──
+function compileCondition(cond) {
+  if (cond.must || cond.should || cond.must_not) return compileFilter(cond);
+  var m = cond.match || {};
+  var key = cond.key;
+  var test;
+  if (m.value !== undefined) test = function(x) { return x === m.value; };
+  else if (m.any) { var anySet = new Set(m.any); test = function(x) { return anySet.has(x); }; }
+  else if (m.except) {
+    var exceptSet = new Set(m.except);
+    return function(payload) {
+      var v = payload[key];
+      var values = Array.isArray(v) ? v : [v];
+      return !values.some(function(x) { return exceptSet.has(x); });
+    };
+  }
+  else return function() { return false; }; // unsupported condition: match nothing
+  return function(payload) {
+    var v = payload[key];
+    return Array.isArray(v) ? v.some(test) : test(v);
+  };
+}
+
+function compileFilter(filter) {
+  if (!filter) return null;
+  var must = (filter.must || []).map(compileCondition);
+  var mustNot = (filter.must_not || []).map(compileCondition);
+  var should = (filter.should || []).map(compileCondition);
+  return function(payload) {
+    for (var i = 0; i < must.length; i++) if (!must[i](payload)) return false;
+    for (var j = 0; j < mustNot.length; j++) if (mustNot[j](payload)) return false;
+    if (should.length && !should.some(function(f) { return f(payload); })) return false;
+    return true;
+  };
+}
+
+function createLocalCollection(dims) {
+  var capacity = 0;
+  var slab = new Float32Array(0);
+  var count = 0;
+  var ids = [];
+  var payloads = [];
+  var alive = [];
+  var rowOf = new Map();
+  var liveCount = 0;
+  var fieldIndexes = {};
+
+  // HNSW state
+  var graph = null; // { levels, links, entry, maxLevel, ready, building }
+  var mL = 1 / Math.log(HNSW_M);
+
+  function grow(min) {
+    var cap = Math.max(min, capacity * 2 || 1024);
+    var next = new Float32Array(cap * dims);
+    next.set(slab.subarray(0, count * dims));
+    slab = next;
+    capacity = cap;
+  }
+
+  function dotQuery(q, row) {
+    var o = row * dims;
+    var s0 = 0, s1 = 0, s2 = 0, s3 = 0;
+    var d = 0;
+    for (; d + 3 < dims; d += 4) {
+      s0 += q[d] * slab[o + d];
+      s1 += q[d + 1] * slab[o + d + 1];
+      s2 += q[d + 2] * slab[o + d + 2];
+      s3 += q[d + 3] * slab[o + d + 3];
+    }
+    for (; d < dims; d++) s0 += q[d] * slab[o + d];
+    return s0 + s1 + s2 + s3;
+  }
+
+  function rowVector(row) {
+    return slab.subarray(row * dims, (row + 1) * dims);
+  }
+
+  function normalise(vector) {
+    if (!vector || vector.length !== dims) return null;
+    var norm = 0;
+    for (var d = 0; d < dims; d++) norm += vector[d] * vector[d];
+    if (norm === 0) return null;
+    var inv = 1 / Math.sqrt(norm);
+    var out = new Float32Array(dims);
+    for (var d2 = 0; d2 < dims; d2++) out[d2] = vector[d2] * inv;
+    return out;
+  }
+
+  // ── HNSW ──
+  function searchLayer(distFn, entryRows, ef, level) {
+    var visited = new Set(entryRows);
+    var candidates = createHeap(closerFirst);
+    var found = createHeap(furtherFirst);
+    entryRows.forEach(function(r) {
+      var item = { row: r, d: distFn(r) };
+      candidates.push(item);
+      found.push(item);
+    });
+    while (found.size() > ef) found.pop();
+    while (candidates.size()) {
+      var c = candidates.pop();
+      if (c.d > found.peek().d && found.size() >= ef) break;
+      var neighbours = graph.links[c.row][level] || [];
+      for (var i = 0; i < neighbours.length; i++) {
+        var n = neighbours[i];
+        if (visited.has(n)) continue;
+        visited.add(n);
+        var d = distFn(n);
+        if (found.size() < ef || d < found.peek().d) {
+          var item = { row: n, d: d };
+          candidates.push(item);
+          found.push(item);
+          if (found.size() > ef) found.pop();
+        }
+      }
+    }
+    return found.toArray().sort(function(a, b) { return a.d - b.d; });
+  }
+
+  function pruneLinks(row, level, maxConn) {
+    var q = rowVector(row);
+    graph.links[row][level] = graph.links[row][level]
+      .map(function(r) { return { row: r, d: 1 - dotQuery(q, r) }; })
+      .sort(function(a, b) { return a.d - b.d; })
+      .slice(0, maxConn)
+      .map(function(x) { return x.row; });
+  }
+
+  function graphInsert(row) {
+    var level = Math.floor(-Math.log(Math.random() || 1e-12) * mL);
+    graph.levels[row] = level;
+    graph.links[row] = [];
+    for (var l = 0; l <= level; l++) graph.links[row][l] = [];
+    if (graph.entry === -1) {
+      graph.entry = row;
+      graph.maxLevel = level;
+      return;
+    }
+    var q = rowVector(row);
+    var distFn = function(r) { return 1 - dotQuery(q, r); };
+    var ep = [graph.entry];
+    for (var l1 = graph.maxLevel; l1 > level; l1--) ep = [searchLayer(distFn, ep, 1, l1)[0].row];
+    for (var l2 = Math.min(level, graph.maxLevel); l2 >= 0; l2--) {
+      var w = searchLayer(distFn, ep, HNSW_EF_CONSTRUCTION, l2);
+      var maxConn = l2 === 0 ? HNSW_M * 2 : HNSW_M;
+      var neighbours = w.slice(0, HNSW_M).map(function(x) { return x.row; });
+      graph.links[row][l2] = neighbours;
+      neighbours.forEach(function(n) {
+        var nl = graph.links[n][l2];
+        nl.push(row);
+        if (nl.length > maxConn) pruneLinks(n, l2, maxConn);
+      });
+      ep = w.map(function(x) { return x.row; });
+    }
+    if (level > graph.maxLevel) {
+      graph.maxLevel = level;
+      graph.entry = row;
+    }
+  }
+
+  async function buildGraph() {
+    graph = { levels: [], links: [], entry: -1, maxLevel: -1, ready: false, building: true };
+    var g = graph;
+    for (var row = 0; row < count; row++) {
+      if (graph !== g) return; // compacted mid-build; the new build takes over
+      graphInsert(row);
+      if (row % BUILD_SLICE === BUILD_SLICE - 1) await new Promise(function(r) { setImmediate(r); });
+    }
+    g.building = false;
+    g.ready = true;
+  }
+
+  function graphSearch(q, ef) {
+    var distFn = function(r) { return 1 - dotQuery(q, r); };
+    var ep = [graph.entry];
+    for (var l = graph.maxLevel; l > 0; l--) ep = [searchLayer(distFn, ep, 1, l)[0].row];
+    return searchLayer(distFn, ep, ef, 0);
+  }
+
+  // ── Mutation ──
+  function invalidateFieldIndexes() {
+    fieldIndexes = {};
+  }
+
+  function upsert(id, vector, payload) {
+    var v = normalise(vector);
+    if (!v) return false;
+    var key = String(id);
+    var old = rowOf.get(key);
+    if (old !== undefined) { alive[old] = false; liveCount--; }
+    if (count >= capacity) grow(count + 1);
+    slab.set(v, count * dims);
+    ids[count] = id;
+    payloads[count] = payload || {};
+    alive[count] = true;
+    rowOf.set(key, count);
+    liveCount++;
+    var row = count++;
+    invalidateFieldIndexes();
+
+    if (graph && graph.ready) graphInsert(row);
+    else if (!graph && liveCount >= HNSW_MIN_POINTS) buildGraph();
+    if (count - liveCount > Math.max(1000, liveCount * 0.25)) compact();
+    return true;
+  }
+
+  function remove(id) {
+    var key = String(id);
+    var row = rowOf.get(key);
+    if (row === undefined) return false;
+    alive[row] = false;
+    rowOf.delete(key);
+    liveCount--;
+    invalidateFieldIndexes();
+    return true;
+  }
+
+  function compact() {
+    var keep = [];
+    for (var r = 0; r < count; r++) if (alive[r]) keep.push(r);
+    var next = new Float32Array(Math.max(1024, keep.length) * dims);
+    keep.forEach(function(r, i) { next.set(rowVector(r), i * dims); });
+    ids = keep.map(function(r) { return ids[r]; });
+    payloads = keep.map(function(r) { return payloads[r]; });
+    alive = keep.map(function() { return true; });
+    slab = next;
+    capacity = next.length / dims;
+    count = keep.length;
+    liveCount = count;
+    rowOf = new Map();
+    ids.forEach(function(id, i) { rowOf.set(String(id), i); });
+    invalidateFieldIndexes();
+    graph = null;
+    if (liveCount >= HNSW_MIN_POINTS) buildGraph();
+  }
+
+  // ── Read ──
+  function get(id) {
+    var row = rowOf.get(String(id));
+    return row === undefined ? null : slab.slice(row * dims, (row + 1) * dims);
+  }
+
+  function fieldIndex(key) {
+    if (fieldIndexes[key]) return fieldIndexes[key];
+    var idx = new Map();
+    for (var r = 0; r < count; r++) {
+      if (!alive[r]) continue;
+      var v = payloads[r][key];
+      (Array.isArray(v) ? v : [v]).forEach(function(x) {
+        if (!idx.has(x)) idx.set(x, []);
+        idx.get(x).push(r);
+      });
+    }
+    fieldIndexes[key] = idx;
+    return idx;
+  }
+
+  // Smallest row set implied by a top-level must { key, match: value|any }
+  function narrowRows(filter) {
+    if (!filter || !filter.must) return null;
+    var best = null;
+    filter.must.forEach(function(cond) {
+      if (!cond.key || !cond.match) return;
+      var values = cond.match.any || (cond.match.value !== undefined ? [cond.match.value] : null);
+      if (!values) return;
+      var idx = fieldIndex(cond.key);
+      var rows = new Set();
+      values.forEach(function(v) { (idx.get(v) || []).forEach(function(r) { rows.add(r); }); });
+      if (!best || rows.size < best.size) best = rows;
+    });
+    return best ? Array.from(best) : null;
+  }
+
+  function exactSearch(q, limit, pred, rows) {
+    var heap = createHeap(closerFirst); // min-heap on score: worst kept hit on top
+    function consider(r) {
+      if (!alive[r] || (pred && !pred(payloads[r]))) return;
+      var s = dotQuery(q, r);
+      if (heap.size() < limit) heap.push({ row: r, d: s });
+      else if (s > heap.peek().d) { heap.pop(); heap.push({ row: r, d: s }); }
+    }
+    if (rows) rows.forEach(consider);
+    else for (var r = 0; r < count; r++) consider(r);
+    return heap.toArray().sort(function(a, b) { return b.d - a.d; }).map(function(x) { return { row: x.row, score: x.d }; });
+  }
+
+  // Returns Qdrant-shaped hits: [{ id, score, payload }]
+  function search(vector, limit, filter) {
+    limit = limit || 10;
+    var q = normalise(vector);
+    if (!q || !liveCount) return [];
+    var pred = compileFilter(filter);
+    var hits = null;
+
+    var rows = narrowRows(filter);
+    if (rows) {
+      hits = exactSearch(q, limit, pred, rows);
+    } else if (graph && graph.ready && liveCount >= HNSW_MIN_POINTS) {
+      var ef = Math.max(HNSW_EF_SEARCH, limit * (pred ? 8 : 2));
+      hits = [];
+      var found = graphSearch(q, ef);
+      for (var i = 0; i < found.length && hits.length < limit; i++) {
+        var r = found[i].row;
+        if (alive[r] && (!pred || pred(payloads[r]))) hits.push({ row: r, score: 1 - found[i].d });
+      }
+      if (pred && hits.length < limit) hits = null; // filter too selective for the graph walk
+    }
+    if (!hits) hits = exactSearch(q, limit, pred, null);
+
+    return hits.map(function(h) { return { id: ids[h.row], score: h.score, payload: payloads[h.row] }; });
+  }
+
+  // ── Snapshot ──
+  function dump() {
+    var keep = [];
+    for (var r = 0; r < count; r++) if (alive[r]) keep.push(r);
+    var vectors = new Float32Array(keep.length * dims);
+    keep.forEach(function(r, i) { vectors.set(rowVector(r), i * dims); });
+    return {
+      meta: { dims: dims, ids: keep.map(function(r) { return ids[r]; }), payloads: keep.map(function(r) { return payloads[r]; }) },
+      vectors: vectors
+    };
+  }
+
+  function load(meta, vectors) {
+    for (var i = 0; i < meta.ids.length; i++) {
+      upsert(meta.ids[i], vectors.subarray(i * dims, (i + 1) * dims), meta.payloads[i]);
+    }
+  }
+
+  return {
+    upsert: upsert,
+    remove: remove,
+    get: get,
+    search: search,
+    dump: dump,
+    load: load,
+    stats: function() {
+      return {
+        points: liveCount,
+        tombstones: count - liveCount,
+        mode: graph && graph.ready && liveCount >= HNSW_MIN_POINTS ? 'hnsw' : (graph && graph.building ? 'exact (hnsw building)' : 'exact')
+      };
+    }
+  };
+}
+
+// ── Snapshot files: <dir>/<collection>.json (meta) + <dir>/<collection>.f32 ──
+async function saveSnapshot(dir, name, collection) {
+  var snap = collection.dump();
+  await fs.promises.mkdir(dir, { recursive: true });
+  var base = path.join(dir, name);
+  var meta = Object.assign({ saved_at: new Date().toISOString() }, snap.meta);
+  await fs.promises.writeFile(base + '.f32.tmp', Buffer.from(snap.vectors.buffer, snap.vectors.byteOffset, snap.vectors.byteLength));
+  await fs.promises.writeFile(base + '.json.tmp', JSON.stringify(meta));
+  await fs.promises.rename(base + '.f32.tmp', base + '.f32');
+  await fs.promises.rename(base + '.json.tmp', base + '.json');
+  return meta.ids.length;
+}
+
+// Returns { meta, vectors } or null if missing / older than maxAgeMs
+async function loadSnapshot(dir, name, maxAgeMs) {
+  var base = path.join(dir, name);
+  try {
+    var meta = JSON.parse(await fs.promises.readFile(base + '.json', 'utf8'));
+    if (maxAgeMs && Date.now() - new Date(meta.saved_at).getTime() > maxAgeMs) return null;
+    var buf = await fs.promises.readFile(base + '.f32');
+    var vectors = new Float32Array(buf.length / 4);
+    new Uint8Array(vectors.buffer).set(buf);
+    if (vectors.length !== meta.ids.length * meta.dims) return null;
+    return { meta: meta, vectors: vectors };
+  } catch (e) {
+    return null;
+  }
+}
+
+module.exports = { createLocalCollection, compileFilter, saveSnapshot, loadSnapshot };
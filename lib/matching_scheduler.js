@@ -0,0 +1,433 @@
+// ── Matching Scheduler ────────────────────────────────────────────────────────
+// Runs the 3x-daily matching cycle as per-scope jobs on a bounded-concurrency
+// pool instead of one long sequential await chain in the web process.
+//
+// Design:
+//   - Cycle at MATCH_HOURS UTC (same minute-check tick as ingestion).
+//   - Work is split into jobs: one per upcoming event (all-pairs job), one per
+//     (community, member), (city, user) and (global, user). Global runs as a
+//     second phase because its eligibility depends on the local matches the
+//     first phase creates.
+//   - MATCHING_DB_CONCURRENCY caps jobs in flight. Each job issues its queries
+//     sequentially, so it holds at most one pg connection at a time — the
+//     default 4 leaves 16 of the pool's 20 connections for HTTP traffic. The
+//     cycle's advisory lock is held on a dedicated connection, not a pooled one.
+//   - MATCHING_QDRANT_CONCURRENCY caps concurrent Qdrant calls for the cycle,
+//     through a limiter of its own (the shared one stays with HTTP handlers).
+//   - Similarity matrices for event jobs run on MATCHING_WORKERS worker_threads
+//     (lib/matching_worker.js) so the CPU-heavy pass never blocks requests.
+//   - Postgres advisory lock prevents concurrent cycles across replicas.
+//   - Per-scope throughput (users/sec, pairs/sec) and queue depth are logged
+//     every PROGRESS_INTERVAL_MS and exposed via getMatchingStatus().
+//   - Incremental by default: only users whose profile or embedding changed,
+//     or who registered for an event / joined a community, since the last
+//     successful run's start are re-scored, and only against their scopes.
+//     An event whose dirty share of registrants is above
+//     EVENT_REBUILD_FRACTION gets the whole-event job instead.
+//   - Full sweep (every user in every scope) when the last successful full run
+//     is older than MATCHING_FULL_SWEEP_HOURS — the safety net for anything
+//     change tracking misses (e.g. a non-dirty user whose top-K now includes
+//     a newcomer).
+//   - Every run is recorded in matching_runs (mode, watermark, stats, error).
+
+var os = require('os');
+var { dbAll, dbGet, dbRun, createClient } = require('../db');
+var { createLimiter } = require('./concurrency');
+var { createMatchingWorkerPool } = require('./matching_worker');
+var { withQdrantConcurrency, prefetchVectors, getVectorCacheStats, getEmbeddingCacheStats, COLLECTIONS } = require('./vector_search');
+var { getSignalRollupStats } = require('./signal_rollup');
+
+var MATCH_HOURS = (process.env.MATCH_HOURS_UTC || '8,13,18').split(',').map(function(h) { return parseInt(h, 10); });
+var DB_CONCURRENCY = parseInt(process.env.MATCHING_DB_CONCURRENCY || '4', 10);
+var QDRANT_CONCURRENCY = parseInt(process.env.MATCHING_QDRANT_CONCURRENCY || '4', 10);
+var WORKERS = parseInt(process.env.MATCHING_WORKERS || String(Math.max(1, Math.min(2, os.cpus().length - 1))), 10);
+var FULL_SWEEP_HOURS = parseInt(process.env.MATCHING_FULL_SWEEP_HOURS || '24', 10);
+var EVENT_REBUILD_FRACTION = 0.25;
+var PROGRESS_INTERVAL_MS = 15000;
+var ADVISORY_LOCK_KEY = 824643; // arbitrary constant, unique to matching
+
+var SCOPES = ['event', 'community', 'location', 'global'];
+
+var running = false;
+var current = null;
+var lastRun = null;
+
+// ── Run ledger ──
+async function ensureTables() {
+  await dbRun(`CREATE TABLE IF NOT EXISTS matching_runs (
+    id SERIAL PRIMARY KEY,
+    mode TEXT DEFAULT 'incremental',
+    status TEXT DEFAULT 'running',
+    started_at TIMESTAMPTZ DEFAULT NOW(),
+    finished_at TIMESTAMPTZ,
+    since TIMESTAMPTZ,
+    stats JSONB DEFAULT '{}',
+    error TEXT
+  )`);
+}
+
+// Decide the mode and watermark for this run. Changes are tracked against the
+// start of the last successful run, so anything written while it ran is
+// picked up next time. 'partial' runs (some jobs failed) never count.
+async function planRun(requestedMode) {
+  var last = await dbGet("SELECT MAX(started_at) AS t FROM matching_runs WHERE status = 'success'");
+  var lastFull = await dbGet("SELECT MAX(started_at) AS t FROM matching_runs WHERE status = 'success' AND mode = 'full'");
+  var since = last && last.t ? last.t : null;
+  if (requestedMode === 'full' || !since) return { mode: 'full', since: null };
+  if (requestedMode === 'incremental') return { mode: 'incremental', since: since };
+  var fullStale = !lastFull || !lastFull.t ||
+    (Date.now() - new Date(lastFull.t).getTime()) > FULL_SWEEP_HOURS * 3600 * 1000;
+  return fullStale ? { mode: 'full', since: null } : { mode: 'incremental', since: since };
+}
+
+// Users whose matching inputs changed since the watermark: profile edits and
+// re-embeddings. New registrations and memberships are picked up per scope.
+async function loadDirtyUsers(since) {
+  var rows = await dbAll(
+    'SELECT user_id FROM stakeholder_profiles WHERE updated_at > $1 OR embedding_updated_at > $1',
+    [since]
+  );
+  return rows.map(function(r) { return r.user_id; });
+}
+
+function emptyScopeStats() {
+  return { jobs: 0, done: 0, failed: 0, users: 0, pairs: 0, matches: 0, busy_ms: 0 };
+}
+
+function newRunState() {
+  var scopes = {};
+  SCOPES.forEach(function(s) { scopes[s] = emptyScopeStats(); });
+  return { started_at: new Date().toISOString(), finished_at: null, queued: 0, in_flight: 0, scopes: scopes };
+}
+
+// users/sec and pairs/sec against wall-clock time since the cycle started
+function throughput(state) {
+  var elapsed = Math.max(1, (state.finished_at ? new Date(state.finished_at) : new Date()) - new Date(state.started_at)) / 1000;
+  var out = {};
+  SCOPES.forEach(function(s) {
+    var st = state.scopes[s];
+    out[s] = Object.assign({}, st, {
+      users_per_sec: Math.round(st.users / elapsed * 100) / 100,
+      pairs_per_sec: Math.round(st.pairs / elapsed * 100) / 100
+    });
+  });
+  return out;
+}
+
+function runSummary(state) {
+  return {
+    mode: state.mode || null,
+    since: state.since || null,
+    dirty_users: state.dirty_users,
+    started_at: state.started_at,
+    finished_at: state.finished_at,
+    scopes: throughput(state)
+  };
+}
+
+function logProgress(state) {
+  var t = throughput(state);
+  console.log('[MatchSched] queue=' + state.queued + ' in_flight=' + state.in_flight + ' ' +
+    SCOPES.filter(function(s) { return t[s].jobs; }).map(function(s) {
+      return s + ' ' + t[s].done + '/' + t[s].jobs + ' (' + t[s].users_per_sec + ' users/s, ' + t[s].pairs_per_sec + ' pairs/s)';
+    }).join(' | '));
+}
+
+// Run jobs [{ scope, label, run: async () => ({ users, pairs, matches }) }]
+// on the shared limiter, updating state as they go.
+function runJobs(jobs, limit, state) {
+  jobs.forEach(function(j) { state.scopes[j.scope].jobs++; });
+  state.queued += jobs.length;
+  return Promise.all(jobs.map(function(job) {
+    return limit(async function() {
+      state.queued--;
+      state.in_flight++;
+      var st = state.scopes[job.scope];
+      var t0 = Date.now();
+      try {
+        var r = (await job.run()) || {};
+        st.users += r.users || 0;
+        st.pairs += r.pairs || 0;
+        st.matches += r.matches || 0;
+        st.done++;
+      } catch (e) {
+        st.failed++;
+        console.error('[MatchSched] ' + job.scope + ' job ' + job.label + ' failed:', e.message);
+      } finally {
+        st.busy_ms += Date.now() - t0;
+        state.in_flight--;
+      }
+    });
+  }));
+}
+
+function userJob(scope, label, userId, context, generateMatchesForUser) {
+  return {
+    scope: scope,
+    label: label,
+    userId: userId,
+    run: async function() {
+      var stats = { pairs: 0 };
+      var matches = await generateMatchesForUser(userId, context, { stats: stats });
+      return { users: 1, pairs: stats.pairs, matches: matches.length };
+    }
+  };
+}
+
+// ── Phase 1: event, community and location jobs ──
+// dirty = null for a full sweep, else { since, users: [ids] }.
+async function buildLocalJobs(workerPool, dirty) {
+  var { generateEventMatches, generateMatchesForUser } = require('../routes/matches');
+  var jobs = [];
+  var dirtyIds = dirty ? dirty.users : [];
+
+  function eventJob(eventId) {
+    return {
+      scope: 'event',
+      label: 'event ' + eventId,
+      run: async function() {
+        var r = await generateEventMatches(eventId, { planEventPairs: workerPool.planEventPairs });
+        return { users: r.stats.registrants, pairs: r.stats.pairs_scored, matches: r.stats.matches_created };
+      }
+    };
+  }
+
+  if (!dirty) {
+    var events = await dbAll("SELECT id FROM events WHERE event_date BETWEEN NOW() AND NOW() + INTERVAL '30 days'");
+    events.forEach(function(ev) { jobs.push(eventJob(ev.id)); });
+  } else {
+    // One row per active registration at an upcoming event, flagged dirty if
+    // the registration is new or the registrant's profile changed.
+    var regs = await dbAll(
+      `SELECT er.event_id, er.user_id, (er.registered_at > $1 OR er.user_id = ANY($2::int[])) AS dirty
+       FROM event_registrations er JOIN events e ON e.id = er.event_id
+       WHERE er.status = 'active' AND e.event_date BETWEEN NOW() AND NOW() + INTERVAL '30 days'`,
+      [dirty.since, dirtyIds]
+    );
+    var byEvent = {};
+    regs.forEach(function(r) {
+      var ev = byEvent[r.event_id] = byEvent[r.event_id] || { total: 0, dirty: [] };
+      ev.total++;
+      if (r.dirty) ev.dirty.push(r.user_id);
+    });
+    Object.keys(byEvent).forEach(function(id) {
+      var ev = byEvent[id];
+      if (!ev.dirty.length) return;
+      if (ev.dirty.length >= ev.total * EVENT_REBUILD_FRACTION) {
+        jobs.push(eventJob(parseInt(id, 10)));
+        return;
+      }
+      ev.dirty.forEach(function(uid) {
+        jobs.push(userJob('event', 'event ' + id + ' user ' + uid, uid, { type: 'event', id: parseInt(id, 10) }, generateMatchesForUser));
+      });
+    });
+  }
+
+  var members = dirty
+    ? await dbAll(
+        `SELECT cm.community_id, cm.user_id FROM community_members cm
+         JOIN communities c ON c.id = cm.community_id
+         WHERE c.is_active = true AND (cm.joined_at > $1 OR cm.user_id = ANY($2::int[]))`,
+        [dirty.since, dirtyIds]
+      )
+    : await dbAll(
+        `SELECT cm.community_id, cm.user_id FROM community_members cm
+         JOIN communities c ON c.id = cm.community_id WHERE c.is_active = true`
+      );
+  members.forEach(function(m) {
+    jobs.push(userJob('community', 'community ' + m.community_id + ' user ' + m.user_id,
+      m.user_id, { type: 'community', id: m.community_id }, generateMatchesForUser));
+  });
+
+  // City clusters of 3+ users. Cluster sizes always come from the full table;
+  // an incremental run only schedules the dirty members.
+  var cityUsers = await dbAll(
+    `SELECT TRIM(SPLIT_PART(geography, ',', 1)) AS city, user_id FROM stakeholder_profiles
+     WHERE geography IS NOT NULL AND geography != ''`
+  );
+  var dirtySet = dirty ? new Set(dirtyIds) : null;
+  var byCity = {};
+  cityUsers.forEach(function(r) {
+    if (!r.city) return;
+    (byCity[r.city] = byCity[r.city] || []).push(r.user_id);
+  });
+  Object.keys(byCity).forEach(function(city) {
+    if (byCity[city].length < 3) return;
+    byCity[city].forEach(function(uid) {
+      if (dirtySet && !dirtySet.has(uid)) return;
+      jobs.push(userJob('location', city + ' user ' + uid, uid, { type: 'location', city: city }, generateMatchesForUser));
+    });
+  });
+
+  return jobs;
+}
+
+// ── Phase 2: global scope — users not globally matched in 7 days whose local scopes are thin ──
+async function buildGlobalJobs() {
+  var { generateMatchesForUser } = require('../routes/matches');
+  var rows = await dbAll(
+    `SELECT u.id FROM users u JOIN stakeholder_profiles sp ON sp.user_id = u.id
+     WHERE (u.last_global_match IS NULL OR u.last_global_match < NOW() - INTERVAL '7 days')
+       AND sp.stakeholder_type IS NOT NULL AND sp.themes IS NOT NULL
+       AND (SELECT COUNT(*) FROM event_matches em
+            WHERE (em.user_a_id = u.id OR em.user_b_id = u.id) AND em.scope_type IN ('event','community')) < 3
+     LIMIT 20`
+  );
+  return rows.map(function(r) {
+    var job = userJob('global', 'user ' + r.id, r.id, { type: 'global' }, generateMatchesForUser);
+    var run = job.run;
+    job.run = async function() {
+      var out = await run();
+      await dbRun('UPDATE users SET last_global_match = NOW() WHERE id = $1', [r.id]);
+      return out;
+    };
+    return job;
+  });
+}
+
+// options.mode: 'auto' (default) | 'incremental' | 'full'
+async function runMatchingCycle(options) {
+  options = options || {};
+  if (running) {
+    console.warn('[MatchSched] Cycle already running in this process — skipping');
+    return { skipped: 'already_running' };
+  }
+  running = true;
+
+  var client = null;
+  var lockHeld = false;
+  var workerPool = null;
+  var ticker = null;
+  var runId = null;
+  var state = newRunState();
+
+  try {
+    // Held for the whole cycle, so kept off the pool the jobs share
+    client = createClient();
+    client.on('error', function(err) { console.error('[MatchSched] Lock connection error:', err.message); });
+    await client.connect();
+    var lock = await client.query('SELECT pg_try_advisory_lock($1) AS ok', [ADVISORY_LOCK_KEY]);
+    if (!lock.rows[0].ok) {
+      console.warn('[MatchSched] Another instance holds the matching lock — skipping');
+      return { skipped: 'locked' };
+    }
+    lockHeld = true;
+    current = state;
+
+    await ensureTables();
+    var plan = await planRun(options.mode || 'auto');
+    var dirty = null;
+    if (plan.mode === 'incremental') {
+      dirty = { since: plan.since, users: await loadDirtyUsers(plan.since) };
+    }
+    state.mode = plan.mode;
+    state.since = plan.since;
+    state.dirty_users = dirty ? dirty.users.length : null;
+    var runRow = await dbGet(
+      "INSERT INTO matching_runs (mode, status, since) VALUES ($1, 'running', $2) RETURNING id",
+      [plan.mode, plan.since]
+    );
+    runId = runRow.id;
+    console.log('[MatchSched] Run #' + runId + ' (' + plan.mode +
+      (dirty ? ', ' + dirty.users.length + ' dirty profiles since ' + new Date(plan.since).toISOString() : '') +
+      ') started at ' + state.started_at + ' (db=' + DB_CONCURRENCY +
+      ', qdrant=' + QDRANT_CONCURRENCY + ', workers=' + WORKERS + ')');
+
+    workerPool = createMatchingWorkerPool(WORKERS);
+    var limit = createLimiter(DB_CONCURRENCY);
+    ticker = setInterval(function() { logProgress(state); }, PROGRESS_INTERVAL_MS);
+
+    // The cycle's Qdrant calls get their own limiter; request handlers keep
+    // the shared one
+    await withQdrantConcurrency(QDRANT_CONCURRENCY, async function() {
+      var localJobs = await buildLocalJobs(workerPool, dirty);
+      // Warm the vector cache for every subject in one batched pass instead of
+      // one Qdrant round trip per job.
+      await prefetchVectors(COLLECTIONS.profiles, localJobs.filter(function(j) { return j.userId; })
+        .map(function(j) { return j.userId; })).catch(function(e) {
+        console.error('[MatchSched] Vector prefetch failed:', e.message);
+      });
+      await runJobs(localJobs, limit, state);
+      await runJobs(await buildGlobalJobs(), limit, state);
+    });
+
+    state.finished_at = new Date().toISOString();
+    logProgress(state);
+    lastRun = runSummary(state);
+    // Any failed job makes the run 'partial'. Only 'success' runs set the
+    // next watermark, so the failed subjects are still dirty next time.
+    var failedJobs = Object.keys(state.scopes).reduce(function(n, k) { return n + state.scopes[k].failed; }, 0);
+    var runStatus = failedJobs ? 'partial' : 'success';
+    if (failedJobs) console.warn('[MatchSched] Run #' + runId + ' partial: ' + failedJobs + ' job(s) failed; watermark not advanced');
+    await dbRun(
+      'UPDATE matching_runs SET status = $3, finished_at = NOW(), stats = $2 WHERE id = $1',
+      [runId, JSON.stringify(lastRun), runStatus]
+    );
+    return lastRun;
+
+  } catch (err) {
+    console.error('[MatchSched] Matching cycle error:', err);
+    state.finished_at = new Date().toISOString();
+    lastRun = Object.assign(runSummary(state), { error: err.message });
+    if (runId) {
+      await dbRun(
+        "UPDATE matching_runs SET status = 'failed', finished_at = NOW(), stats = $2, error = $3 WHERE id = $1",
+        [runId, JSON.stringify(lastRun), String(err.message || err).slice(0, 500)]
+      ).catch(function() {});
+    }
+    return lastRun;
+
+  } finally {
+    running = false;
+    current = null;
+    if (ticker) clearInterval(ticker);
+    if (workerPool) await workerPool.close().catch(function() {});
+    if (client) {
+      if (lockHeld) {
+        try { await client.query('SELECT pg_advisory_unlock($1)', [ADVISORY_LOCK_KEY]); } catch (e) {}
+      }
+      await client.end().catch(function() {});
+    }
+  }
+}
+
+// ── Status for the admin dashboard ──
+async function getMatchingStatus() {
+  await ensureTables();
+  var runs = await dbAll(
+    'SELECT id, mode, status, started_at, finished_at, since, stats, error FROM matching_runs ORDER BY id DESC LIMIT 14'
+  );
+  return {
+    running: running,
+    current: current ? {
+      mode: current.mode || null,
+      started_at: current.started_at,
+      dirty_users: current.dirty_users,
+      queue_depth: current.queued,
+      in_flight: current.in_flight,
+      scopes: throughput(current)
+    } : null,
+    last_run: lastRun,
+    runs: runs,
+    vector_cache: getVectorCacheStats(),
+    embedding_cache: getEmbeddingCacheStats(),
+    signal_rollup: getSignalRollupStats(),
+    config: {
+      hours_utc: MATCH_HOURS, db_concurrency: DB_CONCURRENCY, qdrant_concurrency: QDRANT_CONCURRENCY,
+      workers: WORKERS, full_sweep_hours: FULL_SWEEP_HOURS
+    }
+  };
+}
+
+// ── Scheduler: minute tick at MATCH_HOURS ──
+function startMatchingScheduler() {
+  setInterval(function() {
+    var now = new Date();
+    if (MATCH_HOURS.indexOf(now.getUTCHours()) === -1 || now.getUTCMinutes() !== 0) return;
+    runMatchingCycle();
+  }, 60000);
+  console.log('[MatchSched] Scheduler armed: ' + MATCH_HOURS.join('/') + ':00 UTC, ' +
+    DB_CONCURRENCY + ' concurrent jobs, ' + WORKERS + ' worker thread(s), full sweep every ' + FULL_SWEEP_HOURS + 'h');
+}
+
+module.exports = { startMatchingScheduler, runMatchingCycle, getMatchingStatus };
@@ -0,0 +1,133 @@
+// ── Matching worker threads ──
+// The CPU-heavy part of an event matching job is the n×n similarity matrix and
+// the per-user top-K neighbour selection (~n² × 1536 multiply-adds). Running it
+// on the main thread blocks HTTP traffic for the duration, so the scheduler
+// hands it to a small pool of worker_threads. The same planEventPairs runs
+// in-thread when no pool is supplied (admin endpoint, scripts).
+//
+// Messages: { id, slab (Float32Array, packed + normalised), n, dims,
+//             hasVector (Uint8Array), k } → { id, matrix, considered }
+
+var { Worker, isMainThread, parentPort } = require('worker_threads');
+var { packNormalized, similarityMatrixFromSlab } = require('./vector_search');
+
+// Indices of the k most similar rows to row i (excluding i) in an n×n matrix.
+function topKNeighbours(matrix, n, i, k) {
+  var idx = [];
+  for (var j = 0; j < n; j++) if (j !== i) idx.push(j);
+  if (idx.length <= k) return idx;
+  var row = i * n;
+  idx.sort(function(a, b) { return matrix[row + b] - matrix[row + a]; });
+  return idx.slice(0, k);
+}
+
+// A pair (i < j) is considered if either side has the other in its top-K —
+// the union of both directions of the per-user ANN query. Users with no vector
+// consider everyone, as generateMatchesForUser's fallback did.
+function planFromSlab(slab, n, dims, hasVector, k) {
+  var matrix = similarityMatrixFromSlab(slab, n, dims);
+  var considered = new Uint8Array(n * n);
+  for (var i = 0; i < n; i++) {
+    if (!hasVector[i]) {
+      for (var j = 0; j < n; j++) if (j !== i) considered[Math.min(i, j) * n + Math.max(i, j)] = 1;
+      continue;
+    }
+    topKNeighbours(matrix, n, i, k).forEach(function(j) {
+      considered[Math.min(i, j) * n + Math.max(i, j)] = 1;
+    });
+  }
+  return { matrix: matrix, considered: considered };
+}
+
+// In-thread planner: vectors is an array of number arrays (or null).
+async function planEventPairs(vectors, k, dims) {
+  dims = dims || 1536;
+  var hasVector = Uint8Array.from(vectors, function(v) { return v ? 1 : 0; });
+  return planFromSlab(packNormalized(vectors, dims), vectors.length, dims, hasVector, k);
+}
+
+// Fixed-size worker pool exposing the same planEventPairs signature.
+function createMatchingWorkerPool(size) {
+  size = Math.max(1, size || 1);
+  var workers = [];
+  var idle = [];
+  var queue = [];
+  var callbacks = {};
+  var nextId = 1;
+
+  function dispatch() {
+    while (idle.length && queue.length) {
+      var w = idle.pop();
+      var job = queue.shift();
+      w.jobId = job.message.id;
+      w.postMessage(job.message, job.transfer);
+    }
+  }
+
+  function spawn() {
+    var w = new Worker(__filename);
+    w.on('message', function(msg) {
+      w.jobId = null;
+      var cb = callbacks[msg.id];
+      delete callbacks[msg.id];
+      idle.push(w);
+      dispatch();
+      if (!cb) return;
+      if (msg.error) cb.reject(new Error(msg.error));
+      else cb.resolve({ matrix: msg.matrix, considered: msg.considered });
+    });
+    w.on('error', function(err) {
+      console.error('[MatchWorker] worker error:', err.message);
+      var cb = callbacks[w.jobId];
+      delete callbacks[w.jobId];
+      if (cb) cb.reject(err);
+      workers.splice(workers.indexOf(w), 1);
+      var at = idle.indexOf(w);
+      if (at !== -1) idle.splice(at, 1);
+      spawn();
+    });
+    workers.push(w);
+    idle.push(w);
+  }
+
+  for (var i = 0; i < size; i++) spawn();
+
+  function plan(vectors, k, dims) {
+    dims = dims || 1536;
+    var hasVector = Uint8Array.from(vectors, function(v) { return v ? 1 : 0; });
+    var slab = packNormalized(vectors, dims);
+    var id = nextId++;
+    return new Promise(function(resolve, reject) {
+      callbacks[id] = { resolve: resolve, reject: reject };
+      queue.push({
+        message: { id: id, slab: slab, n: vectors.length, dims: dims, hasVector: hasVector, k: k },
+        transfer: [slab.buffer, hasVector.buffer]
+      });
+      dispatch();
+    });
+  }
+
+  return {
+    planEventPairs: plan,
+    size: function() { return workers.length; },
+    busy: function() { return workers.length - idle.length; },
+    queued: function() { return queue.length; },
+    close: function() {
+      return Promise.all(workers.map(function(w) { return w.terminate(); }));
+    }
+  };
+}
+
+if (!isMainThread && parentPort) {
+  parentPort.on('message', function(msg) {
+    try {
+      var out = planFromSlab(msg.slab, msg.n, msg.dims, msg.hasVector, msg.k);
+      parentPort.postMessage({ id: msg.id, matrix: out.matrix, considered: out.considered },
+        [out.matrix.buffer, out.considered.buffer]);
+    } catch (err) {
+      parentPort.postMessage({ id: msg.id, error: err.message });
+    }
+  });
+}
+
+module.exports = { planEventPairs, createMatchingWorkerPool, topKNeighbours };
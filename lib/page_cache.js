@@ -0,0 +1,283 @@
+// ── HTTP page cache ──
+// On-disk cache of fetched HTML for the harvesters. The curated re-check,
+// image backfill and repeat discovery hits keep landing on the same sites;
+// this turns most of those into a disk read or a 304.
+//
+// Design:
+//   - Keyed by normalised URL (lower-case host, no fragment, no tracking
+//     params, sorted query). Each entry is two files under PAGE_CACHE_DIR:
+//     <key>.json (url, validators, fetch time, content hash, processed
+//     marks) and <key>.html.gz (the body).
+//   - Younger than the caller's maxAgeMs (default PAGE_CACHE_TTL_HOURS):
+//     served from disk with no request. Older: conditional GET with
+//     If-None-Match / If-Modified-Since; a 304 refreshes fetched_at.
+//   - A network error with a cached body still within PAGE_CACHE_MAX_AGE_DAYS
+//     serves the stale copy rather than failing the page.
+//   - content_hash (sha256 of the body) lets callers skip re-extraction:
+//     markProcessed(url, consumer, hash) records what a consumer last handled,
+//     and a later fetch reports unchanged=true while the hash still matches.
+//   - Eviction sweeps (at most every PAGE_CACHE_SWEEP_MINUTES, and after a
+//     burst of writes) drop entries unused for PAGE_CACHE_MAX_AGE_DAYS, then
+//     least-recently-used entries until the cache is under PAGE_CACHE_MAX_MB.
+//   - Fail open: any cache I/O error degrades to a plain fetch.
+
+var fs = require('fs');
+var os = require('os');
+var path = require('path');
+var zlib = require('zlib');
+var crypto = require('crypto');
+var { promisify } = require('util');
+
+var gzip = promisify(zlib.gzip);
+var gunzip = promisify(zlib.gunzip);
+
+var PAGE_CACHE_DIR = process.env.PAGE_CACHE_DIR || path.join(os.tmpdir(), 'em_page_cache');
+var PAGE_CACHE_TTL_MS = parseFloat(process.env.PAGE_CACHE_TTL_HOURS || '24') * 3600 * 1000;
+var PAGE_CACHE_MAX_AGE_MS = parseFloat(process.env.PAGE_CACHE_MAX_AGE_DAYS || '14') * 86400 * 1000;
+var PAGE_CACHE_MAX_BYTES = parseFloat(process.env.PAGE_CACHE_MAX_MB || '200') * 1024 * 1024;
+var PAGE_CACHE_SWEEP_MS = parseFloat(process.env.PAGE_CACHE_SWEEP_MINUTES || '10') * 60 * 1000;
+var WRITES_PER_SWEEP = 200;
+
+var TRACKING_PARAMS = /^(utm_|fbclid$|gclid$|mc_cid$|mc_eid$|_hs|ref$|ref_src$)/i;
+
+var stats = { hits: 0, revalidated: 0, misses: 0, stale: 0, errors: 0, evictions: 0, writes: 0 };
+var disk = { entries: null, bytes: null, swept_at: null };
+var lastSweep = 0;
+var writesSinceSweep = 0;
+var sweeping = null;
+var dirReady = null;
+
+function ensureDir() {
+  if (!dirReady) {
+    dirReady = fs.promises.mkdir(PAGE_CACHE_DIR, { recursive: true }).catch(function(err) {
+      dirReady = null;
+      throw err;
+    });
+  }
+  return dirReady;
+}
+
+function normaliseUrl(url) {
+  try {
+    var u = new URL(url);
+    u.hash = '';
+    u.hostname = u.hostname.toLowerCase();
+    if ((u.protocol === 'http:' && u.port === '80') || (u.protocol === 'https:' && u.port === '443')) u.port = '';
+    var params = [];
+    u.searchParams.forEach(function(v, k) { if (!TRACKING_PARAMS.test(k)) params.push([k, v]); });
+    params.sort(function(a, b) { return a[0] < b[0] ? -1 : a[0] > b[0] ? 1 : 0; });
+    u.search = params.length ? '?' + new URLSearchParams(params).toString() : '';
+    if (u.pathname.length > 1) u.pathname = u.pathname.replace(/\/+$/, '');
+    return u.href;
+  } catch (e) {
+    return url;
+  }
+}
+
+function keyFor(url) {
+  return crypto.createHash('sha1').update(normaliseUrl(url)).digest('hex');
+}
+
+function metaPath(key) { return path.join(PAGE_CACHE_DIR, key + '.json'); }
+function bodyPath(key) { return path.join(PAGE_CACHE_DIR, key + '.html.gz'); }
+
+function hashBody(body) {
+  return crypto.createHash('sha256').update(body, 'utf8').digest('hex');
+}
+
+async function readMeta(key) {
+  try {
+    return JSON.parse(await fs.promises.readFile(metaPath(key), 'utf8'));
+  } catch (e) {
+    return null;
+  }
+}
+
+async function readBody(key) {
+  var buf = await fs.promises.readFile(bodyPath(key));
+  return (await gunzip(buf)).toString('utf8');
+}
+
+// Meta is written after the body, so a reader never sees a meta file
+// pointing at a body that is not there yet.
+async function writeEntry(key, meta, body) {
+  await ensureDir();
+  if (body !== undefined) await fs.promises.writeFile(bodyPath(key), await gzip(Buffer.from(body, 'utf8')));
+  await fs.promises.writeFile(metaPath(key), JSON.stringify(meta));
+  writesSinceSweep++;
+  stats.writes++;
+  maybeSweep();
+}
+
+function result(meta, body, source, consumer) {
+  var processed = consumer && meta.processed && meta.processed[consumer];
+  return {
+    url: meta.url,
+    body: body,
+    status: meta.status,
+    content_type: meta.content_type || '',
+    content_hash: meta.content_hash,
+    fetched_at: meta.fetched_at,
+    cache: source,
+    unchanged: !!processed && processed === meta.content_hash
+  };
+}
+
+// fetcher(headers) performs the request with the given conditional headers
+// and returns a fetch Response. Non-2xx/304 responses throw
+// 'HTTP <status>' after being counted, like a plain fetch wrapper would.
+//
+// options.maxAgeMs: serve from disk without a request when younger than
+//   this (default PAGE_CACHE_TTL_HOURS; 0 always revalidates).
+// options.consumer: name to check markProcessed() against for `unchanged`.
+async function fetchCached(url, fetcher, options) {
+  options = options || {};
+  var maxAgeMs = options.maxAgeMs != null ? options.maxAgeMs : PAGE_CACHE_TTL_MS;
+  var key = keyFor(url);
+  var meta = await readMeta(key);
+  var cachedBody = null;
+
+  if (meta) {
+    var age = Date.now() - new Date(meta.fetched_at).getTime();
+    if (age > PAGE_CACHE_MAX_AGE_MS) {
+      meta = null;
+    } else {
+      try {
+        cachedBody = await readBody(key);
+      } catch (e) {
+        meta = null;
+      }
+      if (meta && age <= maxAgeMs) {
+        stats.hits++;
+        touch(key);
+        return result(meta, cachedBody, 'hit', options.consumer);
+      }
+    }
+  }
+
+  var headers = {};
+  if (meta && meta.etag) headers['If-None-Match'] = meta.etag;
+  if (meta && meta.last_modified) headers['If-Modified-Since'] = meta.last_modified;
+
+  var resp;
+  try {
+    resp = await fetcher(headers);
+  } catch (err) {
+    if (meta) {
+      stats.stale++;
+      return result(meta, cachedBody, 'stale', options.consumer);
+    }
+    throw err;
+  }
+
+  if (resp.status === 304 && meta) {
+    stats.revalidated++;
+    meta.fetched_at = new Date().toISOString();
+    await writeEntry(key, meta).catch(countError);
+    return result(meta, cachedBody, 'revalidated', options.consumer);
+  }
+  if (!resp.ok) {
+    stats.misses++;
+    throw new Error('HTTP ' + resp.status);
+  }
+
+  stats.misses++;
+  var body = await resp.text();
+  var fresh = {
+    url: normaliseUrl(url),
+    status: resp.status,
+    etag: resp.headers.get('etag') || null,
+    last_modified: resp.headers.get('last-modified') || null,
+    content_type: resp.headers.get('content-type') || '',
+    content_hash: hashBody(body),
+    fetched_at: new Date().toISOString(),
+    processed: meta && meta.processed || {}
+  };
+  await writeEntry(key, fresh, body).catch(countError);
+  return result(fresh, body, 'miss', options.consumer);
+}
+
+// Record that `consumer` has handled the page at this content hash, so the
+// next fetch of identical content reports unchanged=true.
+async function markProcessed(url, consumer, contentHash) {
+  var key = keyFor(url);
+  var meta = await readMeta(key);
+  if (!meta || meta.content_hash !== contentHash) return;
+  meta.processed = meta.processed || {};
+  meta.processed[consumer] = contentHash;
+  await writeEntry(key, meta).catch(countError);
+}
+
+function countError(err) {
+  stats.errors++;
+  console.error('[page_cache] write failed:', err.message);
+}
+
+// LRU clock: eviction orders by mtime of the meta file
+function touch(key) {
+  var now = new Date();
+  fs.promises.utimes(metaPath(key), now, now).catch(function() {});
+}
+
+// ── Eviction ──
+function maybeSweep() {
+  if (sweeping) return;
+  if (Date.now() - lastSweep < PAGE_CACHE_SWEEP_MS && writesSinceSweep < WRITES_PER_SWEEP) return;
+  sweeping = sweep().catch(function(err) {
+    stats.errors++;
+    console.error('[page_cache] sweep failed:', err.message);
+  }).finally(function() { sweeping = null; });
+}
+
+async function sweep() {
+  lastSweep = Date.now();
+  writesSinceSweep = 0;
+  await ensureDir();
+  var names = await fs.promises.readdir(PAGE_CACHE_DIR);
+  var entries = {};
+  for (var i = 0; i < names.length; i++) {
+    var m = names[i].match(/^([0-9a-f]{40})\.(json|html\.gz)$/);
+    if (!m) continue;
+    var st;
+    try { st = await fs.promises.stat(path.join(PAGE_CACHE_DIR, names[i])); } catch (e) { continue; }
+    var e = entries[m[1]] || (entries[m[1]] = { key: m[1], bytes: 0, used: 0 });
+    e.bytes += st.size;
+    if (m[2] === 'json') e.used = st.mtimeMs;
+  }
+
+  var list = Object.keys(entries).map(function(k) { return entries[k]; });
+  list.sort(function(a, b) { return a.used - b.used; });
+  var total = list.reduce(function(s, e) { return s + e.bytes; }, 0);
+  var cutoff = Date.now() - PAGE_CACHE_MAX_AGE_MS;
+  var kept = list.length;
+  // Over the cap: evict down to 90% so the next few writes don't re-trigger
+  var target = total > PAGE_CACHE_MAX_BYTES ? PAGE_CACHE_MAX_BYTES * 0.9 : Infinity;
+
+  // Oldest first: orphans (no meta, used=0) and expired entries, then LRU
+  for (var j = 0; j < list.length; j++) {
+    var entry = list[j];
+    if (entry.used >= cutoff && total <= target) continue;
+    await fs.promises.unlink(metaPath(entry.key)).catch(function() {});
+    await fs.promises.unlink(bodyPath(entry.key)).catch(function() {});
+    total -= entry.bytes;
+    kept--;
+    stats.evictions++;
+  }
+
+  disk.entries = kept;
+  disk.bytes = total;
+  disk.swept_at = new Date().toISOString();
+}
+
+function getPageCacheStats() {
+  var lookups = stats.hits + stats.revalidated + stats.misses + stats.stale;
+  return Object.assign({
+    dir: PAGE_CACHE_DIR,
+    hit_rate: lookups ? Math.round((stats.hits + stats.revalidated) / lookups * 1000) / 1000 : null,
+    disk_entries: disk.entries,
+    disk_bytes: disk.bytes,
+    swept_at: disk.swept_at
+  }, stats);
+}
+
+module.exports = { fetchCached, markProcessed, normaliseUrl, getPageCacheStats };
@@ -0,0 +1,82 @@
+// ── Pulse aggregation ──
+// The numbers behind a community pulse — signal count, prior-period count,
+// action breakdown, and per-theme counts with their own action breakdown —
+// computed in Postgres in one statement, so a 90-day pulse for a busy
+// community returns a few dozen grouped rows instead of streaming every
+// community_signals row into Node.
+//
+// Design:
+//   - One range scan over [now - 2×period, now] on
+//     idx_community_signals_community. Each row is flagged as current (in
+//     the period and matching the filters) or prior (in the period before,
+//     unfiltered, as the heat score has always compared against).
+//   - Totals and per-action counts come from a GROUP BY action with FILTER
+//     for current vs prior. Theme counts come from unnest(theme_tags) over
+//     the current rows, grouped by (theme, action), in the same statement.
+//   - Ties are broken by name, so the top themes and the dominant action
+//     are stable between runs.
+
+var { dbAll } = require('../db');
+
+var PERIOD_INTERVALS = { '7d': '7 days', '30d': '30 days', '90d': '90 days' };
+
+function periodInterval(period) {
+  return PERIOD_INTERVALS[period] || '30 days';
+}
+
+// filters: { region, theme, action, period }. Returns
+// { signal_count, prior_count, action_counts, dominant_action,
+//   themes: [{ theme, signal_count, action_breakdown }] (most signals first) }
+async function aggregatePulse(communityId, filters) {
+  var params = [communityId, periodInterval(filters.period)];
+  var conds = ["received_at > NOW() - $2::interval"];
+  if (filters.region) { params.push(filters.region); conds.push('region = $' + params.length); }
+  if (filters.theme) { params.push(filters.theme); conds.push('$' + params.length + ' = ANY(theme_tags)'); }
+  if (filters.action) { params.push(filters.action); conds.push("metadata->>'signal_action' = $" + params.length); }
+
+  var rows = await dbAll(
+    `WITH base AS MATERIALIZED (
+       SELECT theme_tags,
+              COALESCE(metadata->>'signal_action', 'unknown') AS action,
+              (${conds.join(' AND ')}) AS is_current,
+              received_at <= NOW() - $2::interval AS is_prior
+       FROM community_signals
+       WHERE community_id = $1 AND received_at > NOW() - $2::interval * 2
+     )
+     SELECT NULL::text AS theme, action,
+            COUNT(*) FILTER (WHERE is_current)::int AS n,
+            COUNT(*) FILTER (WHERE is_prior)::int AS prior_n
+     FROM base GROUP BY action
+     UNION ALL
+     SELECT t.theme, b.action, COUNT(*)::int, 0
+     FROM base b CROSS JOIN LATERAL (SELECT DISTINCT unnest(b.theme_tags) AS theme) t
+     WHERE b.is_current
+     GROUP BY t.theme, b.action`,
+    params
+  );
+
+  var out = { signal_count: 0, prior_count: 0, action_counts: {}, dominant_action: 'unknown', themes: [] };
+  var byTheme = {};
+  rows.forEach(function(r) {
+    if (r.theme === null) {
+      out.signal_count += r.n;
+      out.prior_count += r.prior_n;
+      if (r.n) out.action_counts[r.action] = r.n;
+      return;
+    }
+    var t = byTheme[r.theme] || (byTheme[r.theme] = { theme: r.theme, signal_count: 0, action_breakdown: {} });
+    t.signal_count += r.n;
+    t.action_breakdown[r.action] = r.n;
+  });
+
+  var best = 0;
+  Object.keys(out.action_counts).sort().forEach(function(a) {
+    if (out.action_counts[a] > best) { best = out.action_counts[a]; out.dominant_action = a; }
+  });
+  out.themes = Object.keys(byTheme).map(function(k) { return byTheme[k]; }).sort(function(a, b) {
+    return b.signal_count - a.signal_count || (a.theme < b.theme ? -1 : 1);
+  });
+  return out;
+}
+
+module.exports = { aggregatePulse, periodInterval };
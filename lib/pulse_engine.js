@@ -0,0 +1,385 @@
+// ── Community pulse engine ──
+// Builds, caches and precomputes the community pulse. Both the
+// GET /api/community/:communityId/pulse route and the in-process
+// precompute go through here, so an owner opening the dashboard reads the
+// same pulse_cache row the scheduler just warmed.
+//
+// Design:
+//   - Counts come from lib/pulse_aggregate (one grouped query). Editorial
+//     lines come from lib/editorial_cache, memoised by prompt and under a
+//     shared concurrency limit. All editorial calls for a pulse are issued
+//     together.
+//   - pulse_cache is read stale-while-revalidate: an expired row is still
+//     served (up to PULSE_STALE_MAX_HOURS) while one caller, holding a
+//     short lease on the row, rebuilds it in the background.
+//   - Precompute runs every PULSE_PRECOMPUTE_EVERY_MINUTES. It picks the
+//     default (unfiltered) pulse for each community with recent signals and
+//     each period. Rows expiring within PULSE_PRECOMPUTE_LEAD_MINUTES are
+//     rebuilt, soonest first, PULSE_PRECOMPUTE_CONCURRENCY communities at a
+//     time. Work not started within PULSE_PRECOMPUTE_BUDGET_MINUTES is left
+//     for the next run. An advisory lock, held on a dedicated connection
+//     rather than a pooled one, keeps it to one instance.
+//   - Each run records time per community for the admin dashboard.
+
+var crypto = require('crypto');
+var { dbGet, dbRun, dbAll, createClient } = require('../db');
+var { cachedEditorial, getEditorialCacheStats } = require('./editorial_cache');
+var { aggregatePulse } = require('./pulse_aggregate');
+var { mapWithConcurrency } = require('./concurrency');
+
+var ANTHROPIC_API_KEY = process.env.ANTHROPIC_API_KEY;
+var EDITORIAL_MODEL = process.env.EDITORIAL_MODEL || 'claude-sonnet-4-20250514';
+var PULSE_CACHE_TTL_HOURS = parseInt(process.env.PULSE_CACHE_TTL_HOURS) || 4;
+// Past expiry a cached pulse is still served (and rebuilt in the background)
+// for this long; older than that the request waits for a rebuild.
+var PULSE_STALE_MAX_HOURS = parseInt(process.env.PULSE_STALE_MAX_HOURS) || 72;
+var PRECOMPUTE_EVERY_MS = parseFloat(process.env.PULSE_PRECOMPUTE_EVERY_MINUTES || '60') * 60 * 1000;
+var PRECOMPUTE_LEAD_MS = parseFloat(process.env.PULSE_PRECOMPUTE_LEAD_MINUTES || '90') * 60 * 1000;
+var PRECOMPUTE_BUDGET_MS = parseFloat(process.env.PULSE_PRECOMPUTE_BUDGET_MINUTES || '30') * 60 * 1000;
+var PRECOMPUTE_CONCURRENCY = parseInt(process.env.PULSE_PRECOMPUTE_CONCURRENCY || '4', 10);
+var PERIODS = ['7d', '30d', '90d'];
+var ADVISORY_LOCK_KEY = 824645; // arbitrary constant, unique to pulse precompute
+
+var running = false;
+var lastRun = null;
+
+// ── Editorial generation via Claude ──
+// Every prompt here is built from aggregates only, so results are memoised
+// by prompt in lib/editorial_cache and calls share its concurrency limit.
+// Failures resolve to a placeholder and are not cached.
+async function requestEditorial(prompt, maxTokens) {
+  var resp = await fetch('https://api.anthropic.com/v1/messages', {
+    method: 'POST',
+    headers: {
+      'x-api-key': ANTHROPIC_API_KEY,
+      'anthropic-version': '2023-06-01',
+      'content-type': 'application/json'
+    },
+    body: JSON.stringify({
+      model: EDITORIAL_MODEL,
+      max_tokens: maxTokens || 300,
+      messages: [{ role: 'user', content: prompt }]
+    })
+  });
+  if (!resp.ok) throw new Error('HTTP ' + resp.status);
+  var data = await resp.json();
+  return data.content[0].text;
+}
+
+async function generateEditorial(prompt, maxTokens) {
+  if (!ANTHROPIC_API_KEY) return '(Editorial generation requires API key)';
+  try {
+    return await cachedEditorial(EDITORIAL_MODEL, maxTokens || 300, prompt, function() {
+      return requestEditorial(prompt, maxTokens);
+    });
+  } catch (err) {
+    console.error('[pulse] Editorial generation error:', err.message);
+    return '(Editorial generation unavailable)';
+  }
+}
+
+// ── Cache helpers ──
+function cacheKey(communityId, params) {
+  var str = communityId + JSON.stringify(params);
+  return crypto.createHash('md5').update(str).digest('hex');
+}
+
+// Returns { payload, fresh } or null. Expired rows are returned (fresh=false)
+// until PULSE_STALE_MAX_HOURS past generation.
+async function getCachedPulse(communityId, filterHash) {
+  var row = await dbGet(
+    `SELECT payload, expires_at > NOW() AS fresh FROM pulse_cache
+     WHERE community_id = $1 AND filter_hash = $2 AND generated_at > NOW() - $3 * INTERVAL '1 hour'`,
+    [communityId, filterHash, PULSE_STALE_MAX_HOURS]
+  );
+  if (!row) return null;
+  return { payload: typeof row.payload === 'string' ? JSON.parse(row.payload) : row.payload, fresh: row.fresh };
+}
+
+async function setCachedPulse(communityId, filterHash, payload) {
+  await dbRun(
+    `INSERT INTO pulse_cache (community_id, filter_hash, payload, expires_at)
+     VALUES ($1, $2, $3, NOW() + INTERVAL '${PULSE_CACHE_TTL_HOURS} hours')
+     ON CONFLICT (community_id, filter_hash)
+     DO UPDATE SET payload = $3, generated_at = NOW(), expires_at = NOW() + INTERVAL '${PULSE_CACHE_TTL_HOURS} hours'`,
+    [communityId, filterHash, JSON.stringify(payload)]
+  );
+}
+
+// Claim the rebuild of an expired entry: pushing expires_at out a few
+// minutes means only one request (on any instance) revalidates it, and a
+// failed rebuild is retried once the lease runs out.
+async function claimPulseRevalidation(communityId, filterHash) {
+  var result = await dbRun(
+    `UPDATE pulse_cache SET expires_at = NOW() + INTERVAL '5 minutes'
+     WHERE community_id = $1 AND filter_hash = $2 AND expires_at <= NOW()`,
+    [communityId, filterHash]
+  );
+  return result.rowCount > 0;
+}
+
+// Build and store one pulse. A filter combination that has dropped under
+// the k-anonymity floor loses its cache row rather than serving old data.
+async function refreshPulse(communityId, filters, filterHash) {
+  var payload = await buildPulse(communityId, filters);
+  if (payload.insufficient_data) {
+    await dbRun('DELETE FROM pulse_cache WHERE community_id = $1 AND filter_hash = $2', [communityId, filterHash]);
+  } else {
+    await setCachedPulse(communityId, filterHash, payload);
+  }
+  return payload;
+}
+
+function revalidatePulse(communityId, filterHash, filters) {
+  claimPulseRevalidation(communityId, filterHash).then(function(claimed) {
+    if (claimed) return refreshPulse(communityId, filters, filterHash);
+  }).catch(function(err) {
+    console.error('[pulse] Revalidation error:', err.message);
+  });
+}
+
+// Aggregate signal intelligence for one filter combination. The editorial
+// calls (cluster summaries, trigger rationales, narrative) are issued
+// together; generateEditorial bounds and memoises them.
+async function buildPulse(communityId, filters) {
+  var region = filters.region;
+  var theme = filters.theme;
+  var action = filters.action;
+  var period = filters.period;
+
+  // Counts come back pre-grouped from Postgres (lib/pulse_aggregate)
+  var agg = await aggregatePulse(communityId, filters);
+  var signalCount = agg.signal_count;
+
+  // K-anonymity check
+  if (signalCount < 5) {
+    return {
+      period: period,
+      filters: { region: region, theme: theme, action: action },
+      insufficient_data: true,
+      message: 'Fewer than 5 signals for this filter combination'
+    };
+  }
+
+  // Heat score (normalized signal density): current period vs prior period
+  var priorCount = agg.prior_count || 1;
+  var heatScore = Math.min(1, signalCount / Math.max(priorCount * 1.5, 10));
+  var heatDelta = priorCount > 0 ? Math.round((signalCount - priorCount) / priorCount * 100) : 0;
+  var dominantAction = agg.dominant_action;
+  var sortedThemes = agg.themes.map(function(t) { return t.theme; });
+
+  // Signal clusters: top themes
+  var clusters = agg.themes.slice(0, 5).map(function(t) {
+    var strength = Math.min(1, t.signal_count / signalCount * 2);
+    return {
+      label: t.theme + ' activity',
+      canonical_theme: t.theme,
+      strength: Math.round(strength * 100) / 100,
+      signal_count: t.signal_count,
+      action_breakdown: t.action_breakdown,
+      editorial_summary: null,
+      programming_trigger: t.signal_count >= 5 && strength > 0.6,
+      trigger_rationale: null
+    };
+  });
+
+  // Editorial copy: every call in flight at once
+  var editorialCalls = [];
+  clusters.forEach(function(c) {
+    editorialCalls.push(generateEditorial(
+      'You are an editorial writer for a community intelligence dashboard. Write a one-sentence editorial summary for a signal cluster about "' + c.canonical_theme + '" with ' + c.signal_count + ' signals. Action breakdown: ' + JSON.stringify(c.action_breakdown) + '. Be specific, warm, and signal-grounded. No raw data. No individual names. No boilerplate.',
+      100
+    ).then(function(text) { c.editorial_summary = text; }));
+
+    if (c.programming_trigger) {
+      editorialCalls.push(generateEditorial(
+        'Write a one-sentence "why now" rationale for programming a community event around "' + c.canonical_theme + '". Signal evidence: ' + c.signal_count + ' signals with actions ' + JSON.stringify(c.action_breakdown) + '. Be specific about timing and opportunity.',
+        80
+      ).then(function(text) { c.trigger_rationale = text || null; }));
+    }
+  });
+
+  // Network narrative
+  var narrative = null;
+  editorialCalls.push(generateEditorial(
+    'Write a 2-sentence aggregate network narrative for a community with ' + signalCount + ' signals in the last ' + period + '. Heat score: ' + Math.round(heatScore * 100) + '%. Dominant activity: ' + dominantAction + '. Top themes: ' + sortedThemes.slice(0, 3).join(', ') + '. Be warm, specific, editorial. No individual data. No boilerplate.',
+    120
+  ).then(function(text) { narrative = text; }));
+
+  // Active canister count
+  var canisterCount = await dbGet(
+    'SELECT COUNT(*) as count FROM community_members cm JOIN stakeholder_profiles sp ON sp.user_id = cm.user_id WHERE cm.community_id = $1',
+    [communityId]
+  );
+  await Promise.all(editorialCalls);
+
+  return {
+    period: period,
+    filters: { region: region, theme: theme, action: action },
+    pulse: {
+      heat_score: Math.round(heatScore * 100) / 100,
+      heat_delta: (heatDelta >= 0 ? '+' : '') + heatDelta + '% vs prior period',
+      dominant_action: dominantAction,
+      signal_count: signalCount,
+      active_canister_count: parseInt(canisterCount.count) || 0
+    },
+    signal_clusters: clusters,
+    network_context: { narrative: narrative },
+    generated_at: new Date().toISOString()
+  };
+}
+
+// ── Read path ──
+// filters: { region, theme, action, period } (theme already normalised).
+// Returns { payload, cache: 'hit' | 'stale' | 'miss' }.
+async function getPulse(communityId, filters) {
+  var filterHash = cacheKey(communityId, filters);
+  var cached = await getCachedPulse(communityId, filterHash);
+  if (cached) {
+    if (!cached.fresh) revalidatePulse(communityId, filterHash, filters);
+    return { payload: cached.payload, cache: cached.fresh ? 'hit' : 'stale' };
+  }
+  var payload = await buildPulse(communityId, filters);
+  if (!payload.insufficient_data) await setCachedPulse(communityId, filterHash, payload);
+  return { payload: payload, cache: 'miss' };
+}
+
+function defaultFilters(period) {
+  return { region: null, theme: null, action: null, period: period };
+}
+
+// ── Precompute ──
+// Default-view pulses due for a rebuild, grouped by community, most urgent
+// community first. force=true takes every community/period.
+async function planPrecompute(force) {
+  var communities = await dbAll(
+    "SELECT DISTINCT community_id FROM community_signals WHERE received_at > NOW() - INTERVAL '90 days'"
+  );
+  var targets = [];
+  communities.forEach(function(c) {
+    PERIODS.forEach(function(period) {
+      targets.push({ community_id: c.community_id, period: period, filter_hash: cacheKey(c.community_id, defaultFilters(period)) });
+    });
+  });
+  if (!targets.length) return [];
+
+  var rows = await dbAll(
+    'SELECT filter_hash, expires_at FROM pulse_cache WHERE filter_hash = ANY($1::text[])',
+    [targets.map(function(t) { return t.filter_hash; })]
+  );
+  var expires = {};
+  rows.forEach(function(r) { expires[r.filter_hash] = new Date(r.expires_at).getTime(); });
+
+  var dueBefore = Date.now() + PRECOMPUTE_LEAD_MS;
+  var byCommunity = {};
+  targets.forEach(function(t) {
+    var exp = expires[t.filter_hash] || 0;
+    if (!force && exp > dueBefore) return;
+    var c = byCommunity[t.community_id] || (byCommunity[t.community_id] = { community_id: t.community_id, due_at: exp, periods: [] });
+    c.due_at = Math.min(c.due_at, exp);
+    c.periods.push(t);
+  });
+  return Object.keys(byCommunity).map(function(k) { return byCommunity[k]; })
+    .sort(function(a, b) { return a.due_at - b.due_at; });
+}
+
+async function precomputeCommunity(job, deadline, summary) {
+  var entry = { community_id: job.community_id, periods: {}, ms: 0 };
+  if (Date.now() > deadline) {
+    summary.skipped_budget++;
+    return;
+  }
+  var started = Date.now();
+  await Promise.all(job.periods.map(function(t) {
+    return refreshPulse(t.community_id, defaultFilters(t.period), t.filter_hash).then(function(payload) {
+      entry.periods[t.period] = payload.insufficient_data ? 'insufficient' : 'cached';
+      if (payload.insufficient_data) summary.insufficient++;
+      else summary.refreshed++;
+    }, function(err) {
+      entry.periods[t.period] = 'error: ' + err.message;
+      summary.errors++;
+    });
+  }));
+  entry.ms = Date.now() - started;
+  summary.communities.push(entry);
+}
+
+// Warm pulse_cache for every active community. Returns the run summary
+// (or { skipped } when another run holds the lock).
+async function precomputePulses(options) {
+  options = options || {};
+  if (running) return { skipped: 'running' };
+  running = true;
+  var client = null;
+  var lockHeld = false;
+  var summary = {
+    started_at: new Date().toISOString(), finished_at: null, duration_ms: 0,
+    planned: 0, refreshed: 0, insufficient: 0, errors: 0, skipped_budget: 0, communities: []
+  };
+
+  try {
+    // Held for the whole run, so kept off the pool the rebuilds share
+    client = createClient();
+    client.on('error', function(err) { console.error('[pulse] Lock connection error:', err.message); });
+    await client.connect();
+    var lock = await client.query('SELECT pg_try_advisory_lock($1) AS ok', [ADVISORY_LOCK_KEY]);
+    if (!lock.rows[0].ok) return { skipped: 'locked' };
+    lockHeld = true;
+
+    var jobs = await planPrecompute(!!options.force);
+    summary.planned = jobs.length;
+    var deadline = Date.now() + PRECOMPUTE_BUDGET_MS;
+    await mapWithConcurrency(jobs, PRECOMPUTE_CONCURRENCY, function(job) {
+      return precomputeCommunity(job, deadline, summary);
+    });
+
+    summary.communities.sort(function(a, b) { return b.ms - a.ms; });
+    summary.finished_at = new Date().toISOString();
+    summary.duration_ms = Date.now() - new Date(summary.started_at).getTime();
+    lastRun = summary;
+    if (jobs.length) {
+      console.log('[pulse] Precompute: ' + summary.refreshed + ' pulse(s) cached for ' + summary.communities.length +
+        ' communities in ' + summary.duration_ms + 'ms (' + summary.insufficient + ' insufficient, ' +
+        summary.errors + ' errors, ' + summary.skipped_budget + ' over budget)');
+    }
+    return summary;
+  } catch (err) {
+    console.error('[pulse] Precompute error:', err.message);
+    summary.finished_at = new Date().toISOString();
+    lastRun = Object.assign(summary, { error: err.message });
+    return summary;
+  } finally {
+    running = false;
+    if (client) {
+      if (lockHeld) {
+        try { await client.query('SELECT pg_advisory_unlock($1)', [ADVISORY_LOCK_KEY]); } catch (e) {}
+      }
+      await client.end().catch(function() {});
+    }
+  }
+}
+
+function startPulseScheduler() {
+  setInterval(function() { precomputePulses(); }, PRECOMPUTE_EVERY_MS);
+  // First pass shortly after boot, so a deploy does not leave owners cold
+  setTimeout(function() { precomputePulses(); }, 60000);
+  console.log('[pulse] Precompute armed: every ' + Math.round(PRECOMPUTE_EVERY_MS / 60000) + 'min, ' +
+    PRECOMPUTE_CONCURRENCY + ' communities at a time, ' + Math.round(PRECOMPUTE_BUDGET_MS / 60000) + 'min budget');
+}
+
+function getPulseStatus() {
+  return {
+    running: running,
+    last_run: lastRun,
+    editorial_cache: getEditorialCacheStats(),
+    config: {
+      ttl_hours: PULSE_CACHE_TTL_HOURS, stale_max_hours: PULSE_STALE_MAX_HOURS,
+      every_minutes: PRECOMPUTE_EVERY_MS / 60000, lead_minutes: PRECOMPUTE_LEAD_MS / 60000,
+      budget_minutes: PRECOMPUTE_BUDGET_MS / 60000, concurrency: PRECOMPUTE_CONCURRENCY
+    }
+  };
+}
+
+module.exports = {
+  getPulse, buildPulse, generateEditorial, precomputePulses, startPulseScheduler, getPulseStatus
+};
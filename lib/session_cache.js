@@ -0,0 +1,191 @@
+// ── Session token cache ──
+// In-process cache in front of the sessions lookup that every authenticated
+// request makes (authenticateToken / optionalAuth). Unread-count polls and
+// the like made that the most-executed query in the app; most requests now
+// resolve their token from memory.
+//
+// Design:
+//   - Keyed by sha256(token). A valid session is cached for
+//     SESSION_CACHE_TTL_S, never past its own expires_at; an unknown or
+//     expired token is cached as a miss for SESSION_CACHE_NEGATIVE_TTL_S so
+//     a client retrying a dead token does not hit Postgres on every call.
+//   - Invalidation crosses replicas on the Postgres channel
+//     'session_invalidate': logout sends the token hash, account deletion
+//     sends the user id. Every instance (the sender too) drops the entries.
+//   - Positive entries are only served while the LISTEN connection is up.
+//     If it drops, notifications may have been missed, so the cache is
+//     cleared and lookups go to Postgres until it reconnects.
+//   - Concurrent lookups of one token share a query. Size is capped at
+//     SESSION_CACHE_MAX entries (oldest inserted evicted first).
+
+var crypto = require('crypto');
+
+var TTL_MS = parseFloat(process.env.SESSION_CACHE_TTL_S || '60') * 1000;
+var NEGATIVE_TTL_MS = parseFloat(process.env.SESSION_CACHE_NEGATIVE_TTL_S || '10') * 1000;
+var MAX_ENTRIES = parseInt(process.env.SESSION_CACHE_MAX || '50000', 10);
+var CHANNEL = 'session_invalidate';
+var RECONNECT_MS = 5000;
+
+var entries = new Map();   // token hash -> { userId, expires }
+var byUser = new Map();    // user id -> Set of token hashes
+var inflight = new Map();
+var listener = null;
+var listening = false;
+var retryAt = 0;
+var generation = 0;        // bumped on every invalidation message
+var stats = { hits: 0, negative_hits: 0, misses: 0, shared: 0, invalidations: 0, evictions: 0, listener_errors: 0 };
+
+function db() {
+  return require('../db');
+}
+
+function hashToken(token) {
+  return crypto.createHash('sha256').update(token).digest('hex');
+}
+
+// ── Cross-replica invalidation ──
+function startListener() {
+  if (listener || Date.now() < retryAt) return;
+  var client = db().createClient();
+  listener = client;
+
+  function fail(err) {
+    if (listener !== client) return;
+    stats.listener_errors++;
+    console.error('[session_cache] Listener lost, cache bypassed until reconnect:', err ? err.message : 'connection ended');
+    listening = false;
+    listener = null;
+    clearAll();
+    client.end().catch(function() {});
+    // Reconnect lazily on a lookup after the back-off
+    retryAt = Date.now() + RECONNECT_MS;
+  }
+
+  client.on('error', fail);
+  client.on('end', function() { fail(null); });
+  client.on('notification', function(msg) {
+    if (msg.channel !== CHANNEL) return;
+    try { applyInvalidation(JSON.parse(msg.payload)); } catch (e) {}
+  });
+  client.connect().then(function() {
+    return client.query('LISTEN ' + CHANNEL);
+  }).then(function() {
+    listening = true;
+  }).catch(fail);
+}
+
+function applyInvalidation(msg) {
+  generation++;
+  (msg.h || []).forEach(dropEntry);
+  if (msg.u != null) {
+    var hashes = byUser.get(String(msg.u));
+    if (hashes) Array.from(hashes).forEach(dropEntry);
+  }
+}
+
+function dropEntry(hash) {
+  var e = entries.get(hash);
+  if (!e) return;
+  entries.delete(hash);
+  stats.invalidations++;
+  if (e.userId != null) untrackUser(e.userId, hash);
+}
+
+function untrackUser(userId, hash) {
+  var set = byUser.get(String(userId));
+  if (!set) return;
+  set.delete(hash);
+  if (!set.size) byUser.delete(String(userId));
+}
+
+function clearAll() {
+  entries.clear();
+  byUser.clear();
+}
+
+function store(hash, userId, expires) {
+  var prev = entries.get(hash);
+  if (prev && prev.userId != null) untrackUser(prev.userId, hash);
+  entries.delete(hash);
+  while (entries.size >= MAX_ENTRIES) {
+    var oldest = entries.keys().next().value;
+    var o = entries.get(oldest);
+    entries.delete(oldest);
+    if (o.userId != null) untrackUser(o.userId, oldest);
+    stats.evictions++;
+  }
+  entries.set(hash, { userId: userId, expires: expires });
+  if (userId != null) {
+    var key = String(userId);
+    if (!byUser.has(key)) byUser.set(key, new Set());
+    byUser.get(key).add(hash);
+  }
+}
+
+// ── Lookup ──
+// Resolves to the session's user id, or null for an unknown/expired token.
+async function lookupSession(token) {
+  startListener();
+  var hash = hashToken(token);
+  var now = Date.now();
+  var e = entries.get(hash);
+  if (e && e.expires > now && (e.userId === null || listening)) {
+    if (e.userId === null) stats.negative_hits++;
+    else stats.hits++;
+    return e.userId;
+  }
+  if (inflight.has(hash)) {
+    stats.shared++;
+    return inflight.get(hash);
+  }
+
+  stats.misses++;
+  var startGen = generation;
+  var p = db().dbGet(
+    'SELECT user_id, expires_at FROM sessions WHERE token = $1 AND expires_at > NOW()',
+    [token]
+  ).then(function(session) {
+    var at = Date.now();
+    if (!session) {
+      store(hash, null, at + NEGATIVE_TTL_MS);
+      return null;
+    }
+    // An invalidation that landed mid-query may be for this very session
+    if (listening && generation === startGen) {
+      store(hash, session.user_id, Math.min(at + TTL_MS, new Date(session.expires_at).getTime()));
+    }
+    return session.user_id;
+  });
+  inflight.set(hash, p);
+  try {
+    return await p;
+  } finally {
+    inflight.delete(hash);
+  }
+}
+
+// ── Invalidation API ──
+async function invalidateSessionToken(token) {
+  var hash = hashToken(token);
+  applyInvalidation({ h: [hash] });
+  await db().dbRun('SELECT pg_notify($1, $2)', [CHANNEL, JSON.stringify({ h: [hash] })]);
+}
+
+async function invalidateUserSessions(userId) {
+  applyInvalidation({ u: userId });
+  await db().dbRun('SELECT pg_notify($1, $2)', [CHANNEL, JSON.stringify({ u: userId })]);
+}
+
+function getSessionCacheStats() {
+  var lookups = stats.hits + stats.negative_hits + stats.misses + stats.shared;
+  return Object.assign({
+    size: entries.size,
+    users: byUser.size,
+    listening: listening,
+    hit_rate: lookups ? Math.round((stats.hits + stats.negative_hits + stats.shared) / lookups * 1000) / 1000 : null,
+    ttl_s: TTL_MS / 1000,
+    negative_ttl_s: NEGATIVE_TTL_MS / 1000
+  }, stats);
+}
+
+module.exports = { lookupSession, invalidateSessionToken, invalidateUserSessions, getSessionCacheStats };
@@ -0,0 +1,233 @@
+// ── Bulk signal ingestion ──
+// Set-based path behind POST /api/signals/ingest-batch: a whole batch of
+// signals is written, linked to canonical entities and queued for embedding
+// in a handful of statements instead of several round trips per row.
+//
+// Design:
+//   - Weights and cost tiers come from module-level tables and one `now`
+//     per batch; nothing is rebuilt per row.
+//   - Rows go in as chunked INSERT ... SELECT unnest(...) (dbBulkInsert), one
+//     pooled round trip per SIGNAL_INSERT_CHUNK rows.
+//   - Entity resolution is one statement per chunk: exact canonical-name
+//     match, then alias match (exact via the GIN index on entities.aliases;
+//     substring for the single-signal route's resolve_entity jobs), then a
+//     single multi-row insert for names still unknown, then one UPDATE
+//     linking signals to their entity.
+//   - Embedding is off the request path: one embed_signal job per signal on
+//     the durable job queue (lib/job_queue.js), claimed SIGNAL_EMBED_BATCH at
+//     a time and re-read by id, so the queue never holds request bodies.
+//   - One rollup refresh job for the themes touched (lib/signal_rollup.js).
+
+var { dbAll, dbRun, dbBulkInsert } = require('../db');
+var { normalizeTheme, normalizeThemes } = require('./theme_taxonomy');
+var { registerJobHandler, enqueueJobs } = require('./job_queue');
+var { noteSignalsChanged } = require('./signal_rollup');
+
+var SIGNAL_INSERT_CHUNK = parseInt(process.env.SIGNAL_INSERT_CHUNK || '1000', 10);
+var SIGNAL_RESOLVE_CHUNK = parseInt(process.env.SIGNAL_RESOLVE_CHUNK || '5000', 10);
+var SIGNAL_EMBED_BATCH = parseInt(process.env.SIGNAL_EMBED_BATCH || '100', 10);
+var SIGNAL_EMBED_CONCURRENCY = parseInt(process.env.SIGNAL_EMBED_CONCURRENCY || '2', 10);
+
+var SOURCE_WEIGHTS = {
+  'sec_filing': 2.0, 'regulatory': 2.0, 'venture': 1.8, 'funding': 1.8,
+  'corporate': 1.5, 'patent': 1.5, 'hiring': 1.3, 'event': 1.2,
+  'podcast': 1.0, 'news': 0.8, 'pr': 0.6, 'social': 0.5
+};
+
+var SIGNAL_COSTS = {
+  'regulatory': 'high', 'sec_filing': 'high', 'corporate': 'high',
+  'venture': 'high', 'funding': 'high',
+  'hiring': 'medium', 'event': 'medium', 'podcast': 'medium',
+  'news': 'low', 'pr': 'low', 'social': 'low'
+};
+
+var DAY_MS = 1000 * 60 * 60 * 24;
+
+var COLUMNS = [
+  { name: 'source_type', type: 'text' },
+  { name: 'source_id', type: 'text' },
+  { name: 'source_url', type: 'text' },
+  { name: 'entity_type', type: 'text' },
+  { name: 'entity_name', type: 'text' },
+  { name: 'entities_json', type: 'jsonb' },
+  { name: 'theme', type: 'text' },
+  { name: 'themes_json', type: 'jsonb' },
+  { name: 'theme_confidence', type: 'real' },
+  { name: 'signal_type', type: 'text' },
+  { name: 'signal_text', type: 'text' },
+  { name: 'signal_summary', type: 'text' },
+  { name: 'sentiment', type: 'text' },
+  { name: 'sentiment_score', type: 'real' },
+  { name: 'geography', type: 'text' },
+  { name: 'country', type: 'text' },
+  { name: 'city', type: 'text' },
+  { name: 'cost_of_signal', type: 'text' },
+  { name: 'constraint_level', type: 'text' },
+  { name: 'independence_score', type: 'real' },
+  { name: 'is_derivative', type: 'boolean' },
+  { name: 'source_weight', type: 'real' },
+  { name: 'recency_weight', type: 'real' },
+  { name: 'final_weight', type: 'real' },
+  { name: 'dollar_amount', type: 'real' },
+  { name: 'dollar_unit', type: 'text' },
+  { name: 'lifecycle_stage', type: 'text' },
+  { name: 'signal_date', type: 'date' }
+];
+
+// Same per-field defaults as the single-row batch insert this replaces
+function toRow(s, now) {
+  var theme = s.theme ? normalizeTheme(s.theme) : null;
+  var themesArr = s.themes ? normalizeThemes(s.themes) : [];
+  if (theme && themesArr.indexOf(theme) === -1) themesArr.push(theme);
+
+  var sourceWeight = SOURCE_WEIGHTS[s.source_type] || 1.0;
+  var recencyWeight = 1.0;
+  if (s.signal_date) {
+    var age = (now - new Date(s.signal_date).getTime()) / DAY_MS;
+    recencyWeight = Math.max(0.2, 1.0 - (age / 90) * 0.8);
+  }
+
+  return [
+    s.source_type, s.source_id || null, s.source_url || null,
+    s.entity_type || null, s.entity_name || null, JSON.stringify(s.entities || []),
+    theme, JSON.stringify(themesArr), s.theme_confidence || 0.0,
+    s.signal_type || null, s.signal_text || null, s.signal_summary || null,
+    s.sentiment || null, s.sentiment_score || null,
+    s.geography || null, s.country || null, s.city || null,
+    SIGNAL_COSTS[s.source_type] || 'low', s.constraint_level || 'low',
+    s.independence_score || 0.5, s.is_derivative || false,
+    sourceWeight, recencyWeight, sourceWeight * recencyWeight,
+    s.dollar_amount || null, s.dollar_unit || null,
+    s.lifecycle_stage || 'unknown', s.signal_date || null
+  ];
+}
+
+// ── Set-based entity resolution ──
+// links: [{ signal_id, entity_type, name }]
+// options.aliasSubstring: match the name anywhere in an entity's aliases
+//   (aliases::text ILIKE '%name%', trigram-indexed) instead of as an exact
+//   alias. The single-signal route has always linked this way; the bulk
+//   route matches exactly.
+async function resolveEntities(links, options) {
+  options = options || {};
+  var aliasMatch = options.aliasSubstring
+    ? "e.aliases::text ILIKE '%' || n.name || '%'"
+    : 'e.aliases ? n.name';
+  var resolved = 0;
+  for (var start = 0; start < links.length; start += SIGNAL_RESOLVE_CHUNK) {
+    var chunk = links.slice(start, start + SIGNAL_RESOLVE_CHUNK);
+    var result = await dbRun(
+      `WITH input AS (
+         SELECT * FROM unnest($1::int[], $2::text[], $3::text[]) AS t(signal_id, entity_type, name)
+       ),
+       names AS (SELECT DISTINCT entity_type, name FROM input),
+       canon AS (
+         SELECT n.entity_type, n.name, e.id
+         FROM names n JOIN entities e ON e.entity_type = n.entity_type AND e.canonical_name = n.name
+       ),
+       alias AS (
+         SELECT DISTINCT ON (n.entity_type, n.name) n.entity_type, n.name, e.id
+         FROM names n JOIN entities e ON e.entity_type = n.entity_type AND ${aliasMatch}
+         WHERE NOT EXISTS (SELECT 1 FROM canon c WHERE c.entity_type = n.entity_type AND c.name = n.name)
+         ORDER BY n.entity_type, n.name, e.id
+       ),
+       created AS (
+         INSERT INTO entities (entity_type, canonical_name)
+         SELECT n.entity_type, n.name FROM names n
+         WHERE NOT EXISTS (SELECT 1 FROM canon c WHERE c.entity_type = n.entity_type AND c.name = n.name)
+           AND NOT EXISTS (SELECT 1 FROM alias a WHERE a.entity_type = n.entity_type AND a.name = n.name)
+         ON CONFLICT (entity_type, canonical_name) DO NOTHING
+         RETURNING id, entity_type, canonical_name AS name
+       ),
+       resolved AS (
+         SELECT entity_type, name, id FROM canon
+         UNION ALL SELECT entity_type, name, id FROM alias
+         UNION ALL SELECT entity_type, name, id FROM created
+       )
+       UPDATE unified_signals s SET entity_id = r.id::text
+       FROM input i JOIN resolved r ON r.entity_type = i.entity_type AND r.name = i.name
+       WHERE s.id = i.signal_id`,
+      [
+        chunk.map(function(l) { return l.signal_id; }),
+        chunk.map(function(l) { return l.entity_type; }),
+        chunk.map(function(l) { return l.name; })
+      ]
+    );
+    resolved += result.rowCount || 0;
+  }
+  return resolved;
+}
+
+// ── Background jobs ──
+// embed_signal: SIGNAL_EMBED_BATCH signal ids per claim → one embeddings call.
+// resolve_entity: single-signal resolutions from POST /api/signals/ingest,
+// batched through resolveEntities with that route's substring alias match.
+async function embedSignalJobs(jobs) {
+  var { embedSignalsBatch } = require('./vector_search');
+  var ids = jobs.map(function(j) { return j.payload.signal_id; });
+  var rows = await dbAll(
+    `SELECT id, source_type, entity_name, theme, themes_json, signal_text, signal_summary,
+            geography, dollar_amount, dollar_unit, lifecycle_stage, cost_of_signal, signal_date
+     FROM unified_signals WHERE id = ANY($1::int[])`,
+    [ids]
+  );
+  var stored = new Set(await embedSignalsBatch(rows));
+  // Only the signals that were read but not stored are retried; an id with no
+  // row (signal deleted since) has nothing left to embed
+  var failed = {};
+  var missed = new Set(rows.filter(function(r) { return !stored.has(r.id); }).map(function(r) { return String(r.id); }));
+  jobs.forEach(function(j) {
+    if (missed.has(String(j.payload.signal_id))) failed[j.id] = new Error('signal ' + j.payload.signal_id + ' was not embedded');
+  });
+  return { failed: failed };
+}
+
+registerJobHandler('embed_signal', {
+  batchSize: SIGNAL_EMBED_BATCH,
+  concurrency: SIGNAL_EMBED_CONCURRENCY,
+  handler: embedSignalJobs
+});
+
+registerJobHandler('resolve_entity', {
+  batchSize: 500,
+  concurrency: 1,
+  handler: function(jobs) {
+    return resolveEntities(jobs.map(function(j) {
+      return { signal_id: j.payload.signal_id, entity_type: j.payload.entity_type || 'company', name: String(j.payload.name).trim() };
+    }).filter(function(l) { return l.name; }), { aliasSubstring: true });
+  }
+});
+
+function enqueueSignalEmbeddings(ids) {
+  return enqueueJobs('embed_signal', ids.map(function(id) { return { signal_id: id }; }));
+}
+
+// ── Entry point ──
+// Returns { inserted, entities_linked, ids }. Signals without source_type
+// are skipped, as before. Embedding is queued as jobs, not awaited.
+async function bulkIngestSignals(signals) {
+  var now = Date.now();
+  var valid = signals.filter(function(s) { return s && s.source_type; });
+  if (!valid.length) return { inserted: 0, entities_linked: 0, ids: [] };
+
+  var inserted = await dbBulkInsert('unified_signals', COLUMNS, valid.map(function(s) { return toRow(s, now); }), {
+    chunkSize: SIGNAL_INSERT_CHUNK,
+    onConflict: '',
+    returning: 'id, entity_type, entity_name, theme'
+  });
+
+  var links = [];
+  inserted.forEach(function(r) {
+    var name = r.entity_name && r.entity_name.trim();
+    if (name) links.push({ signal_id: r.id, entity_type: r.entity_type || 'company', name: name });
+  });
+  var linked = await resolveEntities(links);
+
+  var ids = inserted.map(function(r) { return r.id; });
+  await enqueueSignalEmbeddings(ids);
+  await noteSignalsChanged(inserted);
+
+  return { inserted: inserted.length, entities_linked: linked, ids: ids };
+}
+
+module.exports = { bulkIngestSignals, resolveEntities, enqueueSignalEmbeddings };
@@ -0,0 +1,252 @@
+// ── Signal theme rollup ──
+// Precomputed per-theme view of the trailing signal window for match
+// scoring. scoreSignalAlignment and the batch scorer used to query
+// unified_signals for every pair (or every scope); the same handful of
+// themes come up thousands of times per cycle, so they now read a rollup
+// row per theme, held in-process.
+//
+// Design:
+//   - signal_theme_rollup: one row per theme over the last
+//     SIGNAL_ROLLUP_WINDOW_DAYS (90) — signal count, per-source-type counts,
+//     high-cost and accelerating counts, and the top SIGNAL_ROLLUP_TOP (20)
+//     signals by final_weight with just the fields scoring reads. The top 20
+//     per theme is a superset of the top 20 for any theme combination, so
+//     merging rollups gives the same rows as the old per-pair query.
+//   - refreshThemes recomputes a set of themes in one statement. Ingest
+//     paths call noteSignalsChanged, which queues a refresh_signal_rollup job
+//     for the themes touched; the job merges everything claimed at once.
+//   - The window slides even when nothing is ingested, so a row older than
+//     SIGNAL_ROLLUP_MAX_AGE_HOURS is recomputed on read, as is a theme with
+//     no row yet. No separate backfill is needed.
+//   - Reads go through an in-process cache (SIGNAL_ROLLUP_TTL_S). A refresh
+//     replaces the local entries at once; other instances catch up on TTL.
+//   - Entity signals (company name → top 5 over 60 days) use the same cache
+//     pattern over a LOWER(entity_name) index.
+
+var { dbAll, dbRun } = require('../db');
+var { registerJobHandler, enqueueJob } = require('./job_queue');
+
+var WINDOW_DAYS = parseInt(process.env.SIGNAL_ROLLUP_WINDOW_DAYS || '90', 10);
+var ENTITY_WINDOW_DAYS = parseInt(process.env.SIGNAL_ENTITY_WINDOW_DAYS || '60', 10);
+var TOP_N = parseInt(process.env.SIGNAL_ROLLUP_TOP || '20', 10);
+var ENTITY_TOP_N = 5;
+var TTL_MS = parseFloat(process.env.SIGNAL_ROLLUP_TTL_S || '300') * 1000;
+var MAX_AGE_HOURS = parseFloat(process.env.SIGNAL_ROLLUP_MAX_AGE_HOURS || '24');
+
+var themeCache = new Map();    // theme -> { rollup, expires }
+var entityCache = new Map();   // lower(entity_name) -> { rows, expires }
+var inflight = new Map();      // theme -> Promise<rollup>
+var stats = { hits: 0, misses: 0, refreshes: 0, themes_refreshed: 0, entity_hits: 0, entity_misses: 0 };
+var tableReady = null;
+
+function ensureTable() {
+  if (!tableReady) {
+    tableReady = dbRun(`CREATE TABLE IF NOT EXISTS signal_theme_rollup (
+      theme TEXT PRIMARY KEY,
+      signal_count INTEGER NOT NULL DEFAULT 0,
+      source_type_counts JSONB NOT NULL DEFAULT '{}',
+      high_cost_count INTEGER NOT NULL DEFAULT 0,
+      accelerating_count INTEGER NOT NULL DEFAULT 0,
+      top_signals JSONB NOT NULL DEFAULT '[]',
+      refreshed_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+    )`).catch(function(err) {
+      tableReady = null;
+      throw err;
+    });
+  }
+  return tableReady;
+}
+
+function unique(list) {
+  var seen = {};
+  return list.filter(function(x) {
+    if (!x || seen[x]) return false;
+    seen[x] = true;
+    return true;
+  });
+}
+
+function cacheRollup(row) {
+  themeCache.set(row.theme, { rollup: row, expires: Date.now() + TTL_MS });
+}
+
+// ── Refresh ──
+// Recomputes the given themes; themes with nothing in the window get an
+// empty row, so they are not recomputed on every read.
+async function refreshThemes(themes) {
+  themes = unique(themes);
+  if (!themes.length) return [];
+  await ensureTable();
+  var rows = await dbAll(
+    `WITH win AS (
+       SELECT theme, COALESCE(source_type, 'unknown') AS source_type, entity_name, signal_summary,
+              lifecycle_stage, cost_of_signal, final_weight
+       FROM unified_signals
+       WHERE theme = ANY($1::text[]) AND signal_date > NOW() - $2 * INTERVAL '1 day'
+     ),
+     agg AS (
+       SELECT theme, COUNT(*)::int AS signal_count,
+              COUNT(*) FILTER (WHERE cost_of_signal = 'high')::int AS high_cost_count,
+              COUNT(*) FILTER (WHERE lifecycle_stage = 'accelerating')::int AS accelerating_count
+       FROM win GROUP BY theme
+     ),
+     src AS (
+       SELECT theme, jsonb_object_agg(source_type, n) AS source_type_counts
+       FROM (SELECT theme, source_type, COUNT(*)::int AS n FROM win GROUP BY theme, source_type) c
+       GROUP BY theme
+     ),
+     top AS (
+       SELECT theme, jsonb_agg(jsonb_build_object(
+                'theme', theme, 'source_type', source_type, 'entity_name', entity_name,
+                'signal_summary', signal_summary, 'lifecycle_stage', lifecycle_stage,
+                'cost_of_signal', cost_of_signal, 'final_weight', final_weight
+              ) ORDER BY rn) AS top_signals
+       FROM (
+         SELECT *, ROW_NUMBER() OVER (PARTITION BY theme ORDER BY final_weight DESC) AS rn FROM win
+       ) r WHERE rn <= $3
+       GROUP BY theme
+     )
+     INSERT INTO signal_theme_rollup
+       (theme, signal_count, source_type_counts, high_cost_count, accelerating_count, top_signals, refreshed_at)
+     SELECT t.theme, COALESCE(a.signal_count, 0), COALESCE(s.source_type_counts, '{}'),
+            COALESCE(a.high_cost_count, 0), COALESCE(a.accelerating_count, 0),
+            COALESCE(p.top_signals, '[]'), NOW()
+     FROM unnest($1::text[]) AS t(theme)
+     LEFT JOIN agg a ON a.theme = t.theme
+     LEFT JOIN src s ON s.theme = t.theme
+     LEFT JOIN top p ON p.theme = t.theme
+     ON CONFLICT (theme) DO UPDATE SET
+       signal_count = EXCLUDED.signal_count,
+       source_type_counts = EXCLUDED.source_type_counts,
+       high_cost_count = EXCLUDED.high_cost_count,
+       accelerating_count = EXCLUDED.accelerating_count,
+       top_signals = EXCLUDED.top_signals,
+       refreshed_at = EXCLUDED.refreshed_at
+     RETURNING *`,
+    [themes, WINDOW_DAYS, TOP_N]
+  );
+  stats.refreshes++;
+  stats.themes_refreshed += rows.length;
+  rows.forEach(cacheRollup);
+  return rows;
+}
+
+// ── Read path ──
+async function loadRollups(themes) {
+  await ensureTable();
+  var rows = await dbAll(
+    `SELECT * FROM signal_theme_rollup
+     WHERE theme = ANY($1::text[]) AND refreshed_at > NOW() - $2 * INTERVAL '1 hour'`,
+    [themes, MAX_AGE_HOURS]
+  );
+  var byTheme = {};
+  rows.forEach(function(r) { byTheme[r.theme] = r; cacheRollup(r); });
+  var missing = themes.filter(function(t) { return !byTheme[t]; });
+  if (missing.length) {
+    (await refreshThemes(missing)).forEach(function(r) { byTheme[r.theme] = r; });
+  }
+  return byTheme;
+}
+
+// Returns { theme: rollup } for every requested theme. Concurrent callers
+// asking for the same uncached theme share one load.
+async function getThemeRollups(themes) {
+  var now = Date.now();
+  var out = {};
+  var waits = [];
+  var toLoad = [];
+  unique(themes).forEach(function(t) {
+    var c = themeCache.get(t);
+    if (c && c.expires > now) {
+      stats.hits++;
+      out[t] = c.rollup;
+    } else if (inflight.has(t)) {
+      stats.hits++;
+      waits.push(inflight.get(t).then(function(r) { out[t] = r; }));
+    } else {
+      stats.misses++;
+      toLoad.push(t);
+    }
+  });
+
+  if (toLoad.length) {
+    var batch = loadRollups(toLoad);
+    toLoad.forEach(function(t) {
+      var p = batch.then(function(byTheme) { return byTheme[t]; });
+      inflight.set(t, p);
+      waits.push(p.then(function(r) { out[t] = r; }));
+    });
+    batch.catch(function() {}).finally(function() {
+      toLoad.forEach(function(t) { inflight.delete(t); });
+    });
+  }
+  await Promise.all(waits);
+  return out;
+}
+
+// Returns { lower(entity_name): [top signals] } for the given lower-cased names.
+async function getEntitySignals(keys) {
+  var now = Date.now();
+  var out = {};
+  var toLoad = [];
+  unique(keys).forEach(function(k) {
+    var c = entityCache.get(k);
+    if (c && c.expires > now) {
+      stats.entity_hits++;
+      out[k] = c.rows;
+    } else {
+      stats.entity_misses++;
+      toLoad.push(k);
+    }
+  });
+  if (!toLoad.length) return out;
+
+  var rows = await dbAll(
+    `SELECT entity_key, entity_name, signal_summary, final_weight FROM (
+       SELECT LOWER(entity_name) AS entity_key, entity_name, signal_summary, final_weight,
+              ROW_NUMBER() OVER (PARTITION BY LOWER(entity_name) ORDER BY final_weight DESC) AS rn
+       FROM unified_signals
+       WHERE LOWER(entity_name) = ANY($1::text[]) AND signal_date > NOW() - $2 * INTERVAL '1 day'
+     ) s WHERE rn <= $3`,
+    [toLoad, ENTITY_WINDOW_DAYS, ENTITY_TOP_N]
+  );
+  toLoad.forEach(function(k) { out[k] = []; });
+  rows.forEach(function(r) { out[r.entity_key].push(r); });
+  toLoad.forEach(function(k) { entityCache.set(k, { rows: out[k], expires: now + TTL_MS }); });
+  return out;
+}
+
+// ── Ingest hook ──
+// signals: rows (or inputs) with theme / entity_name. Drops local entity
+// entries right away; theme rollups are recomputed by the job below.
+function noteSignalsChanged(signals) {
+  var themes = [];
+  signals.forEach(function(s) {
+    if (s.theme) themes.push(s.theme);
+    if (s.entity_name) entityCache.delete(String(s.entity_name).toLowerCase());
+  });
+  themes = unique(themes);
+  if (!themes.length) return Promise.resolve(0);
+  return enqueueJob('refresh_signal_rollup', { themes: themes });
+}
+
+registerJobHandler('refresh_signal_rollup', {
+  batchSize: 200,
+  concurrency: 1,
+  handler: function(jobs) {
+    var themes = [];
+    jobs.forEach(function(j) { themes = themes.concat(j.payload.themes || []); });
+    return refreshThemes(themes);
+  }
+});
+
+function getSignalRollupStats() {
+  var lookups = stats.hits + stats.misses;
+  return Object.assign({
+    cached_themes: themeCache.size,
+    cached_entities: entityCache.size,
+    hit_rate: lookups ? Math.round(stats.hits / lookups * 1000) / 1000 : null
+  }, stats);
+}
+
+module.exports = { getThemeRollups, getEntitySignals, refreshThemes, noteSignalsChanged, getSignalRollupStats };
@@ -6,6 +6,13 @@ var QDRANT_URL = process.env.QDRANT_URL;
 var QDRANT_API_KEY = process.env.QDRANT_API_KEY;
 var OPENAI_API_KEY = process.env.OPENAI_API_KEY;
 
+var os = require('os');
+var path = require('path');
+var { AsyncLocalStorage } = require('async_hooks');
+var { createLimiter } = require('./concurrency');
+var { createLocalCollection, saveSnapshot, loadSnapshot } = require('./local_vector_index');
+var { lookupEmbeddings, storeEmbeddings, getEmbeddingCacheStats } = require('./embedding_cache');
+
 var EMBEDDING_MODEL = 'text-embedding-3-small';
 var EMBEDDING_DIMS = 1536;
 
@@ -16,12 +23,15 @@ var COLLECTIONS = {
 };
 
 // ── OpenAI Embedding ──
+// All embedding goes through the (model, sha256(text)) cache in
+// lib/embedding_cache.js; only misses are sent upstream, in batches.
+// Vectors come back as Float32Array whether cached or fresh.
 
-async function getEmbedding(text) {
-  if (!text || !text.trim()) return null;
-  // Truncate to ~8000 tokens worth of text (rough estimate)
-  var truncated = text.slice(0, 30000);
+var EMBEDDING_MAX_CHARS = 30000; // ~8000 tokens worth of text (rough estimate)
+var EMBEDDING_BATCH = 512;       // inputs per upstream call (API max is 2048)
 
+// One upstream call. Returns vectors aligned with inputs, or null on error.
+async function requestEmbeddings(inputs) {
   var resp = await fetch('https://api.openai.com/v1/embeddings', {
     method: 'POST',
     headers: {
@@ -30,7 +40,7 @@ async function getEmbedding(text) {
     },
     body: JSON.stringify({
       model: EMBEDDING_MODEL,
-      input: truncated
+      input: inputs
     })
   });
 
@@ -41,39 +51,73 @@ async function getEmbedding(text) {
   }
 
   var data = await resp.json();
-  return data.data[0].embedding;
+  var out = new Array(inputs.length);
+  data.data.forEach(function(d, i) {
+    out[d.index !== undefined ? d.index : i] = Float32Array.from(d.embedding);
+  });
+  return out;
 }
 
-// Batch embed multiple texts (up to 2048 per call)
+async function getEmbedding(text) {
+  if (!text || !text.trim()) return null;
+  var vectors = await getEmbeddings([text]);
+  return vectors.length ? vectors[0] : null;
+}
+
+// Batch embed multiple texts. Returns vectors aligned with texts, or [] if
+// an upstream call fails.
 async function getEmbeddings(texts) {
   if (!texts || !texts.length) return [];
-  var cleaned = texts.map(function(t) { return (t || '').slice(0, 30000); });
+  var cleaned = texts.map(function(t) { return (t || '').slice(0, EMBEDDING_MAX_CHARS); });
+  var vectors = await lookupEmbeddings(EMBEDDING_MODEL, cleaned);
 
-  var resp = await fetch('https://api.openai.com/v1/embeddings', {
-    method: 'POST',
-    headers: {
-      'Authorization': 'Bearer ' + OPENAI_API_KEY,
-      'Content-Type': 'application/json'
-    },
-    body: JSON.stringify({
-      model: EMBEDDING_MODEL,
-      input: cleaned
-    })
+  // Distinct missing texts, so repeated inputs cost one upstream slot
+  var missing = new Map();
+  cleaned.forEach(function(t, i) {
+    if (!vectors[i] && !missing.has(t)) missing.set(t, missing.size);
   });
+  if (!missing.size) return vectors;
 
-  if (!resp.ok) {
-    var err = await resp.text();
-    console.error('OpenAI batch embedding error:', resp.status, err);
-    return [];
+  var missTexts = Array.from(missing.keys());
+  var fresh = [];
+  try {
+    for (var i = 0; i < missTexts.length; i += EMBEDDING_BATCH) {
+      var got = await requestEmbeddings(missTexts.slice(i, i + EMBEDDING_BATCH));
+      if (!got) return [];
+      fresh = fresh.concat(got);
+    }
+  } finally {
+    // Chunks that came back are paid for — cache them even if a later one failed
+    await storeEmbeddings(EMBEDDING_MODEL, fresh.map(function(v, k) { return { text: missTexts[k], vector: v }; }));
   }
 
-  var data = await resp.json();
-  return data.data.map(function(d) { return d.embedding; });
+  cleaned.forEach(function(t, i) {
+    if (!vectors[i]) vectors[i] = fresh[missing.get(t)];
+  });
+  return vectors;
 }
 
 // ── Qdrant Helpers ──
 
-async function qdrantRequest(method, path, body) {
+// Cap on concurrent Qdrant HTTP calls from this process. Background work
+// (the matching cycle) runs under withQdrantConcurrency() instead: its own
+// limiter, carried through its async calls, so it cannot saturate the
+// cluster and never throttles request handlers sharing this one.
+var qdrantLimit = createLimiter(parseInt(process.env.QDRANT_CONCURRENCY || '16', 10));
+var qdrantLimitScope = new AsyncLocalStorage();
+
+// Runs fn() with every Qdrant call it makes (directly or in anything it
+// awaits) capped at max concurrent requests. Resolves with fn's result.
+function withQdrantConcurrency(max, fn) {
+  return qdrantLimitScope.run(createLimiter(max), fn);
+}
+
+function qdrantRequest(method, path, body) {
+  var limit = qdrantLimitScope.getStore() || qdrantLimit;
+  return limit(function() { return qdrantRequestNow(method, path, body); });
+}
+
+async function qdrantRequestNow(method, path, body) {
   var opts = {
     method: method,
     headers: {
@@ -92,8 +136,160 @@ async function qdrantRequest(method, path, body) {
   return resp.json();
 }
 
+// ── Vector cache ──
+// Bounded LRU of stored point vectors, one per collection, so matching does
+// not pull the same 1536-dim vectors over the network on every pair. Rows
+// live in one preallocated Float32Array slab (capacity × dims) rather than as
+// JSON number arrays; Qdrant stores float32, so the conversion is lossless.
+// The Map gives key → slot and recency order (entries are re-inserted on hit).
+// Upserts through this module write through and deletes invalidate; the TTL
+// bounds staleness from writes made by other processes.
+
+var VECTOR_CACHE_SIZE = parseInt(process.env.VECTOR_CACHE_SIZE || '4096', 10);
+var VECTOR_CACHE_TTL_MS = parseInt(process.env.VECTOR_CACHE_TTL_MS || String(60 * 60 * 1000), 10);
+var VECTOR_FETCH_BATCH = 256;
+
+var vectorCaches = {};
+
+function createVectorCache(capacity, dims) {
+  var slab = null; // allocated on first put
+  var entries = new Map(); // key -> { slot, at }
+  var freeSlots = [];
+  var nextSlot = 0;
+  var stats = { hits: 0, misses: 0, evictions: 0, invalidations: 0 };
+
+  function get(id) {
+    var key = String(id);
+    var e = entries.get(key);
+    if (!e || Date.now() - e.at > VECTOR_CACHE_TTL_MS) {
+      if (e) { entries.delete(key); freeSlots.push(e.slot); }
+      stats.misses++;
+      return null;
+    }
+    entries.delete(key);
+    entries.set(key, e);
+    stats.hits++;
+    return slab.slice(e.slot * dims, (e.slot + 1) * dims);
+  }
+
+  function put(id, vector) {
+    if (!vector || vector.length !== dims) return;
+    if (!slab) slab = new Float32Array(capacity * dims);
+    var key = String(id);
+    var e = entries.get(key);
+    if (e) {
+      entries.delete(key);
+    } else {
+      var slot;
+      if (freeSlots.length) slot = freeSlots.pop();
+      else if (nextSlot < capacity) slot = nextSlot++;
+      else {
+        var oldest = entries.keys().next().value;
+        slot = entries.get(oldest).slot;
+        entries.delete(oldest);
+        stats.evictions++;
+      }
+      e = { slot: slot, at: 0 };
+    }
+    e.at = Date.now();
+    slab.set(vector, e.slot * dims);
+    entries.set(key, e);
+  }
+
+  // Presence check that does not count as a lookup or touch recency
+  function has(id) {
+    var e = entries.get(String(id));
+    return !!e && Date.now() - e.at <= VECTOR_CACHE_TTL_MS;
+  }
+
+  function invalidate(id) {
+    var key = String(id);
+    var e = entries.get(key);
+    if (!e) return;
+    entries.delete(key);
+    freeSlots.push(e.slot);
+    stats.invalidations++;
+  }
+
+  return {
+    get: get,
+    has: has,
+    put: put,
+    invalidate: invalidate,
+    stats: function() {
+      return Object.assign({ size: entries.size, capacity: capacity }, stats);
+    }
+  };
+}
+
+function vectorCacheFor(collection) {
+  if (!vectorCaches[collection]) vectorCaches[collection] = createVectorCache(VECTOR_CACHE_SIZE, EMBEDDING_DIMS);
+  return vectorCaches[collection];
+}
+
+function getVectorCacheStats() {
+  var out = {};
+  Object.keys(vectorCaches).forEach(function(c) {
+    var st = vectorCaches[c].stats();
+    var lookups = st.hits + st.misses;
+    st.hit_rate = lookups ? Math.round(st.hits / lookups * 1000) / 1000 : null;
+    out[c] = st;
+  });
+  return out;
+}
+
+// Qdrant's JSON body needs plain arrays, not typed arrays
+function plainVector(v) {
+  return ArrayBuffer.isView(v) ? Array.from(v) : v;
+}
+
+// ── Vector backend ──
+// VECTOR_BACKEND=qdrant (default): everything goes to Qdrant Cloud.
+// VECTOR_BACKEND=local: an in-process index (lib/local_vector_index.js) is
+//   the only store — no Qdrant needed (tests, single-node deployments).
+// VECTOR_BACKEND=hybrid: writes go to both; reads for a collection switch to
+//   the local index once warmLocalIndex() has loaded all of it.
+// The local index warm-loads from a snapshot file, else from Postgres rows +
+// the embedding cache (+ Qdrant for cache misses in hybrid mode), and is
+// snapshotted periodically.
+
+var VECTOR_BACKEND = (process.env.VECTOR_BACKEND || 'qdrant').toLowerCase();
+var LOCAL_INDEX_SNAPSHOT_DIR = process.env.LOCAL_INDEX_SNAPSHOT_DIR || path.join(os.tmpdir(), 'em_vector_index');
+var LOCAL_INDEX_SNAPSHOT_MAX_AGE_MS = 6 * 60 * 60 * 1000;
+var LOCAL_INDEX_SNAPSHOT_INTERVAL_MS = 10 * 60 * 1000;
+
+var localCollections = {};
+var localWarm = {};
+var localDirty = {};
+
+function localCollection(name) {
+  if (!localCollections[name]) localCollections[name] = createLocalCollection(EMBEDDING_DIMS);
+  return localCollections[name];
+}
+
+function writesToQdrant() {
+  return VECTOR_BACKEND !== 'local';
+}
+
+function writesToLocal() {
+  return VECTOR_BACKEND !== 'qdrant';
+}
+
+function readsFromLocal(collection) {
+  return VECTOR_BACKEND === 'local' || (VECTOR_BACKEND === 'hybrid' && !!localWarm[collection]);
+}
+
+function localUpsert(collection, points) {
+  var index = localCollection(collection);
+  points.forEach(function(p) { index.upsert(p.id, p.vector, p.payload || {}); });
+  localDirty[collection] = true;
+}
+
 // Ensure collection exists (idempotent)
 async function ensureCollection(name) {
+  if (writesToLocal()) localCollection(name);
+  if (!writesToQdrant()) return true;
+
   // Check if exists
   var check = await fetch(QDRANT_URL + '/collections/' + name, {
     headers: { 'api-key': QDRANT_API_KEY }
@@ -123,29 +319,34 @@ async function initCollections() {
   }
 }
 
-// Upsert a single point
+// Upsert a single point (writes through to the vector cache)
 async function upsertPoint(collection, id, vector, payload) {
-  return qdrantRequest('PUT', '/collections/' + collection + '/points', {
-    points: [{
-      id: id,
-      vector: vector,
-      payload: payload || {}
-    }]
-  });
+  return upsertPoints(collection, [{ id: id, vector: vector, payload: payload || {} }]);
 }
 
 // Upsert multiple points (batch)
 async function upsertPoints(collection, points) {
   if (!points || !points.length) return null;
-  return qdrantRequest('PUT', '/collections/' + collection + '/points', {
-    points: points
+  if (writesToLocal()) localUpsert(collection, points);
+  var result = !writesToQdrant() ? { result: { status: 'completed' }, status: 'ok' } :
+    await qdrantRequest('PUT', '/collections/' + collection + '/points', {
+      points: points.map(function(p) { return Object.assign({}, p, { vector: plainVector(p.vector) }); })
+    });
+  var cache = vectorCacheFor(collection);
+  points.forEach(function(p) {
+    if (result) cache.put(p.id, p.vector);
+    else cache.invalidate(p.id);
   });
+  return result;
 }
 
 // Search by vector
 async function searchByVector(collection, vector, limit, filter) {
+  if (readsFromLocal(collection)) {
+    return { result: localCollection(collection).search(vector, limit || 10, filter), status: 'ok' };
+  }
   var body = {
-    vector: vector,
+    vector: plainVector(vector),
     limit: limit || 10,
     with_payload: true
   };
@@ -155,6 +356,12 @@ async function searchByVector(collection, vector, limit, filter) {
 
 // Delete a point by ID
 async function deletePoint(collection, id) {
+  vectorCacheFor(collection).invalidate(id);
+  if (writesToLocal()) {
+    localCollection(collection).remove(id);
+    localDirty[collection] = true;
+  }
+  if (!writesToQdrant()) return { result: { status: 'completed' }, status: 'ok' };
   return qdrantRequest('POST', '/collections/' + collection + '/points/delete', {
     points: [id]
   });
@@ -192,15 +399,19 @@ async function embedProfile(profile, user) {
 
   var pointId = 'user_' + profile.user_id;
   // Qdrant needs numeric or UUID IDs — use user_id as integer
-  await upsertPoint(COLLECTIONS.profiles, profile.user_id, vector, {
+  await upsertPoint(COLLECTIONS.profiles, profile.user_id, vector, profilePayload(profile, text));
+
+  return pointId;
+}
+
+function profilePayload(profile, text) {
+  return {
     user_id: profile.user_id,
     stakeholder_type: profile.stakeholder_type,
     themes: profile.themes || [],
     geography: profile.geography,
     text: text
-  });
-
-  return pointId;
+  };
 }
 
 // ── High-Level: Embed & Upsert Event ──
@@ -225,7 +436,13 @@ async function embedEvent(event) {
   var vector = await getEmbedding(text);
   if (!vector) return null;
 
-  await upsertPoint(COLLECTIONS.events, event.id, vector, {
+  await upsertPoint(COLLECTIONS.events, event.id, vector, eventPayload(event, text));
+
+  return 'event_' + event.id;
+}
+
+function eventPayload(event, text) {
+  return {
     event_id: event.id,
     name: event.name,
     themes: event.themes || [],
@@ -233,9 +450,7 @@ async function embedEvent(event) {
     country: event.country,
     event_date: event.event_date,
     text: text
-  });
-
-  return 'event_' + event.id;
+  };
 }
 
 // ── High-Level: Embed & Upsert Signal ──
@@ -259,7 +474,13 @@ async function embedSignal(signal) {
   var vector = await getEmbedding(text);
   if (!vector) return null;
 
-  await upsertPoint(COLLECTIONS.signals, signal.id, vector, {
+  await upsertPoint(COLLECTIONS.signals, signal.id, vector, signalPayload(signal, text));
+
+  return 'signal_' + signal.id;
+}
+
+function signalPayload(signal, text) {
+  return {
     signal_id: signal.id,
     source_type: signal.source_type,
     entity_name: signal.entity_name,
@@ -269,19 +490,19 @@ async function embedSignal(signal) {
     cost_of_signal: signal.cost_of_signal,
     signal_date: signal.signal_date,
     text: text
-  });
-
-  return 'signal_' + signal.id;
+  };
 }
 
 // ── Batch Embed Signals ──
+// Resolves to the ids of the signals that were embedded and stored; any
+// other id failed (no vector back, or its upsert was rejected).
 
 async function embedSignalsBatch(signals) {
-  if (!signals || !signals.length) return 0;
+  if (!signals || !signals.length) return [];
 
   var texts = signals.map(buildSignalText);
   var vectors = await getEmbeddings(texts);
-  if (!vectors.length) return 0;
+  if (!vectors.length) return [];
 
   var points = [];
   for (var i = 0; i < signals.length; i++) {
@@ -289,30 +510,20 @@ async function embedSignalsBatch(signals) {
       points.push({
         id: signals[i].id,
         vector: vectors[i],
-        payload: {
-          signal_id: signals[i].id,
-          source_type: signals[i].source_type,
-          entity_name: signals[i].entity_name,
-          theme: signals[i].theme,
-          themes: signals[i].themes_json || [],
-          lifecycle_stage: signals[i].lifecycle_stage,
-          cost_of_signal: signals[i].cost_of_signal,
-          signal_date: signals[i].signal_date,
-          text: texts[i]
-        }
+        payload: signalPayload(signals[i], texts[i])
       });
     }
   }
 
-  if (points.length) {
-    // Qdrant batch limit is ~100 points per call
-    for (var j = 0; j < points.length; j += 100) {
-      var batch = points.slice(j, j + 100);
-      await upsertPoints(COLLECTIONS.signals, batch);
+  var stored = [];
+  // Qdrant batch limit is ~100 points per call
+  for (var j = 0; j < points.length; j += 100) {
+    var batch = points.slice(j, j + 100);
+    if (await upsertPoints(COLLECTIONS.signals, batch)) {
+      batch.forEach(function(p) { stored.push(p.id); });
     }
   }
-
-  return points.length;
+  return stored;
 }
 
 // ── Search Helpers ──
@@ -346,28 +557,79 @@ async function searchSimilarEvents(vector, limit) {
 }
 // ── Retrieve stored vectors ──
 
+// Returned vectors are Float32Array copies out of the cache; callers that
+// send one back to Qdrant go through plainVector().
+
 async function getPointVector(collection, pointId) {
-  var result = await qdrantRequest('POST', '/collections/' + collection + '/points', {
-    ids: [pointId],
-    with_vector: true
+  var vectors = await getPointVectors(collection, [pointId]);
+  return vectors[pointId] || null;
+}
+
+// Fetch ids missing from the cache in batches of VECTOR_FETCH_BATCH and store
+// them. Capped at the cache capacity so a long list cannot evict its own
+// head. Returns the number of ids fetched from Qdrant.
+async function prefetchVectors(collection, pointIds) {
+  if (readsFromLocal(collection)) return 0;
+  var cache = vectorCacheFor(collection);
+  var missing = [];
+  var seen = new Set();
+  (pointIds || []).forEach(function(id) {
+    var key = String(id);
+    if (seen.has(key)) return;
+    seen.add(key);
+    if (!cache.has(id)) missing.push(id);
   });
-  if (result && result.result && result.result.length > 0) {
-    return result.result[0].vector;
+  missing = missing.slice(0, VECTOR_CACHE_SIZE);
+  if (!missing.length) return 0;
+
+  var batches = [];
+  for (var i = 0; i < missing.length; i += VECTOR_FETCH_BATCH) {
+    batches.push(missing.slice(i, i + VECTOR_FETCH_BATCH));
   }
-  return null;
+  await Promise.all(batches.map(async function(ids) {
+    var result = await qdrantRequest('POST', '/collections/' + collection + '/points', {
+      ids: ids,
+      with_vector: true
+    });
+    if (result && result.result) {
+      result.result.forEach(function(p) { cache.put(p.id, p.vector); });
+    }
+  }));
+  return missing.length;
 }
 
 async function getPointVectors(collection, pointIds) {
   if (!pointIds || !pointIds.length) return {};
-  var result = await qdrantRequest('POST', '/collections/' + collection + '/points', {
-    ids: pointIds,
-    with_vector: true
-  });
+  if (readsFromLocal(collection)) {
+    var local = localCollection(collection);
+    var found = {};
+    pointIds.forEach(function(id) {
+      var v = local.get(id);
+      if (v) found[id] = v;
+    });
+    return found;
+  }
+  var cache = vectorCacheFor(collection);
   var vectors = {};
-  if (result && result.result) {
-    result.result.forEach(function(p) {
-      vectors[p.id] = p.vector;
+  var missing = [];
+  pointIds.forEach(function(id) {
+    var v = cache.get(id);
+    if (v) vectors[id] = v;
+    else missing.push(id);
+  });
+  if (!missing.length) return vectors;
+
+  for (var i = 0; i < missing.length; i += VECTOR_FETCH_BATCH) {
+    var result = await qdrantRequest('POST', '/collections/' + collection + '/points', {
+      ids: missing.slice(i, i + VECTOR_FETCH_BATCH),
+      with_vector: true
     });
+    if (result && result.result) {
+      result.result.forEach(function(p) {
+        cache.put(p.id, p.vector);
+        vectors[p.id] = Float32Array.from(p.vector);
+      });
+    }
   }
   return vectors;
 }
@@ -397,6 +659,59 @@ async function findCandidates(userId, eventRegistrantIds, limit) {
   });
 }
 
+// ── Vector math ──
+
+// Pack vectors into one row-major Float32Array slab, L2-normalised so cosine
+// similarity becomes a plain dot product. Missing vectors become zero rows.
+function packNormalized(vectors, dims) {
+  dims = dims || EMBEDDING_DIMS;
+  var slab = new Float32Array(vectors.length * dims);
+  for (var i = 0; i < vectors.length; i++) {
+    var v = vectors[i];
+    if (!v || v.length !== dims) continue;
+    var norm = 0;
+    for (var d = 0; d < dims; d++) norm += v[d] * v[d];
+    if (norm === 0) continue;
+    var inv = 1 / Math.sqrt(norm);
+    var off = i * dims;
+    for (var d2 = 0; d2 < dims; d2++) slab[off + d2] = v[d2] * inv;
+  }
+  return slab;
+}
+
+// Full n×n cosine similarity matrix in one pass over a packed slab. Only the
+// upper triangle is computed; the result is mirrored. Returns Float32Array(n*n).
+function similarityMatrix(vectors, dims) {
+  dims = dims || EMBEDDING_DIMS;
+  return similarityMatrixFromSlab(packNormalized(vectors, dims), vectors.length, dims);
+}
+
+// Same, for rows already packed by packNormalized (e.g. handed to a worker).
+function similarityMatrixFromSlab(slab, n, dims) {
+  dims = dims || EMBEDDING_DIMS;
+  var out = new Float32Array(n * n);
+  for (var i = 0; i < n; i++) {
+    var oi = i * dims;
+    out[i * n + i] = 1;
+    for (var j = i + 1; j < n; j++) {
+      var oj = j * dims;
+      var s0 = 0, s1 = 0, s2 = 0, s3 = 0;
+      var d = 0;
+      for (; d + 3 < dims; d += 4) {
+        s0 += slab[oi + d] * slab[oj + d];
+        s1 += slab[oi + d + 1] * slab[oj + d + 1];
+        s2 += slab[oi + d + 2] * slab[oj + d + 2];
+        s3 += slab[oi + d + 3] * slab[oj + d + 3];
+      }
+      for (; d < dims; d++) s0 += slab[oi + d] * slab[oj + d];
+      var s = s0 + s1 + s2 + s3;
+      out[i * n + j] = s;
+      out[j * n + i] = s;
+    }
+  }
+  return out;
+}
+
 // ── Intent/Offering Collections ──
 
 var INTENT_OFFERING_COLLECTIONS = {
@@ -414,54 +729,52 @@ async function ensureCollections() {
   }
 }
 
+function parseMaybeJson(raw) {
+  if (typeof raw === 'string') {
+    try { raw = JSON.parse(raw); } catch(e) {}
+  }
+  return raw;
+}
+
+function buildIntentText(profile) {
+  var intentRaw = parseMaybeJson(profile.intent);
+  var intentText = intentRaw ? JSON.stringify(intentRaw) : '';
+  if (profile.focus_text) intentText = intentText + ' ' + profile.focus_text;
+  return intentText.trim();
+}
+
+function buildOfferingText(profile) {
+  var offeringRaw = parseMaybeJson(profile.offering);
+  return (offeringRaw ? JSON.stringify(offeringRaw) : '').trim();
+}
+
+function intentOfferingPayload(profile, text) {
+  return {
+    user_id: profile.user_id,
+    stakeholder_type: profile.stakeholder_type,
+    text: text.slice(0, 500)
+  };
+}
+
 async function embedIntentOffering(profile, user) {
   var intentId = null;
   var offeringId = null;
 
   try {
-    // Build intent text
-    var intentRaw = profile.intent;
-    var intentText = '';
-    if (intentRaw) {
-      if (typeof intentRaw === 'string') {
-        try { intentRaw = JSON.parse(intentRaw); } catch(e) {}
-      }
-      if (intentRaw) intentText = JSON.stringify(intentRaw);
-    }
-    if (profile.focus_text) intentText = intentText + ' ' + profile.focus_text;
-    intentText = intentText.trim();
-
+    var intentText = buildIntentText(profile);
     if (intentText) {
       var intentVector = await getEmbedding(intentText);
       if (intentVector) {
-        await upsertPoint(INTENT_OFFERING_COLLECTIONS.intents, profile.user_id, intentVector, {
-          user_id: profile.user_id,
-          stakeholder_type: profile.stakeholder_type,
-          text: intentText.slice(0, 500)
-        });
+        await upsertPoint(INTENT_OFFERING_COLLECTIONS.intents, profile.user_id, intentVector, intentOfferingPayload(profile, intentText));
         intentId = 'intent_' + profile.user_id;
       }
     }
 
-    // Build offering text
-    var offeringRaw = profile.offering;
-    var offeringText = '';
-    if (offeringRaw) {
-      if (typeof offeringRaw === 'string') {
-        try { offeringRaw = JSON.parse(offeringRaw); } catch(e) {}
-      }
-      if (offeringRaw) offeringText = JSON.stringify(offeringRaw);
-    }
-    offeringText = offeringText.trim();
-
+    var offeringText = buildOfferingText(profile);
     if (offeringText) {
       var offeringVector = await getEmbedding(offeringText);
       if (offeringVector) {
-        await upsertPoint(INTENT_OFFERING_COLLECTIONS.offerings, profile.user_id, offeringVector, {
-          user_id: profile.user_id,
-          stakeholder_type: profile.stakeholder_type,
-          text: offeringText.slice(0, 500)
-        });
+        await upsertPoint(INTENT_OFFERING_COLLECTIONS.offerings, profile.user_id, offeringVector, intentOfferingPayload(profile, offeringText));
         offeringId = 'offering_' + profile.user_id;
       }
     }
@@ -472,52 +785,222 @@ async function embedIntentOffering(profile, user) {
   return { intentId: intentId, offeringId: offeringId };
 }
 
-async function backfillUnembeddedProfiles() {
-  var success = 0;
-  var failed = 0;
-  try {
-    var { dbAll, dbRun } = require('../db');
-    var profiles = await dbAll(
-      'SELECT sp.*, u.name, u.company FROM stakeholder_profiles sp JOIN users u ON u.id = sp.user_id WHERE sp.embedding_updated_at IS NULL AND (sp.stakeholder_type IS NOT NULL OR sp.focus_text IS NOT NULL OR sp.themes IS NOT NULL) ORDER BY sp.updated_at DESC'
-    );
-    console.log('[backfill] Found ' + profiles.length + ' profiles to embed');
-
-    for (var i = 0; i < profiles.length; i++) {
-      var profile = profiles[i];
-      var user = { name: profile.name, company: profile.company };
-      try {
-        var vectorId = await embedProfile(profile, user);
-        if (vectorId) {
-          await dbRun(
-            'UPDATE stakeholder_profiles SET qdrant_vector_id = $1, embedding_updated_at = NOW() WHERE user_id = $2',
-            [vectorId, profile.user_id]
-          );
-        }
-        await embedIntentOffering(profile, user);
-        success++;
-        console.log('[backfill] Embedded user ' + profile.user_id + ' (' + (i + 1) + '/' + profiles.length + ')');
-      } catch (err) {
-        failed++;
-        console.error('[backfill] Failed user ' + profile.user_id + ':', err.message);
+// Batched, rate-limited, resumable — see lib/embedding_backfill.js
+async function backfillUnembeddedProfiles(options) {
+  return require('./embedding_backfill').runProfileBackfill(options);
+}
+
+// ── Local index warm-load ──
+
+var WARM_PAGE = 2000;
+
+// Postgres source for each collection: keyset-paged rows → { id, text, payload }
+function warmSources() {
+  var profileRows = function(after) {
+    return require('../db').dbAll(
+      `SELECT sp.*, u.name, u.company FROM stakeholder_profiles sp JOIN users u ON u.id = sp.user_id
+       WHERE (sp.stakeholder_type IS NOT NULL OR sp.focus_text IS NOT NULL OR sp.themes IS NOT NULL)
+         AND sp.user_id > $1 ORDER BY sp.user_id LIMIT $2`, [after, WARM_PAGE]);
+  };
+  var sources = {};
+  sources[COLLECTIONS.profiles] = {
+    rows: profileRows,
+    key: 'user_id',
+    point: function(r) {
+      var text = buildProfileText(r, { name: r.name, company: r.company });
+      return text ? { id: r.user_id, text: text, payload: profilePayload(r, text) } : null;
+    }
+  };
+  sources[INTENT_OFFERING_COLLECTIONS.intents] = {
+    rows: profileRows,
+    key: 'user_id',
+    point: function(r) {
+      var text = buildIntentText(r);
+      return text ? { id: r.user_id, text: text, payload: intentOfferingPayload(r, text) } : null;
+    }
+  };
+  sources[INTENT_OFFERING_COLLECTIONS.offerings] = {
+    rows: profileRows,
+    key: 'user_id',
+    point: function(r) {
+      var text = buildOfferingText(r);
+      return text ? { id: r.user_id, text: text, payload: intentOfferingPayload(r, text) } : null;
+    }
+  };
+  sources[COLLECTIONS.events] = {
+    rows: function(after) {
+      return require('../db').dbAll('SELECT * FROM events WHERE id > $1 ORDER BY id LIMIT $2', [after, WARM_PAGE]);
+    },
+    key: 'id',
+    point: function(r) {
+      var text = buildEventText(r);
+      return text ? { id: r.id, text: text, payload: eventPayload(r, text) } : null;
+    }
+  };
+  sources[COLLECTIONS.signals] = {
+    rows: function(after) {
+      return require('../db').dbAll('SELECT * FROM unified_signals WHERE id > $1 ORDER BY id LIMIT $2', [after, WARM_PAGE]);
+    },
+    key: 'id',
+    point: function(r) {
+      var text = buildSignalText(r);
+      return text ? { id: r.id, text: text, payload: signalPayload(r, text) } : null;
+    }
+  };
+  return sources;
+}
+
+// Stored vectors for ids straight from Qdrant (not via the local index,
+// which may be the thing being rebuilt). Returns { vectors, failed }:
+// failed holds the ids of batches whose request failed; any other id not
+// in vectors is one Qdrant does not have.
+async function fetchQdrantVectors(collection, ids) {
+  var out = { vectors: {}, failed: new Set() };
+  for (var i = 0; i < ids.length; i += VECTOR_FETCH_BATCH) {
+    var batch = ids.slice(i, i + VECTOR_FETCH_BATCH);
+    var result = await qdrantRequest('POST', '/collections/' + collection + '/points', {
+      ids: batch,
+      with_vector: true
+    }).catch(function(err) {
+      console.error('[vector_search] Qdrant point fetch failed:', err.message);
+      return null;
+    });
+    if (!result || !result.result) {
+      batch.forEach(function(id) { out.failed.add(String(id)); });
+      continue;
+    }
+    result.result.forEach(function(p) { if (p.vector) out.vectors[p.id] = Float32Array.from(p.vector); });
+  }
+  return out;
+}
+
+// Rebuild one collection from Postgres. Vectors come from the embedding
+// cache; texts not in it are embedded only when embedMissing is set. When
+// Qdrant is also written (hybrid), cache misses are read back from Qdrant —
+// points upserted before the embedding cache existed are only there.
+// Returns { loaded, missing, absent }: missing points may exist but could
+// not be loaded; absent ones Qdrant confirmed it does not have either.
+async function warmFromPostgres(name, source, embedMissing) {
+  var index = localCollection(name);
+  var loaded = 0;
+  var missing = 0;
+  var absent = 0;
+  var after = 0;
+  for (;;) {
+    var rows = await source.rows(after);
+    if (!rows.length) break;
+    after = rows[rows.length - 1][source.key];
+    var points = rows.map(function(r) {
+      try { return source.point(r); } catch (e) { return null; }
+    }).filter(Boolean);
+    if (!points.length) continue;
+    var texts = points.map(function(p) { return p.text.slice(0, EMBEDDING_MAX_CHARS); });
+    var vectors = embedMissing ? await getEmbeddings(texts) : await lookupEmbeddings(EMBEDDING_MODEL, texts);
+    var stored = null;
+    if (!embedMissing && writesToQdrant()) {
+      var gaps = points.filter(function(p, i) { return !vectors[i]; }).map(function(p) { return p.id; });
+      if (gaps.length) {
+        stored = await fetchQdrantVectors(name, gaps);
+        points.forEach(function(p, i) { if (!vectors[i] && stored.vectors[p.id]) vectors[i] = stored.vectors[p.id]; });
       }
-      // Rate-limit OpenAI
-      await new Promise(function(r) { setTimeout(r, 100); });
     }
-  } catch (err) {
-    console.error('[backfill] Fatal error:', err.message);
+    points.forEach(function(p, i) {
+      if (vectors[i]) {
+        if (index.upsert(p.id, vectors[i], p.payload)) loaded++;
+        else missing++;
+      } else if (stored && !stored.failed.has(String(p.id))) {
+        absent++;
+      } else {
+        missing++;
+      }
+    });
+  }
+  return { loaded: loaded, missing: missing, absent: absent };
+}
+
+// Load every collection into the local index: snapshot if fresh, else
+// Postgres. options.embedMissing defaults to true for VECTOR_BACKEND=local.
+async function warmLocalIndex(options) {
+  options = options || {};
+  var embedMissing = options.embedMissing !== undefined ? options.embedMissing : VECTOR_BACKEND === 'local';
+  var sources = warmSources();
+  var report = {};
+  var names = Object.keys(sources);
+  for (var i = 0; i < names.length; i++) {
+    var name = names[i];
+    var t0 = Date.now();
+    try {
+      var snap = options.fromPostgres ? null : await loadSnapshot(LOCAL_INDEX_SNAPSHOT_DIR, name, LOCAL_INDEX_SNAPSHOT_MAX_AGE_MS);
+      if (snap) {
+        localCollection(name).load(snap.meta, snap.vectors);
+        report[name] = { source: 'snapshot', loaded: snap.meta.ids.length };
+      } else {
+        var r = await warmFromPostgres(name, sources[name], embedMissing);
+        report[name] = Object.assign({ source: 'postgres' }, r);
+        localDirty[name] = true;
+      }
+      // Hybrid reads only switch to a complete index; with points missing
+      // they stay on Qdrant (and the collection is not snapshotted) until a
+      // later warm-load gets them all. VECTOR_BACKEND=local has nowhere else
+      // to read.
+      localWarm[name] = VECTOR_BACKEND === 'local' || !report[name].missing;
+      if (!localWarm[name]) {
+        console.warn('[vector_search] ' + name + ': ' + report[name].missing + ' point(s) missing locally — reads stay on Qdrant');
+      }
+      report[name].warm = localWarm[name];
+      report[name].ms = Date.now() - t0;
+    } catch (err) {
+      console.error('[vector_search] warm-load ' + name + ' failed:', err.message);
+      report[name] = { error: err.message };
+    }
   }
-  console.log('[backfill] Complete. success=' + success + ' failed=' + failed);
-  return { success: success, failed: failed };
+  console.log('[vector_search] Local index warm (' + VECTOR_BACKEND + '): ' + JSON.stringify(report));
+  await saveLocalIndexSnapshots();
+  return report;
+}
+
+async function saveLocalIndexSnapshots() {
+  var names = Object.keys(localDirty).filter(function(n) { return localDirty[n] && localWarm[n]; });
+  for (var i = 0; i < names.length; i++) {
+    try {
+      localDirty[names[i]] = false;
+      await saveSnapshot(LOCAL_INDEX_SNAPSHOT_DIR, names[i], localCollections[names[i]]);
+    } catch (err) {
+      localDirty[names[i]] = true;
+      console.error('[vector_search] snapshot ' + names[i] + ' failed:', err.message);
+    }
+  }
+}
+
+// Boot hook: no-op for VECTOR_BACKEND=qdrant
+async function startLocalVectorIndex() {
+  if (VECTOR_BACKEND === 'qdrant') return null;
+  var report = await warmLocalIndex();
+  setInterval(function() {
+    saveLocalIndexSnapshots();
+  }, LOCAL_INDEX_SNAPSHOT_INTERVAL_MS);
+  return report;
+}
+
+function getLocalIndexStats() {
+  var out = { backend: VECTOR_BACKEND, collections: {} };
+  Object.keys(localCollections).forEach(function(n) {
+    out.collections[n] = Object.assign({ warm: !!localWarm[n] }, localCollections[n].stats());
+  });
+  return out;
 }
 
 module.exports = {
   // Core
   getEmbedding,
   getEmbeddings,
+  getEmbeddingCacheStats,
   COLLECTIONS,
 
   // Qdrant ops
   initCollections,
+  ensureCollection,
+  withQdrantConcurrency,
   upsertPoint,
   upsertPoints,
   searchByVector,
@@ -526,11 +1009,25 @@ module.exports = {
   // Vector retrieval
   getPointVector,
   getPointVectors,
+  prefetchVectors,
+  getVectorCacheStats,
   findCandidates,
 
+  // Local backend
+  warmLocalIndex,
+  startLocalVectorIndex,
+  saveLocalIndexSnapshots,
+  getLocalIndexStats,
+
+  // Vector math
+  packNormalized,
+  similarityMatrix,
+  similarityMatrixFromSlab,
+
   // High-level embed + upsert
   embedProfile,
   buildProfileText,
+  profilePayload,
   embedEvent,
   buildEventText,
   embedSignal,
@@ -538,7 +1035,11 @@ module.exports = {
   embedSignalsBatch,
 
   // Intent/offering collections
+  INTENT_OFFERING_COLLECTIONS,
   ensureCollections,
+  buildIntentText,
+  buildOfferingText,
+  intentOfferingPayload,
   embedIntentOffering,
   backfillUnembeddedProfiles,
 
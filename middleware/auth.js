@@ -1,4 +1,4 @@
-var { dbGet } = require('../db');
+var { lookupSession } = require('../lib/session_cache');
 
 async function authenticateToken(req, res, next) {
   var authHeader = req.headers.authorization;
@@ -8,13 +8,10 @@ async function authenticateToken(req, res, next) {
   if (!token) return res.status(401).json({ error: 'No token' });
 
   try {
-    var session = await dbGet(
-      'SELECT user_id FROM sessions WHERE token = $1 AND expires_at > NOW()',
-      [token]
-    );
-    if (!session) return res.status(401).json({ error: 'Invalid or expired token' });
+    var userId = await lookupSession(token);
+    if (userId == null) return res.status(401).json({ error: 'Invalid or expired token' });
 
-    req.user = { id: session.user_id };
+    req.user = { id: userId };
     next();
   } catch (err) {
     console.error('Auth middleware error:', err);
@@ -31,11 +28,8 @@ async function optionalAuth(req, res, next) {
   if (!token) return next();
 
   try {
-    var session = await dbGet(
-      'SELECT user_id FROM sessions WHERE token = $1 AND expires_at > NOW()',
-      [token]
-    );
-    if (session) req.user = { id: session.user_id };
+    var userId = await lookupSession(token);
+    if (userId != null) req.user = { id: userId };
   } catch (err) {
     // Silent fail for optional auth
   }
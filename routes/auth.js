@@ -3,6 +3,7 @@ var crypto = require('crypto');
 var bcrypt = require('bcryptjs');
 var { dbGet, dbRun } = require('../db');
 var { authenticateToken } = require('../middleware/auth');
+var { invalidateSessionToken } = require('../lib/session_cache');
 var { authLimiter, signupLimiter, magicSendLimiter } = require('../middleware/anti_abuse');
 
 var router = express.Router();
@@ -216,6 +217,7 @@ router.post('/logout', authenticateToken, async function(req, res) {
   try {
     var token = req.headers.authorization.replace('Bearer ', '');
     await dbRun('DELETE FROM sessions WHERE token = $1', [token]);
+    await invalidateSessionToken(token);
     res.json({ ok: true });
   } catch (err) {
     console.error('Logout error:', err);
@@ -22,7 +22,6 @@ router.get('/mine', authenticateToken, async function(req, res) {
   try {
     var communities = await dbAll(
       `SELECT c.*, cm.role, cm.joined_at,
-        (SELECT COUNT(*) FROM community_members WHERE community_id = c.id) as member_count,
         (SELECT COUNT(*) FROM events WHERE community_id = c.id AND event_date >= CURRENT_DATE) as upcoming_events
        FROM communities c
        JOIN community_members cm ON cm.community_id = c.id
@@ -125,8 +124,7 @@ router.post('/join', authenticateToken, async function(req, res) {
 router.get('/:slug/public', async function(req, res) {
   try {
     var community = await dbGet(
-      `SELECT name, slug, description, created_at,
-        (SELECT COUNT(*) FROM community_members WHERE community_id = communities.id) as member_count,
+      `SELECT name, slug, description, created_at, member_count,
         (SELECT COUNT(*) FROM events WHERE community_id = communities.id AND event_date >= CURRENT_DATE) as upcoming_events
        FROM communities WHERE slug = $1 AND is_active = true`,
       [req.params.slug]
@@ -142,9 +140,7 @@ router.get('/:slug/public', async function(req, res) {
 router.get('/:slug', authenticateToken, async function(req, res) {
   try {
     var community = await dbGet(
-      `SELECT c.*,
-        (SELECT COUNT(*) FROM community_members WHERE community_id = c.id) as member_count
-       FROM communities c WHERE c.slug = $1 AND c.is_active = true`,
+      'SELECT c.* FROM communities c WHERE c.slug = $1 AND c.is_active = true',
       [req.params.slug]
     );
     if (!community) return res.status(404).json({ error: 'Community not found' });
@@ -158,8 +154,7 @@ router.get('/:slug', authenticateToken, async function(req, res) {
 
     // Get community events
     var events = await dbAll(
-      `SELECT e.*,
-        (SELECT COUNT(*) FROM event_registrations WHERE event_id = e.id AND status = 'active') as reg_count
+      `SELECT e.*, e.registration_count as reg_count
        FROM events e
        WHERE e.community_id = $1
        ORDER BY e.event_date ASC`,
@@ -229,7 +224,7 @@ router.post('/:slug/events', authenticateToken, async function(req, res) {
 router.get('/:slug/members', authenticateToken, async function(req, res) {
   try {
     var community = await dbGet(
-      'SELECT id FROM communities WHERE slug = $1 AND is_active = true', [req.params.slug]
+      'SELECT id, member_count FROM communities WHERE slug = $1 AND is_active = true', [req.params.slug]
     );
     if (!community) return res.status(404).json({ error: 'Community not found' });
 
@@ -261,11 +256,7 @@ router.get('/:slug/members', authenticateToken, async function(req, res) {
          GROUP BY sp.stakeholder_type`,
         [community.id]
       );
-      var total = await dbGet(
-        'SELECT COUNT(*) as total FROM community_members WHERE community_id = $1',
-        [community.id]
-      );
-      res.json({ stats: stats, total: parseInt(total.total) });
+      res.json({ stats: stats, total: community.member_count });
     }
   } catch (err) {
     console.error('Get members error:', err);
@@ -343,9 +334,7 @@ router.post('/:slug/regenerate-code', authenticateToken, async function(req, res
 router.get('/:slug/dashboard', authenticateToken, async function(req, res) {
   try {
     var community = await dbGet(
-      `SELECT c.*,
-        (SELECT COUNT(*) FROM community_members WHERE community_id = c.id) as member_count
-       FROM communities c WHERE c.slug = $1 AND c.is_active = true`,
+      'SELECT c.* FROM communities c WHERE c.slug = $1 AND c.is_active = true',
       [req.params.slug]
     );
     if (!community) return res.status(404).json({ error: 'Community not found' });
@@ -372,7 +361,7 @@ router.get('/:slug/dashboard', authenticateToken, async function(req, res) {
     // Events in community with per-event match stats
     var events = await dbAll(
       `SELECT e.id, e.name, e.event_date, e.city,
-         (SELECT COUNT(*) FROM event_registrations WHERE event_id = e.id AND status = 'active') as reg_count,
+         e.registration_count as reg_count,
          (SELECT COUNT(*) FROM event_matches WHERE event_id = e.id) as match_count,
          (SELECT COUNT(*) FROM event_matches WHERE event_id = e.id
             AND user_a_decision = 'accept' AND user_b_decision = 'accept') as mutual_count,
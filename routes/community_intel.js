@@ -3,16 +3,13 @@
 // Pulse, event-triggers, suggest-match, member-moments, signals/inbound
 
 var express = require('express');
-var crypto = require('crypto');
 var router = express.Router();
 var { dbGet, dbRun, dbAll } = require('../db');
 var { logSignalOutcome } = require('../lib/outcome_logger');
 var { authenticateToken } = require('../middleware/auth');
 var { getCanonicalThemes, normalizeTheme } = require('../lib/theme_taxonomy');
-
-var ANTHROPIC_API_KEY = process.env.ANTHROPIC_API_KEY;
-var EDITORIAL_MODEL = process.env.EDITORIAL_MODEL || 'claude-sonnet-4-20250514';
-var PULSE_CACHE_TTL_HOURS = parseInt(process.env.PULSE_CACHE_TTL_HOURS) || 4;
+var { aggregatePulse } = require('../lib/pulse_aggregate');
+var { getPulse, generateEditorial } = require('../lib/pulse_engine');
 
 // ── Community owner auth ──
 async function communityOwnerAuth(req, res, next) {
@@ -35,56 +32,6 @@ async function communityOwnerAuth(req, res, next) {
   }
 }
 
-// ── Editorial generation via Claude ──
-async function generateEditorial(prompt, maxTokens) {
-  if (!ANTHROPIC_API_KEY) return '(Editorial generation requires API key)';
-  try {
-    var resp = await fetch('https://api.anthropic.com/v1/messages', {
-      method: 'POST',
-      headers: {
-        'x-api-key': ANTHROPIC_API_KEY,
-        'anthropic-version': '2023-06-01',
-        'content-type': 'application/json'
-      },
-      body: JSON.stringify({
-        model: EDITORIAL_MODEL,
-        max_tokens: maxTokens || 300,
-        messages: [{ role: 'user', content: prompt }]
-      })
-    });
-    if (!resp.ok) return '(Editorial generation unavailable)';
-    var data = await resp.json();
-    return data.content[0].text;
-  } catch (err) {
-    console.error('[community] Editorial generation error:', err.message);
-    return '(Editorial generation unavailable)';
-  }
-}
-
-// ── Cache helpers ──
-function cacheKey(communityId, params) {
-  var str = communityId + JSON.stringify(params);
-  return crypto.createHash('md5').update(str).digest('hex');
-}
-
-async function getCachedPulse(communityId, filterHash) {
-  var row = await dbGet(
-    'SELECT payload FROM pulse_cache WHERE community_id = $1 AND filter_hash = $2 AND expires_at > NOW()',
-    [communityId, filterHash]
-  );
-  return row ? row.payload : null;
-}
-
-async function setCachedPulse(communityId, filterHash, payload) {
-  await dbRun(
-    `INSERT INTO pulse_cache (community_id, filter_hash, payload, expires_at)
-     VALUES ($1, $2, $3, NOW() + INTERVAL '${PULSE_CACHE_TTL_HOURS} hours')
-     ON CONFLICT (community_id, filter_hash)
-     DO UPDATE SET payload = $3, generated_at = NOW(), expires_at = NOW() + INTERVAL '${PULSE_CACHE_TTL_HOURS} hours'`,
-    [communityId, filterHash, JSON.stringify(payload)]
-  );
-}
-
 // ══════════════════════════════════════════════════════
 // GET /api/community/:communityId/pulse
 // Aggregate signal intelligence
@@ -104,147 +51,10 @@ router.get('/:communityId/pulse', authenticateToken, communityOwnerAuth, async f
       theme = normalized;
     }
 
-    var filterHash = cacheKey(communityId, { region: region, theme: theme, action: action, period: period });
-
-    // Check cache
-    var cached = await getCachedPulse(communityId, filterHash);
-    if (cached) return res.json(typeof cached === 'string' ? JSON.parse(cached) : cached);
-
-    // Period to interval
-    var intervalMap = { '7d': '7 days', '30d': '30 days', '90d': '90 days' };
-    var interval = intervalMap[period] || '30 days';
-
-    // Fetch signals
-    var conditions = ['community_id = $1', "received_at > NOW() - INTERVAL '" + interval + "'"];
-    var params = [communityId];
-    var idx = 2;
-
-    if (region) { conditions.push('region = $' + idx); params.push(region); idx++; }
-    if (theme) { conditions.push('$' + idx + ' = ANY(theme_tags)'); params.push(theme); idx++; }
-    if (action) { conditions.push("metadata->>'signal_action' = $" + idx); params.push(action); idx++; }
-
-    var signals = await dbAll(
-      'SELECT * FROM community_signals WHERE ' + conditions.join(' AND ') + ' ORDER BY received_at DESC',
-      params
-    );
-
-    var signalCount = signals.length;
-
-    // K-anonymity check
-    if (signalCount < 5) {
-      return res.json({
-        period: period,
-        filters: { region: region, theme: theme, action: action },
-        insufficient_data: true,
-        message: 'Fewer than 5 signals for this filter combination'
-      });
-    }
-
-    // Compute heat score (normalized signal density)
-    // Compare current period to prior period
-    var priorSignals = await dbAll(
-      "SELECT COUNT(*) as count FROM community_signals WHERE community_id = $1 AND received_at > NOW() - INTERVAL '" + interval + "' * 2 AND received_at <= NOW() - INTERVAL '" + interval + "'",
-      [communityId]
-    );
-    var priorCount = parseInt(priorSignals[0] ? priorSignals[0].count : 0) || 1;
-    var heatScore = Math.min(1, signalCount / Math.max(priorCount * 1.5, 10));
-    var heatDelta = priorCount > 0 ? Math.round((signalCount - priorCount) / priorCount * 100) : 0;
-
-    // Aggregate action breakdown
-    var actionCounts = {};
-    var themeCounts = {};
-    for (var i = 0; i < signals.length; i++) {
-      var meta = signals[i].metadata || {};
-      if (typeof meta === 'string') { try { meta = JSON.parse(meta); } catch(e) { meta = {}; } }
-      var act = meta.signal_action || 'unknown';
-      actionCounts[act] = (actionCounts[act] || 0) + 1;
-      var tags = signals[i].theme_tags || [];
-      for (var t = 0; t < tags.length; t++) {
-        themeCounts[tags[t]] = (themeCounts[tags[t]] || 0) + 1;
-      }
-    }
-
-    // Find dominant action
-    var dominantAction = 'unknown';
-    var maxCount = 0;
-    for (var a in actionCounts) {
-      if (actionCounts[a] > maxCount) { maxCount = actionCounts[a]; dominantAction = a; }
-    }
-
-    // Build signal clusters (group by theme)
-    var clusters = [];
-    var sortedThemes = Object.keys(themeCounts).sort(function(a, b) { return themeCounts[b] - themeCounts[a]; });
-    for (var ti = 0; ti < Math.min(sortedThemes.length, 5); ti++) {
-      var ct = sortedThemes[ti];
-      var clusterSignals = signals.filter(function(s) { return (s.theme_tags || []).indexOf(ct) !== -1; });
-      var clusterActions = {};
-      for (var ci = 0; ci < clusterSignals.length; ci++) {
-        var cm = clusterSignals[ci].metadata || {};
-        if (typeof cm === 'string') { try { cm = JSON.parse(cm); } catch(e) { cm = {}; } }
-        var ca = cm.signal_action || 'unknown';
-        clusterActions[ca] = (clusterActions[ca] || 0) + 1;
-      }
-
-      var strength = Math.min(1, clusterSignals.length / signalCount * 2);
-      var triggerWorthy = clusterSignals.length >= 5 && strength > 0.6;
-
-      // Generate editorial summary
-      var editorial = await generateEditorial(
-        'You are an editorial writer for a community intelligence dashboard. Write a one-sentence editorial summary for a signal cluster about "' + ct + '" with ' + clusterSignals.length + ' signals. Action breakdown: ' + JSON.stringify(clusterActions) + '. Be specific, warm, and signal-grounded. No raw data. No individual names. No boilerplate.',
-        100
-      );
-
-      var triggerRationale = '';
-      if (triggerWorthy) {
-        triggerRationale = await generateEditorial(
-          'Write a one-sentence "why now" rationale for programming a community event around "' + ct + '". Signal evidence: ' + clusterSignals.length + ' signals with actions ' + JSON.stringify(clusterActions) + '. Be specific about timing and opportunity.',
-          80
-        );
-      }
-
-      clusters.push({
-        label: ct + ' activity',
-        canonical_theme: ct,
-        strength: Math.round(strength * 100) / 100,
-        signal_count: clusterSignals.length,
-        action_breakdown: clusterActions,
-        editorial_summary: editorial,
-        programming_trigger: triggerWorthy,
-        trigger_rationale: triggerRationale || null
-      });
-    }
-
-    // Active canister count
-    var canisterCount = await dbGet(
-      'SELECT COUNT(*) as count FROM community_members cm JOIN stakeholder_profiles sp ON sp.user_id = cm.user_id WHERE cm.community_id = $1',
-      [communityId]
-    );
-
-    // Network narrative
-    var narrative = await generateEditorial(
-      'Write a 2-sentence aggregate network narrative for a community with ' + signalCount + ' signals in the last ' + period + '. Heat score: ' + Math.round(heatScore * 100) + '%. Dominant activity: ' + dominantAction + '. Top themes: ' + sortedThemes.slice(0, 3).join(', ') + '. Be warm, specific, editorial. No individual data. No boilerplate.',
-      120
-    );
-
-    var payload = {
-      period: period,
-      filters: { region: region, theme: theme, action: action },
-      pulse: {
-        heat_score: Math.round(heatScore * 100) / 100,
-        heat_delta: (heatDelta >= 0 ? '+' : '') + heatDelta + '% vs prior period',
-        dominant_action: dominantAction,
-        signal_count: signalCount,
-        active_canister_count: parseInt(canisterCount.count) || 0
-      },
-      signal_clusters: clusters,
-      network_context: { narrative: narrative },
-      generated_at: new Date().toISOString()
-    };
-
-    // Cache result
-    await setCachedPulse(communityId, filterHash, payload);
-
-    res.json(payload);
+    // Served from pulse_cache (stale-while-revalidate), else built now
+    var result = await getPulse(communityId, { region: region, theme: theme, action: action, period: period });
+    res.set('X-Pulse-Cache', result.cache);
+    res.json(result.payload);
   } catch (err) {
     console.error('[community] Pulse error:', err);
     res.status(500).json({ error: 'Failed to generate pulse' });
@@ -259,44 +69,23 @@ router.get('/:communityId/event-triggers', authenticateToken, communityOwnerAuth
   try {
     var communityId = req.communityId;
 
-    // Get recent pulse data
-    var signals = await dbAll(
-      "SELECT * FROM community_signals WHERE community_id = $1 AND received_at > NOW() - INTERVAL '30 days' ORDER BY received_at DESC",
-      [communityId]
-    );
+    // Get recent pulse data (grouped in Postgres)
+    var agg = await aggregatePulse(communityId, { period: '30d' });
 
-    if (signals.length < 5) {
+    if (agg.signal_count < 5) {
       return res.json({ triggers: [], message: 'Insufficient signal data for recommendations' });
     }
 
-    // Cluster by theme
-    var themeClusters = {};
-    for (var i = 0; i < signals.length; i++) {
-      var tags = signals[i].theme_tags || [];
-      for (var t = 0; t < tags.length; t++) {
-        if (!themeClusters[tags[t]]) themeClusters[tags[t]] = [];
-        themeClusters[tags[t]].push(signals[i]);
-      }
-    }
-
     var triggers = [];
-    var themes = Object.keys(themeClusters).sort(function(a, b) {
-      return themeClusters[b].length - themeClusters[a].length;
-    });
+    var themes = agg.themes;
 
     for (var ti = 0; ti < Math.min(themes.length, 3); ti++) {
-      var theme = themes[ti];
-      var clusterSize = themeClusters[theme].length;
-      var heat = Math.min(1, clusterSize / signals.length * 2);
+      var theme = themes[ti].theme;
+      var clusterSize = themes[ti].signal_count;
+      var heat = Math.min(1, clusterSize / agg.signal_count * 2);
 
       // Determine event type based on cluster characteristics
-      var actionCounts = {};
-      for (var si = 0; si < themeClusters[theme].length; si++) {
-        var meta = themeClusters[theme][si].metadata || {};
-        if (typeof meta === 'string') { try { meta = JSON.parse(meta); } catch(e) { meta = {}; } }
-        var act = meta.signal_action || 'unknown';
-        actionCounts[act] = (actionCounts[act] || 0) + 1;
-      }
+      var actionCounts = themes[ti].action_breakdown;
 
       var eventType = clusterSize > 10 ? 'roundtable' : 'content';
       var confidence = heat > 0.7 ? 'high' : heat > 0.4 ? 'medium' : 'low';
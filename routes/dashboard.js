@@ -43,13 +43,109 @@ router.post('/ingestion/run', authenticateToken, adminOnly, function(req, res) {
   res.json({ status: 'started', kind: kind });
 });
 
+// ── GET /api/admin/matching — matching scheduler throughput + queue depth ──
+router.get('/matching', authenticateToken, adminOnly, async function(req, res) {
+  try {
+    var { getMatchingStatus } = require('../lib/matching_scheduler');
+    res.json(await getMatchingStatus());
+  } catch(e) {
+    res.status(500).json({ error: e.message });
+  }
+});
+
+// ── POST /api/admin/matching/run — trigger a matching cycle now ──
+// body.mode: 'auto' (default) | 'incremental' | 'full'
+router.post('/matching/run', authenticateToken, adminOnly, function(req, res) {
+  var { runMatchingCycle } = require('../lib/matching_scheduler');
+  var mode = ['incremental', 'full'].indexOf((req.body || {}).mode) !== -1 ? req.body.mode : 'auto';
+  runMatchingCycle({ mode: mode }).then(function(result) {
+    console.log('[admin] Manual matching cycle finished:', JSON.stringify(result));
+  }).catch(function(e) {
+    console.error('[admin] Manual matching cycle error:', e.message);
+  });
+  res.json({ status: 'started', mode: mode });
+});
+
+// ── GET /api/admin/pulse — community pulse precompute (time per community) ──
+router.get('/pulse', authenticateToken, adminOnly, function(req, res) {
+  var { getPulseStatus } = require('../lib/pulse_engine');
+  res.json(getPulseStatus());
+});
+
+// ── POST /api/admin/pulse/run — warm every community's pulse now ──
+router.post('/pulse/run', authenticateToken, adminOnly, function(req, res) {
+  var { precomputePulses } = require('../lib/pulse_engine');
+  precomputePulses({ force: true }).then(function(result) {
+    console.log('[admin] Manual pulse precompute finished:', JSON.stringify({ refreshed: result.refreshed, errors: result.errors, skipped: result.skipped }));
+  }).catch(function(e) {
+    console.error('[admin] Manual pulse precompute error:', e.message);
+  });
+  res.json({ status: 'started' });
+});
+
+// ── GET /api/admin/counters — maintained counter reconciliation (drift found) ──
+router.get('/counters', authenticateToken, adminOnly, function(req, res) {
+  var { getCounterStatus } = require('../lib/counters');
+  res.json(getCounterStatus());
+});
+
+// ── POST /api/admin/counters/reconcile — recount and repair drift now ──
+router.post('/counters/reconcile', authenticateToken, adminOnly, async function(req, res) {
+  try {
+    var { reconcileCounters } = require('../lib/counters');
+    res.json(await reconcileCounters());
+  } catch(e) {
+    res.status(500).json({ error: e.message });
+  }
+});
+
+// ── GET /api/admin/recommender — event feature table and scoring timings ──
+router.get('/recommender', authenticateToken, adminOnly, function(req, res) {
+  var { getRecommenderStats } = require('../lib/event_recommender');
+  res.json(getRecommenderStats());
+});
+
+// ── GET /api/admin/feed-snapshots — public feed snapshot cache ──
+router.get('/feed-snapshots', authenticateToken, adminOnly, function(req, res) {
+  var { getFeedSnapshotStats } = require('../lib/feed_snapshots');
+  res.json(getFeedSnapshotStats());
+});
+
+// ── GET /api/admin/session-cache — auth session cache hit rate ──
+router.get('/session-cache', authenticateToken, adminOnly, function(req, res) {
+  var { getSessionCacheStats } = require('../lib/session_cache');
+  res.json(getSessionCacheStats());
+});
+
+// ── GET /api/admin/jobs — background job queue depth, latency, failures ──
+router.get('/jobs', authenticateToken, adminOnly, async function(req, res) {
+  try {
+    var { getJobQueueStatus } = require('../lib/job_queue');
+    res.json(await getJobQueueStatus());
+  } catch(e) {
+    res.status(500).json({ error: e.message });
+  }
+});
+
+// ── POST /api/admin/jobs/retry-failed — re-queue failed jobs ──
+// body.type: only this job type (default: all types)
+router.post('/jobs/retry-failed', authenticateToken, adminOnly, async function(req, res) {
+  try {
+    var { retryFailedJobs } = require('../lib/job_queue');
+    var requeued = await retryFailedJobs((req.body || {}).type || null);
+    res.json({ requeued: requeued });
+  } catch(e) {
+    res.status(500).json({ error: e.message });
+  }
+});
+
 // ── GET /api/admin/dashboard — full network intelligence ──
 router.get('/dashboard', authenticateToken, adminOnly, async function(req, res) {
   try {
     // ─── NETWORK TOTALS ───
     var totalUsers = await safeGet('SELECT COUNT(*) as c FROM users', [], {c:0});
     var completeCanisters = await safeGet("SELECT COUNT(*) as c FROM stakeholder_profiles WHERE stakeholder_type IS NOT NULL", [], {c:0});
-    var totalRegs = await safeGet("SELECT COUNT(*) as c FROM event_registrations WHERE status = 'active'", [], {c:0});
+    var totalRegs = await safeGet('SELECT COALESCE(SUM(registration_count), 0) as c FROM events', [], {c:0});
     var activeEvents = await safeGet("SELECT COUNT(*) as c FROM events WHERE event_date >= CURRENT_DATE", [], {c:0});
     var totalMatches = await safeGet('SELECT COUNT(*) as c FROM event_matches', [], {c:0});
     var acceptedOneWay = await safeGet("SELECT COUNT(*) as c FROM event_matches WHERE user_a_decision = 'accept' OR user_b_decision = 'accept'", [], {c:0});
@@ -264,20 +360,19 @@ router.get('/dashboard', authenticateToken, adminOnly, async function(req, res)
     // ─── EVENT SCORECARDS ───
     var eventScorecard = await safeAll(`
       SELECT e.id, e.name, TO_CHAR(e.event_date, 'MM/DD') as date,
-        COUNT(DISTINCT er.user_id) as regs,
-        COUNT(DISTINCT m.id) as matches,
-        CASE WHEN COUNT(DISTINCT m.id) > 0 THEN
-          COUNT(DISTINCT m.id) FILTER (WHERE m.user_a_decision='accept' OR m.user_b_decision='accept')::float / COUNT(DISTINCT m.id)
+        e.registration_count as regs,
+        COUNT(m.id) as matches,
+        CASE WHEN COUNT(m.id) > 0 THEN
+          COUNT(m.id) FILTER (WHERE m.user_a_decision='accept' OR m.user_b_decision='accept')::float / COUNT(m.id)
         ELSE 0 END as accept_rate,
-        CASE WHEN COUNT(DISTINCT m.id) > 0 THEN
-          COUNT(DISTINCT m.id) FILTER (WHERE m.status='revealed')::float / COUNT(DISTINCT m.id)
+        CASE WHEN COUNT(m.id) > 0 THEN
+          COUNT(m.id) FILTER (WHERE m.status='revealed')::float / COUNT(m.id)
         ELSE 0 END as reveal_rate,
         AVG(m.score_total) FILTER (WHERE m.score_total > 0) as avg_score
       FROM events e
-      LEFT JOIN event_registrations er ON er.event_id = e.id AND er.status = 'active'
       LEFT JOIN event_matches m ON m.event_id = e.id
-      GROUP BY e.id, e.name, e.event_date
-      HAVING COUNT(DISTINCT er.user_id) > 0
+      WHERE e.registration_count > 0
+      GROUP BY e.id, e.name, e.event_date, e.registration_count
       ORDER BY e.event_date DESC LIMIT 20
     `, [], []);
 
@@ -470,10 +565,9 @@ router.get('/live', authenticateToken, adminOnly, async function(req, res) {
 router.get('/dashboard/event/:id', authenticateToken, adminOnly, async function(req, res) {
   try {
     var eid = req.params.id;
-    var event = await safeGet('SELECT id, name, event_date, city, country FROM events WHERE id = $1', [eid], null);
+    var event = await safeGet('SELECT id, name, event_date, city, country, registration_count FROM events WHERE id = $1', [eid], null);
     if (!event) return res.status(404).json({ error: 'Event not found' });
 
-    var regs = await safeGet("SELECT COUNT(*) as c FROM event_registrations WHERE event_id = $1 AND status = 'active'", [eid], {c:0});
     var matches = await safeGet('SELECT COUNT(*) as c FROM event_matches WHERE event_id = $1', [eid], {c:0});
     var accepted = await safeGet("SELECT COUNT(*) as c FROM event_matches WHERE event_id = $1 AND (user_a_decision='accept' OR user_b_decision='accept')", [eid], {c:0});
     var revealed = await safeGet("SELECT COUNT(*) as c FROM event_matches WHERE event_id = $1 AND status = 'revealed'", [eid], {c:0});
@@ -496,7 +590,7 @@ router.get('/dashboard/event/:id', authenticateToken, adminOnly, async function(
 
     res.json({
       event: event,
-      regs: parseInt(regs.c) || 0, matches: parseInt(matches.c) || 0,
+      regs: event.registration_count, matches: parseInt(matches.c) || 0,
       accepted: parseInt(accepted.c) || 0, revealed: parseInt(revealed.c) || 0,
       avgScore: parseFloat(avgScore.avg) || 0,
       stakeholders: stakeholders.map(function(s) { return { type: s.type, count: parseInt(s.count) || 0 }; }),
@@ -512,7 +606,7 @@ router.get('/dashboard/event/:id', authenticateToken, adminOnly, async function(
 router.get('/people', authenticateToken, adminOnly, async function(req, res) {
   try {
     var users = await safeAll(
-      `SELECT u.id, u.email, u.name, u.created_at,
+      `SELECT u.id, u.email, u.name, u.created_at, u.match_count, u.reveal_count,
         sp.stakeholder_type, sp.themes, sp.intent, sp.offering, sp.geography, sp.focus_text,
         CASE
           WHEN sp.id IS NULL THEN 'no_profile'
@@ -579,7 +673,7 @@ router.get('/user-lookup', authenticateToken, adminOnly, async function(req, res
 router.get('/communities', authenticateToken, adminOnly, async function(req, res) {
   try {
     var communities = await safeAll(
-      'SELECT id, name, slug, access_code, is_active, (SELECT COUNT(*) FROM community_members WHERE community_id = communities.id) as member_count FROM communities ORDER BY name',
+      'SELECT id, name, slug, access_code, is_active, member_count FROM communities ORDER BY name',
       [], []
     );
     res.json({ communities: communities });
@@ -7,6 +7,7 @@ var { authenticateToken } = require('../middleware/auth');
 var { extractText } = require('../lib/document_extractor');
 var { extractCanisterFields, extractSignals, classifyDocumentType, assessAuthenticity } = require('../lib/document_intelligence');
 var { normalizeThemes } = require('../lib/theme_taxonomy');
+var { noteSignalsChanged } = require('../lib/signal_rollup');
 var { documentLimiter, documentAbuseCheck, flagUser } = require('../middleware/anti_abuse');
 
 var router = express.Router();
@@ -234,6 +235,11 @@ router.post('/ingest', authenticateToken, documentLimiter, documentAbuseCheck, u
         console.error('[documents] signal embed failed:', embedErr.message);
       }
     }
+    noteSignalsChanged(signals.filter(function(sg) { return sg.signal_text; }).map(function(sg) {
+      return { theme: sg.theme, entity_name: entityName };
+    })).catch(function(err) {
+      console.error('[documents] signal rollup refresh failed:', err.message);
+    });
 
     // ── Update document record with provenance ──
     await dbRun(
@@ -324,9 +330,14 @@ router.delete('/:id', authenticateToken, async function(req, res) {
 
     // 1. Delete signal records
     if (signalIds.length) {
+      var removed = [];
       for (var i = 0; i < signalIds.length; i++) {
-        await dbRun('DELETE FROM unified_signals WHERE id = $1 AND user_id = $2', [signalIds[i], userId]);
+        var gone = await dbRun('DELETE FROM unified_signals WHERE id = $1 AND user_id = $2 RETURNING theme, entity_name', [signalIds[i], userId]);
+        removed = removed.concat(gone.rows || []);
       }
+      noteSignalsChanged(removed).catch(function(err) {
+        console.error('[documents] signal rollup refresh failed:', err.message);
+      });
     }
 
     // 2. Delete Qdrant points
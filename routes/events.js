@@ -4,56 +4,32 @@ var { dbGet, dbRun, dbAll } = require('../db');
 var { authenticateToken, optionalAuth } = require('../middleware/auth');
 var { normalizeThemes } = require('../lib/theme_taxonomy');
 var { embedEvent } = require('../lib/vector_search');
+var { searchEvents } = require('../lib/event_search');
+var { recommendEvents } = require('../lib/event_recommender');
+var { noteEventsChanged } = require('../lib/events_version');
+var { getFeedSnapshot, sendFeedSnapshot } = require('../lib/feed_snapshots');
 var emc2 = require('../lib/emc2.js');
 
 var router = express.Router();
 
 // ── GET /api/events ── (list with filters)
+// Keyset-paged: pass the previous response's next_cursor as ?cursor=
+// Explicit columns: search/normalisation columns and claim fields
+// (claim_token, owner_email) stay server-side.
+var LIST_COLUMNS = 'e.id, e.name, e.slug, e.description, e.event_date, e.start_at, e.end_at, e.timezone, ' +
+  'e.venue_type, e.city, e.country, e.event_type, e.themes, e.expected_attendees, e.source_url, e.image_url, ' +
+  'e.community_id, e.is_public, e.registration_count, e.created_at, e.updated_at';
+
 router.get('/', optionalAuth, async function(req, res) {
   try {
-    var { theme, city, country, search, upcoming, limit, offset } = req.query;
-    var conditions = [];
-    var params = [];
-    var idx = 1;
-
-    if (theme) {
-      conditions.push('e.themes::text ILIKE $' + idx);
-      params.push('%' + theme + '%');
-      idx++;
-    }
-    if (city) {
-      conditions.push('e.city ILIKE $' + idx);
-      params.push('%' + city + '%');
-      idx++;
-    }
-    if (country) {
-      conditions.push('e.country ILIKE $' + idx);
-      params.push('%' + country + '%');
-      idx++;
-    }
-    if (search) {
-      conditions.push('(e.name ILIKE $' + idx + ' OR e.description ILIKE $' + idx + ')');
-      params.push('%' + search + '%');
-      idx++;
-    }
-    if (upcoming === 'true') {
-      conditions.push('(e.event_date >= CURRENT_DATE OR e.event_date IS NULL)');
-    }
-
-    conditions.push('(e.community_id IS NULL OR e.is_public = true)');
-    var where = ' WHERE ' + conditions.join(' AND ');
-    var lim = parseInt(limit) || 500;
-    var off = parseInt(offset) || 0;
-
-    var events = await dbAll(
-      'SELECT e.*, COALESCE(rc.reg_count, 0) AS registration_count FROM events e' +
-      ' LEFT JOIN (SELECT event_id, COUNT(*) AS reg_count FROM event_registrations WHERE status = $' + idx + ' GROUP BY event_id) rc ON rc.event_id = e.id' +
-      where + ' ORDER BY e.event_date ASC NULLS LAST LIMIT $' + (idx + 1) + ' OFFSET $' + (idx + 2),
-      params.concat(['active', lim, off])
+    var { theme, city, country, search, upcoming, sort, limit, cursor } = req.query;
+    var result = await searchEvents(
+      { search: search, theme: theme, city: city, country: country, status: upcoming === 'true' ? 'upcoming' : 'all' },
+      { columns: LIST_COLUMNS, sort: sort, limit: Math.min(parseInt(limit) || 100, 500), cursor: cursor }
     );
-
-    res.json({ events: events });
+    res.json(result);
   } catch (err) {
+    if (err.status === 400) return res.status(400).json({ error: err.message });
     console.error('List events error:', err);
     res.status(500).json({ error: 'Failed to load events' });
   }
@@ -79,171 +55,17 @@ router.get('/user/registrations', authenticateToken, async function(req, res) {
 
 
 // ── GET /api/events/recommended — personalized event scoring ──
+// Scored against every upcoming event by lib/event_recommender.js
 router.get('/recommended', authenticateToken, async function(req, res) {
   try {
-    console.log('[Recommendations] Called for user', req.user.id);
-
-    // Load user profile
-    var profile = await dbGet(
-      'SELECT stakeholder_type, themes, intent, offering, geography, focus_text, deal_details FROM stakeholder_profiles WHERE user_id = $1',
-      [req.user.id]
-    );
-    if (!profile) {
-      console.log('[Recommendations] No profile for user', req.user.id);
-      return res.json({ recommendations: [], reason: 'no_profile' });
-    }
-
-    var userThemes = [];
-    try { userThemes = typeof profile.themes === 'string' ? JSON.parse(profile.themes) : (profile.themes || []); } catch(e) { userThemes = []; }
-    var userIntent = [];
-    try { userIntent = typeof profile.intent === 'string' ? JSON.parse(profile.intent) : (profile.intent || []); } catch(e) { userIntent = []; }
-    var userOffering = [];
-    try { userOffering = typeof profile.offering === 'string' ? JSON.parse(profile.offering) : (profile.offering || []); } catch(e) { userOffering = []; }
-    if (!Array.isArray(userThemes)) userThemes = [];
-    if (!Array.isArray(userIntent)) userIntent = [];
-    if (!Array.isArray(userOffering)) userOffering = [];
-
-    var userGeo = (profile.geography || '').toLowerCase();
-    var userType = (profile.stakeholder_type || '').toLowerCase();
-    var userFocus = (profile.focus_text || '').toLowerCase();
-
-    // Build keyword set from intent, offering, and focus_text for text matching
-    var userKeywords = new Set();
-    userThemes.forEach(function(t) { if (typeof t === 'string') userKeywords.add(t.toLowerCase()); });
-    userIntent.forEach(function(t) { if (typeof t === 'string') userKeywords.add(t.toLowerCase()); });
-    userOffering.forEach(function(t) { if (typeof t === 'string') userKeywords.add(t.toLowerCase()); });
-    if (userFocus) {
-      userFocus.split(/[\s,;]+/).forEach(function(w) { if (w.length > 3) userKeywords.add(w); });
-    }
-    // Also add stakeholder type keywords
-    if (userType) userKeywords.add(userType);
-
-    console.log('[Recommendations] Profile loaded — type:', profile.stakeholder_type, ', themes:', userThemes.length, ', keywords:', userKeywords.size, ', geo:', userGeo || 'none');
-
-    // Load upcoming events the user hasn't registered for
-    var events = await dbAll(
-      `SELECT e.id, e.name, e.description, e.event_date, e.city, e.country, e.themes, e.slug,
-              e.community_id, COALESCE(e.is_public, false) as is_public,
-        (SELECT COUNT(*) FROM event_registrations WHERE event_id = e.id AND status = 'active') as reg_count
-       FROM events e
-       WHERE e.event_date >= CURRENT_DATE
-       AND e.id NOT IN (SELECT event_id FROM event_registrations WHERE user_id = $1 AND status = 'active')
-       AND (e.community_id IS NULL OR COALESCE(e.is_public, false) = true
-            OR e.community_id IN (SELECT community_id FROM community_members WHERE user_id = $1))
-       ORDER BY e.event_date ASC NULLS LAST
-       LIMIT 100`,
-      [req.user.id]
-    );
-
-    console.log('[Recommendations] Upcoming events found:', events.length);
-
-    // Score each event
-    var scored = [];
-    for (var i = 0; i < events.length; i++) {
-      var ev = events[i];
-      var evThemes = [];
-      try { evThemes = typeof ev.themes === 'string' ? JSON.parse(ev.themes) : (ev.themes || []); } catch(e) { evThemes = []; }
-      if (!Array.isArray(evThemes)) evThemes = [];
-      var evCity = (ev.city || '').toLowerCase();
-      var evCountry = (ev.country || '').toLowerCase();
-      var evName = (ev.name || '').toLowerCase();
-      var evDesc = (ev.description || '').toLowerCase();
-
-      // 1. Theme overlap (0-1) — Jaccard
-      var themeSet = new Set(userThemes.map(function(t) { return (typeof t === 'string' ? t : '').toLowerCase(); }));
-      var evSet = new Set(evThemes.map(function(t) { return (typeof t === 'string' ? t : '').toLowerCase(); }));
-      var intersection = 0;
-      evSet.forEach(function(t) { if (t && themeSet.has(t)) intersection++; });
-      var union = new Set([...themeSet, ...evSet].filter(function(t) { return t; })).size;
-      var themeScore = union > 0 ? intersection / union : 0;
-
-      // 2. Keyword relevance — check if event name/description/themes match user canister keywords
-      var keywordHits = 0;
-      if (userKeywords.size > 0) {
-        userKeywords.forEach(function(kw) {
-          if (kw && evName.indexOf(kw) !== -1) keywordHits++;
-          if (kw && evDesc.indexOf(kw) !== -1) keywordHits++;
-          evThemes.forEach(function(t) { if (typeof t === 'string' && t.toLowerCase().indexOf(kw) !== -1) keywordHits++; });
-        });
-      }
-      var keywordScore = userKeywords.size > 0 ? Math.min(1, keywordHits / Math.max(2, userKeywords.size * 0.25)) : 0;
-
-      // 3. Geographic relevance (0-1)
-      var geoScore = 0;
-      if (userGeo && (evCity || evCountry)) {
-        if (evCity && (userGeo.indexOf(evCity) !== -1 || evCity.indexOf(userGeo) !== -1)) geoScore = 1;
-        else if (evCountry && (userGeo.indexOf(evCountry) !== -1 || evCountry.indexOf(userGeo) !== -1)) geoScore = 0.6;
-        else {
-          var euroCountries = ['uk','united kingdom','england','germany','france','spain','netherlands','sweden','switzerland','italy','portugal','austria','belgium','denmark','finland','norway','ireland','poland','czech','romania','greece'];
-          var apacCountries = ['singapore','australia','japan','south korea','china','india','hong kong','taiwan','new zealand','indonesia','thailand','malaysia','vietnam','philippines'];
-          var naCountries = ['usa','us','canada','united states','austin','new york','san francisco','texas','california'];
-          var meaCountries = ['uae','saudi arabia','israel','qatar','south africa','kenya','nigeria','egypt'];
-          var userRegion = '';
-          var evRegion = '';
-          [['europe', euroCountries], ['apac', apacCountries], ['americas', naCountries], ['mea', meaCountries]].forEach(function(r) {
-            r[1].forEach(function(c) {
-              if (userGeo.indexOf(c) !== -1) userRegion = r[0];
-              if (evCountry.indexOf(c) !== -1 || evCity.indexOf(c) !== -1) evRegion = r[0];
-            });
-          });
-          if (userRegion && userRegion === evRegion) geoScore = 0.3;
-        }
-      }
-
-      // 4. Stakeholder-type relevance — boost events with relevant tags
-      var typeBoost = 0;
-      if (userType) {
-        var typeKeywords = {
-          'investor': ['investor','vc','venture','fund','capital','pitch','deal','portfolio'],
-          'founder': ['founder','startup','pitch','launch','build','scale','fundrais'],
-          'corporate': ['enterprise','corporate','innovation','partnership','strategy'],
-          'researcher': ['research','academic','science','university','lab','deep tech']
-        };
-        var boostWords = typeKeywords[userType] || [];
-        boostWords.forEach(function(w) {
-          if (evName.indexOf(w) !== -1 || evDesc.indexOf(w) !== -1) typeBoost += 0.1;
-        });
-        typeBoost = Math.min(typeBoost, 0.3);
-      }
-
-      // 5. Composite score — themes 30%, keywords 25%, geo 25%, type 20%
-      var total = (themeScore * 0.3) + (keywordScore * 0.25) + (geoScore * 0.25) + (typeBoost * 0.2);
-
-      // Build reasons
-      var reasons = [];
-      if (themeScore > 0) reasons.push('Theme match');
-      if (keywordScore > 0) reasons.push('Canister signal');
-      if (geoScore >= 0.6) reasons.push('Your region');
-      if (typeBoost > 0) reasons.push('For ' + (profile.stakeholder_type || 'you') + 's');
-
-      scored.push({
-        id: ev.id, name: ev.name, event_date: ev.event_date,
-        city: ev.city, country: ev.country, slug: ev.slug,
-        score: Math.round(total * 100), reasons: reasons,
-        _debug: { themeScore: themeScore, keywordScore: keywordScore, keywordHits: keywordHits, geoScore: geoScore, typeBoost: typeBoost, total: total }
-      });
-    }
-    scored.sort(function(a, b) { return b.score - a.score; });
-
-    // Filter to meaningful matches, but fall back to top upcoming if nothing scores
-    var meaningful = scored.filter(function(s) { return s.score > 3; });
-    if (meaningful.length === 0 && scored.length > 0) {
-      // Fallback: return top upcoming events as "Upcoming near you" recommendations
-      meaningful = scored.slice(0, 6).map(function(s) {
-        s.reasons = s.reasons.length > 0 ? s.reasons : ['Upcoming event'];
-        s.score = Math.max(s.score, 1);
-        return s;
-      });
-      console.log('[Recommendations] Using fallback — top', meaningful.length, 'upcoming events for user', req.user.id);
-    }
+    var recommendations = await recommendEvents(req.user.id);
+    if (!recommendations) return res.json({ recommendations: [], reason: 'no_profile' });
 
     // Strip debug info from response unless ?debug=1
     if (req.query.debug !== '1') {
-      meaningful.forEach(function(s) { delete s._debug; });
+      recommendations.forEach(function(r) { delete r._debug; });
     }
-
-    console.log('[Recommendations] Returning', meaningful.length, 'recommendations for user', req.user.id);
-    res.json({ recommendations: meaningful.slice(0, 10) });
+    res.json({ recommendations: recommendations });
   } catch (err) {
     console.error('[Recommendations] ERROR for user', req.user ? req.user.id : 'unknown', ':', err.message, err.stack);
     res.status(500).json({ error: 'Failed to load recommendations', detail: err.message });
@@ -497,9 +319,7 @@ router.get('/community/:communityId', authenticateToken, async function(req, res
     if (!community) return res.status(403).json({ error: 'Access denied' });
 
     var events = await dbAll(
-      `SELECT e.*,
-        (SELECT COUNT(*) FROM event_registrations WHERE event_id = e.id AND status = 'active') as registration_count
-       FROM events e WHERE e.community_id = $1 ORDER BY e.event_date ASC`,
+      'SELECT e.* FROM events e WHERE e.community_id = $1 ORDER BY e.event_date ASC',
       [communityId]
     );
     res.json({ events: events });
@@ -526,12 +346,6 @@ router.get('/:id(\\d+)', optionalAuth, async function(req, res) {
       if (!membership) return res.status(403).json({ error: 'This event is only visible to community members' });
     }
 
-    var count = await dbGet(
-      'SELECT COUNT(*) as count FROM event_registrations WHERE event_id = $1 AND status = $2',
-      [event.id, 'active']
-    );
-    event.registration_count = parseInt(count.count);
-
     // Check if current user is registered
     if (req.user) {
       var reg = await dbGet(
@@ -703,6 +517,7 @@ router.post('/submit', authenticateToken, async function(req, res) {
        JSON.stringify(normalizedThemes), slug, source_url, expected_attendees,
        start_at, end_at, timezone, venue_type]
     );
+    noteEventsChanged();
 
     var event = result.rows[0];
 
@@ -755,6 +570,7 @@ router.post('/', authenticateToken, async function(req, res) {
        expected_attendees ? parseInt(expected_attendees) : null,
        communityId, req.user.id]
     );
+    noteEventsChanged();
     var event = result.rows[0];
     embedEvent(event).catch(function(err) { console.error('Event embed error:', err); });
     res.json({ event: event });
@@ -797,6 +613,7 @@ router.patch('/:id', authenticateToken, async function(req, res) {
        themes ? JSON.stringify(themes) : null, description || null,
        is_public !== undefined ? (is_public === true || is_public === 'true') : null, eventId]
     );
+    noteEventsChanged();
     res.json({ event: result.rows[0] });
   } catch (err) {
     console.error('Edit event error:', err);
@@ -814,6 +631,7 @@ router.delete('/:id', authenticateToken, async function(req, res) {
     await dbRun('DELETE FROM event_registrations WHERE event_id = $1', [eventId]);
     await dbRun('DELETE FROM event_matches WHERE event_id = $1', [eventId]);
     await dbRun('DELETE FROM events WHERE id = $1', [eventId]);
+    noteEventsChanged();
     res.json({ success: true });
   } catch (err) {
     console.error('Delete event error:', err);
@@ -992,6 +810,7 @@ router.post('/harvest', authenticateToken, async function(req, res) {
         false, true
       ]
     );
+    noteEventsChanged();
 
     var event = result.rows[0];
     res.json({ success: true, event: event, extracted: extracted, needs_review: true });
@@ -1104,6 +923,7 @@ router.post('/harvest-batch', authenticateToken, async function(req, res) {
              JSON.stringify(themes), slug, extracted.website || url,
              extracted.expected_attendees || null, false, true]
           );
+          noteEventsChanged();
           added++;
           results.push({ url: url, status: 'added', event: result.rows[0] });
         }
@@ -1282,212 +1102,209 @@ function eventImage(imageUrl, sourceUrl) {
   return null;
 }
 
-router.get('/feed.json', openCors, async function(req, res) {
-  try {
-    var status = req.query.status || 'upcoming'; // upcoming | past | all
-    var regionFilter = req.query.region || null;  // optional country filter
-    var cityFilter = req.query.city || null;
-    var themeFilter = req.query.theme || null;
-    var limit = Math.min(parseInt(req.query.limit) || 500, 1000);
-
-    var conditions = ['(community_id IS NULL OR is_public = true)'];
-    var params = [];
-    var idx = 1;
-
-    if (status === 'upcoming') {
-      conditions.push('event_date >= CURRENT_DATE');
-    } else if (status === 'past') {
-      conditions.push('event_date < CURRENT_DATE');
-    }
+// Feed query params, trimmed so equivalent requests share a snapshot
+function feedParam(v) {
+  return typeof v === 'string' && v.trim() ? v.trim() : null;
+}
 
-    if (regionFilter) {
-      conditions.push('country ILIKE $' + idx);
-      params.push('%' + regionFilter + '%');
-      idx++;
-    }
-    if (cityFilter) {
-      conditions.push('city ILIKE $' + idx);
-      params.push('%' + cityFilter + '%');
-      idx++;
-    }
-    if (themeFilter) {
-      conditions.push('themes::text ILIKE $' + idx);
-      params.push('%' + themeFilter + '%');
-      idx++;
-    }
+// Feed limits are rounded up to one of a few sizes so arbitrary values can't
+// each mint their own snapshot
+var FEED_LIMITS = [50, 100, 200, 500, 1000];
 
-    var where = conditions.length ? ' WHERE ' + conditions.join(' AND ') : '';
+function feedLimit(v, dflt, max) {
+  var n = Math.min(parseInt(v) || dflt, max);
+  for (var i = 0; i < FEED_LIMITS.length; i++) {
+    if (FEED_LIMITS[i] >= n) return Math.min(FEED_LIMITS[i], max);
+  }
+  return max;
+}
 
-    var events = await dbAll(
-      'SELECT e.id, e.name, e.slug, e.description, e.event_date, e.city, e.country, e.themes, ' +
-      'e.expected_attendees, e.event_type, e.is_public, e.source_url, e.image_url, ' +
-      '(SELECT COUNT(*)::int FROM event_registrations WHERE event_id = e.id AND status = \'active\') as rsvp_count ' +
-      'FROM events e' + where +
-      ' ORDER BY e.event_date ASC LIMIT $' + idx,
-      params.concat([limit])
-    );
+var FEED_STATUSES = ['upcoming', 'past', 'all'];
 
-    var baseUrl = process.env.APP_URL || 'https://eventmedium.ai';
-    var items = events.map(function(e) {
-      var themes = e.themes;
-      if (typeof themes === 'string') { try { themes = JSON.parse(themes); } catch(err) { themes = []; } }
-
-      return {
-        id: e.id,
-        name: e.name,
-        description: e.description || '',
-        date: e.event_date,
-        city: e.city || '',
-        country: e.country || '',
-        themes: Array.isArray(themes) ? themes : [],
-        url: baseUrl + '/event.html?id=' + e.id,
-        image: eventImage(e.image_url, e.source_url),
-        rsvp_count: e.rsvp_count || 0,
-        expected_attendees: e.expected_attendees || null,
-        event_type: e.event_type || null,
-        status: e.event_date >= new Date().toISOString().split('T')[0] ? 'upcoming' : 'past'
-      };
+// Both feeds are served from lib/feed_snapshots.js: pre-rendered and
+// pre-compressed per filter set, with ETag / If-None-Match support.
+router.get('/feed.json', openCors, async function(req, res) {
+  try {
+    var status = req.query.status || 'upcoming';
+    // Anything else was always treated as 'all'
+    if (FEED_STATUSES.indexOf(status) === -1) status = 'all';
+    var regionFilter = feedParam(req.query.region);  // optional country filter
+    var cityFilter = feedParam(req.query.city);
+    var themeFilter = feedParam(req.query.theme);
+    var limit = feedLimit(req.query.limit, 500, 1000);
+
+    var snap = await getFeedSnapshot(['json', status, regionFilter, cityFilter, themeFilter, limit], {
+      contentType: 'application/json; charset=utf-8',
+      load: function() {
+        return searchEvents(
+          // Undated events only appear with status=all, as before the shared search
+          { theme: themeFilter, city: cityFilter, country: regionFilter, status: status,
+            dated: status === 'upcoming' || status === 'past' },
+          {
+            columns: 'e.id, e.name, e.slug, e.description, e.event_date, e.city, e.country, e.themes, ' +
+              'e.expected_attendees, e.event_type, e.is_public, e.source_url, e.image_url, e.registration_count AS rsvp_count',
+            limit: limit
+          }
+        ).then(function(r) { return r.events; });
+      },
+      render: renderJsonFeed
     });
 
     res.set('Cache-Control', 'public, max-age=3600'); // 1hr cache
-    res.json({
-      feed: 'EventMedium Events Feed',
-      version: '1.1',
-      generated_at: new Date().toISOString(),
-      site: baseUrl,
-      browse_url: baseUrl + '/events.html',
-      canister_cta: {
-        label: 'Meet the right people at these events — build your canister with Nev',
-        url: baseUrl + '/auth.html?utm_source=feed&utm_medium=json&utm_campaign=canister'
-      },
-      count: items.length,
-      events: items
-    });
+    sendFeedSnapshot(req, res, snap);
   } catch (err) {
     console.error('Events feed error:', err);
     res.status(500).json({ error: 'Failed to generate events feed' });
   }
 });
 
+// Undated events (status=all only) sort after every dated one, so they
+// count as upcoming
+function feedItemStatus(eventDate, now) {
+  if (!eventDate) return 'upcoming';
+  var day = new Date(eventDate).toISOString().split('T')[0];
+  return day >= now.toISOString().split('T')[0] ? 'upcoming' : 'past';
+}
+
+function renderJsonFeed(events, builtAt) {
+  var baseUrl = process.env.APP_URL || 'https://eventmedium.ai';
+  var items = events.map(function(e) {
+    var themes = e.themes;
+    if (typeof themes === 'string') { try { themes = JSON.parse(themes); } catch(err) { themes = []; } }
+
+    return {
+      id: e.id,
+      name: e.name,
+      description: e.description || '',
+      date: e.event_date,
+      city: e.city || '',
+      country: e.country || '',
+      themes: Array.isArray(themes) ? themes : [],
+      url: baseUrl + '/event.html?id=' + e.id,
+      image: eventImage(e.image_url, e.source_url),
+      rsvp_count: e.rsvp_count || 0,
+      expected_attendees: e.expected_attendees || null,
+      event_type: e.event_type || null,
+      status: feedItemStatus(e.event_date, builtAt)
+    };
+  });
+
+  return JSON.stringify({
+    feed: 'EventMedium Events Feed',
+    version: '1.1',
+    generated_at: builtAt.toISOString(),
+    site: baseUrl,
+    browse_url: baseUrl + '/events.html',
+    canister_cta: {
+      label: 'Meet the right people at these events — build your canister with Nev',
+      url: baseUrl + '/auth.html?utm_source=feed&utm_medium=json&utm_campaign=canister'
+    },
+    count: items.length,
+    events: items
+  });
+}
+
 // ── RSS 2.0 Feed ── /api/events/rss ──────────────────────────────────────────
 router.get('/rss', openCors, async function(req, res) {
   try {
-    var themeFilter = req.query.theme || null;
-    var regionFilter = req.query.region || null;
-    var cityFilter = req.query.city || null;
-    var limit = Math.min(parseInt(req.query.limit) || 200, 500);
-
-    var conditions = [
-      '(e.community_id IS NULL OR COALESCE(e.is_public, false) = true)',
-      'e.event_date >= CURRENT_DATE'
-    ];
-    var params = [];
-    var idx = 1;
-
-    if (regionFilter) {
-      conditions.push('e.country ILIKE $' + idx);
-      params.push('%' + regionFilter + '%');
-      idx++;
-    }
-
-    if (cityFilter) {
-      conditions.push('e.city ILIKE $' + idx);
-      params.push('%' + cityFilter + '%');
-      idx++;
-    }
-
-    if (themeFilter) {
-      conditions.push('e.themes::text ILIKE $' + idx);
-      params.push('%' + themeFilter + '%');
-      idx++;
-    }
-
-    var where = ' WHERE ' + conditions.join(' AND ');
-
-    var events = await dbAll(
-      'SELECT e.id, e.name, e.slug, e.description, e.event_date, e.city, e.country, ' +
-      'e.themes, e.expected_attendees, e.event_type, e.source_url, e.image_url, e.created_at, ' +
-      '(SELECT COUNT(*)::int FROM event_registrations WHERE event_id = e.id AND status = \'active\') as rsvp_count ' +
-      'FROM events e' + where +
-      ' ORDER BY e.event_date ASC NULLS LAST LIMIT $' + idx,
-      params.concat([limit])
-    );
-
-    var baseUrl = process.env.APP_URL || 'https://eventmedium.ai';
-    var now = new Date().toUTCString();
-
-    function escXml(s) {
-      if (!s) return '';
-      return s.replace(/&/g, '&amp;').replace(/</g, '&lt;').replace(/>/g, '&gt;').replace(/"/g, '&quot;');
-    }
-
-    var items = events.map(function(e) {
-      var themes = e.themes;
-      if (typeof themes === 'string') { try { themes = JSON.parse(themes); } catch(err) { themes = []; } }
-      if (!Array.isArray(themes)) themes = [];
-
-      var link = baseUrl + '/event.html?id=' + e.id + '&utm_source=rss&utm_medium=feed';
-      var hubLink = baseUrl + '/events.html?utm_source=rss&utm_medium=feed';
-      var nevLink = baseUrl + '/auth.html?utm_source=rss&utm_medium=feed&utm_campaign=canister';
-      var pubDate = e.created_at ? new Date(e.created_at).toUTCString() : now;
-      var eventDate = e.event_date ? new Date(e.event_date).toISOString().split('T')[0] : 'TBD';
-      var location = [e.city, e.country].filter(Boolean).join(', ') || 'Location TBD';
-      var image = eventImage(e.image_url, e.source_url);
-
-      var desc = (e.description || e.name) + '\n\n' +
-        'Date: ' + eventDate + '\n' +
-        'Location: ' + location +
-        (e.expected_attendees ? '\nExpected Attendees: ' + e.expected_attendees : '') +
-        (e.rsvp_count > 0 ? '\nRSVPs: ' + e.rsvp_count : '') +
-        '\nThemes: ' + (themes.length ? themes.join(', ') : 'General') +
-        '\n\nView on EventMedium: ' + link +
-        '\nBrowse all events: ' + hubLink +
-        '\n\nGoing? Meet the right people there — build your canister with Nev, ' +
-        'EventMedium\'s AI concierge, and get matched before the event: ' + nevLink;
-
-      var categories = themes.map(function(t) {
-        return '      <category>' + escXml(t) + '</category>';
-      }).join('\n');
-
-      return '    <item>\n' +
-        '      <title>' + escXml(e.name) + '</title>\n' +
-        '      <link>' + escXml(link) + '</link>\n' +
-        '      <guid isPermaLink="true">' + escXml(baseUrl + '/event.html?id=' + e.id) + '</guid>\n' +
-        '      <pubDate>' + pubDate + '</pubDate>\n' +
-        '      <description>' + escXml(desc) + '</description>\n' +
-        (image ? '      <media:thumbnail url="' + escXml(image) + '" />\n' : '') +
-        (categories ? categories + '\n' : '') +
-        '      <source url="' + escXml(baseUrl + '/api/events/rss') + '">EventMedium</source>\n' +
-        '    </item>';
-    }).join('\n');
+    var themeFilter = feedParam(req.query.theme);
+    var regionFilter = feedParam(req.query.region);
+    var cityFilter = feedParam(req.query.city);
+    var limit = feedLimit(req.query.limit, 200, 500);
+
+    var snap = await getFeedSnapshot(['rss', regionFilter, cityFilter, themeFilter, limit], {
+      contentType: 'application/rss+xml; charset=utf-8',
+      load: function() {
+        return searchEvents(
+          { theme: themeFilter, city: cityFilter, country: regionFilter, status: 'upcoming', dated: true },
+          {
+            columns: 'e.id, e.name, e.slug, e.description, e.event_date, e.city, e.country, ' +
+              'e.themes, e.expected_attendees, e.event_type, e.source_url, e.image_url, e.created_at, e.registration_count AS rsvp_count',
+            limit: limit
+          }
+        ).then(function(r) { return r.events; });
+      },
+      render: function(events, builtAt) {
+        return renderRssFeed(events, builtAt, themeFilter, cityFilter);
+      }
+    });
 
-    var xml = '<?xml version="1.0" encoding="UTF-8"?>\n' +
-      '<rss version="2.0" xmlns:atom="http://www.w3.org/2005/Atom" xmlns:media="http://search.yahoo.com/mrss/">\n' +
-      '  <channel>\n' +
-      '    <title>EventMedium — Upcoming Events' +
-      escXml(themeFilter ? ': ' + themeFilter : '') + escXml(cityFilter ? ' in ' + cityFilter : '') + '</title>\n' +
-      '    <link>' + escXml(baseUrl + '/events.html') + '</link>\n' +
-      '    <description>Upcoming conferences, summits, and professional events across AI, FinTech, Climate, Health, and 20+ themes. Every event links back to EventMedium, where Nev — our AI concierge — builds your canister and matches you with the right people before you arrive.</description>\n' +
-      '    <language>en</language>\n' +
-      '    <lastBuildDate>' + now + '</lastBuildDate>\n' +
-      '    <atom:link href="' + escXml(baseUrl + '/api/events/rss') + '" rel="self" type="application/rss+xml" />\n' +
-      '    <image>\n' +
-      '      <url>' + escXml(baseUrl + '/images/em-logo.png') + '</url>\n' +
-      '      <title>EventMedium</title>\n' +
-      '      <link>' + escXml(baseUrl + '/events.html') + '</link>\n' +
-      '    </image>\n' +
-      '    <ttl>360</ttl>\n' +
-      items + '\n' +
-      '  </channel>\n' +
-      '</rss>';
-
-    res.set('Content-Type', 'application/rss+xml; charset=utf-8');
     res.set('Cache-Control', 'public, max-age=3600');
-    res.send(xml);
+    sendFeedSnapshot(req, res, snap);
   } catch (err) {
     console.error('RSS feed error:', err);
     res.status(500).set('Content-Type', 'text/plain').send('RSS feed error');
   }
 });
 
+function renderRssFeed(events, builtAt, themeFilter, cityFilter) {
+  var baseUrl = process.env.APP_URL || 'https://eventmedium.ai';
+  var now = builtAt.toUTCString();
+
+  function escXml(s) {
+    if (!s) return '';
+    return s.replace(/&/g, '&amp;').replace(/</g, '&lt;').replace(/>/g, '&gt;').replace(/"/g, '&quot;');
+  }
+
+  var items = events.map(function(e) {
+    var themes = e.themes;
+    if (typeof themes === 'string') { try { themes = JSON.parse(themes); } catch(err) { themes = []; } }
+    if (!Array.isArray(themes)) themes = [];
+
+    var link = baseUrl + '/event.html?id=' + e.id + '&utm_source=rss&utm_medium=feed';
+    var hubLink = baseUrl + '/events.html?utm_source=rss&utm_medium=feed';
+    var nevLink = baseUrl + '/auth.html?utm_source=rss&utm_medium=feed&utm_campaign=canister';
+    var pubDate = e.created_at ? new Date(e.created_at).toUTCString() : now;
+    var eventDate = e.event_date ? new Date(e.event_date).toISOString().split('T')[0] : 'TBD';
+    var location = [e.city, e.country].filter(Boolean).join(', ') || 'Location TBD';
+    var image = eventImage(e.image_url, e.source_url);
+
+    var desc = (e.description || e.name) + '\n\n' +
+      'Date: ' + eventDate + '\n' +
+      'Location: ' + location +
+      (e.expected_attendees ? '\nExpected Attendees: ' + e.expected_attendees : '') +
+      (e.rsvp_count > 0 ? '\nRSVPs: ' + e.rsvp_count : '') +
+      '\nThemes: ' + (themes.length ? themes.join(', ') : 'General') +
+      '\n\nView on EventMedium: ' + link +
+      '\nBrowse all events: ' + hubLink +
+      '\n\nGoing? Meet the right people there — build your canister with Nev, ' +
+      'EventMedium\'s AI concierge, and get matched before the event: ' + nevLink;
+
+    var categories = themes.map(function(t) {
+      return '      <category>' + escXml(t) + '</category>';
+    }).join('\n');
+
+    return '    <item>\n' +
+      '      <title>' + escXml(e.name) + '</title>\n' +
+      '      <link>' + escXml(link) + '</link>\n' +
+      '      <guid isPermaLink="true">' + escXml(baseUrl + '/event.html?id=' + e.id) + '</guid>\n' +
+      '      <pubDate>' + pubDate + '</pubDate>\n' +
+      '      <description>' + escXml(desc) + '</description>\n' +
+      (image ? '      <media:thumbnail url="' + escXml(image) + '" />\n' : '') +
+      (categories ? categories + '\n' : '') +
+      '      <source url="' + escXml(baseUrl + '/api/events/rss') + '">EventMedium</source>\n' +
+      '    </item>';
+  }).join('\n');
+
+  return '<?xml version="1.0" encoding="UTF-8"?>\n' +
+    '<rss version="2.0" xmlns:atom="http://www.w3.org/2005/Atom" xmlns:media="http://search.yahoo.com/mrss/">\n' +
+    '  <channel>\n' +
+    '    <title>EventMedium — Upcoming Events' +
+    escXml(themeFilter ? ': ' + themeFilter : '') + escXml(cityFilter ? ' in ' + cityFilter : '') + '</title>\n' +
+    '    <link>' + escXml(baseUrl + '/events.html') + '</link>\n' +
+    '    <description>Upcoming conferences, summits, and professional events across AI, FinTech, Climate, Health, and 20+ themes. Every event links back to EventMedium, where Nev — our AI concierge — builds your canister and matches you with the right people before you arrive.</description>\n' +
+    '    <language>en</language>\n' +
+    '    <lastBuildDate>' + now + '</lastBuildDate>\n' +
+    '    <atom:link href="' + escXml(baseUrl + '/api/events/rss') + '" rel="self" type="application/rss+xml" />\n' +
+    '    <image>\n' +
+    '      <url>' + escXml(baseUrl + '/images/em-logo.png') + '</url>\n' +
+    '      <title>EventMedium</title>\n' +
+    '      <link>' + escXml(baseUrl + '/events.html') + '</link>\n' +
+    '    </image>\n' +
+    '    <ttl>360</ttl>\n' +
+    items + '\n' +
+    '  </channel>\n' +
+    '</rss>';
+}
+
 module.exports = { router };
\ No newline at end of file
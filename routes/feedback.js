@@ -1,7 +1,8 @@
 var express = require('express');
 var router = express.Router();
-var { dbGet, dbRun, dbAll } = require('../db');
+var { dbRun, dbAll } = require('../db');
 var { authenticateToken } = require('../middleware/auth');
+var { lookupSession } = require('../lib/session_cache');
 
 // Admin check
 function adminOnly(req, res, next) {
@@ -26,8 +27,7 @@ router.post('/feedback', async function(req, res) {
     if (authHeader && authHeader.indexOf('Bearer ') === 0) {
       try {
         var token = authHeader.split(' ')[1];
-        var session = await dbGet('SELECT user_id FROM sessions WHERE token = $1 AND expires_at > NOW()', [token]);
-        user_id = session ? session.user_id : null;
+        user_id = await lookupSession(token);
       } catch(e) { /* anonymous is fine */ }
     }
 
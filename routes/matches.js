@@ -1,10 +1,13 @@
 var express = require('express');
-var { dbGet, dbRun, dbAll } = require('../db');
+var { dbGet, dbRun, dbAll, dbBulkInsert } = require('../db');
 var { authenticateToken } = require('../middleware/auth');
 var { normalizeThemes, normalizeTheme } = require('../lib/theme_taxonomy');
 var { getEmbedding, getEmbeddings, getPointVector, getPointVectors, findCandidates, searchByVector, buildProfileText, COLLECTIONS } = require('../lib/vector_search');
+var { planEventPairs } = require('../lib/matching_worker');
 var emc2 = require('../lib/emc2.js');
 var { logMatchOutcome } = require('../lib/outcome_logger');
+var { registerJobHandler, enqueueJob } = require('../lib/job_queue');
+var { getThemeRollups, getEntitySignals } = require('../lib/signal_rollup');
 var router = express.Router();
 
 // ══════════════════════════════════════════════════════
@@ -280,122 +283,199 @@ function scoreCapitalFit(profileA, profileB) {
 // SIGNAL ENRICHMENT (Tier 2 — plugs in when available)
 // ══════════════════════════════════════════════════════
 
-async function scoreSignalAlignment(profileA, profileB) {
+function sharedSignalThemes(profileA, profileB) {
+  var themesA = normalizeThemes(parseJsonSafe(profileA.themes));
+  var themesB = normalizeThemes(parseJsonSafe(profileB.themes));
+  return themesA.filter(function(t) { return themesB.indexOf(t) !== -1; });
+}
+
+// Pure half of signal scoring: turns the theme/entity signal rows for a pair
+// into scores. Shared by scoreSignalAlignment and the batch scorer so both
+// paths produce identical results.
+function signalAlignmentFromRows(sharedThemes, recentSignals, entitySignals) {
   var context = [];
   var convergence = 0;
   var timing = 0;
   var constraint = 0;
 
-  try {
-    var themesA = normalizeThemes(parseJsonSafe(profileA.themes));
-    var themesB = normalizeThemes(parseJsonSafe(profileB.themes));
-    var sharedThemes = themesA.filter(function(t) { return themesB.indexOf(t) !== -1; });
+  if (recentSignals.length >= 3) {
+    // Count independent source types
+    var sourceTypes = {};
+    recentSignals.forEach(function(s) { sourceTypes[s.source_type] = true; });
+    var independentSources = Object.keys(sourceTypes).length;
 
-    if (!sharedThemes.length) {
-      return { total: 0, convergence: 0, timing: 0, constraint: 0, reasons: [], context: [] };
+    // Convergence: ≥3 independent source types on shared theme = strong signal
+    if (independentSources >= 3) {
+      convergence = Math.min(1.0, independentSources * 0.2);
+      context.push('Converging signals across ' + independentSources + ' source types on: ' + sharedThemes.join(', '));
     }
 
-    // Check if shared themes have converging signals
-    var recentSignals = await dbAll(
-      `SELECT theme, source_type, entity_name, signal_summary, lifecycle_stage, cost_of_signal, final_weight
-       FROM unified_signals
-       WHERE theme = ANY($1::text[])
-       AND signal_date > NOW() - INTERVAL '90 days'
-       ORDER BY final_weight DESC
-       LIMIT 20`,
-      [sharedThemes]
-    );
+    // Check for high-cost signals (SEC filings, funding rounds)
+    var highCost = recentSignals.filter(function(s) { return s.cost_of_signal === 'high'; });
+    if (highCost.length >= 2) {
+      convergence += 0.2;
+      context.push(highCost.length + ' high-cost signals (filings/funding) detected');
+    }
 
-    if (recentSignals.length >= 3) {
-      // Count independent source types
-      var sourceTypes = {};
-      recentSignals.forEach(function(s) { sourceTypes[s.source_type] = true; });
-      var independentSources = Object.keys(sourceTypes).length;
+    // Lifecycle acceleration
+    var accelerating = recentSignals.filter(function(s) { return s.lifecycle_stage === 'accelerating'; });
+    if (accelerating.length >= 2) {
+      timing = 0.5;
+      context.push('Theme lifecycle: accelerating');
+    }
+  }
 
-      // Convergence: ≥3 independent source types on shared theme = strong signal
-      if (independentSources >= 3) {
-        convergence = Math.min(1.0, independentSources * 0.2);
-        context.push('Converging signals across ' + independentSources + ' source types on: ' + sharedThemes.join(', '));
-      }
+  // Entity-level signal overlap
+  if (entitySignals && entitySignals.length) {
+    constraint = 0.3;
+    entitySignals.forEach(function(s) {
+      context.push(s.entity_name + ': ' + (s.signal_summary || '').slice(0, 100));
+    });
+  }
 
-      // Check for high-cost signals (SEC filings, funding rounds)
-      var highCost = recentSignals.filter(function(s) { return s.cost_of_signal === 'high'; });
-      if (highCost.length >= 2) {
-        convergence += 0.2;
-        context.push(highCost.length + ' high-cost signals (filings/funding) detected');
-      }
+  return { convergence: convergence, timing: timing, constraint: constraint, context: context };
+}
 
-      // Lifecycle acceleration
-      var accelerating = recentSignals.filter(function(s) { return s.lifecycle_stage === 'accelerating'; });
-      if (accelerating.length >= 2) {
-        timing = 0.5;
-        context.push('Theme lifecycle: accelerating');
-      }
+// Top 20 by weight across the shared themes. Each rollup carries its
+// theme's top 20, so the merge equals one query over all shared themes.
+function mergeThemeSignals(sharedThemes, rollups) {
+  var rows = [];
+  sharedThemes.forEach(function(t) {
+    if (rollups[t]) rows = rows.concat(rollups[t].top_signals);
+  });
+  return rows.sort(byWeightDesc).slice(0, 20);
+}
+
+function mergeEntitySignals(byEntity, entityA, entityB) {
+  var rows = byEntity[entityA] || [];
+  if (entityB !== entityA) rows = rows.concat(byEntity[entityB] || []);
+  return rows.slice().sort(byWeightDesc).slice(0, 5);
+}
+
+function finishSignalScores(parts) {
+  var total = (parts.convergence + parts.timing + parts.constraint) / 3;
+  return {
+    total: Math.min(1.0, total),
+    convergence: parts.convergence,
+    timing: parts.timing,
+    constraint: parts.constraint,
+    reasons: parts.context.map(function(c) { return '[Signal] ' + c; }),
+    context: parts.context
+  };
+}
+
+async function scoreSignalAlignment(profileA, profileB) {
+  var parts = { convergence: 0, timing: 0, constraint: 0, context: [] };
+
+  try {
+    var sharedThemes = sharedSignalThemes(profileA, profileB);
+
+    if (!sharedThemes.length) {
+      return { total: 0, convergence: 0, timing: 0, constraint: 0, reasons: [], context: [] };
     }
 
+    // Converging signals on the shared themes, from the per-theme rollup
+    var rollups = await getThemeRollups(sharedThemes);
+    var recentSignals = mergeThemeSignals(sharedThemes, rollups);
+
     // Entity-level signal overlap
+    var entitySignals = [];
     var entityA = (profileA.company || '').toLowerCase();
     var entityB = (profileB.company || '').toLowerCase();
     if (entityA && entityB) {
-      var entitySignals = await dbAll(
-        `SELECT entity_name, signal_summary FROM unified_signals
-         WHERE LOWER(entity_name) IN ($1, $2)
-         AND signal_date > NOW() - INTERVAL '60 days'
-         ORDER BY final_weight DESC LIMIT 5`,
-        [entityA, entityB]
-      );
-      if (entitySignals.length) {
-        constraint = 0.3;
-        entitySignals.forEach(function(s) {
-          context.push(s.entity_name + ': ' + (s.signal_summary || '').slice(0, 100));
-        });
-      }
+      var byEntity = await getEntitySignals([entityA, entityB]);
+      entitySignals = mergeEntitySignals(byEntity, entityA, entityB);
     }
+
+    parts = signalAlignmentFromRows(sharedThemes, recentSignals, entitySignals);
   } catch (err) {
     console.error('Signal alignment scoring error:', err);
   }
 
-  var total = (convergence + timing + constraint) / 3;
-  var reasons = context.map(function(c) { return '[Signal] ' + c; });
-
-  return {
-    total: Math.min(1.0, total),
-    convergence: convergence,
-    timing: timing,
-    constraint: constraint,
-    reasons: reasons,
-    context: context
-  };
+  return finishSignalScores(parts);
 }
 
 // ══════════════════════════════════════════════════════
 // NETWORK PROXIMITY SCORING
 // ══════════════════════════════════════════════════════
 
-async function scoreNetworkProximity(userA, userB) {
+function parseRawThemes(themes) {
+  try { return typeof themes === 'string' ? JSON.parse(themes) : (themes || []); } catch(e) { return []; }
+}
+
+// Pure half of network scoring. facts = { eventOverlap, mutualCount,
+// themesA, themesB (null when a profile is missing), otherType, positiveCount }.
+function networkProximityFromFacts(facts) {
   var score = 0;
   var reasons = [];
 
+  // 1. Shared event registrations (both registered for same events)
+  var eventOverlap = facts.eventOverlap;
+  if (eventOverlap >= 3) {
+    score += 0.4;
+    reasons.push('Co-registered at ' + eventOverlap + ' events');
+  } else if (eventOverlap >= 2) {
+    score += 0.25;
+    reasons.push('Co-registered at ' + eventOverlap + ' events');
+  } else if (eventOverlap >= 1) {
+    score += 0.1;
+  }
+
+  // 2. Shared revealed matches (both independently matched with same third person)
+  var mutualCount = facts.mutualCount;
+  if (mutualCount >= 2) {
+    score += 0.35;
+    reasons.push(mutualCount + ' mutual revealed connections');
+  } else if (mutualCount >= 1) {
+    score += 0.2;
+    reasons.push('1 mutual revealed connection');
+  }
+
+  // 3. Theme cluster density — do they share niche theme combos (not just "AI")
+  if (facts.themesA && facts.themesB) {
+    // Only count non-generic themes as cluster signal
+    var genericThemes = ['AI', 'Enterprise SaaS', 'FinTech'];
+    var nicheA = facts.themesA.filter(function(t) { return genericThemes.indexOf(t) === -1; });
+    var nicheB = facts.themesB.filter(function(t) { return genericThemes.indexOf(t) === -1; });
+    var nicheOverlap = nicheA.filter(function(t) { return nicheB.indexOf(t) !== -1; });
+
+    if (nicheOverlap.length >= 2) {
+      score += 0.25;
+      reasons.push('Niche theme cluster: ' + nicheOverlap.join(', '));
+    } else if (nicheOverlap.length === 1) {
+      score += 0.1;
+    }
+  }
+
+  // 4. Positive feedback pattern — has either user had high-quality matches with similar archetypes?
+  if (facts.otherType && facts.positiveCount >= 2) {
+    score += 0.15;
+    reasons.push('User has valued ' + facts.otherType + ' matches before');
+  }
+
+  return { score: score, reasons: reasons };
+}
+
+function finishNetworkScores(result) {
+  return {
+    score: Math.min(1.0, result.score),
+    reasons: result.reasons.map(function(r) { return '[Network] ' + r; })
+  };
+}
+
+async function scoreNetworkProximity(userA, userB) {
+  var facts = { eventOverlap: 0, mutualCount: 0, themesA: null, themesB: null, otherType: null, positiveCount: 0 };
+  var result = { score: 0, reasons: [] };
+
   try {
-    // 1. Shared event registrations (both registered for same events)
     var sharedEvents = await dbGet(
       `SELECT COUNT(*)::int as count FROM event_registrations a
        JOIN event_registrations b ON a.event_id = b.event_id
        WHERE a.user_id = $1 AND b.user_id = $2 AND a.status = 'active' AND b.status = 'active'`,
       [userA, userB]
     );
-    var eventOverlap = sharedEvents ? sharedEvents.count : 0;
-    if (eventOverlap >= 3) {
-      score += 0.4;
-      reasons.push('Co-registered at ' + eventOverlap + ' events');
-    } else if (eventOverlap >= 2) {
-      score += 0.25;
-      reasons.push('Co-registered at ' + eventOverlap + ' events');
-    } else if (eventOverlap >= 1) {
-      score += 0.1;
-    }
+    facts.eventOverlap = sharedEvents ? sharedEvents.count : 0;
 
-    // 2. Shared revealed matches (both independently matched with same third person)
     var mutualReveals = await dbGet(
       `SELECT COUNT(DISTINCT a_matches.su)::int as count FROM (
          SELECT CASE WHEN user_a_id = $1 THEN user_b_id ELSE user_a_id END as su
@@ -407,64 +487,33 @@ async function scoreNetworkProximity(userA, userB) {
        ) b_matches ON a_matches.su = b_matches.su`,
       [userA, userB]
     );
+    facts.mutualCount = mutualReveals ? mutualReveals.count : 0;
 
-    var mutualCount = mutualReveals ? mutualReveals.count : 0;
-    if (mutualCount >= 2) {
-      score += 0.35;
-      reasons.push(mutualCount + ' mutual revealed connections');
-    } else if (mutualCount >= 1) {
-      score += 0.2;
-      reasons.push('1 mutual revealed connection');
-    }
-
-    // 3. Theme cluster density — do they share niche theme combos (not just "AI")
     var profileA = await dbGet('SELECT themes FROM stakeholder_profiles WHERE user_id = $1', [userA]);
-    var profileB = await dbGet('SELECT themes FROM stakeholder_profiles WHERE user_id = $1', [userB]);
-
+    var profileB = await dbGet('SELECT themes, stakeholder_type FROM stakeholder_profiles WHERE user_id = $1', [userB]);
     if (profileA && profileB) {
-      var themesA = [];
-      var themesB = [];
-      try { themesA = typeof profileA.themes === 'string' ? JSON.parse(profileA.themes) : (profileA.themes || []); } catch(e) {}
-      try { themesB = typeof profileB.themes === 'string' ? JSON.parse(profileB.themes) : (profileB.themes || []); } catch(e) {}
-
-      // Only count non-generic themes as cluster signal
-      var genericThemes = ['AI', 'Enterprise SaaS', 'FinTech'];
-      var nicheA = themesA.filter(function(t) { return genericThemes.indexOf(t) === -1; });
-      var nicheB = themesB.filter(function(t) { return genericThemes.indexOf(t) === -1; });
-      var nicheOverlap = nicheA.filter(function(t) { return nicheB.indexOf(t) !== -1; });
-
-      if (nicheOverlap.length >= 2) {
-        score += 0.25;
-        reasons.push('Niche theme cluster: ' + nicheOverlap.join(', '));
-      } else if (nicheOverlap.length === 1) {
-        score += 0.1;
-      }
+      facts.themesA = parseRawThemes(profileA.themes);
+      facts.themesB = parseRawThemes(profileB.themes);
     }
 
-    // 4. Positive feedback pattern — has either user had high-quality matches with similar archetypes?
-    var otherProfile = await dbGet('SELECT stakeholder_type FROM stakeholder_profiles WHERE user_id = $1', [userB]);
-    if (otherProfile && otherProfile.stakeholder_type) {
+    if (profileB && profileB.stakeholder_type) {
+      facts.otherType = profileB.stakeholder_type;
       var positivePattern = await dbGet(
         `SELECT COUNT(*)::int as count FROM match_feedback mf
          JOIN event_matches em ON em.id = mf.match_id
          JOIN stakeholder_profiles sp ON sp.user_id = CASE WHEN em.user_a_id = $1 THEN em.user_b_id ELSE em.user_a_id END
          WHERE mf.user_id = $1 AND mf.rating = 'valuable' AND sp.stakeholder_type = $2`,
-        [userA, otherProfile.stakeholder_type]
+        [userA, profileB.stakeholder_type]
       );
-      if (positivePattern && positivePattern.count >= 2) {
-        score += 0.15;
-        reasons.push('User has valued ' + otherProfile.stakeholder_type + ' matches before');
-      }
+      facts.positiveCount = positivePattern ? positivePattern.count : 0;
     }
 
+    result = networkProximityFromFacts(facts);
   } catch (err) {
     console.error('Network proximity scoring error:', err);
   }
 
-  return {
-    score: Math.min(1.0, score),
-    reasons: reasons.map(function(r) { return '[Network] ' + r; })
-  };
+  return finishNetworkScores(result);
 }
 
 // ══════════════════════════════════════════════════════
@@ -511,19 +560,7 @@ async function scoreMatch(userA, userB, eventId, options) {
     console.error('Semantic scoring error:', e.message);
   }
 
-  // 2. Theme overlap
-  var themeResult = scoreThemeOverlap(profileA.themes, profileB.themes);
-
-  // 3. Intent complementarity
-  var intentResult = scoreIntentComplementarity(profileA, profileB);
-
-  // 4. Stakeholder fit
-  var scoreStakeholder = scoreStakeholderFit(profileA.stakeholder_type, profileB.stakeholder_type);
-
-  // 5. Capital fit
-  var capitalResult = scoreCapitalFit(profileA, profileB);
-
- // 6. Network proximity (Tier 2)
+  // 6. Network proximity (Tier 2)
   var networkResult = { score: 0, reasons: [] };
   if (options.skipNetworkProximity !== true) {
     try {
@@ -543,20 +580,24 @@ async function scoreMatch(userA, userB, eventId, options) {
     }
   }
 
-  // Build reasons array
-  var reasons = [];
-  if (themeResult.shared.length) {
-    reasons.push('Shared themes: ' + themeResult.shared.join(', '));
-  }
-  reasons = reasons.concat(intentResult.reasons);
-  if (capitalResult.applicable && capitalResult.reasons.length) {
-    reasons = reasons.concat(capitalResult.reasons);
-  }
-  reasons = reasons.concat(signalScores.reasons);
+  return composeMatchScore(userA, userB, eventId, profileA, profileB, scoreSemantic, networkResult, signalScores);
+}
 
-  if (scoreStakeholder >= 0.7) {
-    reasons.push('Strong archetype fit: ' + profileA.stakeholder_type + ' ↔ ' + profileB.stakeholder_type);
-  }
+// Everything in scoreMatch that needs no I/O: the profile-only components,
+// tier weights and the final rounded result. The batch scorer calls this
+// directly with preloaded network/signal inputs.
+function composeMatchScore(userA, userB, eventId, profileA, profileB, scoreSemantic, networkResult, signalScores) {
+  // 2. Theme overlap
+  var themeResult = scoreThemeOverlap(profileA.themes, profileB.themes);
+
+  // 3. Intent complementarity
+  var intentResult = scoreIntentComplementarity(profileA, profileB);
+
+  // 4. Stakeholder fit
+  var scoreStakeholder = scoreStakeholderFit(profileA.stakeholder_type, profileB.stakeholder_type);
+
+  // 5. Capital fit
+  var capitalResult = scoreCapitalFit(profileA, profileB);
 
   // Weighted composite
   var hasSignals = signalScores.total > 0;
@@ -677,6 +718,265 @@ function cosineSimilarity(a, b) {
   return denom === 0 ? 0 : dot / denom;
 }
 
+// ══════════════════════════════════════════════════════
+// BATCH SCORING — preload once, score every pair in memory
+// ══════════════════════════════════════════════════════
+// scoreMatch costs ~10 round trips per pair (profiles, co-registrations,
+// mutual reveals, feedback pattern, theme + entity signals). The batch path
+// loads the same facts for a whole user set with a handful of `= ANY($1)`
+// queries and feeds them to the same pure scoring functions, so the output
+// is identical to calling scoreMatch pair by pair.
+
+function pairKey(a, b) {
+  return a < b ? a + ':' + b : b + ':' + a;
+}
+
+function countIntersection(setA, setB) {
+  if (!setA || !setB) return 0;
+  var small = setA.size <= setB.size ? setA : setB;
+  var large = small === setA ? setB : setA;
+  var n = 0;
+  small.forEach(function(v) { if (large.has(v)) n++; });
+  return n;
+}
+
+// Same order as the SQL it replaces: ORDER BY final_weight DESC, which in
+// Postgres puts NULLs first
+function byWeightDesc(a, b) {
+  var wa = a.final_weight, wb = b.final_weight;
+  if (wa == null || wb == null) return (wb == null ? 1 : 0) - (wa == null ? 1 : 0);
+  return wb - wa;
+}
+
+// Load everything scoreMatch would fetch for any pair drawn from userIds.
+// options.skipNetworkProximity / options.enrichWithSignals mirror scoreMatch.
+async function loadScoringContext(userIds, options) {
+  options = options || {};
+  var ids = Array.from(new Set(userIds));
+  var ctx = {
+    profiles: {},
+    authProviders: {},
+    eventSets: {},
+    revealedPartners: {},
+    valuedTypes: {},
+    themeSignals: null,
+    entitySignals: null,
+    signalMemo: {},
+    options: options
+  };
+  if (!ids.length) return ctx;
+
+  var profiles = await dbAll(
+    'SELECT sp.*, u.name as name, u.company as company, u.auth_provider as auth_provider FROM stakeholder_profiles sp JOIN users u ON u.id = sp.user_id WHERE sp.user_id = ANY($1)',
+    [ids]
+  );
+  profiles.forEach(function(p) {
+    ctx.authProviders[p.user_id] = p.auth_provider;
+    delete p.auth_provider;
+    ctx.profiles[p.user_id] = p;
+  });
+  // Users without a profile still need their provider for the test/real check
+  var missing = ids.filter(function(id) { return !ctx.profiles[id]; });
+  if (missing.length) {
+    var users = await dbAll('SELECT id, auth_provider FROM users WHERE id = ANY($1)', [missing]);
+    users.forEach(function(u) { ctx.authProviders[u.id] = u.auth_provider; });
+  }
+
+  if (options.skipNetworkProximity !== true) {
+    var regs = await dbAll(
+      "SELECT user_id, event_id FROM event_registrations WHERE user_id = ANY($1) AND status = 'active'",
+      [ids]
+    );
+    regs.forEach(function(r) {
+      (ctx.eventSets[r.user_id] = ctx.eventSets[r.user_id] || new Set()).add(r.event_id);
+    });
+
+    var revealed = await dbAll(
+      "SELECT user_a_id, user_b_id FROM event_matches WHERE (user_a_id = ANY($1) OR user_b_id = ANY($1)) AND status = 'revealed'",
+      [ids]
+    );
+    revealed.forEach(function(m) {
+      (ctx.revealedPartners[m.user_a_id] = ctx.revealedPartners[m.user_a_id] || new Set()).add(m.user_b_id);
+      (ctx.revealedPartners[m.user_b_id] = ctx.revealedPartners[m.user_b_id] || new Set()).add(m.user_a_id);
+    });
+
+    var valued = await dbAll(
+      `SELECT mf.user_id, sp.stakeholder_type, COUNT(*)::int as count FROM match_feedback mf
+       JOIN event_matches em ON em.id = mf.match_id
+       JOIN stakeholder_profiles sp ON sp.user_id = CASE WHEN em.user_a_id = mf.user_id THEN em.user_b_id ELSE em.user_a_id END
+       WHERE mf.user_id = ANY($1) AND mf.rating = 'valuable' AND sp.stakeholder_type IS NOT NULL
+       GROUP BY mf.user_id, sp.stakeholder_type`,
+      [ids]
+    );
+    valued.forEach(function(v) {
+      (ctx.valuedTypes[v.user_id] = ctx.valuedTypes[v.user_id] || {})[v.stakeholder_type] = v.count;
+    });
+  }
+
+  if (options.enrichWithSignals !== false) {
+    try {
+      // One rollup per theme and one entity lookup per company, both served
+      // from lib/signal_rollup's in-process cache after the first scope
+      var themeSet = {};
+      profiles.forEach(function(p) {
+        normalizeThemes(parseJsonSafe(p.themes)).forEach(function(t) { themeSet[t] = true; });
+      });
+      ctx.themeSignals = await getThemeRollups(Object.keys(themeSet));
+
+      var entitySet = {};
+      profiles.forEach(function(p) {
+        var e = (p.company || '').toLowerCase();
+        if (e) entitySet[e] = true;
+      });
+      ctx.entitySignals = await getEntitySignals(Object.keys(entitySet));
+    } catch (err) {
+      console.error('Signal alignment preload error:', err);
+      ctx.themeSignals = null;
+      ctx.entitySignals = null;
+    }
+  }
+
+  return ctx;
+}
+
+// Existing matches in a scope involving any of userIds, as a Set of pairKeys.
+async function loadExistingPairs(context, userIds) {
+  var rows;
+  if (context.type === 'event') {
+    rows = await dbAll(
+      'SELECT user_a_id, user_b_id FROM event_matches WHERE event_id = $1 AND (user_a_id = ANY($2) OR user_b_id = ANY($2))',
+      [context.id, userIds]
+    );
+  } else if (context.type === 'community') {
+    rows = await dbAll(
+      'SELECT user_a_id, user_b_id FROM event_matches WHERE community_id = $1 AND (user_a_id = ANY($2) OR user_b_id = ANY($2))',
+      [context.id, userIds]
+    );
+  } else {
+    rows = await dbAll(
+      'SELECT user_a_id, user_b_id FROM event_matches WHERE scope_type = $1 AND (user_a_id = ANY($2) OR user_b_id = ANY($2))',
+      [context.type, userIds]
+    );
+  }
+  var pairs = new Set();
+  rows.forEach(function(r) { pairs.add(pairKey(r.user_a_id, r.user_b_id)); });
+  return pairs;
+}
+
+// Don't mix test and real users (same rule generateMatchesForUser applied per pair)
+function mixesTestAndReal(ctx, userA, userB) {
+  var a = ctx.authProviders[userA];
+  var b = ctx.authProviders[userB];
+  if (a === undefined || b === undefined) return false;
+  return (a === 'test') !== (b === 'test');
+}
+
+function networkFromContext(ctx, userA, userB) {
+  var profileA = ctx.profiles[userA];
+  var profileB = ctx.profiles[userB];
+  var otherType = profileB && profileB.stakeholder_type ? profileB.stakeholder_type : null;
+  return finishNetworkScores(networkProximityFromFacts({
+    eventOverlap: countIntersection(ctx.eventSets[userA], ctx.eventSets[userB]),
+    mutualCount: countIntersection(ctx.revealedPartners[userA], ctx.revealedPartners[userB]),
+    themesA: profileA && profileB ? parseRawThemes(profileA.themes) : null,
+    themesB: profileA && profileB ? parseRawThemes(profileB.themes) : null,
+    otherType: otherType,
+    positiveCount: otherType ? ((ctx.valuedTypes[userA] || {})[otherType] || 0) : 0
+  }));
+}
+
+function signalsFromContext(ctx, profileA, profileB) {
+  var sharedThemes = sharedSignalThemes(profileA, profileB);
+  if (!sharedThemes.length || !ctx.themeSignals) {
+    return { total: 0, convergence: 0, timing: 0, constraint: 0, reasons: [], context: [] };
+  }
+
+  var themeKey = sharedThemes.slice().sort().join('\u0001');
+  var recentSignals = ctx.signalMemo[themeKey];
+  if (!recentSignals) recentSignals = ctx.signalMemo[themeKey] = mergeThemeSignals(sharedThemes, ctx.themeSignals);
+
+  var entitySignals = [];
+  var entityA = (profileA.company || '').toLowerCase();
+  var entityB = (profileB.company || '').toLowerCase();
+  if (entityA && entityB) entitySignals = mergeEntitySignals(ctx.entitySignals, entityA, entityB);
+
+  return finishSignalScores(signalAlignmentFromRows(sharedThemes, recentSignals, entitySignals));
+}
+
+// Score one pair from a loaded context. Returns null if either profile is
+// missing, exactly like scoreMatch.
+function scorePairFromContext(ctx, userA, userB, eventId, scoreSemantic) {
+  var profileA = ctx.profiles[userA];
+  var profileB = ctx.profiles[userB];
+  if (!profileA || !profileB) return null;
+
+  var options = ctx.options;
+  var networkResult = { score: 0, reasons: [] };
+  if (options.skipNetworkProximity !== true) networkResult = networkFromContext(ctx, userA, userB);
+
+  var signalScores = { total: 0, convergence: 0, timing: 0, constraint: 0, reasons: [], context: [] };
+  if (options.enrichWithSignals !== false) signalScores = signalsFromContext(ctx, profileA, profileB);
+
+  return composeMatchScore(userA, userB, eventId, profileA, profileB, scoreSemantic || 0, networkResult, signalScores);
+}
+
+// Semantic similarity of userId against each candidate, following scoreMatch's
+// precedence: precomputed ANN score → stored Qdrant vectors → on-the-fly embedding.
+async function resolveSemanticScores(ctx, userId, candidateIds, precomputedSimilarity) {
+  var scores = {};
+  precomputedSimilarity = precomputedSimilarity || {};
+  var pending = candidateIds.filter(function(id) {
+    if (precomputedSimilarity[id] !== undefined) {
+      scores[id] = precomputedSimilarity[id];
+      return false;
+    }
+    return ctx.profiles[id] && ctx.profiles[userId];
+  });
+  if (!pending.length) return scores;
+
+  try {
+    var vectors = await getPointVectors(COLLECTIONS.profiles, [userId].concat(pending));
+    var fallback = [];
+    pending.forEach(function(id) {
+      if (vectors[userId] && vectors[id]) {
+        scores[id] = cosineSimilarity(vectors[userId], vectors[id]);
+      } else {
+        fallback.push(id);
+      }
+    });
+    if (!fallback.length) return scores;
+
+    // Last resort: embed on the fly, one batched call for the whole fallback set
+    var texts = {};
+    [userId].concat(fallback).forEach(function(id) {
+      var p = ctx.profiles[id];
+      try { texts[id] = buildProfileText(p, { name: p.name, company: p.company }); } catch(e) { texts[id] = ''; }
+    });
+    if (!texts[userId]) return scores;
+    var embedIds = [userId].concat(fallback.filter(function(id) { return texts[id]; }));
+    if (embedIds.length < 2) return scores;
+    var embeddings = await getEmbeddings(embedIds.map(function(id) { return texts[id]; }));
+    if (embeddings.length !== embedIds.length) return scores;
+    for (var i = 1; i < embedIds.length; i++) {
+      scores[embedIds[i]] = cosineSimilarity(embeddings[0], embeddings[i]);
+    }
+  } catch(e) {
+    console.error('Semantic scoring error:', e.message);
+  }
+  return scores;
+}
+
+// Batch equivalent of calling scoreMatch(userId, c, eventId, options) for
+// every c in candidateIds. Returns results aligned with candidateIds.
+async function scoreMatchBatch(userId, candidateIds, eventId, options) {
+  options = options || {};
+  var ctx = options.scoringContext || await loadScoringContext([userId].concat(candidateIds), options);
+  var semantic = await resolveSemanticScores(ctx, userId, candidateIds, options.precomputedSimilarity);
+  return candidateIds.map(function(otherId) {
+    return scorePairFromContext(ctx, userId, otherId, eventId, semantic[otherId]);
+  });
+}
+
 // ══════════════════════════════════════════════════════
 // GENERATE MATCHES FOR A USER AT AN EVENT
 // ══════════════════════════════════════════════════════
@@ -781,43 +1081,26 @@ async function generateMatchesForUser(userId, context, options) {
   if (!candidates) console.log('[Matcher] Fallback: scoring all ' + pairsToScore.length + ' (' + context.type + ')');
 
   // ── Stage 2: Full scoring ──
+  // One batch preload for the subject + every candidate (profiles, auth
+  // providers, existing pairs, network and signal facts), then score in memory.
   var matches = [];
   var scoreOptions = Object.assign({}, options, { precomputedSimilarity: precomputedSimilarity });
   var eventIdForScore = context.type === 'event' ? context.id : null;
 
-  for (var i = 0; i < pairsToScore.length; i++) {
-    var otherId = pairsToScore[i];
-
-    // Don't mix test and real users
-    var selfUser = await dbGet('SELECT auth_provider FROM users WHERE id = $1', [userId]);
-    var otherUser = await dbGet('SELECT auth_provider FROM users WHERE id = $1', [otherId]);
-    if (selfUser && otherUser) {
-      if ((selfUser.auth_provider === 'test') !== (otherUser.auth_provider === 'test')) continue;
-    }
-
-    // Duplicate check per scope
-    var existing = null;
-    if (context.type === 'event') {
-      existing = await dbGet(
-        "SELECT id FROM event_matches WHERE event_id = $1 AND ((user_a_id = $2 AND user_b_id = $3) OR (user_a_id = $3 AND user_b_id = $2))",
-        [context.id, userId, otherId]
-      );
-    } else if (context.type === 'community') {
-      existing = await dbGet(
-        "SELECT id FROM event_matches WHERE community_id = $1 AND ((user_a_id = $2 AND user_b_id = $3) OR (user_a_id = $3 AND user_b_id = $2))",
-        [context.id, userId, otherId]
-      );
-    } else {
-      existing = await dbGet(
-        "SELECT id FROM event_matches WHERE scope_type = $1 AND ((user_a_id = $2 AND user_b_id = $3) OR (user_a_id = $3 AND user_b_id = $2))",
-        [context.type, userId, otherId]
-      );
-    }
-    if (existing) continue;
+  var existingPairs = await loadExistingPairs(context, [userId]);
+  var ctx = await loadScoringContext([userId].concat(pairsToScore), scoreOptions);
+  pairsToScore = pairsToScore.filter(function(otherId) {
+    if (mixesTestAndReal(ctx, userId, otherId)) return false;
+    return !existingPairs.has(pairKey(userId, otherId));
+  });
 
-    var result = await scoreMatch(userId, otherId, eventIdForScore, scoreOptions);
+  var results = await scoreMatchBatch(userId, pairsToScore,
+    eventIdForScore, Object.assign({}, scoreOptions, { scoringContext: ctx }));
+  if (options.stats) options.stats.pairs = (options.stats.pairs || 0) + pairsToScore.length;
+  for (var i = 0; i < pairsToScore.length; i++) {
+    var result = results[i];
     if (!result || result.score_total < threshold) continue;
-    matches.push({ result: result, otherId: otherId });
+    matches.push({ result: result, otherId: pairsToScore[i] });
   }
 
   matches.sort(function(a, b) { return b.result.score_total - a.result.score_total; });
@@ -829,42 +1112,25 @@ async function generateMatchesForUser(userId, context, options) {
   var createdMatchIds = [];
   var createdPairs = [];
 
-  for (var m = 0; m < matches.length; m++) {
-    var mr = matches[m].result;
-    var ins = await dbRun(
-      `INSERT INTO event_matches
-         (event_id, community_id, scope_type, user_a_id, user_b_id,
-          score_total, score_semantic, score_theme, score_intent, score_stakeholder,
-          score_capital, score_signal_convergence, score_timing, score_constraint_complementarity,
-          score_geography, score_urgency, score_canister_richness, match_mode,
-          match_reasons, signal_context, status)
-       VALUES ($1,$2,$3,$4,$5,$6,$7,$8,$9,$10,$11,$12,$13,$14,$15,$16,$17,$18,$19,$20,$21)
-       RETURNING id`,
-      [
-        eventId, commId, scopeType, userId, matches[m].otherId,
-        mr.score_total, mr.score_semantic, mr.score_theme, mr.score_intent,
-        mr.score_stakeholder, mr.score_capital,
-        mr.score_signal_convergence, mr.score_timing, mr.score_constraint_complementarity,
-        mr.score_geography, mr.score_urgency, mr.score_canister_richness, scopeType,
-        JSON.stringify(mr.match_reasons), JSON.stringify(mr.signal_context),
-        'pending'
-      ]
-    );
-
-    // Log with ids so match creation is diagnosable (audit: lifecycle was unlogged)
-    if (ins && ins.rows && ins.rows[0]) {
-      createdMatchIds.push(ins.rows[0].id);
-      createdPairs.push({ matchId: ins.rows[0].id, a: userId, b: matches[m].otherId });
-      console.log('[Matcher] created match ' + ins.rows[0].id + ' scope=' + scopeType +
-        ' users=' + userId + '/' + matches[m].otherId + ' score=' + mr.score_total);
-    }
-  }
+  var created = await insertMatchRows(matches.map(function(m) {
+    return { eventId: eventId, communityId: commId, scopeType: scopeType, result: m.result };
+  }));
+
+  // Log with ids so match creation is diagnosable (audit: lifecycle was unlogged)
+  var scoreByOther = {};
+  matches.forEach(function(m) { scoreByOther[m.otherId] = m.result.score_total; });
+  created.forEach(function(row) {
+    createdMatchIds.push(row.id);
+    createdPairs.push({ matchId: row.id, a: row.user_a_id, b: row.user_b_id });
+    console.log('[Matcher] created match ' + row.id + ' scope=' + scopeType +
+      ' users=' + row.user_a_id + '/' + row.user_b_id + ' score=' + scoreByOther[row.user_b_id]);
+  });
 
   // Tell people they have matches. Without this, a pending match is invisible:
   // reveal needs BOTH sides to accept, so unnotified matches never complete.
-  // Fire-and-forget — a notification failure must never fail match creation.
+  // Queued as a durable job — a notification failure must never fail match creation.
   if (createdPairs.length) {
-    notifyNewMatches(createdPairs).catch(function(e) {
+    enqueueJob('notify_matches', { pairs: createdPairs }).catch(function(e) {
       console.error('[Matcher] notifyNewMatches error:', e.message);
     });
   }
@@ -938,6 +1204,21 @@ async function notifyNewMatches(pairs) {
   console.log('[Matcher] notified ' + userIds.length + ' user(s) of ' + pairs.length + ' new match(es)');
 }
 
+// Queued notify_matches jobs are claimed together and merged, so a matching
+// cycle that creates matches across many scopes still sends each user one
+// notification. Never retried: per-user send errors are already swallowed
+// above, and a re-run would double-notify.
+registerJobHandler('notify_matches', {
+  batchSize: 50,
+  concurrency: 1,
+  maxAttempts: 1,
+  handler: function(jobs) {
+    var pairs = [];
+    jobs.forEach(function(j) { pairs = pairs.concat(j.payload.pairs || []); });
+    return notifyNewMatches(pairs);
+  }
+});
+
 // ══════════════════════════════════════════════════════
 // ROUTES
 // ══════════════════════════════════════════════════════
@@ -1352,11 +1633,10 @@ router.post('/admin/generate-bulk', authenticateToken, async function(req, res)
     var context, users;
 
     if (event_id) {
+      // Event scope runs as one all-pairs job rather than a per-user loop
       context = { type: 'event', id: parseInt(event_id) };
-      users = await dbAll(
-        "SELECT user_id FROM event_registrations WHERE event_id = $1 AND status = 'active'",
-        [event_id]
-      );
+      var run = await generateEventMatches(context.id, { threshold: threshold || 0.4, enrichWithSignals: true });
+      return res.json({ context: context, users: run.stats.registrants, matches_generated: run.matches.length, stats: run.stats });
     } else if (community_id) {
       context = { type: 'community', id: parseInt(community_id) };
       users = await dbAll("SELECT user_id FROM community_members WHERE community_id = $1", [community_id]);
@@ -2129,6 +2409,169 @@ async function hasNegativeHistory(userA, userB) {
   } catch(e) { return false; }
 }
 
+// ══════════════════════════════════════════════════════
+// WHOLE-EVENT MATCHING — every unordered pair scored once
+// ══════════════════════════════════════════════════════
+// Per-user fan-out considers each pair twice and re-resolves the pool, the
+// real-account filter and the ANN query for every registrant. This job loads
+// the pool, its profiles and vectors once, builds the full similarity matrix
+// in one pass, and scores each unordered pair exactly once.
+
+var lastEventMatchingStats = [];
+
+// event_matches columns written by the matcher, with unnest() element types.
+var MATCH_INSERT_COLUMNS = [
+  { name: 'event_id', type: 'int' }, { name: 'community_id', type: 'int' },
+  { name: 'scope_type', type: 'text' }, { name: 'user_a_id', type: 'int' },
+  { name: 'user_b_id', type: 'int' }, { name: 'score_total', type: 'float8' },
+  { name: 'score_semantic', type: 'float8' }, { name: 'score_theme', type: 'float8' },
+  { name: 'score_intent', type: 'float8' }, { name: 'score_stakeholder', type: 'float8' },
+  { name: 'score_capital', type: 'float8' }, { name: 'score_signal_convergence', type: 'float8' },
+  { name: 'score_timing', type: 'float8' }, { name: 'score_constraint_complementarity', type: 'float8' },
+  { name: 'score_geography', type: 'float8' }, { name: 'score_urgency', type: 'float8' },
+  { name: 'score_canister_richness', type: 'float8' }, { name: 'match_mode', type: 'text' },
+  { name: 'match_reasons', type: 'jsonb' }, { name: 'signal_context', type: 'jsonb' },
+  { name: 'status', type: 'text' }
+];
+
+function matchInsertValues(row) {
+  var mr = row.result;
+  return [
+    row.eventId, row.communityId, row.scopeType, mr.user_a_id, mr.user_b_id,
+    mr.score_total, mr.score_semantic, mr.score_theme, mr.score_intent,
+    mr.score_stakeholder, mr.score_capital,
+    mr.score_signal_convergence, mr.score_timing, mr.score_constraint_complementarity,
+    mr.score_geography, mr.score_urgency, mr.score_canister_richness, row.scopeType,
+    JSON.stringify(mr.match_reasons), JSON.stringify(mr.signal_context),
+    'pending'
+  ];
+}
+
+// Bulk write via unnest(), a few hundred rows per round trip. Pairs that
+// already exist in the scope are skipped by ON CONFLICT DO NOTHING against
+// uq_event_matches_scope_pair, so no per-pair duplicate check is needed.
+// Returns [{ id, user_a_id, user_b_id }] for the rows actually written.
+async function insertMatchRows(rows) {
+  return dbBulkInsert('event_matches', MATCH_INSERT_COLUMNS, rows.map(matchInsertValues), {
+    returning: 'id, user_a_id, user_b_id'
+  });
+}
+
+async function generateEventMatches(eventId, options) {
+  options = options || {};
+  var threshold = options.threshold || 0.45;
+  var candidateLimit = options.candidateLimit || 50;
+  var t0 = Date.now();
+  var stats = {
+    event_id: eventId, registrants: 0, with_vectors: 0, pairs_considered: 0,
+    pairs_scored: 0, matches_created: 0,
+    load_ms: 0, similarity_ms: 0, scoring_ms: 0, insert_ms: 0, total_ms: 0
+  };
+
+  // ── Load: real registrants, scoring context, existing pairs, vectors ──
+  // Same blocklist as generateMatchesForUser: test/seed accounts never match.
+  var regs = await dbAll(
+    `SELECT er.user_id FROM event_registrations er JOIN users u ON u.id = er.user_id
+     WHERE er.event_id = $1 AND er.status = 'active' AND u.auth_provider NOT IN ('test','seed')
+     ORDER BY er.registered_at, er.user_id`,
+    [eventId]
+  );
+  var ids = regs.map(function(r) { return r.user_id; });
+  stats.registrants = ids.length;
+  if (ids.length < 2) {
+    stats.total_ms = Date.now() - t0;
+    return { matches: [], stats: stats };
+  }
+
+  var ctx = await loadScoringContext(ids, options);
+  var existingPairs = await loadExistingPairs({ type: 'event', id: eventId }, ids);
+  // If the vector store is unreachable, carry on as if nobody had a stored
+  // vector: the embedding fallback below fills what it can, and any user
+  // still without one has every pair scored with semantic 0 rather than the
+  // whole event failing.
+  var vectors;
+  try {
+    vectors = await getPointVectors(COLLECTIONS.profiles, ids);
+  } catch(e) {
+    console.error('[Matcher] event ' + eventId + ' vector load failed, scoring without stored vectors:', e.message);
+    vectors = {};
+  }
+
+  // Users without a stored vector: embed their profile text once, in one call
+  var unembedded = ids.filter(function(id) { return !vectors[id] && ctx.profiles[id]; });
+  if (unembedded.length) {
+    try {
+      var texts = unembedded.map(function(id) {
+        var p = ctx.profiles[id];
+        try { return buildProfileText(p, { name: p.name, company: p.company }); } catch(e) { return ''; }
+      });
+      var fresh = await getEmbeddings(texts);
+      if (fresh.length === unembedded.length) {
+        unembedded.forEach(function(id, k) { if (texts[k]) vectors[id] = fresh[k]; });
+      }
+    } catch(e) {
+      console.error('[Matcher] event ' + eventId + ' fallback embedding failed:', e.message);
+    }
+  }
+  stats.load_ms = Date.now() - t0;
+
+  // ── Similarity: one vectorised pass over the packed slab ──
+  // options.planEventPairs lets the scheduler run this on a worker thread.
+  var t1 = Date.now();
+  var n = ids.length;
+  var hasVector = ids.map(function(id) { return !!vectors[id]; });
+  stats.with_vectors = hasVector.filter(Boolean).length;
+  var planner = options.planEventPairs || planEventPairs;
+  var plan = await planner(ids.map(function(id) { return vectors[id] || null; }), candidateLimit);
+  var matrix = plan.matrix;
+  var considered = plan.considered;
+  stats.similarity_ms = Date.now() - t1;
+
+  // ── Scoring: upper triangle only, earlier registrant is side A ──
+  var t2 = Date.now();
+  var rows = [];
+  for (var a = 0; a < n; a++) {
+    for (var b = a + 1; b < n; b++) {
+      if (!considered[a * n + b]) continue;
+      stats.pairs_considered++;
+      var ua = ids[a], ub = ids[b];
+      if (mixesTestAndReal(ctx, ua, ub) || existingPairs.has(pairKey(ua, ub))) continue;
+      var sim = hasVector[a] && hasVector[b] ? matrix[a * n + b] : 0;
+      var result = scorePairFromContext(ctx, ua, ub, eventId, sim);
+      stats.pairs_scored++;
+      if (!result || result.score_total < threshold) continue;
+      rows.push({ eventId: eventId, communityId: null, scopeType: 'event', result: result });
+    }
+  }
+  rows.sort(function(x, y) { return y.result.score_total - x.result.score_total; });
+  stats.scoring_ms = Date.now() - t2;
+
+  // ── Insert ──
+  var t3 = Date.now();
+  var created = rows.length ? await insertMatchRows(rows) : [];
+  stats.matches_created = created.length;
+  stats.insert_ms = Date.now() - t3;
+  stats.total_ms = Date.now() - t0;
+
+  if (created.length) {
+    var createdPairs = created.map(function(r) { return { matchId: r.id, a: r.user_a_id, b: r.user_b_id }; });
+    enqueueJob('notify_matches', { pairs: createdPairs }).catch(function(e) {
+      console.error('[Matcher] notifyNewMatches error:', e.message);
+    });
+  }
+
+  console.log('[Matcher] event ' + eventId + ': ' + stats.registrants + ' registrants, ' +
+    stats.pairs_scored + '/' + stats.pairs_considered + ' pairs scored, ' + stats.matches_created +
+    ' created in ' + stats.total_ms + 'ms (load ' + stats.load_ms + ', sim ' + stats.similarity_ms +
+    ', score ' + stats.scoring_ms + ', insert ' + stats.insert_ms + ')');
+
+  return { matches: rows.map(function(r) { return r.result; }), stats: stats };
+}
+
+function getEventMatchingStats() {
+  return lastEventMatchingStats;
+}
+
 // ══════════════════════════════════════════════════════
 // SCHEDULER FUNCTIONS (exported for server.js)
 // ══════════════════════════════════════════════════════
@@ -2136,13 +2579,15 @@ async function hasNegativeHistory(userA, userB) {
 async function runEventMatching() {
   var db = require('../db');
   var events = await db.dbAll("SELECT id FROM events WHERE event_date BETWEEN NOW() AND NOW() + INTERVAL '30 days'");
+  var runStats = [];
   for (var i = 0; i < events.length; i++) {
-    var regs = await db.dbAll("SELECT user_id FROM event_registrations WHERE event_id = $1 AND status = 'active'", [events[i].id]);
-    for (var j = 0; j < regs.length; j++) {
-      try { await generateMatchesForUser(regs[j].user_id, { type: 'event', id: events[i].id }); } catch(e) { console.error('[matching] event match error:', e.message); }
-    }
-    if (regs.length) console.log('[scheduler] event', events[i].id, ':', regs.length, 'users processed');
+    try {
+      var run = await generateEventMatches(events[i].id);
+      if (run.stats.registrants) runStats.push(run.stats);
+    } catch(e) { console.error('[matching] event match error:', e.message); }
   }
+  lastEventMatchingStats = runStats;
+  return runStats;
 }
 
 async function runCommunityMatching() {
@@ -2171,7 +2616,6 @@ async function runGlobalMatching() {
   `);
   for (var i = 0; i < candidates.length; i++) {
     try { await generateMatchesForUser(candidates[i].user_id, { type: 'global' }); } catch(e) {}
-    await new Promise(function(r){ setTimeout(r, 200); });
   }
   console.log('[scheduler] global matching:', candidates.length, 'candidates processed');
 }
@@ -2181,7 +2625,8 @@ async function runGlobalMatching() {
 // ══════════════════════════════════════════════════════
 
 module.exports = {
-  router, scoreMatch, generateMatchesForUser,
+  router, scoreMatch, scoreMatchBatch, loadScoringContext, generateMatchesForUser,
+  generateEventMatches, getEventMatchingStats,
   createNotification, notifyMatchReveal, notifyNewMatches,
   extractDebriefInsights, getNevResponse,
   scoreGeography, scoreUrgency, computeRichness, hasNegativeHistory,
@@ -148,15 +148,13 @@ router.get('/graph', async function(req, res) {
         sp.geography,
         sp.themes,
         u.company,
-        COUNT(DISTINCT er.event_id)                                          AS event_count,
-        COUNT(DISTINCT CASE WHEN em.status = 'revealed' THEN em.id END)     AS match_count
+        COUNT(er.event_id)                                                   AS event_count,
+        u.reveal_count                                                       AS match_count
       FROM users u
       JOIN stakeholder_profiles sp ON sp.user_id = u.id
       LEFT JOIN event_registrations er ON er.user_id = u.id AND er.status = 'active'
-      LEFT JOIN event_matches em
-             ON (em.user_a_id = u.id OR em.user_b_id = u.id)
       WHERE sp.geography IS NOT NULL AND sp.geography <> ''
-      GROUP BY u.id, sp.stakeholder_type, sp.geography, sp.themes, u.company
+      GROUP BY u.id, sp.stakeholder_type, sp.geography, sp.themes, u.company, u.reveal_count
     `);
 
     var members = memberRows.map(function(r) {
@@ -177,14 +175,13 @@ router.get('/graph', async function(req, res) {
     var eventRows = await dbAll(`
       SELECT
         e.id, e.name, e.slug, e.event_date, e.city, e.country, e.themes,
-        COUNT(DISTINCT er.id)                                              AS registered_count,
-        COUNT(DISTINCT em.id)                                              AS match_count,
-        COUNT(DISTINCT CASE WHEN em.status = 'revealed' THEN em.id END)   AS revealed_count
+        e.registration_count                                               AS registered_count,
+        COUNT(em.id)                                                       AS match_count,
+        COUNT(em.id) FILTER (WHERE em.status = 'revealed')                 AS revealed_count
       FROM events e
-      LEFT JOIN event_registrations er ON er.event_id = e.id AND er.status = 'active'
       LEFT JOIN event_matches em ON em.event_id = e.id
       WHERE e.city IS NOT NULL
-      GROUP BY e.id, e.name, e.slug, e.event_date, e.city, e.country, e.themes
+      GROUP BY e.id, e.name, e.slug, e.event_date, e.city, e.country, e.themes, e.registration_count
       ORDER BY e.event_date DESC
       LIMIT 50
     `);
@@ -1,6 +1,7 @@
 var express = require('express');
 var { dbGet, dbRun, dbAll } = require('../db');
 var { authenticateToken } = require('../middleware/auth');
+var { invalidateUserSessions } = require('../lib/session_cache');
 
 var router = express.Router();
 
@@ -230,6 +231,7 @@ router.delete('/delete-account', authenticateToken, async function(req, res) {
 
     // 8. Sessions
     await safeDel('DELETE FROM sessions WHERE user_id = $1', [userId]);
+    await invalidateUserSessions(userId).catch(function(e) { console.error('GDPR DELETION: session invalidation failed:', e.message); });
 
     // 9. Magic codes
     await safeDel('DELETE FROM magic_codes WHERE email = $1', [user.email]);
@@ -2,7 +2,10 @@ var express = require('express');
 var { dbGet, dbRun, dbAll } = require('../db');
 var { authenticateToken } = require('../middleware/auth');
 var { normalizeTheme, normalizeThemes } = require('../lib/theme_taxonomy');
-var { embedSignal, embedSignalsBatch, searchSignalsByThemes } = require('../lib/vector_search');
+var { searchSignalsByThemes } = require('../lib/vector_search');
+var { bulkIngestSignals, enqueueSignalEmbeddings } = require('../lib/signal_ingest');
+var { enqueueJob } = require('../lib/job_queue');
+var { noteSignalsChanged } = require('../lib/signal_rollup');
 
 var router = express.Router();
 
@@ -89,17 +92,20 @@ router.post('/ingest', async function(req, res) {
 
     var signal = result.rows[0];
 
-    // Resolve to canonical entity if entity_name provided
+    // Resolve to canonical entity if entity_name provided (background job)
     if (s.entity_name) {
-      resolveEntity(s.entity_type || 'company', s.entity_name, signal.id).catch(function(err) {
+      enqueueJob('resolve_entity', { entity_type: s.entity_type || 'company', name: s.entity_name, signal_id: signal.id }).catch(function(err) {
         console.error('Entity resolution error:', err);
       });
     }
 
-    // Embed in Qdrant (async)
-    embedSignal(signal).catch(function(err) {
+    // Embed in Qdrant (background job)
+    enqueueSignalEmbeddings([signal.id]).catch(function(err) {
       console.error('Signal embedding error:', err);
     });
+    noteSignalsChanged([signal]).catch(function(err) {
+      console.error('Signal rollup refresh error:', err.message);
+    });
 
     res.json({ signal: signal });
   } catch (err) {
@@ -109,6 +115,8 @@ router.post('/ingest', async function(req, res) {
 });
 
 // ── POST /api/signals/ingest-batch ── (ingest multiple signals)
+// Set-based: chunked bulk insert, one entity-resolution statement per chunk,
+// embeddings queued in the background (see lib/signal_ingest.js).
 router.post('/ingest-batch', async function(req, res) {
   try {
     var signals = req.body.signals;
@@ -116,81 +124,8 @@ router.post('/ingest-batch', async function(req, res) {
       return res.status(400).json({ error: 'signals array required' });
     }
 
-    var inserted = [];
-    for (var i = 0; i < signals.length; i++) {
-      var s = signals[i];
-      if (!s.source_type) continue;
-
-      var theme = s.theme ? normalizeTheme(s.theme) : null;
-      var themesArr = s.themes ? normalizeThemes(s.themes) : [];
-      if (theme && themesArr.indexOf(theme) === -1) themesArr.push(theme);
-
-      var sourceWeightMap = {
-        'sec_filing': 2.0, 'regulatory': 2.0, 'venture': 1.8, 'funding': 1.8,
-        'corporate': 1.5, 'patent': 1.5, 'hiring': 1.3, 'event': 1.2,
-        'podcast': 1.0, 'news': 0.8, 'pr': 0.6, 'social': 0.5
-      };
-      var sourceWeight = sourceWeightMap[s.source_type] || 1.0;
-
-      var recencyWeight = 1.0;
-      if (s.signal_date) {
-        var age = (Date.now() - new Date(s.signal_date).getTime()) / (1000 * 60 * 60 * 24);
-        recencyWeight = Math.max(0.2, 1.0 - (age / 90) * 0.8);
-      }
-
-      var costMap = {
-        'regulatory': 'high', 'sec_filing': 'high', 'corporate': 'high',
-        'venture': 'high', 'funding': 'high',
-        'hiring': 'medium', 'event': 'medium', 'podcast': 'medium',
-        'news': 'low', 'pr': 'low', 'social': 'low'
-      };
-
-      var result = await dbRun(
-        `INSERT INTO unified_signals (
-          source_type, source_id, source_url,
-          entity_type, entity_name, entities_json,
-          theme, themes_json, theme_confidence,
-          signal_type, signal_text, signal_summary,
-          sentiment, sentiment_score,
-          geography, country, city,
-          cost_of_signal, constraint_level,
-          independence_score, is_derivative,
-          source_weight, recency_weight, final_weight,
-          dollar_amount, dollar_unit,
-          lifecycle_stage, signal_date
-        ) VALUES (
-          $1, $2, $3, $4, $5, $6, $7, $8, $9, $10,
-          $11, $12, $13, $14, $15, $16, $17, $18, $19, $20,
-          $21, $22, $23, $24, $25, $26, $27, $28
-        ) RETURNING *`,
-        [
-          s.source_type, s.source_id || null, s.source_url || null,
-          s.entity_type || null, s.entity_name || null, JSON.stringify(s.entities || []),
-          theme, JSON.stringify(themesArr), s.theme_confidence || 0.0,
-          s.signal_type || null, s.signal_text || null, s.signal_summary || null,
-          s.sentiment || null, s.sentiment_score || null,
-          s.geography || null, s.country || null, s.city || null,
-          costMap[s.source_type] || 'low', s.constraint_level || 'low',
-          s.independence_score || 0.5, s.is_derivative || false,
-          sourceWeight, recencyWeight, sourceWeight * recencyWeight,
-          s.dollar_amount || null, s.dollar_unit || null,
-          s.lifecycle_stage || 'unknown', s.signal_date || null
-        ]
-      );
-      inserted.push(result.rows[0]);
-    }
-
-    // Batch embed all inserted signals
-    var embeddedCount = await embedSignalsBatch(inserted);
-
-    // Resolve entities (async)
-    inserted.forEach(function(sig) {
-      if (sig.entity_name) {
-        resolveEntity(sig.entity_type || 'company', sig.entity_name, sig.id).catch(function() {});
-      }
-    });
-
-    res.json({ inserted: inserted.length, embedded: embeddedCount });
+    var result = await bulkIngestSignals(signals);
+    res.json({ inserted: result.inserted, entities_linked: result.entities_linked, embedding_queued: result.ids.length });
   } catch (err) {
     console.error('Batch ingest error:', err);
     res.status(500).json({ error: 'Batch ingest failed' });
@@ -298,9 +233,12 @@ router.post('/ingest/corporate', async function(req, res) {
     );
 
     // Embed the unified signal
-    embedSignal(unified.rows[0]).catch(function(err) {
+    enqueueSignalEmbeddings([unified.rows[0].id]).catch(function(err) {
       console.error('Corporate signal embedding error:', err);
     });
+    noteSignalsChanged(unified.rows).catch(function(err) {
+      console.error('Signal rollup refresh error:', err.message);
+    });
 
     res.json({ corporate_signal: corp.rows[0], unified_signal: unified.rows[0] });
   } catch (err) {
@@ -358,9 +296,12 @@ router.post('/ingest/podcast', async function(req, res) {
       ]
     );
 
-    embedSignal(unified.rows[0]).catch(function(err) {
+    enqueueSignalEmbeddings([unified.rows[0].id]).catch(function(err) {
       console.error('Podcast signal embedding error:', err);
     });
+    noteSignalsChanged(unified.rows).catch(function(err) {
+      console.error('Signal rollup refresh error:', err.message);
+    });
 
     res.json({ episode: episode.rows[0], unified_signal: unified.rows[0] });
   } catch (err) {
@@ -405,9 +346,12 @@ router.post('/ingest/news', async function(req, res) {
       ]
     );
 
-    embedSignal(unified.rows[0]).catch(function(err) {
+    enqueueSignalEmbeddings([unified.rows[0].id]).catch(function(err) {
       console.error('News signal embedding error:', err);
     });
+    noteSignalsChanged(unified.rows).catch(function(err) {
+      console.error('Signal rollup refresh error:', err.message);
+    });
 
     res.json({ signal: unified.rows[0] });
   } catch (err) {
@@ -447,9 +391,12 @@ router.post('/ingest/venture', async function(req, res) {
       ]
     );
 
-    embedSignal(unified.rows[0]).catch(function(err) {
+    enqueueSignalEmbeddings([unified.rows[0].id]).catch(function(err) {
       console.error('Venture signal embedding error:', err);
     });
+    noteSignalsChanged(unified.rows).catch(function(err) {
+      console.error('Signal rollup refresh error:', err.message);
+    });
 
     res.json({ signal: unified.rows[0] });
   } catch (err) {
@@ -458,41 +405,4 @@ router.post('/ingest/venture', async function(req, res) {
   }
 });
 
-// ── Entity Resolution Helper ──
-
-async function resolveEntity(entityType, name, signalId) {
-  if (!name) return null;
-
-  var canonical = name.trim();
-  // Try to find existing entity
-  var entity = await dbGet(
-    `SELECT id FROM entities
-     WHERE entity_type = $1 AND (canonical_name = $2 OR aliases::text ILIKE $3)`,
-    [entityType, canonical, '%' + canonical + '%']
-  );
-
-  if (!entity) {
-    // Create new entity
-    var result = await dbRun(
-      'INSERT INTO entities (entity_type, canonical_name) VALUES ($1, $2) ON CONFLICT (entity_type, canonical_name) DO NOTHING RETURNING id',
-      [entityType, canonical]
-    );
-    if (result.rows.length) {
-      entity = result.rows[0];
-    } else {
-      entity = await dbGet('SELECT id FROM entities WHERE entity_type = $1 AND canonical_name = $2', [entityType, canonical]);
-    }
-  }
-
-  // Link signal to entity
-  if (entity && signalId) {
-    await dbRun(
-      'UPDATE unified_signals SET entity_id = $1 WHERE id = $2',
-      [String(entity.id), signalId]
-    );
-  }
-
-  return entity ? entity.id : null;
-}
-
-module.exports = { router, resolveEntity };
+module.exports = { router };
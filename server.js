@@ -149,6 +149,103 @@ async function runMigrations() {
     // Event visibility for community events
     await dbRun('ALTER TABLE events ADD COLUMN IF NOT EXISTS community_id INTEGER REFERENCES communities(id)');
     await dbRun('ALTER TABLE events ADD COLUMN IF NOT EXISTS is_public BOOLEAN DEFAULT FALSE');
+    // Event dedup index: normalised_name is the SQL mirror of normaliseName()
+    // in lib/event_dedup.js — keep the two in step.
+    await dbRun(`CREATE OR REPLACE FUNCTION em_normalise_event_name(n TEXT) RETURNS TEXT AS $$
+      SELECT regexp_replace(regexp_replace(regexp_replace(regexp_replace(regexp_replace(regexp_replace(regexp_replace(
+        lower(COALESCE(n, '')),
+        '\\y20\\d{2}\\y', '', 'g'),
+        '\\y\\d{1,3}(st|nd|rd|th)\\y', '', 'g'),
+        '\\yedition\\y', '', 'g'),
+        '\\yannual\\y', '', 'g'),
+        'conference|summit|expo|forum|congress|convention|festival|symposium', '', 'g'),
+        '&|and', '', 'g'),
+        '[^a-z0-9]', '', 'g')
+    $$ LANGUAGE sql IMMUTABLE`).catch(function(e) { console.error('[migrate] em_normalise_event_name:', e.message); });
+    await dbRun('ALTER TABLE events ADD COLUMN IF NOT EXISTS normalised_name TEXT GENERATED ALWAYS AS (em_normalise_event_name(name)) STORED').catch(function(e) {
+      console.error('[migrate] events.normalised_name:', e.message);
+    });
+    await dbRun('CREATE EXTENSION IF NOT EXISTS pg_trgm').catch(function(e) { console.error('[migrate] pg_trgm:', e.message); });
+    await dbRun('CREATE INDEX IF NOT EXISTS idx_events_normalised_name_trgm ON events USING gin (normalised_name gin_trgm_ops)').catch(function(e) {
+      console.error('[migrate] idx_events_normalised_name_trgm:', e.message);
+    });
+    await dbRun('CREATE INDEX IF NOT EXISTS idx_events_normalised_name ON events (normalised_name)').catch(function(){});
+    await dbRun('CREATE INDEX IF NOT EXISTS idx_events_lower_name ON events (LOWER(name))').catch(function(){});
+    // Event search (lib/event_search.js): full-text, theme containment,
+    // normalised places, keyset sort keys and a maintained RSVP counter.
+    // em_normalise_place is mirrored by normalisePlace() there.
+    await dbRun(`CREATE OR REPLACE FUNCTION em_normalise_place(p TEXT) RETURNS TEXT AS $$
+      SELECT lower(btrim(regexp_replace(COALESCE(p, ''), '\\s+', ' ', 'g')))
+    $$ LANGUAGE sql IMMUTABLE`).catch(function(e) { console.error('[migrate] em_normalise_place:', e.message); });
+    await dbRun("ALTER TABLE events ADD COLUMN IF NOT EXISTS search_tsv tsvector GENERATED ALWAYS AS (setweight(to_tsvector('english', COALESCE(name, '')), 'A') || setweight(to_tsvector('english', COALESCE(description, '')), 'B')) STORED").catch(function(e) {
+      console.error('[migrate] events.search_tsv:', e.message);
+    });
+    await dbRun('ALTER TABLE events ADD COLUMN IF NOT EXISTS city_norm TEXT GENERATED ALWAYS AS (em_normalise_place(city)) STORED').catch(function(e) {
+      console.error('[migrate] events.city_norm:', e.message);
+    });
+    await dbRun('ALTER TABLE events ADD COLUMN IF NOT EXISTS country_norm TEXT GENERATED ALWAYS AS (em_normalise_place(country)) STORED').catch(function(e) {
+      console.error('[migrate] events.country_norm:', e.message);
+    });
+    // Maintained counter columns created by this run are filled once the
+    // counter triggers exist (below), rather than reading 0 until the
+    // reconciler's first scheduled pass.
+    var counterCols = await dbRun(`SELECT COUNT(*)::int AS n FROM information_schema.columns
+      WHERE table_schema = current_schema()
+        AND (table_name, column_name) IN (('events', 'registration_count'), ('communities', 'member_count'),
+                                          ('users', 'match_count'), ('users', 'reveal_count'))`);
+    var newCounterColumns = counterCols.rows[0].n < 4;
+    await dbRun('ALTER TABLE events ADD COLUMN IF NOT EXISTS registration_count INTEGER NOT NULL DEFAULT 0');
+    await dbRun('CREATE INDEX IF NOT EXISTS idx_events_search_tsv ON events USING gin (search_tsv)').catch(function(){});
+    await dbRun('CREATE INDEX IF NOT EXISTS idx_events_name_trgm ON events USING gin (name gin_trgm_ops)').catch(function(){});
+    await dbRun('CREATE INDEX IF NOT EXISTS idx_events_themes ON events USING gin (themes jsonb_path_ops)').catch(function(){});
+    // Place filters are substring matches; the earlier prefix-only btree
+    // indexes are replaced by trigram ones
+    await dbRun('DROP INDEX IF EXISTS idx_events_city_norm').catch(function(){});
+    await dbRun('DROP INDEX IF EXISTS idx_events_country_norm').catch(function(){});
+    await dbRun('CREATE INDEX IF NOT EXISTS idx_events_city_norm_trgm ON events USING gin (city_norm gin_trgm_ops)').catch(function(){});
+    await dbRun('CREATE INDEX IF NOT EXISTS idx_events_country_norm_trgm ON events USING gin (country_norm gin_trgm_ops)').catch(function(){});
+    await dbRun("CREATE INDEX IF NOT EXISTS idx_events_date_key ON events ((COALESCE(event_date, 'infinity'::date)), id)").catch(function(){});
+    await dbRun("CREATE INDEX IF NOT EXISTS idx_events_popular ON events (registration_count DESC, (COALESCE(event_date, 'infinity'::date)), id)").catch(function(){});
+    await dbRun(`CREATE OR REPLACE FUNCTION em_event_registration_count() RETURNS trigger AS $$
+      BEGIN
+        IF TG_OP IN ('UPDATE', 'DELETE') AND OLD.status = 'active' THEN
+          UPDATE events SET registration_count = registration_count - 1 WHERE id = OLD.event_id;
+        END IF;
+        IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.status = 'active' THEN
+          UPDATE events SET registration_count = registration_count + 1 WHERE id = NEW.event_id;
+        END IF;
+        RETURN NULL;
+      END
+    $$ LANGUAGE plpgsql`).catch(function(e) { console.error('[migrate] em_event_registration_count:', e.message); });
+    await dbRun(`DO $$ BEGIN
+      IF NOT EXISTS (SELECT 1 FROM pg_trigger WHERE tgname = 'trg_event_registration_count') THEN
+        CREATE TRIGGER trg_event_registration_count
+          AFTER INSERT OR DELETE OR UPDATE OF status, event_id ON event_registrations
+          FOR EACH ROW EXECUTE FUNCTION em_event_registration_count();
+      END IF;
+    END $$`).catch(function(e) { console.error('[migrate] trg_event_registration_count:', e.message); });
+    // Events version (lib/events_version.js): any content change to events
+    // bumps the sequence; in-process caches compare it to decide on a rebuild.
+    await dbRun('CREATE SEQUENCE IF NOT EXISTS em_events_change_seq').catch(function(e) { console.error('[migrate] em_events_change_seq:', e.message); });
+    await dbRun(`CREATE OR REPLACE FUNCTION em_events_changed() RETURNS trigger AS $$
+      BEGIN
+        PERFORM nextval('em_events_change_seq');
+        RETURN NULL;
+      END
+    $$ LANGUAGE plpgsql`).catch(function(e) { console.error('[migrate] em_events_changed:', e.message); });
+    await dbRun(`DO $$ BEGIN
+      IF NOT EXISTS (SELECT 1 FROM pg_trigger WHERE tgname = 'trg_events_changed') THEN
+        CREATE TRIGGER trg_events_changed
+          AFTER INSERT OR DELETE OR TRUNCATE ON events
+          FOR EACH STATEMENT EXECUTE FUNCTION em_events_changed();
+      END IF;
+      IF NOT EXISTS (SELECT 1 FROM pg_trigger WHERE tgname = 'trg_events_changed_update') THEN
+        CREATE TRIGGER trg_events_changed_update
+          AFTER UPDATE OF name, description, event_date, city, country, themes, event_type, slug,
+                          source_url, image_url, expected_attendees, community_id, is_public ON events
+          FOR EACH STATEMENT EXECUTE FUNCTION em_events_changed();
+      END IF;
+    END $$`).catch(function(e) { console.error('[migrate] trg_events_changed:', e.message); });
     // Community intelligence tables
     await dbRun(`CREATE TABLE IF NOT EXISTS community_taxonomies (
       id SERIAL PRIMARY KEY, community_id INTEGER REFERENCES communities(id),
@@ -237,9 +334,116 @@ async function runMigrations() {
     await dbRun("ALTER TABLE unified_signals ADD COLUMN IF NOT EXISTS visibility TEXT DEFAULT 'public'").catch(function(){});
     await dbRun('CREATE INDEX IF NOT EXISTS idx_unified_signals_user ON unified_signals(user_id)').catch(function(){});
     await dbRun('CREATE INDEX IF NOT EXISTS idx_unified_signals_doc ON unified_signals(document_id)').catch(function(){});
+    // Signal enrichment looks companies up by LOWER(entity_name)
+    await dbRun('CREATE INDEX IF NOT EXISTS idx_unified_signals_entity_lower ON unified_signals (LOWER(entity_name), signal_date)').catch(function(){});
+    // Theme rollup refresh scans one theme's trailing window
+    await dbRun('CREATE INDEX IF NOT EXISTS idx_unified_signals_theme_date ON unified_signals (theme, signal_date)').catch(function(){});
+    // Bulk signal ingest resolves entity names against aliases with `aliases ? name`
+    await dbRun('CREATE INDEX IF NOT EXISTS idx_entities_aliases ON entities USING gin (aliases)').catch(function(){});
+    // Single-signal ingest links names found anywhere in aliases (ILIKE '%name%')
+    await dbRun('CREATE INDEX IF NOT EXISTS idx_entities_aliases_trgm ON entities USING gin ((aliases::text) gin_trgm_ops)').catch(function(){});
     // Communities (may already exist from initial deploy — IF NOT EXISTS is safe)
     await dbRun("CREATE TABLE IF NOT EXISTS communities (id SERIAL PRIMARY KEY, name TEXT NOT NULL, slug TEXT UNIQUE, description TEXT, owner_user_id INTEGER REFERENCES users(id), access_code VARCHAR(20) UNIQUE, is_active BOOLEAN DEFAULT TRUE, comm_type TEXT DEFAULT 'open', themes JSONB DEFAULT '[]', created_at TIMESTAMPTZ DEFAULT NOW(), updated_at TIMESTAMPTZ DEFAULT NOW())");
     await dbRun("CREATE TABLE IF NOT EXISTS community_members (id SERIAL PRIMARY KEY, community_id INTEGER NOT NULL REFERENCES communities(id) ON DELETE CASCADE, user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE, role TEXT DEFAULT 'member', joined_at TIMESTAMPTZ DEFAULT NOW(), UNIQUE(community_id, user_id))");
+    // Maintained counters (lib/counters.js reconciles them): member count per
+    // community, match and reveal counts per user. Events' registration_count
+    // is set up with the event search columns above.
+    await dbRun('ALTER TABLE communities ADD COLUMN IF NOT EXISTS member_count INTEGER NOT NULL DEFAULT 0');
+    await dbRun('ALTER TABLE users ADD COLUMN IF NOT EXISTS match_count INTEGER NOT NULL DEFAULT 0');
+    await dbRun('ALTER TABLE users ADD COLUMN IF NOT EXISTS reveal_count INTEGER NOT NULL DEFAULT 0');
+    await dbRun(`CREATE OR REPLACE FUNCTION em_community_member_count() RETURNS trigger AS $$
+      BEGIN
+        IF TG_OP IN ('UPDATE', 'DELETE') THEN
+          UPDATE communities SET member_count = member_count - 1 WHERE id = OLD.community_id;
+        END IF;
+        IF TG_OP IN ('INSERT', 'UPDATE') THEN
+          UPDATE communities SET member_count = member_count + 1 WHERE id = NEW.community_id;
+        END IF;
+        RETURN NULL;
+      END
+    $$ LANGUAGE plpgsql`).catch(function(e) { console.error('[migrate] em_community_member_count:', e.message); });
+    // Match counters are maintained per statement, not per row: the matching
+    // pool bulk-inserts hundreds of pairs per statement from concurrent jobs,
+    // and per-row UPDATEs of users locked rows in arrival order (deadlocks,
+    // hot rows for popular users). Each statement nets its +/-1s per user and
+    // applies them once, locking users in id order.
+    await dbRun(`CREATE OR REPLACE FUNCTION em_user_match_deltas() RETURNS trigger AS $$
+      DECLARE
+        a int[]; b int[]; rev boolean[]; sgn int[];
+        ids int[]; dm int[]; dr int[];
+      BEGIN
+        IF TG_OP = 'INSERT' THEN
+          SELECT array_agg(user_a_id), array_agg(user_b_id), array_agg(status = 'revealed'), array_agg(1)
+            INTO a, b, rev, sgn FROM new_rows;
+        ELSIF TG_OP = 'DELETE' THEN
+          SELECT array_agg(user_a_id), array_agg(user_b_id), array_agg(status = 'revealed'), array_agg(-1)
+            INTO a, b, rev, sgn FROM old_rows;
+        ELSE
+          SELECT array_agg(x.user_a_id), array_agg(x.user_b_id), array_agg(x.status = 'revealed'), array_agg(x.sign)
+            INTO a, b, rev, sgn
+            FROM (SELECT user_a_id, user_b_id, status, 1 AS sign FROM new_rows
+                  UNION ALL SELECT user_a_id, user_b_id, status, -1 FROM old_rows) x;
+        END IF;
+        IF a IS NULL THEN RETURN NULL; END IF;
+
+        SELECT array_agg(d.id ORDER BY d.id), array_agg(d.m ORDER BY d.id), array_agg(d.r ORDER BY d.id)
+          INTO ids, dm, dr
+          FROM (SELECT p.id, SUM(p.sign)::int AS m,
+                       SUM(CASE WHEN p.revealed THEN p.sign ELSE 0 END)::int AS r
+                FROM (SELECT r.ua AS id, r.revealed, r.sign FROM unnest(a, b, rev, sgn) AS r(ua, ub, revealed, sign)
+                      UNION ALL
+                      SELECT r.ub, r.revealed, r.sign FROM unnest(a, b, rev, sgn) AS r(ua, ub, revealed, sign)
+                      WHERE r.ub IS DISTINCT FROM r.ua) p
+                WHERE p.id IS NOT NULL
+                GROUP BY p.id) d
+          WHERE d.m <> 0 OR d.r <> 0;
+        IF ids IS NULL THEN RETURN NULL; END IF;
+
+        PERFORM 1 FROM users WHERE id = ANY(ids) ORDER BY id FOR UPDATE;
+        UPDATE users u SET match_count = u.match_count + d.m, reveal_count = u.reveal_count + d.r
+          FROM unnest(ids, dm, dr) AS d(id, m, r)
+          WHERE u.id = d.id;
+        RETURN NULL;
+      END
+    $$ LANGUAGE plpgsql`).catch(function(e) { console.error('[migrate] em_user_match_deltas:', e.message); });
+    // Transition tables rule out column lists, so the update trigger fires on
+    // every UPDATE statement; decision and score updates net to no change.
+    // Created and the old per-row triggers dropped in one statement, so there
+    // is no window without a trigger.
+    await dbRun(`DO $$ BEGIN
+      IF NOT EXISTS (SELECT 1 FROM pg_trigger WHERE tgname = 'trg_community_member_count') THEN
+        CREATE TRIGGER trg_community_member_count
+          AFTER INSERT OR DELETE OR UPDATE OF community_id ON community_members
+          FOR EACH ROW EXECUTE FUNCTION em_community_member_count();
+      END IF;
+      IF NOT EXISTS (SELECT 1 FROM pg_trigger WHERE tgname = 'trg_user_match_counts_ins') THEN
+        CREATE TRIGGER trg_user_match_counts_ins
+          AFTER INSERT ON event_matches REFERENCING NEW TABLE AS new_rows
+          FOR EACH STATEMENT EXECUTE FUNCTION em_user_match_deltas();
+      END IF;
+      IF NOT EXISTS (SELECT 1 FROM pg_trigger WHERE tgname = 'trg_user_match_counts_del') THEN
+        CREATE TRIGGER trg_user_match_counts_del
+          AFTER DELETE ON event_matches REFERENCING OLD TABLE AS old_rows
+          FOR EACH STATEMENT EXECUTE FUNCTION em_user_match_deltas();
+      END IF;
+      IF NOT EXISTS (SELECT 1 FROM pg_trigger WHERE tgname = 'trg_user_match_counts_upd') THEN
+        CREATE TRIGGER trg_user_match_counts_upd
+          AFTER UPDATE ON event_matches REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+          FOR EACH STATEMENT EXECUTE FUNCTION em_user_match_deltas();
+      END IF;
+      DROP TRIGGER IF EXISTS trg_user_match_counts ON event_matches;
+      DROP TRIGGER IF EXISTS trg_user_match_counts_update ON event_matches;
+    END $$`).catch(function(e) { console.error('[migrate] counter triggers:', e.message); });
+    await dbRun('DROP FUNCTION IF EXISTS em_user_match_counts()').catch(function(){});
+    if (newCounterColumns) {
+      var counterRun = await require('./lib/counters').reconcileCounters();
+      var counterErrors = Object.keys(counterRun.counters || {}).filter(function(k) { return counterRun.counters[k].error; });
+      if (counterRun.skipped || counterRun.error || counterErrors.length) {
+        console.error('[migrate] Counter backfill incomplete (' + (counterRun.skipped || counterRun.error || counterErrors.join(', ')) + '); the scheduled reconciler will retry');
+      } else {
+        console.log('[migrate] Counter columns backfilled in ' + counterRun.duration_ms + 'ms');
+      }
+    }
     // Match feedback / debrief tables
     await dbRun('ALTER TABLE event_matches ADD COLUMN IF NOT EXISTS user_a_context TEXT').catch(function(){});
     await dbRun('ALTER TABLE event_matches ADD COLUMN IF NOT EXISTS user_b_context TEXT').catch(function(){});
@@ -260,6 +464,30 @@ async function runMigrations() {
     await dbRun('CREATE INDEX IF NOT EXISTS idx_abuse_flags_recent ON abuse_flags(created_at DESC)').catch(function(){});
     await dbRun('CREATE INDEX IF NOT EXISTS idx_event_matches_status ON event_matches(status)').catch(function(){});
     await dbRun('CREATE INDEX IF NOT EXISTS idx_event_matches_revealed ON event_matches(revealed_at)').catch(function(){});
+    // One row per canonical (least, greatest) user pair per scope. Backs the
+    // bulk match writer's ON CONFLICT DO NOTHING, replacing the per-pair
+    // duplicate SELECT. Racing matcher runs left duplicate pending rows that
+    // nobody has acted on; drop the later copy so the index can build.
+    await dbRun(`DELETE FROM event_matches dup USING event_matches keep
+      WHERE dup.id > keep.id
+        AND COALESCE(dup.scope_type, 'event') = COALESCE(keep.scope_type, 'event')
+        AND COALESCE(dup.event_id, 0) = COALESCE(keep.event_id, 0)
+        AND COALESCE(dup.community_id, 0) = COALESCE(keep.community_id, 0)
+        AND LEAST(dup.user_a_id, dup.user_b_id) = LEAST(keep.user_a_id, keep.user_b_id)
+        AND GREATEST(dup.user_a_id, dup.user_b_id) = GREATEST(keep.user_a_id, keep.user_b_id)
+        AND dup.status = 'pending' AND dup.user_a_decision IS NULL AND dup.user_b_decision IS NULL`).catch(function(e) {
+      console.error('[migrate] event_matches duplicate cleanup:', e.message);
+    });
+    await dbRun(`CREATE UNIQUE INDEX IF NOT EXISTS uq_event_matches_scope_pair ON event_matches (
+      COALESCE(scope_type, 'event'), COALESCE(event_id, 0), COALESCE(community_id, 0),
+      LEAST(user_a_id, user_b_id), GREATEST(user_a_id, user_b_id))`).catch(function(e) {
+      console.error('[migrate] uq_event_matches_scope_pair:', e.message);
+    });
+    // Change tracking for incremental matching (lib/matching_scheduler.js)
+    await dbRun('CREATE INDEX IF NOT EXISTS idx_stakeholder_profiles_updated_at ON stakeholder_profiles(updated_at)').catch(function(){});
+    await dbRun('CREATE INDEX IF NOT EXISTS idx_stakeholder_profiles_embedding_updated_at ON stakeholder_profiles(embedding_updated_at)').catch(function(){});
+    await dbRun('CREATE INDEX IF NOT EXISTS idx_event_reg_registered_at ON event_registrations(registered_at)').catch(function(){});
+    await dbRun('CREATE INDEX IF NOT EXISTS idx_community_members_joined_at ON community_members(joined_at)').catch(function(){});
     // emc2_ledger indexes
     await dbRun('CREATE INDEX IF NOT EXISTS idx_emc2_ledger_user_id ON emc2_ledger(user_id)');
     await dbRun('CREATE INDEX IF NOT EXISTS idx_emc2_ledger_created_at ON emc2_ledger(created_at)');
@@ -469,85 +697,53 @@ runMigrations().then(function() {
 });
 
 // ── Scheduled matching: 3x daily (8am, 1pm, 6pm UTC) ──────────────────────────
-// node-cron is not installed — using setInterval with hour checking
-function scheduleMatching() {
-  var MATCH_HOURS = [8, 13, 18]; // UTC
-  setInterval(async function() {
-    var hour = new Date().getUTCHours();
-    var minute = new Date().getUTCMinutes();
-    if (MATCH_HOURS.indexOf(hour) === -1 || minute !== 0) return;
-    console.log('[Scheduler] Running matching cycle at ' + new Date().toISOString());
-    try {
-      var { runEventMatching, runCommunityMatching, generateMatchesForUser } = require('./routes/matches');
-      var db = require('./db');
-
-      // 1. Event-scoped matches
-      await runEventMatching().catch(function(e) { console.error('[Scheduler] runEventMatching error:', e.message); });
-
-      // 2. Community-scoped matches
-      await runCommunityMatching().catch(function(e) { console.error('[Scheduler] runCommunityMatching error:', e.message); });
-
-      // 3. Location-scoped matches — city clusters of 3+ users
-      var cityRows = await db.dbAll(
-        "SELECT DISTINCT SPLIT_PART(geography, ',', 1) as city FROM stakeholder_profiles WHERE geography IS NOT NULL AND geography != ''"
-      );
-      for (var i = 0; i < cityRows.length; i++) {
-        var city = (cityRows[i].city || '').trim();
-        if (!city) continue;
-        var cityUsers = await db.dbAll(
-          "SELECT user_id FROM stakeholder_profiles WHERE geography ILIKE $1", [city + '%']
-        );
-        if (cityUsers.length < 3) continue;
-        for (var j = 0; j < cityUsers.length; j++) {
-          try { await generateMatchesForUser(cityUsers[j].user_id, { type: 'location', city: city }); } catch(e) {}
-        }
-        console.log('[Scheduler] Location ' + city + ': processed ' + cityUsers.length + ' users');
-      }
-
-      // 4. Global scope — users where last_global_match is null or >7 days AND other scopes are thin
-      var globalCandidates = await db.dbAll(
-        `SELECT u.id FROM users u JOIN stakeholder_profiles sp ON sp.user_id = u.id
-         WHERE (u.last_global_match IS NULL OR u.last_global_match < NOW() - INTERVAL '7 days')
-         AND sp.stakeholder_type IS NOT NULL AND sp.themes IS NOT NULL LIMIT 20`
-      );
-      for (var i = 0; i < globalCandidates.length; i++) {
-        var uid = globalCandidates[i].id;
-        try {
-          var localCnt = await db.dbGet(
-            "SELECT COUNT(*)::int as cnt FROM event_matches WHERE (user_a_id = $1 OR user_b_id = $1) AND scope_type IN ('event','community')",
-            [uid]
-          );
-          if ((localCnt && localCnt.cnt || 0) < 3) {
-            await generateMatchesForUser(uid, { type: 'global' });
-            await db.dbRun("UPDATE users SET last_global_match = NOW() WHERE id = $1", [uid]);
-            console.log('[Scheduler] Global run for user ' + uid);
-          }
-        } catch(e) {}
-      }
-    } catch(err) {
-      console.error('[Scheduler] Matching cycle error:', err);
-    }
-  }, 60000); // check every minute
-}
-scheduleMatching();
+// Per-scope jobs on a bounded-concurrency pool with worker threads for the
+// similarity pass. See lib/matching_scheduler.js.
+require('./lib/matching_scheduler').startMatchingScheduler();
 
 // ── Autonomous event ingestion: daily discovery + weekly curated re-check ────
 // Self-schedules inside the server process (no external cron needed) and
 // catches up on boot if the last successful run is stale. See lib/ingestion_scheduler.js.
 require('./lib/ingestion_scheduler').startIngestionScheduler();
 
+// ── Background jobs: embeddings, entity resolution, notifications ────────────
+// Postgres-backed queue (FOR UPDATE SKIP LOCKED), so queued side effects
+// survive restarts and are shared across instances. Handlers register when
+// their modules load above. See lib/job_queue.js.
+require('./lib/job_queue').startJobWorkers();
+
+// ── Community pulse precompute: keeps pulse_cache warm ahead of expiry ───────
+// Replaces the external scripts/community_pulse.js cron. See lib/pulse_engine.js.
+require('./lib/pulse_engine').startPulseScheduler();
+
+// ── Counter reconciliation: repairs drift in trigger-maintained counts ──────
+// See lib/counters.js.
+require('./lib/counters').startCounterReconciler();
+
 // ── Admin: backfill embeddings ──
 app.post('/api/admin/backfill-embeddings', async function(req, res) {
   if (!req.session || req.session.userId !== 2) return res.status(403).json({ error: 'Forbidden' });
   try {
     var { backfillUnembeddedProfiles } = require('./lib/vector_search');
-    // Run async, return immediately
-    backfillUnembeddedProfiles().then(function(result) {
+    // Run async, return immediately. Resumes an interrupted run unless body.restart.
+    var restart = !!(req.body && req.body.restart);
+    backfillUnembeddedProfiles({ restart: restart }).then(function(result) {
       console.log('[admin] backfill complete:', result);
     }).catch(function(e) {
       console.error('[admin] backfill error:', e);
     });
-    res.json({ status: 'backfill started' });
+    res.json({ status: 'backfill started', restart: restart });
+  } catch(e) {
+    res.status(500).json({ error: e.message });
+  }
+});
+
+// ── Admin: backfill progress (throughput, ETA, checkpoint) ──
+app.get('/api/admin/backfill-embeddings', async function(req, res) {
+  if (!req.session || req.session.userId !== 2) return res.status(403).json({ error: 'Forbidden' });
+  try {
+    var { getBackfillStatus } = require('./lib/embedding_backfill');
+    res.json(await getBackfillStatus());
   } catch(e) {
     res.status(500).json({ error: e.message });
   }
@@ -576,4 +772,7 @@ app.listen(PORT, async function() {
   } else {
     console.log('Qdrant not configured — skipping collection init');
   }
+  // VECTOR_BACKEND=local|hybrid: warm the in-process index (snapshot, else Postgres)
+  var { startLocalVectorIndex } = require('./lib/vector_search');
+  startLocalVectorIndex().catch(function(e) { console.error('[startup] local vector index failed:', e.message); });
 });